@@ -0,0 +1,150 @@
+-- Migration: 015_create_evaluation_scores_and_stats
+-- Description: Typed per-criterion evaluation scores and incrementally maintained statistics
+-- Author: System Migration
+-- Date: 2026-10-19
+-- Dependencies: 007_create_jobs_table.sql, 009_create_interviews_table.sql
+
+-- Create evaluation_scores table (one row per interview and criterion, written by the evaluator)
+CREATE TABLE IF NOT EXISTS public.evaluation_scores (
+    id_interview INTEGER NOT NULL,
+    id_job INTEGER,
+    criterion VARCHAR(100) NOT NULL,
+    score NUMERIC(5,4) CHECK (score >= 0 AND score <= 1),
+    recommendation VARCHAR(20) CHECK (recommendation IN ('strong_hire', 'hire', 'no_hire', 'strong_no_hire')),
+    source VARCHAR(20) NOT NULL DEFAULT 'structured',
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+
+    PRIMARY KEY (id_interview, criterion),
+
+    -- Foreign key constraints
+    CONSTRAINT fk_evaluation_scores_interviews
+        FOREIGN KEY (id_interview)
+        REFERENCES public.interviews(id_interview)
+        ON DELETE CASCADE
+        ON UPDATE CASCADE,
+    CONSTRAINT fk_evaluation_scores_jobs
+        FOREIGN KEY (id_job)
+        REFERENCES public.jobs(id_job)
+        ON DELETE SET NULL
+        ON UPDATE CASCADE
+);
+
+-- Create evaluation_stats table (pre-aggregated per job; id_job = 0 holds the global totals)
+CREATE TABLE IF NOT EXISTS public.evaluation_stats (
+    id_job INTEGER NOT NULL,
+    criterion VARCHAR(100) NOT NULL,
+    n BIGINT NOT NULL DEFAULT 0,
+    scored BIGINT NOT NULL DEFAULT 0,
+    score_sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+    score_sq_sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+    strong_hire BIGINT NOT NULL DEFAULT 0,
+    hire BIGINT NOT NULL DEFAULT 0,
+    no_hire BIGINT NOT NULL DEFAULT 0,
+    strong_no_hire BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+
+    PRIMARY KEY (id_job, criterion)
+);
+
+-- Add comments for documentation
+COMMENT ON TABLE public.evaluation_scores IS 'Normalised evaluation scores per interview and criterion';
+COMMENT ON COLUMN public.evaluation_scores.criterion IS 'overall, technical.<criterion> or behavioral.<criterion>';
+COMMENT ON COLUMN public.evaluation_scores.score IS 'Score normalised to 0..1 (NULL when only a recommendation was found)';
+COMMENT ON COLUMN public.evaluation_scores.recommendation IS 'Hiring recommendation (overall rows only)';
+COMMENT ON COLUMN public.evaluation_scores.source IS 'structured (rubric JSON) or free_text (parsed from evaluation text)';
+COMMENT ON TABLE public.evaluation_stats IS 'Running totals of evaluation_scores per job and criterion, maintained by trigger';
+COMMENT ON COLUMN public.evaluation_stats.id_job IS 'Job id, or 0 for the global totals';
+COMMENT ON COLUMN public.evaluation_stats.scored IS 'Rows with a non-null score (denominator of the average)';
+COMMENT ON COLUMN public.evaluation_stats.score_sq_sum IS 'Sum of squared scores (for the standard deviation)';
+
+-- Create indexes for better performance
+CREATE INDEX IF NOT EXISTS idx_evaluation_scores_job ON public.evaluation_scores(id_job, criterion);
+CREATE INDEX IF NOT EXISTS idx_evaluation_scores_updated ON public.evaluation_scores(updated_at);
+
+-- Keep evaluation_stats up to date: subtract the old row and add the new one, in its job and in the global totals
+CREATE OR REPLACE FUNCTION public.evaluation_stats_add(
+    p_id_job INTEGER, p_criterion VARCHAR, p_score NUMERIC, p_recommendation VARCHAR, p_sign INTEGER
+) RETURNS VOID AS $$
+BEGIN
+    INSERT INTO public.evaluation_stats AS s
+        (id_job, criterion, n, scored, score_sum, score_sq_sum, strong_hire, hire, no_hire, strong_no_hire, updated_at)
+    SELECT scope, p_criterion, p_sign,
+           CASE WHEN p_score IS NULL THEN 0 ELSE p_sign END,
+           p_sign * COALESCE(p_score, 0),
+           p_sign * COALESCE(p_score, 0) * COALESCE(p_score, 0),
+           CASE WHEN p_recommendation = 'strong_hire' THEN p_sign ELSE 0 END,
+           CASE WHEN p_recommendation = 'hire' THEN p_sign ELSE 0 END,
+           CASE WHEN p_recommendation = 'no_hire' THEN p_sign ELSE 0 END,
+           CASE WHEN p_recommendation = 'strong_no_hire' THEN p_sign ELSE 0 END,
+           CURRENT_TIMESTAMP
+    FROM unnest(ARRAY[0, NULLIF(p_id_job, 0)]) AS scope
+    WHERE scope IS NOT NULL
+    ON CONFLICT (id_job, criterion) DO UPDATE SET
+        n = s.n + EXCLUDED.n,
+        scored = s.scored + EXCLUDED.scored,
+        score_sum = s.score_sum + EXCLUDED.score_sum,
+        score_sq_sum = s.score_sq_sum + EXCLUDED.score_sq_sum,
+        strong_hire = s.strong_hire + EXCLUDED.strong_hire,
+        hire = s.hire + EXCLUDED.hire,
+        no_hire = s.no_hire + EXCLUDED.no_hire,
+        strong_no_hire = s.strong_no_hire + EXCLUDED.strong_no_hire,
+        updated_at = EXCLUDED.updated_at;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+CREATE OR REPLACE FUNCTION public.evaluation_scores_maintain_stats() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM public.evaluation_stats_add(OLD.id_job, OLD.criterion, OLD.score, OLD.recommendation, -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM public.evaluation_stats_add(NEW.id_job, NEW.criterion, NEW.score, NEW.recommendation, 1);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+DROP TRIGGER IF EXISTS trg_evaluation_scores_stats ON public.evaluation_scores;
+CREATE TRIGGER trg_evaluation_scores_stats
+    AFTER INSERT OR UPDATE OR DELETE ON public.evaluation_scores
+    FOR EACH ROW EXECUTE FUNCTION public.evaluation_scores_maintain_stats();
+
+-- Backfill from the structured evaluations already stored by the evaluator (fires the trigger).
+-- Only where interviews has the columns the evaluator writes (id_job, evaluation_structured_json).
+DO $$
+BEGIN
+    IF (SELECT COUNT(*) FROM information_schema.columns
+        WHERE table_schema = 'public' AND table_name = 'interviews'
+          AND column_name IN ('id_job', 'evaluation_structured_json')) = 2 THEN
+        INSERT INTO public.evaluation_scores (id_interview, id_job, criterion, score, recommendation, source)
+        SELECT i.id_interview, i.id_job, 'overall',
+               LEAST(GREATEST((i.evaluation_structured_json -> 'overall_assessment' ->> 'quantitative_score')::NUMERIC / 100, 0), 1),
+               NULLIF(i.evaluation_structured_json -> 'overall_assessment' ->> 'recommendation', ''),
+               'structured'
+        FROM public.interviews i
+        WHERE i.evaluation_structured_json -> 'overall_assessment' ? 'quantitative_score'
+        ON CONFLICT (id_interview, criterion) DO NOTHING;
+    END IF;
+END $$;
+
+-- Enable Row Level Security (RLS)
+ALTER TABLE public.evaluation_scores ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.evaluation_stats ENABLE ROW LEVEL SECURITY;
+
+-- Create policy for admin access
+CREATE POLICY "Admin can manage evaluation scores" ON public.evaluation_scores
+    FOR ALL USING (auth.jwt() ->> 'role' = 'admin');
+CREATE POLICY "Admin can view evaluation stats" ON public.evaluation_stats
+    FOR SELECT USING (auth.jwt() ->> 'role' = 'admin');
+
+-- Create policy for interviewers (if role exists)
+CREATE POLICY "Interviewers can view evaluation scores" ON public.evaluation_scores
+    FOR SELECT USING (auth.jwt() ->> 'role' = 'interviewer');
+CREATE POLICY "Interviewers can view evaluation stats" ON public.evaluation_stats
+    FOR SELECT USING (auth.jwt() ->> 'role' = 'interviewer');
+
+-- Grant permissions (evaluation_stats is written only by the trigger)
+GRANT SELECT ON public.evaluation_scores TO authenticated;
+GRANT SELECT ON public.evaluation_stats TO authenticated;
+GRANT ALL ON public.evaluation_scores TO service_role;
+GRANT SELECT ON public.evaluation_stats TO service_role;
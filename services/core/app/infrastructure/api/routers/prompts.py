@@ -8,6 +8,7 @@ from ..models.prompt import PromptCreate, PromptUpdate, PromptResponse # --> Mod
 from ...infrastructure.persistence.postgres.postgres_prompt_repository import (
     get, list, create, update, delete # Repo real (funciones CRUD)
 )
+from ...prompt_events import publish_prompt_change # --> Invalida caches de prompts en Evaluator/Speech
 
 # El gateway construye /api/v1/core/prompts → Core /api/v1/prompts.:contentReference[oaicite:1]{index=1}
 router = APIRouter(prefix="/api/v1/prompts", tags=["prompts"])
@@ -78,6 +79,7 @@ async def create_prompt(
         "created_at": datetime.utcnow()
     }
     row = await repo["create"](p) # --> Aquí llamamos a la funcion CREATE() del postgres_prompt_repository.py
+    await publish_prompt_change("created", p["id"])
     return row
 
 
@@ -97,6 +99,7 @@ async def update_prompt(
     updated = await repo["update"](id, payload) # --> Aquí llamamos a la funcion UPDATE() del postgres_prompt_repository.py
     if not updated:
         raise HTTPException(status_code=404, detail="Prompt not found")
+    await publish_prompt_change("updated", id)
     return updated
 
 
@@ -115,4 +118,5 @@ async def delete_prompt(
     ok = await repo["delete"](id) # --> Aquí llamamos a la funcion DELETE() del postgres_prompt_repository.py
     if not ok:
         raise HTTPException(status_code=404, detail="Prompt not found")
+    await publish_prompt_change("deleted", id)
     return
@@ -0,0 +1,53 @@
+# --*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*
+# services/core/app/infrastructure/prompt_events.py
+# Publica en Redis cada cambio de prompts para que Evaluator y Speech invaliden su cache local.
+# Canal: PROMPTS_INVALIDATION_CHANNEL (default "prompts:invalidate"). Nunca rompe el request si Redis falla.
+# --*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*
+from __future__ import annotations
+from typing import Any, Optional
+from datetime import datetime, timezone
+import json
+import logging
+import os
+
+from redis.asyncio import Redis
+
+logger = logging.getLogger(__name__)
+
+PROMPTS_CHANNEL = os.getenv("PROMPTS_INVALIDATION_CHANNEL", "prompts:invalidate")
+PROMPTS_VERSION_KEY = os.getenv("PROMPTS_VERSION_KEY", "prompts:version") # --> Contador monotónico de cambios
+
+_redis: Optional[Redis] = None
+
+def _get_redis() -> Redis:
+    """Cliente Redis (lazy) con la misma config REDIS_* del .env del Core."""
+    global _redis
+    if _redis is None:
+        _redis = Redis(
+            host=os.getenv("REDIS_HOST", "localhost"),
+            port=int(os.getenv("REDIS_PORT", 6379)),
+            db=int(os.getenv("REDIS_DB", 0)),
+            password=os.getenv("REDIS_PASSWORD") or None,
+            socket_timeout=2,
+        )
+    return _redis
+
+async def publish_prompt_change(action: str, prompt_id: Any, prompt_type: Optional[str] = None) -> None:
+    """
+    Incrementa la versión global de prompts y publica {"action", "prompt_id", "prompt_type", "version"}.
+    action: "created" | "updated" | "deleted".
+    """
+    try:
+        r = _get_redis()
+        version = await r.incr(PROMPTS_VERSION_KEY)
+        message = {
+            "action": action,
+            "prompt_id": str(prompt_id),
+            "prompt_type": prompt_type,
+            "version": version,
+            "at": datetime.now(timezone.utc).isoformat(),
+        }
+        await r.publish(PROMPTS_CHANNEL, json.dumps(message))
+    except Exception as e:
+        # --> Los consumidores igual refrescan por TTL; sólo tarda más en verse el cambio
+        logger.warning(f"No se pudo publicar invalidación de prompt {prompt_id}: {e}")
@@ -50,6 +50,13 @@ class GenerateTextUseCase:
             
             # Obtener información del modelo
             model_info = self.llm_provider.get_model_info(request.model or ModelType.GPT_4)
+
+            # Tokens reales si el proveedor los reporta (last_usage); si no, estimación por palabras
+            usage = getattr(self.llm_provider, "last_usage", None)
+            if isinstance(usage, dict) and usage.get("completion_tokens"):
+                tokens_used = int(usage.get("prompt_tokens", 0)) + int(usage["completion_tokens"])
+            else:
+                usage, tokens_used = None, len(generated_text.split())
             
             return GenerateResponse(
                 generated_text=generated_text,
@@ -57,9 +64,10 @@ class GenerateTextUseCase:
                 timestamp=datetime.now(),
                 processing_time=processing_time,
                 model_used=str(request.model or ModelType.GPT_4),
-                tokens_used=len(generated_text.split()),  # Estimación simple
+                tokens_used=tokens_used,
                 metadata={
                     "model_info": model_info,
+                    "usage": usage,
                     "prompt_length": len(full_prompt),
                     "context_provided": bool(request.context),
                     "llm_service_version": "1.0.0"
@@ -39,6 +39,10 @@ class Interview:
         self.evaluation_1 = None
         self.evaluation_2 = None
         self.evaluation_3 = None
+        # Token plan per evaluation slot (single call or map-reduce), filled by run_evaluations.
+        self.evaluation_plan = None
+        # Per-stage timings and real tokens/cost per provider for the run that produced the evaluations.
+        self.evaluation_usage = None
 
     def _default_system_prompt(self):
         """Returns a default system prompt for the LLM."""
@@ -110,6 +114,8 @@ class Interview:
             'evaluation_1': self.evaluation_1,
             'evaluation_2': self.evaluation_2,
             'evaluation_3': self.evaluation_3,
+            'evaluation_plan': self.evaluation_plan,
+            'evaluation_usage': self.evaluation_usage,
         }
 
     @classmethod
@@ -125,6 +131,8 @@ class Interview:
         interview.evaluation_1 = data.get('evaluation_1')
         interview.evaluation_2 = data.get('evaluation_2')
         interview.evaluation_3 = data.get('evaluation_3')
+        interview.evaluation_plan = data.get('evaluation_plan')
+        interview.evaluation_usage = data.get('evaluation_usage')
         return interview
 
     def __repr__(self):
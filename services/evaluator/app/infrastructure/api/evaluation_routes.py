@@ -12,7 +12,7 @@ router = APIRouter(prefix="/api/v1/evaluation", tags=["evaluation"])
 
 # Structured evaluation models based on rubric schema
 class CriterionScore(BaseModel):
-    score: Literal["very_weak", "weak", "strong", "very_strong"]
+    score: Literal["very_weak", "weak", "strong", "very_strong", "not_applicable"]
     rationale: str
     evidence: List[str]
 
@@ -31,6 +31,8 @@ class BehavioralEvaluation(BaseModel):
 class OverallAssessment(BaseModel):
     quantitative_score: float  # 0-100
     score_calculation: str
+    technical_weight: Optional[float] = None  # 0-1
+    behavioral_weight: Optional[float] = None  # 0-1
     recommendation: Literal["strong_hire", "hire", "no_hire", "strong_no_hire"]
     key_strengths: List[str]
     areas_for_improvement: List[str]
@@ -43,7 +45,7 @@ class EvaluationMetadata(BaseModel):
 
 class StructuredEvaluationResponse(BaseModel):
     """Structured evaluation response following the rubric schema"""
-    interview_type: Literal["technical", "behavioral"]
+    interview_type: Literal["technical", "behavioral", "mixed"]
     technical_evaluation: Optional[TechnicalEvaluation] = None
     behavioral_evaluation: Optional[BehavioralEvaluation] = None
     overall_assessment: OverallAssessment
@@ -75,6 +77,22 @@ class InterviewEvaluationResponse(BaseModel):
     evaluation_2: Optional[str] = None  # Gemini evaluation text  
     evaluation_3: Optional[str] = None  # DeepSeek evaluation text
 
+# Statistics models (pre-aggregated in evaluation_stats, scores normalised to 0-1)
+class CriterionStats(BaseModel):
+    name: str  # overall | technical.<criterion> | behavioral.<criterion>
+    evaluations: int
+    avg_score: Optional[float] = None
+
+class EvaluationStatsResponse(BaseModel):
+    job_id: Optional[str] = None  # None = global
+    total_interviews: int
+    avg_score: Optional[float] = None
+    score_stddev: Optional[float] = None
+    recommendations: Dict[str, int]
+    success_rate: Optional[float] = None  # (hire + strong_hire) / interviews with a recommendation
+    criteria: List[CriterionStats]
+    updated_at: Optional[str] = None
+
 class ExportRequest(BaseModel):
     interview_id: str
     format: str = "pdf"
@@ -120,16 +138,18 @@ async def get_interview_results(interview_id: str):
 
 # Structured Evaluation Endpoint - Returns rubric-based evaluation
 @router.get("/structured/{interview_id}", response_model=StructuredEvaluationResponse)
-async def get_structured_evaluation(interview_id: str):
+async def get_structured_evaluation(interview_id: str, provider: Optional[str] = None, persist: bool = False):
     """Get structured rubric-based evaluation for a specific interview"""
     from ...infrastructure.llm_provider import load_interview_from_source, get_structured_evaluation
+    from ...infrastructure.repository import get_repository
     
     try:
         # Load interview from file (this is what actually exists)
         interview = load_interview_from_source("file", f"{interview_id}.json")
         
-        # Get structured evaluation using the rubric schema
-        structured_evaluation = await get_structured_evaluation(interview)
+        # Get structured evaluation using the rubric schema (validated while streaming, cached by content)
+        repo = get_repository() if persist else None
+        structured_evaluation = await get_structured_evaluation(interview, provider=provider, repo=repo)
         
         return structured_evaluation
         
@@ -171,6 +191,26 @@ async def get_mixed_evaluation_experimental(
             detail=f"Experimental evaluation failed for interview {interview_id}: {str(e)}"
         )
 
+# Statistics Endpoints - read the running totals kept by the evaluation_stats trigger (no JSON scan)
+async def _score_stats(job_id: Optional[str] = None) -> EvaluationStatsResponse:
+    from ...infrastructure.repository import get_repository
+
+    try:
+        stats = await get_repository().get_score_stats(job_id)
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"Could not read evaluation statistics: {str(e)}")
+    return EvaluationStatsResponse(**stats)
+
+@router.get("/stats/global", response_model=EvaluationStatsResponse)
+async def get_global_stats():
+    """Global evaluation statistics: interviews, average score, recommendations and per-criterion averages"""
+    return await _score_stats()
+
+@router.get("/stats/position/{position_id}", response_model=EvaluationStatsResponse)
+async def get_position_stats(position_id: str):
+    """Evaluation statistics for one position (job)"""
+    return await _score_stats(position_id)
+
 # Export Endpoint - Only supports JSON export since that's what actually exists
 @router.post("/export/{interview_id}")
 async def export_interview(
@@ -1,21 +1,25 @@
 """
-Reporting endpoints - simplified to match actual capabilities
-These endpoints handle basic report generation for interview evaluations
+Reporting endpoints - bulk reports over interview evaluations
+Reports are built by a background job into a content-addressed store (NDJSON / CSV / JSON)
+and downloaded with ETag and HTTP range support
 """
-from fastapi import APIRouter, HTTPException, BackgroundTasks, Depends
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Request, Response
 from fastapi.responses import FileResponse
 from pydantic import BaseModel
-from typing import List, Optional
-from datetime import datetime
-import json
+from typing import List, Literal, Optional
+
+from ..reporting import REPORT_FORMATS, REPORT_TTL_S, build_report, get_report_store, report_key
 
 router = APIRouter(prefix="/api/v1/reporting", tags=["reporting"])
 
 # Realistic models based on actual Interview entity
 class ReportRequest(BaseModel):
-    interview_ids: List[str]
-    format: str = "json"  # Only JSON supported currently
+    interview_ids: List[str] = []
+    job_id: Optional[str] = None  # All the interviews of a job (instead of / in addition to interview_ids)
+    format: Literal["json", "ndjson", "csv"] = "json"  # ndjson / csv: one row per line (opt-in)
     include_evaluations: bool = True
+    include_context: bool = False  # Adds jd + full_transcript (one context load per interview)
+    refresh: bool = False  # Rebuild even if an identical report is already stored
 
 class ReportResponse(BaseModel):
     report_id: str
@@ -23,52 +27,105 @@ class ReportResponse(BaseModel):
     message: str
     format: str
     interview_count: int
+    rows: int = 0
+    reused: bool = False
+    status_url: Optional[str] = None
+    download_url: Optional[str] = None
 
-# Report Generation Endpoints
-@router.post("/generate", response_model=ReportResponse)
-async def generate_report(
-    request: ReportRequest,
-    background_tasks: BackgroundTasks
-):
-    """Generate a report for multiple interviews (JSON format only)"""
-    if request.format != "json":
-        raise HTTPException(
-            status_code=400, 
-            detail="Only 'json' format is currently supported"
-        )
-    
-    report_id = f"report_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-    
+def _report_response(report_id: str, meta: dict, reused: bool = False) -> ReportResponse:
+    status = meta.get("status", "unknown")
     return ReportResponse(
         report_id=report_id,
-        status="completed",  # JSON reports are generated immediately
-        message="JSON report generated successfully",
-        format=request.format,
-        interview_count=len(request.interview_ids)
+        status=status,
+        message=meta.get("error") or f"{meta.get('rows', 0)} of {meta.get('interview_count', 0)} interviews written",
+        format=meta.get("format", ""),
+        interview_count=meta.get("interview_count", 0),
+        rows=meta.get("rows", 0),
+        reused=reused,
+        status_url=f"{router.prefix}/status/{report_id}",
+        download_url=f"{router.prefix}/download/{report_id}" if status == "completed" else None,
     )
 
+# Report Generation Endpoints
+@router.post("/generate", response_model=ReportResponse, status_code=202)
+async def generate_report(request: ReportRequest, background_tasks: BackgroundTasks):
+    """
+    Queue a report for many interviews and return its id at once.
+    The id is the hash of the inputs: an identical request reuses the stored (or in-progress) report.
+    """
+    from ..repository import get_repository
+
+    repo = get_repository()
+    interview_ids = list(dict.fromkeys(request.interview_ids))  # --> Sin duplicados, orden original
+    if request.job_id is not None:
+        try:
+            job_ids = await repo.list_interview_ids(job_id=request.job_id)
+        except Exception as e:
+            raise HTTPException(status_code=502, detail=f"Could not list interviews for job {request.job_id}: {str(e)}")
+        interview_ids = list(dict.fromkeys(interview_ids + job_ids))
+    if not interview_ids:
+        raise HTTPException(status_code=400, detail="No interviews to report (give interview_ids or a job_id with interviews)")
+
+    report_id = report_key(interview_ids, request.format, request.include_evaluations, request.include_context)
+    store = get_report_store()
+    meta, build = store.claim(report_id, request.format, len(interview_ids), refresh=request.refresh)
+    if build:
+        background_tasks.add_task(build_report, repo, interview_ids, request.format,
+                                  include_evaluations=request.include_evaluations,
+                                  include_context=request.include_context, report_id=report_id, store=store)
+    return _report_response(report_id, meta, reused=not build)
+
+@router.get("/status/{report_id}", response_model=ReportResponse)
+async def report_status(report_id: str):
+    """State of a report in the store (queued | building | completed | incomplete | error)"""
+    meta = get_report_store().meta(report_id)
+    if meta is None:
+        raise HTTPException(status_code=404, detail=f"Report {report_id} not found")
+    return _report_response(report_id, meta)
+
+def _etag_matches(header: Optional[str], etag: str) -> bool:
+    if not header:
+        return False
+    tags = [t.strip().removeprefix("W/") for t in header.split(",")]
+    return "*" in tags or etag in tags
+
 @router.get("/download/{report_id}")
-async def download_report(report_id: str):
-    """Download a generated report (JSON format)"""
-    # Since we only support JSON reports, return the report data directly
-    # In a real system, this would fetch from storage
-    raise HTTPException(
-        status_code=501,
-        detail="Report download not yet implemented. Use generate endpoint with format='json' for immediate results."
-    )
+async def download_report(report_id: str, request: Request):
+    """
+    Download a finished report. Sends a strong ETag (hash of the file): If-None-Match answers 304,
+    and Range / If-Range requests get 206 partial content, so retries resume instead of starting over.
+    """
+    store = get_report_store()
+    meta = store.meta(report_id)
+    if meta is None:
+        raise HTTPException(status_code=404, detail=f"Report {report_id} not found")
+    if meta.get("status") != "completed":
+        raise HTTPException(status_code=409, detail=f"Report {report_id} is {meta.get('status')}, not completed")
+    path = store.path(report_id, meta["format"])
+    if not path.exists():
+        raise HTTPException(status_code=410, detail=f"Report {report_id} file is gone")
+
+    headers = {"ETag": f'"{meta["sha256"]}"', "Cache-Control": f"private, max-age={REPORT_TTL_S}"}
+    if _etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    # --> FileResponse resuelve Range / If-Range (usa nuestro ETag: no lo pisa)
+    return FileResponse(path, media_type=REPORT_FORMATS[meta["format"]]["mime_type"], filename=path.name,
+                        headers=headers)
 
 # Utility endpoints showing actual capabilities
 @router.get("/formats")
 async def get_supported_formats():
     """Get list of actually supported export formats"""
+    names = {"ndjson": "Newline-delimited JSON", "csv": "CSV", "json": "JSON Data"}
     return {
         "formats": [
             {
-                "id": "json",
-                "name": "JSON Data",
-                "mime_type": "application/json", 
-                "extension": ".json",
+                "id": fmt,
+                "name": names[fmt],
+                "mime_type": spec["mime_type"],
+                "extension": spec["extension"],
                 "status": "supported"
             }
+            for fmt, spec in REPORT_FORMATS.items()
         ]
-    }
\ No newline at end of file
+    }
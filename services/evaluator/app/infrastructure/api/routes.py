@@ -1,9 +1,12 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi.responses import StreamingResponse
 from typing import Annotated
+import json
 
 from ...domain.models import GenerateRequest, GenerateResponse, ModelType
 from ...application.use_cases import GenerateTextUseCase, LLMProviderPort
 from ..llm_provider import call_openai_gpt5, call_google_gemini, call_openrouter_deepseek
+from .. import metrics
 
 
 router = APIRouter(prefix="/api/v1")
@@ -11,6 +14,9 @@ router = APIRouter(prefix="/api/v1")
 
 class RealLLMProvider:
     """Real LLM provider that uses the actual implementations"""
+
+    def __init__(self):
+        self.last_usage = None  # --> Real tokens/cost of the last generate_text (one instance per request)
     
     async def generate_text(
         self, 
@@ -24,15 +30,18 @@ class RealLLMProvider:
             # The existing functions expect prompt, rubric, transcript
             # For general text generation, we'll use the prompt as the main content
             # and empty strings for rubric and transcript
-            if model == ModelType.GPT_4:
-                return await call_openai_gpt5(prompt, "", "")
-            elif model == ModelType.CLAUDE:
-                return await call_google_gemini(prompt, "", "")
-            elif model == ModelType.LLAMA:
-                return await call_openrouter_deepseek(prompt, "", "")
-            else:
-                # Default to GPT-4
-                return await call_openai_gpt5(prompt, "", "")
+            with metrics.usage_scope() as usage:
+                if model == ModelType.GPT_4:
+                    text = await call_openai_gpt5(prompt, "", "")
+                elif model == ModelType.CLAUDE:
+                    text = await call_google_gemini(prompt, "", "")
+                elif model == ModelType.LLAMA:
+                    text = await call_openrouter_deepseek(prompt, "", "")
+                else:
+                    # Default to GPT-4
+                    text = await call_openai_gpt5(prompt, "", "")
+            self.last_usage = usage.to_dict()["totals"]
+            return text
         except Exception as e:
             return f"Error generating text: {str(e)}"
     
@@ -113,7 +122,7 @@ async def list_models(
 
 # Interview evaluation endpoints
 from pydantic import BaseModel
-from typing import Optional
+from typing import Literal, Optional
 
 
 class InterviewRequest(BaseModel):
@@ -185,6 +194,134 @@ async def evaluate_interview(request: InterviewRequest):
         )
 
 
+def _sse(event: str, data: dict) -> str:
+    """Formato Server-Sent Events (una línea data con JSON)"""
+    if event == "ping":
+        return ": ping\n\n"
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@router.post("/evaluate-interview/stream")
+async def evaluate_interview_stream(request: InterviewRequest, persist: bool = True, use_cache: bool = True):
+    """
+    Streaming variant of /evaluate-interview (Server-Sent Events).
+    Opens a streaming completion per enabled provider concurrently and multiplexes the tokens,
+    tagged by slot/provider. The final documents are persisted once, right before the `done` event.
+    """
+    from ...domain.entities.interview import Interview
+    from ..llm_streaming import stream_evaluations
+
+    interview = Interview(
+        interview_id=request.interview_id,
+        system_prompt=request.system_prompt,
+        rubric=request.rubric,
+        jd=request.jd,
+        full_transcript=request.full_transcript
+    )
+
+    async def events():
+        async for event, data in stream_evaluations(interview, use_cache=use_cache):
+            if event == "done" and persist:
+                try:
+                    from ..repository import get_repository
+                    await get_repository().save_evaluation_results(interview.interview_id, interview.to_dict())
+                    data["persisted"] = True
+                except Exception as e:
+                    data["persisted"] = False
+                    data["persist_error"] = str(e)
+            yield _sse(event, data)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},  # --> Sin buffering en nginx
+    )
+
+
+class SubmitEvaluationRequest(BaseModel):
+    """Request model for asynchronous evaluation (the worker loads the context by interview_id)"""
+    interview_id: str
+    priority: Literal["realtime", "normal", "bulk"] = "realtime"
+
+
+@router.post("/evaluations", status_code=202)
+async def submit_evaluation(request: SubmitEvaluationRequest):
+    """
+    Enqueue an evaluation for the worker and return at once with the job id.
+    Progress is pushed on /evaluations/{interview_id}/events (SSE) or /status (long-poll).
+    """
+    from ..job_queue import enqueue_job
+    from ..job_status import get_redis, publish_status
+
+    r = get_redis()
+    if r is None:
+        raise HTTPException(status_code=503, detail="Evaluation queue unavailable (Redis disabled or down)")
+    # --> "queued" ANTES del XADD: un worker libre puede publicar "running" apenas entra el job,
+    #     y un "queued" posterior pisaría el último estado (los suscriptores verían running -> queued)
+    await publish_status(request.interview_id, "queued", priority=request.priority)
+    try:
+        job_id = await enqueue_job(r, request.interview_id, request.priority)
+    except Exception as e:
+        await publish_status(request.interview_id, "error", f"Could not enqueue evaluation: {str(e)}")
+        raise HTTPException(status_code=503, detail=f"Could not enqueue evaluation: {str(e)}")
+    job_id = job_id.decode() if isinstance(job_id, bytes) else str(job_id)
+
+    base = f"{router.prefix}/evaluations/{request.interview_id}"
+    return {
+        "job_id": job_id,
+        "interview_id": request.interview_id,
+        "priority": request.priority,
+        "status": "queued",
+        "status_url": f"{base}/status",
+        "events_url": f"{base}/events",
+    }
+
+
+@router.get("/evaluations/{interview_id}/status")
+async def get_evaluation_status(
+    interview_id: str,
+    wait: float = Query(0, ge=0, le=60, description="Long-poll: seconds to wait for a change"),
+    since: Optional[str] = Query(None, description="Status the client already has; returns as soon as it differs"),
+):
+    """Last published status; with wait>0 holds the request until the status differs from `since`."""
+    from ..job_status import get_status, watch_status, is_terminal
+
+    current = await get_status(interview_id)
+    if wait and not is_terminal(current) and (current or {}).get("status") == since:
+        try:
+            async for event in watch_status(interview_id, heartbeat_s=wait, timeout_s=wait):
+                if event and event.get("status") != since:
+                    return event
+        except RuntimeError as e:
+            raise HTTPException(status_code=503, detail=str(e))
+    return current or {"interview_id": interview_id, "status": "unknown"}
+
+
+@router.get("/evaluations/{interview_id}/events")
+async def evaluation_events(interview_id: str, timeout: float = Query(900, gt=0, le=3600)):
+    """
+    Server-Sent Events with every status transition (`status` events), closing after done/error.
+    The current status is sent first, so subscribing after the job finished still gets the outcome.
+    """
+    from ..job_status import get_redis, watch_status
+
+    if get_redis() is None:
+        raise HTTPException(status_code=503, detail="Status updates unavailable (Redis disabled or down)")
+
+    async def events():
+        try:
+            async for event in watch_status(interview_id, timeout_s=timeout):
+                yield _sse("status", event) if event else _sse("ping", {})
+        except Exception as e:
+            yield _sse("error", {"error": str(e)})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.post("/evaluate-interview-file")
 async def evaluate_interview_from_file(file_path: str, source_type: str = "file"):
     """Evaluate an interview loaded from file or database"""
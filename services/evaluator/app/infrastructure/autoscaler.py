@@ -0,0 +1,146 @@
+# --*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*
+# services/evaluator/app/infrastructure/autoscaler.py
+# Decisiones del supervisor de workers (supervisor.py), sin procesos ni loops acá:
+#   - read_lag: backlog del consumer group en todos los carriles (XINFO GROUPS "lag"; XRANGE si Redis no lo sabe),
+#     pendientes (entregados sin ack) y espera del job más viejo sin entregar
+#   - ScalePolicy.desired: cuántos workers hacen falta (entre EVALUATOR_SCALE_MIN / EVALUATOR_SCALE_MAX)
+#   - retire_consumers: XGROUP DELCONSUMER de consumers retirados o abandonados, SÓLO con 0 pendientes
+#     (borrar un consumer con pendientes los saca del PEL y se perderían esos jobs)
+# Sólo depende de redis (como job_queue).
+# --*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*
+from __future__ import annotations
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Optional, Set
+import math
+import os
+import time
+
+from redis.exceptions import ResponseError
+
+from .job_queue import lane_streams
+
+GROUP_NAME = os.getenv("EVALUATOR_GROUP", "evaluator_group")  # --> Mismo default que worker.py
+
+SCALE_MIN_WORKERS        = int(os.getenv("EVALUATOR_SCALE_MIN", "1"))
+SCALE_MAX_WORKERS        = int(os.getenv("EVALUATOR_SCALE_MAX", "4"))
+SCALE_BACKLOG_PER_WORKER = int(os.getenv("EVALUATOR_SCALE_BACKLOG_PER_WORKER", "10"))  # --> Jobs en cola que "banca" un worker
+SCALE_MAX_WAIT_S         = float(os.getenv("EVALUATOR_SCALE_MAX_WAIT_S", "60"))        # --> Job más viejo esperando más que esto = +1 worker
+SCALE_IDLE_S             = float(os.getenv("EVALUATOR_SCALE_IDLE_S", "300"))           # --> Cola vacía por esto = -1 worker
+CONSUMER_STALE_MS        = int(os.getenv("EVALUATOR_CONSUMER_STALE_MS", "3600000"))    # --> Consumer sin actividad (y sin pendientes) = se borra
+
+_LAG_SCAN_LIMIT = 1000  # --> Tope del conteo por XRANGE cuando XINFO no trae "lag"
+
+
+def _s(v: Any) -> str:
+    """bytes -> str (Redis sin decode_responses)."""
+    return v.decode("utf-8", errors="replace") if isinstance(v, bytes) else str(v)
+
+def _entry_ts(entry_id: Any) -> float:
+    """Segundos epoch de un ID de stream ("<ms>-<seq>")."""
+    return int(_s(entry_id).split("-", 1)[0]) / 1000
+
+
+@dataclass
+class QueueLag:
+    """Foto de la cola del consumer group (todos los carriles)."""
+    backlog: int = 0           # --> Entries todavía no entregados a ningún consumer
+    pending: int = 0           # --> Entregados sin ack (en curso o esperando reintento)
+    oldest_wait_s: float = 0.0 # --> Cuánto lleva esperando el entry sin entregar más viejo
+    lanes: Dict[str, int] = field(default_factory=dict)  # --> backlog por carril
+
+    @property
+    def idle(self) -> bool:
+        return self.backlog == 0 and self.pending == 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"backlog": self.backlog, "pending": self.pending, "oldest_wait_s": round(self.oldest_wait_s, 1),
+                "lanes": dict(self.lanes)}
+
+
+async def read_lag(r, group: str = GROUP_NAME, now: Optional[float] = None) -> QueueLag:
+    """
+    XINFO GROUPS por carril: "lag" (Redis >= 7) y "pending"; el primer entry después de last-delivered-id
+    da la espera más vieja. Un carril sin stream o sin grupo todavía cuenta como vacío.
+    """
+    now = time.time() if now is None else now
+    lag = QueueLag()
+    for priority, stream in lane_streams().items():
+        try:
+            groups = await r.xinfo_groups(stream)
+        except ResponseError:
+            continue  # --> Stream sin crear (Redis caído sí sube: no es una cola vacía)
+        info = next((g for g in groups if _s(g.get("name")) == group), None)
+        if info is None:
+            continue
+        last = _s(info.get("last-delivered-id") or "0-0")
+        waiting = await r.xrange(stream, min=f"({last}", count=1 if info.get("lag") is not None else _LAG_SCAN_LIMIT)
+        backlog = int(info["lag"]) if info.get("lag") is not None else len(waiting)
+        lag.lanes[priority] = backlog
+        lag.backlog += backlog
+        lag.pending += int(info.get("pending") or 0)
+        if backlog and waiting:
+            lag.oldest_wait_s = max(lag.oldest_wait_s, now - _entry_ts(waiting[0][0]))
+    return lag
+
+
+@dataclass
+class ScalePolicy:
+    """
+    Tamaño del pool a partir del lag:
+      - con backlog: ceil(backlog / backlog_per_worker) workers (nunca menos de los que hay);
+        si además el job más viejo espera más que max_wait_s, al menos uno más
+      - cola vacía (sin backlog ni pendientes) durante idle_s: uno menos
+    Siempre dentro de [min_workers, max_workers].
+    """
+    min_workers: int = SCALE_MIN_WORKERS
+    max_workers: int = SCALE_MAX_WORKERS
+    backlog_per_worker: int = SCALE_BACKLOG_PER_WORKER
+    max_wait_s: float = SCALE_MAX_WAIT_S
+    idle_s: float = SCALE_IDLE_S
+
+    def clamp(self, n: int) -> int:
+        return max(self.min_workers, min(self.max_workers, n))
+
+    def desired(self, current: int, lag: QueueLag, idle_for_s: float = 0.0) -> int:
+        target = current
+        if lag.backlog > 0:
+            target = max(current, math.ceil(lag.backlog / max(1, self.backlog_per_worker)))
+            if lag.oldest_wait_s >= self.max_wait_s:
+                target = max(target, current + 1)
+        elif lag.idle and idle_for_s >= self.idle_s:
+            target = current - 1
+        return self.clamp(target)
+
+
+async def retire_consumers(r, retired: Iterable[str], live: Iterable[str] = (), prefix: Optional[str] = None,
+                           stale_ms: int = CONSUMER_STALE_MS, group: str = GROUP_NAME) -> Set[str]:
+    """
+    XGROUP DELCONSUMER en cada carril para:
+      - los consumers `retired` (workers que el supervisor bajó o que murieron)
+      - con `prefix`, los que empiezan así, no están `live` y llevan más de stale_ms sin actividad
+        (pools anteriores que no se limpiaron)
+    Sólo si no tienen pendientes: los que tienen quedan para la próxima pasada (otro worker los reclama
+    con XAUTOCLAIM). Devuelve los nombres que ya no tienen nada pendiente en ningún carril.
+    """
+    retired, live = set(retired), set(live)
+    blocked: Set[str] = set()
+    removed: Set[str] = set()
+    for stream in lane_streams().values():
+        try:
+            consumers = await r.xinfo_consumers(stream, group)
+        except ResponseError:
+            continue  # --> Sin stream / sin grupo: nada que limpiar
+        for c in consumers:
+            name = _s(c.get("name"))
+            stale = (prefix is not None and name.startswith(prefix) and name not in live
+                     and int(c.get("idle") or 0) >= stale_ms)
+            if name not in retired and not stale:
+                continue
+            if int(c.get("pending") or 0) > 0:
+                blocked.add(name)
+                continue
+            await r.xgroup_delconsumer(stream, group, name)
+            removed.add(name)
+    if removed - blocked:
+        print(f"[Evaluator] Consumers retirados: {sorted(removed - blocked)}")
+    return (retired | removed) - blocked
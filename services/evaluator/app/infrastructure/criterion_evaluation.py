@@ -0,0 +1,264 @@
+# --*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*
+# services/evaluator/app/infrastructure/criterion_evaluation.py
+# Evaluación por criterio (EVALUATOR_EVAL_MODE=per_criterion) para entrevistas largas:
+#   - split_criteria: parte la rúbrica en criterios ("Score (1-5) on A, B, C." o lista con viñetas/números)
+#   - TurnIndex: índice TF-IDF local sobre los turnos del transcript (sin embeddings ni servicios externos)
+#   - select_evidence: por criterio, los turnos más relevantes (con su par pregunta/respuesta) dentro de
+#     EVALUATOR_CRITERIA_MAX_TOKENS, en orden cronológico y con "[...]" donde se omitió algo
+#   - combine_criteria: une las evaluaciones por criterio en una sola (puntaje promedio + veredicto mayoritario)
+# Las llamadas (una por criterio, en paralelo) las hace llm_provider._evaluate_with_plan.
+# Con transcripts cortos (< EVALUATOR_CRITERIA_MIN_TOKENS) o rúbricas de un solo criterio se evalúa entero.
+# --*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*
+from __future__ import annotations
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence
+import json
+import math
+import os
+import re
+
+from .ensemble import extract_verdict
+from .token_budget import estimate_tokens, split_turns
+
+EVAL_MODE           = os.getenv("EVALUATOR_EVAL_MODE", "whole")                   # --> "whole" | "per_criterion"
+CRITERIA_MIN_TOKENS = int(os.getenv("EVALUATOR_CRITERIA_MIN_TOKENS", "3000"))    # --> Por debajo no conviene partir
+CRITERIA_MAX_TOKENS = int(os.getenv("EVALUATOR_CRITERIA_MAX_TOKENS", "1500"))    # --> Evidencia por criterio
+CRITERIA_TOP_K      = int(os.getenv("EVALUATOR_CRITERIA_TOP_K", "8"))            # --> Turnos recuperados por criterio
+
+CRITERIA_VERSION = 1  # --> Subirlo si cambian la selección o el armado (invalida lo cacheado)
+
+_HIRE_THRESHOLD = 0.6  # --> Desempate del veredicto: promedio >= 3/5
+
+# --> Vocabulario extra por criterio (clave = palabra en el nombre del criterio). Pisar/extender por .env:
+#     EVALUATOR_CRITERIA_HINTS='{"kubernetes": ["k8s", "pod", "helm"]}'
+_DEFAULT_HINTS: Dict[str, List[str]] = {
+    "problem": ["approach", "solution", "debug", "tradeoff", "trade-off", "complexity", "edge", "case", "design"],
+    "python": ["python", "django", "flask", "fastapi", "pydantic", "asyncio", "pandas", "pytest", "decorator"],
+    "api": ["api", "rest", "endpoint", "http", "request", "response", "status", "auth", "jwt", "pagination"],
+    "http": ["http", "request", "response", "header", "status", "rest"],
+    "sql": ["sql", "query", "database", "postgres", "mysql", "index", "join", "transaction", "schema", "table"],
+    "database": ["database", "sql", "postgres", "mysql", "index", "query", "orm", "migration", "table"],
+}
+
+def _load_hints() -> Dict[str, List[str]]:
+    hints = dict(_DEFAULT_HINTS)
+    raw = os.getenv("EVALUATOR_CRITERIA_HINTS")
+    if raw:
+        try:
+            hints.update({str(k).lower(): [str(w) for w in v] for k, v in json.loads(raw).items()})
+        except Exception as e:
+            print(f"[Evaluator] WARNING: EVALUATOR_CRITERIA_HINTS inválido ({e}); uso defaults")
+    return hints
+
+CRITERIA_HINTS = _load_hints()
+
+
+# ================================
+# Rúbrica -> criterios
+# ================================
+@dataclass
+class Criterion:
+    name: str
+    rubric: str  # --> Rúbrica para la llamada de ESTE criterio (instrucciones comunes + el criterio)
+    query: str   # --> Texto con el que se buscan los turnos relevantes
+
+
+_LIST_ITEM = re.compile(r"^(?P<indent>\s*)(?:[-*•]|\d+[.)])\s+(?P<text>\S.*)$")
+# --> "Score (1-5) on A, B, C and D." / "Criteria: A, B, C"
+_INLINE_LIST = re.compile(r"(?P<lead>\b(?:on|in|for|across|criteria|categories)\s*:?\s+)"
+                          r"(?P<items>[^.:;\n]+?(?:,[^.:;\n]+?)+)(?=[.;\n]|$)", re.I)
+_ITEM_SEP = re.compile(r"\s*,\s*(?:and\s+|y\s+)?|\s+(?:and|y)\s+", re.I)
+_NAME_END = re.compile(r"\s*(?::|\s[-–—]\s|\()")
+
+def _name_of(text: str) -> str:
+    """Nombre corto de un ítem ("Python: idiomatic code..." -> "Python")."""
+    name = _NAME_END.split(text.strip(), maxsplit=1)[0].strip(" *_")
+    return name if 0 < len(name) <= 60 else " ".join(text.split()[:6])
+
+def _list_criteria(rubric: str) -> List[Criterion]:
+    lines = rubric.splitlines()
+    items = [(i, m) for i, m in ((i, _LIST_ITEM.match(line)) for i, line in enumerate(lines)) if m]
+    if len(items) < 2:
+        return []
+    level = min(len(m.group("indent")) for _, m in items)
+    starts = [(i, m) for i, m in items if len(m.group("indent")) == level]
+    blocks: List[List[str]] = []
+    owned = set()
+    for n, (i, m) in enumerate(starts):
+        block = [lines[i].strip()]
+        owned.add(i)
+        end = starts[n + 1][0] if n + 1 < len(starts) else len(lines)
+        for j in range(i + 1, end):
+            # --> Sub-ítems y líneas indentadas son parte del criterio; el resto, instrucciones comunes
+            if lines[j].strip() and len(lines[j]) - len(lines[j].lstrip()) > level:
+                block.append(lines[j].strip())
+                owned.add(j)
+            elif lines[j].strip():
+                break
+        blocks.append(block)
+    shared = "\n".join(line for i, line in enumerate(lines) if i not in owned).strip()
+    criteria = []
+    for block in blocks:
+        text = " ".join(block)
+        body = _LIST_ITEM.match(block[0]).group("text")
+        criteria.append(Criterion(_name_of(body), f"{shared}\n\n" + "\n".join(block) if shared else "\n".join(block),
+                                  text))
+    return criteria
+
+def _inline_criteria(rubric: str) -> List[Criterion]:
+    m = _INLINE_LIST.search(rubric)
+    if not m:
+        return []
+    names = [n.strip(" *_") for n in _ITEM_SEP.split(m.group("items")) if n.strip(" *_")]
+    if len(names) < 2:
+        return []
+    # --> Misma rúbrica con la lista reemplazada por el criterio: se conservan escala e instrucciones
+    return [Criterion(name, rubric[:m.start("items")] + name + rubric[m.end("items"):], name) for name in names]
+
+def split_criteria(rubric: Optional[str]) -> List[Criterion]:
+    """Criterios de la rúbrica (lista con viñetas/números o lista en línea); [] si no se distinguen al menos 2."""
+    if not rubric:
+        return []
+    return _list_criteria(rubric) or _inline_criteria(rubric)
+
+def plan_criteria(rubric: Optional[str], transcript_tokens: int, mode: Optional[str] = None) -> List[Criterion]:
+    """Criterios a evaluar por separado, o [] si esta entrevista se evalúa entera."""
+    if (mode or EVAL_MODE) != "per_criterion" or transcript_tokens < CRITERIA_MIN_TOKENS:
+        return []
+    return split_criteria(rubric)
+
+def criteria_cache_params() -> Dict[str, Any]:
+    """Parámetros que se suman a la clave del cache de evaluaciones (un texto por criterio no es una evaluación entera)."""
+    if EVAL_MODE != "per_criterion":
+        return {}
+    return {"eval_mode": "per_criterion", "criteria_v": CRITERIA_VERSION, "criteria_min_tokens": CRITERIA_MIN_TOKENS,
+            "criteria_max_tokens": CRITERIA_MAX_TOKENS, "criteria_top_k": CRITERIA_TOP_K}
+
+
+# ================================
+# Índice TF-IDF de turnos
+# ================================
+# --> Etiqueta de rol al inicio del turno ("Interviewer: ...", "[0:42] assistant: ...", "**Candidate:** ...")
+_SPEAKER = re.compile(r"^\s*(?:\[[^\]]{1,40}\]\s*)?(?:\*\*)?(?P<role>[^:*\n]{1,30}?)(?:\*\*)?\s*:")
+_ASKING_ROLES = frozenset(("interviewer", "assistant", "bot", "ai", "agent", "model"))
+_TERM = re.compile(r"[a-z0-9áéíóúñ][a-z0-9áéíóúñ+#]+")
+_STOPWORDS = frozenset(
+    "the and for with that this you your are was were have has had but not can could would should will "
+    "what when where which who how why about into from they them then than there their our out its also just "
+    "like some more very really yeah okay well did does done been being any all one two get got use used using "
+    "que los las una por para con del como pero más muy sus esto esta este eso son fue hay".split())
+
+def _terms(text: str) -> List[str]:
+    """Términos normalizados (minúsculas, sin stopwords, plural simple -> singular)."""
+    terms = []
+    for t in _TERM.findall((text or "").lower()):
+        if t in _STOPWORDS:
+            continue
+        if len(t) > 3 and t.endswith("s") and not t.endswith("ss"):
+            t = t[:-1]
+        terms.append(t)
+    return terms
+
+
+class TurnIndex:
+    """TF-IDF (tf logarítmico, idf suavizado, coseno) sobre los turnos de un transcript."""
+
+    def __init__(self, turns: Sequence[str]) -> None:
+        self.turns = list(turns)
+        counts = [Counter(_terms(t)) for t in self.turns]
+        df = Counter(term for c in counts for term in c)
+        n = len(self.turns)
+        self.idf = {term: math.log((1 + n) / (1 + d)) + 1 for term, d in df.items()}
+        self._vectors = [self._weigh(c) for c in counts]
+
+    def _weigh(self, counts: Counter) -> Dict[str, float]:
+        vector = {t: (1 + math.log(c)) * self.idf[t] for t, c in counts.items() if t in self.idf}
+        norm = math.sqrt(sum(w * w for w in vector.values())) or 1.0
+        return {t: w / norm for t, w in vector.items()}
+
+    def search(self, query: str) -> List[tuple]:
+        """[(score, índice de turno)] con score > 0, de mayor a menor."""
+        q = self._weigh(Counter(_terms(query)))
+        scored = [(sum(w * v.get(t, 0.0) for t, w in q.items()), i) for i, v in enumerate(self._vectors)]
+        return sorted([(s, i) for s, i in scored if s > 0], key=lambda x: (-x[0], x[1]))
+
+
+def _expanded_query(criterion: Criterion) -> str:
+    words = set(_terms(criterion.name))
+    extra = [w for key, hints in CRITERIA_HINTS.items() if _terms(key) and set(_terms(key)) <= words for w in hints]
+    return " ".join([criterion.query, *extra])
+
+def _exchange(turns: Sequence[str], i: int) -> List[int]:
+    """El turno y su par: la respuesta que sigue a una pregunta, o la pregunta que originó una respuesta."""
+    m = _SPEAKER.match(turns[i])
+    asking = bool(m) and m.group("role").strip().lower() in _ASKING_ROLES
+    pair = i + 1 if asking else i - 1
+    return [j for j in (i - 1, i, i + 1) if j in (i, pair) and 0 <= j < len(turns)]
+
+def _render(turns: Sequence[str], picked: Sequence[int]) -> str:
+    out: List[str] = []
+    last = -1
+    for i in sorted(picked):
+        if i > last + 1:
+            out.append("[...]")
+        out.append(turns[i])
+        last = i
+    if last < len(turns) - 1:
+        out.append("[...]")
+    return "\n".join(out)
+
+def select_evidence(index: TurnIndex, criterion: Criterion, max_tokens: Optional[int] = None,
+                    top_k: Optional[int] = None) -> str:
+    """
+    Turnos más relevantes para el criterio, cada uno con su par pregunta/respuesta, hasta top_k
+    turnos o max_tokens. Sin coincidencias léxicas (p. ej. "Communication") se toma una muestra pareja
+    de toda la entrevista.
+    """
+    turns = index.turns
+    max_tokens = CRITERIA_MAX_TOKENS if max_tokens is None else max_tokens
+    top_k = CRITERIA_TOP_K if top_k is None else top_k
+    ranked = [i for _, i in index.search(_expanded_query(criterion))]
+    if not ranked:
+        step = max(1, len(turns) // max(top_k, 1))
+        ranked = list(range(len(turns) - 1, -1, -step))[::-1]
+    picked: set = set()
+    used = 0
+    for i in ranked[:top_k]:
+        new = [j for j in _exchange(turns, i) if j not in picked]
+        cost = sum(estimate_tokens(turns[j]) + 1 for j in new)
+        if picked and used + cost > max_tokens:
+            continue  # --> Uno más chico todavía puede entrar
+        picked.update(new)
+        used += cost
+    return _render(turns, picked)
+
+def evidence_by_criterion(transcript: str, criteria: Sequence[Criterion], max_tokens: Optional[int] = None) -> List[str]:
+    """Evidencia de cada criterio (el índice se arma una sola vez por transcript)."""
+    index = TurnIndex(split_turns(transcript or ""))
+    return [select_evidence(index, c, max_tokens) for c in criteria]
+
+
+# ================================
+# Combinación
+# ================================
+def combine_criteria(criteria: Sequence[Criterion], outputs: Sequence[str]) -> str:
+    """
+    Una evaluación con una sección por criterio + "Overall score: x/5" (promedio de los puntajes leídos)
+    y "Overall Verdict" (mayoría de los veredictos por criterio; empate o sin veredictos -> promedio >= 3/5).
+    """
+    sections = [f"### {c.name}\n{o.strip()}" for c, o in zip(criteria, outputs)]
+    verdicts = [extract_verdict(o) for o in outputs]
+    scores = [v.score for v in verdicts if v.score is not None]
+    mean = sum(scores) / len(scores) if scores else None
+    hire = sum(v.recommendation in ("hire", "strong_hire") for v in verdicts)
+    no_hire = sum(v.recommendation in ("no_hire", "strong_no_hire") for v in verdicts)
+
+    summary = []
+    if mean is not None:
+        summary.append(f"Overall score: {mean * 5:.1f}/5")
+    if hire != no_hire:
+        summary.append(f"Overall Verdict: {'Hire' if hire > no_hire else 'No Hire'}")
+    elif mean is not None:
+        summary.append(f"Overall Verdict: {'Hire' if mean >= _HIRE_THRESHOLD else 'No Hire'}")
+    return "\n\n".join(sections + (["### Overall\n" + "\n".join(summary)] if summary else []))
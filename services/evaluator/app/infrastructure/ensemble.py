@@ -0,0 +1,173 @@
+# --*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*
+# services/evaluator/app/infrastructure/ensemble.py
+# Ensemble con salida temprana (EVALUATOR_ENSEMBLE=early_exit):
+#   - corre primero un "panel" (todos los providers habilitados menos el último)
+#   - a medida que terminan, extrae puntaje y veredicto de cada evaluación (texto libre)
+#   - si dos evaluaciones válidas coinciden >= EVALUATOR_ENSEMBLE_AGREEMENT, el desempate no se llama
+#   - si discrepan (o alguna falla / no se puede leer) se llama al desempate
+# Con EVALUATOR_ENSEMBLE=all (default) se llaman todos, como siempre.
+# --*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+import asyncio
+import os
+import re
+
+from . import metrics
+
+ENSEMBLE_MODE      = os.getenv("EVALUATOR_ENSEMBLE", "all")                     # --> "all" | "early_exit"
+ENSEMBLE_AGREEMENT = float(os.getenv("EVALUATOR_ENSEMBLE_AGREEMENT", "0.8"))    # --> 0..1; más alto = desempata más seguido
+
+_HIRE_SIDE = {"strong_hire": 1, "hire": 1, "no_hire": -1, "strong_no_hire": -1}
+
+# --> Veredictos en texto libre (orden: los más específicos primero)
+_VERDICT_PATTERNS: List[Tuple[str, re.Pattern]] = [
+    ("strong_no_hire", re.compile(r"\bstrong(?:ly)?[\s_-]*(?:no[\s_-]*hire|not[\s_-]*(?:hire|recommend))", re.I)),
+    ("no_hire", re.compile(r"\b(?:no[\s_-]*hire|do not hire|don't hire|not recommended|not recommend|"
+                           r"reject(?:ed)?|not a (?:good )?fit|does not meet)", re.I)),
+    ("strong_hire", re.compile(r"\bstrong(?:ly)?[\s_-]*(?:hire|recommend)", re.I)),
+    ("hire", re.compile(r"\b(?:hire|recommended|recommend|advance to|move forward)", re.I)),
+]
+# --> "Score: 4/5", "Overall: 78/100", "3.5 out of 5"
+_SCORE_OUT_OF = re.compile(r"(\d+(?:\.\d+)?)\s*(?:/|out of)\s*(5|10|100)\b", re.I)
+# --> "Overall score: 4.2" / "quantitative_score: 78" (sin escala explícita)
+_SCORE_LABELED = re.compile(r"(?:overall|final|total|quantitative)[\s_]*(?:score|rating)?\s*[:=]\s*(\d+(?:\.\d+)?)", re.I)
+
+
+@dataclass
+class Verdict:
+    """Lo que se pudo leer de una evaluación: puntaje normalizado 0..1 y/o recomendación."""
+    score: Optional[float] = None
+    recommendation: Optional[str] = None
+
+    @property
+    def readable(self) -> bool:
+        return self.score is not None or self.recommendation is not None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"score": None if self.score is None else round(self.score, 3), "recommendation": self.recommendation}
+
+
+def _normalize(value: float, scale: Optional[float]) -> Optional[float]:
+    if scale is None:
+        scale = 5.0 if value <= 5 else 10.0 if value <= 10 else 100.0  # --> Rubric 1-5 por defecto
+    if value < 0 or value > scale:
+        return None
+    return value / scale
+
+def extract_verdict(text: Optional[str]) -> Verdict:
+    """
+    Puntaje y veredicto de una evaluación en texto libre (heurístico):
+      - puntaje: el "overall/final" si lo hay; si no, el promedio de los "x/5", "x/10", "x/100"
+      - veredicto: la última mención (las conclusiones van al final)
+    """
+    if not text:
+        return Verdict()
+    score = None
+    labeled = _SCORE_LABELED.findall(text)
+    if labeled:
+        score = _normalize(float(labeled[-1]), None)
+    if score is None:
+        values = [v for v in (_normalize(float(n), float(s)) for n, s in _SCORE_OUT_OF.findall(text)) if v is not None]
+        score = sum(values) / len(values) if values else None
+
+    # --> Una mención contenida en otra más específica no cuenta ("recommended" dentro de "not recommended")
+    spans: List[Tuple[int, int, str]] = []
+    for label, pattern in _VERDICT_PATTERNS:
+        for m in pattern.finditer(text):
+            if not any(start <= m.start() and m.end() <= end for start, end, _ in spans):
+                spans.append((m.start(), m.end(), label))
+    recommendation = max(spans)[2] if spans else None
+    return Verdict(score=score, recommendation=recommendation)
+
+def agreement(a: Verdict, b: Verdict) -> float:
+    """
+    0..1: cuánto coinciden dos evaluaciones.
+      - veredictos de lados opuestos (hire vs no_hire) -> 0
+      - puntajes: 1 - |diferencia| (normalizados)
+      - veredictos: 1 si son iguales, 0.8 si sólo coincide el lado (hire vs strong_hire)
+    Se toma el mínimo de lo disponible; sin nada comparable -> 0 (hay que desempatar).
+    """
+    parts = []
+    if a.recommendation and b.recommendation:
+        if _HIRE_SIDE[a.recommendation] != _HIRE_SIDE[b.recommendation]:
+            return 0.0
+        parts.append(1.0 if a.recommendation == b.recommendation else 0.8)
+    if a.score is not None and b.score is not None:
+        parts.append(1.0 - abs(a.score - b.score))
+    return min(parts) if parts else 0.0
+
+def best_agreement(verdicts: Dict[str, Verdict]) -> Tuple[float, Optional[Tuple[str, str]]]:
+    """El par de evaluaciones que más coincide (y su acuerdo)."""
+    best, pair = 0.0, None
+    keys = sorted(verdicts)
+    for i, x in enumerate(keys):
+        for y in keys[i + 1:]:
+            value = agreement(verdicts[x], verdicts[y])
+            if pair is None or value > best:
+                best, pair = value, (x, y)
+    return best, pair
+
+
+SlotResult = Tuple[str, Any, Dict[str, Any]]  # --> (attr, output, plan) como _run_slot
+
+async def run_early_exit(slots: Sequence[tuple], run_slot: Callable[[tuple], Awaitable[SlotResult]],
+                         is_valid: Callable[[Any], bool], threshold: float = ENSEMBLE_AGREEMENT) -> List[SlotResult]:
+    """
+    slots: habilitados, en orden de preferencia (el/los últimos son desempate).
+    Lanza el panel; cada vez que termina una evaluación mira si ya hay dos válidas que coinciden.
+    Si una falla, arranca el siguiente desempate en su lugar (para seguir teniendo dos votos).
+    Los slots que nunca se llamaron vuelven con output None y plan mode="skipped".
+    """
+    if len(slots) < 3:
+        return list(await asyncio.gather(*[run_slot(s) for s in slots]))
+
+    panel, reserve = list(slots[:-1]), list(slots[-1:])
+    running = {asyncio.create_task(run_slot(s)): s for s in panel}
+    done: Dict[str, SlotResult] = {}
+    verdicts: Dict[str, Verdict] = {}
+    decision, score, pair = "all", 0.0, None
+
+    try:
+        while running:
+            finished, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in finished:
+                running.pop(task)
+                attr, output, plan = task.result()
+                done[attr] = (attr, output, plan)
+                verdict = extract_verdict(output) if is_valid(output) else Verdict()
+                plan["verdict"] = verdict.to_dict()
+                if verdict.readable:
+                    verdicts[attr] = verdict
+                elif reserve:
+                    # --> Evaluación fallida o ilegible: el desempate entra ya como reemplazo
+                    nxt, decision = reserve.pop(0), "substitute"
+                    running[asyncio.create_task(run_slot(nxt))] = nxt
+
+            if len(verdicts) >= 2:
+                score, pair = best_agreement(verdicts)
+                if score >= threshold and reserve:
+                    decision = "early_exit"
+                    break  # --> Coinciden: el desempate no se llama
+            if not running and reserve:
+                # --> Panel terminado sin acuerdo: desempate
+                nxt, decision = reserve.pop(0), "tiebreak"
+                running[asyncio.create_task(run_slot(nxt))] = nxt
+    finally:
+        for task in running:
+            task.cancel()  # --> Panel de 3+: lo que sigue corriendo cuando dos ya coinciden se cancela
+
+    metrics.inc("ensemble_decisions_total", decision=decision)
+
+    results = []
+    for slot in slots:
+        attr, provider, model = slot[0], slot[1], slot[2]
+        if attr in done:
+            results.append(done[attr])
+        else:
+            metrics.inc("ensemble_skipped_calls_total", provider=provider)
+            results.append((attr, None, {"provider": provider, "model": model, "mode": "skipped",
+                                         "reason": "ensemble_agreement", "agreement": round(score, 3),
+                                         "agreeing": list(pair or ())}))
+    return results
@@ -0,0 +1,178 @@
+# --*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*
+# services/evaluator/app/infrastructure/evaluation_cache.py
+# Cache content-addressed de evaluaciones LLM.
+# Clave = sha256(provider, model, parámetros de generación, system_prompt, rubric, full_transcript).
+# Dos niveles: LRU local (proceso) -> Redis (compartido entre workers y reinicios).
+# --*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*
+from __future__ import annotations
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+import asyncio
+import hashlib
+import json
+import os
+import time
+
+from . import metrics
+
+# --> Config por ENV
+CACHE_ENABLED  = os.getenv("EVALUATOR_CACHE", "1") == "1"                 # --> 0 = nunca cachear
+CACHE_BACKEND  = os.getenv("EVALUATOR_CACHE_BACKEND", "redis")            # --> "redis" | "memory"
+CACHE_MAX_ITEMS = int(os.getenv("EVALUATOR_CACHE_MAX_ITEMS", "512"))      # --> Tamaño del LRU local
+CACHE_TTL_S    = int(os.getenv("EVALUATOR_CACHE_TTL_S", str(30 * 24 * 3600)))  # --> TTL (local y Redis)
+CACHE_PREFIX   = os.getenv("EVALUATOR_CACHE_PREFIX", "evaluator:cache:")   # --> Prefijo de claves en Redis
+REDIS_URI      = os.getenv("REDIS_URI", "redis://redis:6379/0")
+
+_REDIS_RETRY_S = 60.0 # --> Si Redis falla, lo salteamos este tiempo (no frena el hot path)
+
+
+def make_cache_key(provider: str, model: str, params: Dict[str, Any],
+                   system_prompt: str, rubric: str, full_transcript: str) -> str:
+    """
+    Hash estable de todo lo que determina la salida del LLM.
+    Cualquier cambio de modelo, parámetros, prompt, rúbrica o transcript genera otra clave.
+    """
+    material = json.dumps(
+        {
+            "provider": provider,
+            "model": model,
+            "params": params or {},
+            "system_prompt": system_prompt or "",
+            "rubric": rubric or "",
+            "full_transcript": full_transcript or "",
+        },
+        sort_keys=True, ensure_ascii=False, separators=(",", ":"),
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class EvaluationCache:
+    """
+    Cache de dos niveles para outputs de evaluación.
+
+      - get(key)  -> LRU local; si no está, Redis (y promueve al LRU)
+      - set(key)  -> escribe en ambos niveles
+      - stats()   -> hits/misses/hit_rate (también quedan como contadores en metrics)
+
+    Redis es opcional: si no hay conexión el cache sigue funcionando sólo en memoria.
+    """
+
+    def __init__(self, max_items: int = CACHE_MAX_ITEMS, ttl_s: int = CACHE_TTL_S,
+                 redis_uri: Optional[str] = REDIS_URI if CACHE_BACKEND == "redis" else None,
+                 prefix: str = CACHE_PREFIX) -> None:
+        self.max_items = max_items
+        self.ttl_s = ttl_s
+        self.redis_uri = redis_uri
+        self.prefix = prefix
+        self._local: "OrderedDict[str, Tuple[float, str]]" = OrderedDict() # --> key -> (expira_en, valor)
+        self._redis = None
+        self._redis_loop = None
+        self._redis_down_until = 0.0
+        self.hits = 0
+        self.misses = 0
+
+    # --------------- Redis (lazy, por event loop) ---------------
+    def _get_redis(self):
+        """
+        Cliente redis.asyncio ligado al loop actual (los clientes async no se comparten entre loops).
+        Devuelve None si no hay Redis configurado o está en cooldown por errores.
+        """
+        if not self.redis_uri or time.monotonic() < self._redis_down_until:
+            return None
+        loop = asyncio.get_running_loop()
+        if self._redis is None or self._redis_loop is not loop:
+            from redis.asyncio import Redis
+            self._redis = Redis.from_url(self.redis_uri, socket_timeout=2, socket_connect_timeout=2)
+            self._redis_loop = loop
+        return self._redis
+
+    def _redis_failed(self, e: Exception) -> None:
+        print(f"[EvalCache] WARNING: Redis no disponible ({e}); sigo sólo con cache local por {_REDIS_RETRY_S:.0f}s")
+        self._redis_down_until = time.monotonic() + _REDIS_RETRY_S
+        self._redis = None
+
+    # --------------- LRU local ---------------
+    def _local_get(self, key: str) -> Optional[str]:
+        item = self._local.get(key)
+        if item is None:
+            return None
+        expires_at, value = item
+        if expires_at < time.monotonic():
+            del self._local[key] # --> Vencido
+            return None
+        self._local.move_to_end(key) # --> Marca como usado recientemente
+        return value
+
+    def _local_set(self, key: str, value: str) -> None:
+        self._local[key] = (time.monotonic() + self.ttl_s, value)
+        self._local.move_to_end(key)
+        while len(self._local) > self.max_items:
+            self._local.popitem(last=False) # --> Desaloja el menos usado
+
+    # --------------- API ---------------
+    async def get(self, key: str, provider: str = "") -> Optional[str]:
+        value = self._local_get(key)
+        tier = "memory"
+        if value is None:
+            r = self._get_redis()
+            if r is not None:
+                try:
+                    raw = await r.get(self.prefix + key)
+                    if raw is not None:
+                        value = raw.decode("utf-8") if isinstance(raw, bytes) else str(raw)
+                        self._local_set(key, value) # --> Promueve al LRU
+                        tier = "redis"
+                except Exception as e:
+                    self._redis_failed(e)
+
+        if value is None:
+            self.misses += 1
+            metrics.inc("evaluation_cache_misses_total", provider=provider)
+        else:
+            self.hits += 1
+            metrics.inc("evaluation_cache_hits_total", provider=provider, tier=tier)
+        return value
+
+    async def set(self, key: str, value: str) -> None:
+        self._local_set(key, value)
+        r = self._get_redis()
+        if r is not None:
+            try:
+                await r.set(self.prefix + key, value, ex=self.ttl_s)
+            except Exception as e:
+                self._redis_failed(e)
+
+    async def contains(self, key: str) -> bool:
+        """Chequeo sin contar hit/miss (p. ej. para planificar re-evaluaciones masivas)."""
+        if self._local_get(key) is not None:
+            return True
+        r = self._get_redis()
+        if r is None:
+            return False
+        try:
+            return bool(await r.exists(self.prefix + key))
+        except Exception as e:
+            self._redis_failed(e)
+            return False
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "enabled": CACHE_ENABLED,
+            "backend": "redis" if self.redis_uri else "memory",
+            "local_items": len(self._local),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+# --------------- Singleton ---------------
+_cache: Optional[EvaluationCache] = None
+
+def get_evaluation_cache() -> EvaluationCache:
+    """Instancia única por proceso (worker/API)."""
+    global _cache
+    if _cache is None:
+        _cache = EvaluationCache()
+    return _cache
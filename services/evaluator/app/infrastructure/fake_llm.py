@@ -0,0 +1,178 @@
+# --*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*
+# services/evaluator/app/infrastructure/fake_llm.py
+# Provider LLM falso para pruebas de carga sin pagar APIs (EVALUATOR_FAKE_LLM=1).
+# Imita la forma de los SDKs (OpenAI chat.completions / Gemini GenerativeModel), así que todo el
+# camino real se ejercita igual: threads, rate limiter, reintentos de 429, map-reduce y streaming.
+# Determinista: texto, latencia y fallas salen de un RNG sembrado con (seed, provider, prompt, n-ésima
+# llamada con ese prompt), sin importar el orden en que se intercalen las llamadas concurrentes.
+# --*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*
+from __future__ import annotations
+from collections import defaultdict
+from types import SimpleNamespace
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import hashlib
+import math
+import os
+import random
+import threading
+import time
+
+from . import metrics
+
+# --> Config por ENV
+FAKE_LLM           = os.getenv("EVALUATOR_FAKE_LLM", "0") == "1"
+FAKE_LATENCY_MS    = float(os.getenv("EVALUATOR_FAKE_LATENCY_MS", "800"))     # --> Mediana hasta el primer token
+FAKE_LATENCY_SIGMA = float(os.getenv("EVALUATOR_FAKE_LATENCY_SIGMA", "0.5"))  # --> Log-normal: 0 = fija, >1 = cola larga
+FAKE_TOKENS_PER_S  = float(os.getenv("EVALUATOR_FAKE_TOKENS_PER_S", "80"))    # --> Velocidad de generación (0 = instantánea)
+FAKE_OUTPUT_TOKENS = int(os.getenv("EVALUATOR_FAKE_OUTPUT_TOKENS", "300"))    # --> Tope si la llamada no trae max_tokens
+FAKE_ERROR_RATE    = float(os.getenv("EVALUATOR_FAKE_ERROR_RATE", "0"))       # --> Probabilidad de error 500
+FAKE_429_RATE      = float(os.getenv("EVALUATOR_FAKE_429_RATE", "0"))         # --> Probabilidad de 429
+FAKE_RETRY_AFTER_S = float(os.getenv("EVALUATOR_FAKE_RETRY_AFTER_S", "1"))
+FAKE_SEED          = os.getenv("EVALUATOR_FAKE_SEED", "0")
+FAKE_CACHE_MIN_TOKENS = int(os.getenv("EVALUATOR_FAKE_CACHE_MIN_TOKENS", "1024"))  # --> Prefijo mínimo cacheable (como OpenAI)
+
+_WORDS = ("candidate", "demonstrates", "solid", "limited", "experience", "with", "the", "rubric", "criterion",
+          "evidence", "clear", "answer", "problem", "solving", "communication", "score", "design", "trade-offs",
+          "testing", "examples", "shows", "partial", "understanding", "of", "requirements", "and")
+
+
+class FakeLLMError(Exception):
+    """Error 5xx simulado."""
+    status_code = 500
+
+class FakeRateLimitError(Exception):
+    """429 simulado, con Retry-After en la respuesta como los SDKs reales."""
+    status_code = 429
+
+    def __init__(self, retry_after: float) -> None:
+        super().__init__(f"Error code: 429 - fake rate limit exceeded (retry after {retry_after}s)")
+        self.response = SimpleNamespace(headers={"retry-after": str(retry_after)})
+
+
+class FakeLLM:
+    """Generador de respuestas para un provider; thread-safe (los SDKs corren en threads)."""
+
+    def __init__(self, provider: str, seed: str = FAKE_SEED) -> None:
+        self.provider = provider
+        self.seed = seed
+        self._seen: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def _rng(self, prompt: str) -> random.Random:
+        digest = hashlib.sha256(f"{self.provider}\x00{prompt}".encode("utf-8")).hexdigest()
+        with self._lock:
+            n = self._seen[digest]  # --> Reintento del mismo prompt = otra tirada (si no, un 429 sería eterno)
+            self._seen[digest] += 1
+        return random.Random(f"{self.seed}:{digest}:{n}")
+
+    def plan(self, prompt: str, max_tokens: Optional[int]) -> Tuple[float, List[str], float]:
+        """(segundos hasta el primer token, tokens de salida, segundos por token). Lanza los errores simulados."""
+        rng = self._rng(prompt)
+        roll = rng.random()
+        ttft = FAKE_LATENCY_MS / 1000 * math.exp(rng.gauss(0, FAKE_LATENCY_SIGMA)) if FAKE_LATENCY_SIGMA else FAKE_LATENCY_MS / 1000
+        if roll < FAKE_429_RATE:
+            metrics.inc("fake_llm_429_total", provider=self.provider)
+            time.sleep(min(ttft, 0.05))  # --> Los 429 vuelven rápido
+            raise FakeRateLimitError(FAKE_RETRY_AFTER_S)
+        if roll < FAKE_429_RATE + FAKE_ERROR_RATE:
+            metrics.inc("fake_llm_errors_total", provider=self.provider)
+            time.sleep(ttft)
+            raise FakeLLMError("fake provider internal error")
+        n_tokens = max(1, int((max_tokens or FAKE_OUTPUT_TOKENS) * rng.uniform(0.6, 1.0)))
+        words = [rng.choice(_WORDS) for _ in range(n_tokens)]
+        words[0] = f"[fake {self.provider}]"
+        per_token = 1 / FAKE_TOKENS_PER_S if FAKE_TOKENS_PER_S > 0 else 0.0
+        metrics.inc("fake_llm_calls_total", provider=self.provider)
+        return ttft, words, per_token
+
+    def complete(self, prompt: str, max_tokens: Optional[int] = None) -> str:
+        ttft, words, per_token = self.plan(prompt, max_tokens)
+        time.sleep(ttft + per_token * len(words))
+        return " ".join(words)
+
+    def stream(self, prompt: str, max_tokens: Optional[int] = None) -> Iterator[str]:
+        ttft, words, per_token = self.plan(prompt, max_tokens)
+        time.sleep(ttft)
+        for i, word in enumerate(words):
+            if per_token:
+                time.sleep(per_token)
+            yield word if i == 0 else " " + word
+
+
+# ================================
+# Adaptadores con forma de SDK
+# ================================
+def _fake_usage(prompt: str, text: str) -> Tuple[int, int]:
+    """Usage como lo reportan los SDKs (~4 caracteres por token de entrada, una palabra por token de salida)."""
+    return max(1, len(prompt) // 4), len(text.split())
+
+_seen_prefixes: set = set()
+
+def _fake_cached_tokens(prefix: Optional[str]) -> int:
+    """
+    Cache de prefijos simulado: un mensaje system ya visto (y de >= FAKE_CACHE_MIN_TOKENS) vuelve
+    como tokens cacheados, en bloques de 128 como los reporta OpenAI. La primera vez no.
+    """
+    if not prefix:
+        return 0
+    tokens = len(prefix) // 4
+    digest = hashlib.sha256(prefix.encode("utf-8")).hexdigest()
+    with _fakes_lock:
+        seen = digest in _seen_prefixes
+        _seen_prefixes.add(digest)
+    return (tokens // 128) * 128 if seen and tokens >= FAKE_CACHE_MIN_TOKENS else 0
+
+def _prompt_from_messages(messages: List[Dict[str, Any]]) -> str:
+    return "\n\n".join(f"[{m.get('role')}]\n{m.get('content')}" for m in messages)
+
+class _FakeCompletions:
+    def __init__(self, llm: FakeLLM) -> None:
+        self._llm = llm
+
+    def create(self, model: str, messages: List[Dict[str, Any]], max_tokens: Optional[int] = None,
+               stream: bool = False, **_: Any):
+        prompt = _prompt_from_messages(messages)
+        if stream:
+            return (SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=t))])
+                    for t in self._llm.stream(prompt, max_tokens))
+        text = self._llm.complete(prompt, max_tokens)
+        prompt_tokens, completion_tokens = _fake_usage(prompt, text)
+        system = "\n\n".join(str(m.get("content")) for m in messages if m.get("role") == "system")
+        details = SimpleNamespace(cached_tokens=_fake_cached_tokens(system))
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text))],
+                               usage=SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+                                                     prompt_tokens_details=details))
+
+class FakeOpenAIClient:
+    """Sustituto de openai.OpenAI (también para OpenRouter): client.chat.completions.create(...)."""
+
+    def __init__(self, provider: str = "openai") -> None:
+        self.chat = SimpleNamespace(completions=_FakeCompletions(get_fake_llm(provider)))
+
+class FakeGenerativeModel:
+    """Sustituto de genai.GenerativeModel: generate_content(prompt, stream=...)."""
+
+    def __init__(self, model_name: str, system_instruction: Optional[str] = None) -> None:
+        self.model_name = model_name
+        self.system_instruction = system_instruction
+        self._llm = get_fake_llm("gemini")
+
+    def generate_content(self, prompt: str, stream: bool = False, generation_config: Optional[Dict[str, Any]] = None):
+        max_tokens = (generation_config or {}).get("max_output_tokens")
+        if stream:
+            return (SimpleNamespace(text=t) for t in self._llm.stream(prompt, max_tokens))
+        text = self._llm.complete(prompt, max_tokens)
+        prompt_tokens, completion_tokens = _fake_usage((self.system_instruction or "") + prompt, text)
+        return SimpleNamespace(text=text, usage_metadata=SimpleNamespace(
+            prompt_token_count=prompt_tokens, candidates_token_count=completion_tokens,
+            cached_content_token_count=_fake_cached_tokens(self.system_instruction)))
+
+
+_fakes: Dict[str, FakeLLM] = {}
+_fakes_lock = threading.Lock()
+
+def get_fake_llm(provider: str) -> FakeLLM:
+    with _fakes_lock:
+        if provider not in _fakes:
+            _fakes[provider] = FakeLLM(provider)
+        return _fakes[provider]
@@ -0,0 +1,183 @@
+# --*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*
+# services/evaluator/app/infrastructure/hedging.py
+# Hedged requests para cortar la cola de latencia de los LLMs (EVALUATOR_HEDGE=1):
+#   - cada provider lleva su p95 de latencia (ventana móvil de las últimas llamadas)
+#   - si la llamada principal no volvió en ese p95, se lanza una de respaldo (mismo modelo u otro
+#     equivalente, EVALUATOR_HEDGE_BACKUPS) y gana la primera respuesta válida; la otra se cancela
+#   - los respaldos salen de un presupuesto: cada llamada principal suma EVALUATOR_HEDGE_BUDGET
+#     créditos (0.1 = como mucho ~10% de llamadas extra) y cada respaldo gasta 1
+# Ojo: los SDKs corren en threads; cancelar libera el cupo del rate limiter pero la request HTTP
+# ya enviada termina igual (se paga). Por eso el presupuesto.
+# --*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*
+from __future__ import annotations
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple
+import asyncio
+import json
+import math
+import os
+import time
+
+from . import metrics
+
+HEDGE_ENABLED     = os.getenv("EVALUATOR_HEDGE", "0") == "1"
+HEDGE_QUANTILE    = float(os.getenv("EVALUATOR_HEDGE_QUANTILE", "0.95"))   # --> Espera antes del respaldo = este cuantil
+HEDGE_MIN_SAMPLES = int(os.getenv("EVALUATOR_HEDGE_MIN_SAMPLES", "20"))   # --> Sin suficientes muestras no hay p95: no se cubre
+HEDGE_WINDOW      = int(os.getenv("EVALUATOR_HEDGE_WINDOW", "200"))        # --> Últimas N latencias por provider
+HEDGE_BUDGET      = float(os.getenv("EVALUATOR_HEDGE_BUDGET", "0.1"))      # --> Respaldos por llamada principal (promedio)
+HEDGE_BURST       = float(os.getenv("EVALUATOR_HEDGE_BURST", "5"))         # --> Respaldos acumulables como máximo
+
+def _load_backups() -> Dict[str, str]:
+    raw = os.getenv("EVALUATOR_HEDGE_BACKUPS")  # --> '{"openai": "gpt-4o-mini", "gemini": "gemini-2.0-flash"}'
+    if not raw:
+        return {}
+    try:
+        return {str(k): str(v) for k, v in json.loads(raw).items()}
+    except Exception as e:
+        print(f"[Evaluator] WARNING: EVALUATOR_HEDGE_BACKUPS inválido ({e}); respaldo = mismo modelo")
+        return {}
+
+HEDGE_BACKUPS = _load_backups()  # --> provider -> modelo de respaldo (sin entrada: el mismo modelo otra vez)
+
+
+class LatencyTracker:
+    """Latencias recientes de un provider y el cuantil a partir del cual conviene cubrirse."""
+
+    def __init__(self, window: int = HEDGE_WINDOW, min_samples: int = HEDGE_MIN_SAMPLES) -> None:
+        self.samples: Deque[float] = deque(maxlen=window)
+        self.min_samples = min_samples
+
+    def observe(self, seconds: float) -> None:
+        self.samples.append(seconds)
+
+    def quantile(self, q: float = HEDGE_QUANTILE) -> Optional[float]:
+        """None hasta juntar min_samples (arrancar cubriéndose todo dispararía el costo)."""
+        if len(self.samples) < max(1, self.min_samples):
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))]
+
+
+class HedgeBudget:
+    """Token bucket: cada llamada principal suma `ratio`, cada respaldo gasta 1 (tope `burst`)."""
+
+    def __init__(self, ratio: float = HEDGE_BUDGET, burst: float = HEDGE_BURST) -> None:
+        self.ratio = ratio
+        self.burst = burst
+        self.tokens = burst
+
+    def earn(self) -> None:
+        self.tokens = min(self.burst, self.tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        if self.tokens < 1.0 - 1e-9:  # --> 10 x 0.1 suma 0.999...
+            return False
+        self.tokens -= 1.0
+        return True
+
+
+# --------------- Registro por provider (por proceso) ---------------
+_trackers: Dict[str, LatencyTracker] = {}
+_budgets: Dict[str, HedgeBudget] = {}
+
+def get_tracker(provider: str) -> LatencyTracker:
+    return _trackers.setdefault(provider, LatencyTracker())
+
+def get_budget(provider: str) -> HedgeBudget:
+    return _budgets.setdefault(provider, HedgeBudget())
+
+def reset() -> None:
+    """Olvida latencias y presupuestos (tests / benchmark)."""
+    _trackers.clear()
+    _budgets.clear()
+
+
+async def hedged(provider: str, primary: Callable[[], Awaitable[Any]], backup: Callable[[], Awaitable[Any]],
+                 is_valid: Callable[[Any], bool], delay: Optional[float] = None) -> Tuple[Any, str]:
+    """
+    await primary(); si tarda más que `delay` (default: p95 del provider) y hay presupuesto,
+    lanza backup() y devuelve la primera respuesta válida.
+    Devuelve (output, resultado): "unhedged" (no hizo falta o no hubo presupuesto), "primary" o "backup"
+    (quién ganó la carrera) o "none" (ninguna válida: se devuelve la de la principal con su error).
+    """
+    tracker, budget = get_tracker(provider), get_budget(provider)
+    budget.earn()
+    delay = tracker.quantile() if delay is None else delay
+    started = time.perf_counter()
+    first = asyncio.ensure_future(primary())
+    names = {first: "primary"}
+    try:
+        if delay is not None:
+            done, _ = await asyncio.wait({first}, timeout=delay)
+            if not done and not budget.try_spend():
+                metrics.inc("hedge_budget_exhausted_total", provider=provider)
+                delay = None
+        if delay is None or first.done():
+            output = await first
+            if is_valid(output):
+                tracker.observe(time.perf_counter() - started)
+            return output, "unhedged"
+
+        metrics.inc("hedge_fired_total", provider=provider)
+        names[asyncio.ensure_future(backup())] = "backup"
+        pending = set(names)
+        outputs: Dict[str, Any] = {}
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in sorted(done, key=lambda t: names[t] != "primary"):  # --> Empate: gana la principal
+                name = names[task]
+                outputs[name] = task.exception() or task.result()
+                if not isinstance(outputs[name], BaseException) and is_valid(outputs[name]):
+                    metrics.inc("hedge_wins_total", provider=provider, winner=name)
+                    return outputs[name], name
+        metrics.inc("hedge_wins_total", provider=provider, winner="none")
+        if isinstance(outputs["primary"], BaseException):
+            raise outputs["primary"]
+        return outputs["primary"], "none"
+    finally:
+        for task in names:
+            if not task.done():
+                task.cancel()  # --> La que perdió (o todas, si a nosotros nos cancelaron)
+        if len(names) > 1:
+            # --> Con respaldo, la latencia de la principal cuenta aunque se haya cancelado
+            #     (cota inferior: si no, la cola desaparece del p95 y se cubre cada vez más)
+            tracker.observe(time.perf_counter() - started)
+
+
+class HedgedCall:
+    """
+    Envuelve un call_* de llm_provider (prompt, rubric, transcript) con hedging.
+    El respaldo es la misma función con model=<respaldo>; lleva la cuenta para el plan del slot.
+    """
+
+    def __init__(self, provider: str, call_fn: Callable[..., Awaitable[Any]], is_valid: Callable[[Any], bool],
+                 backup_model: Optional[str] = None) -> None:
+        self.provider = provider
+        self.call_fn = call_fn
+        self.is_valid = is_valid
+        self.backup_model = backup_model
+        self.calls = 0
+        self.hedges = 0
+        self.backup_wins = 0
+
+    async def __call__(self, prompt, rubric, transcript):
+        self.calls += 1
+        backup_kwargs = {"model": self.backup_model} if self.backup_model else {}
+        output, outcome = await hedged(
+            self.provider,
+            lambda: self.call_fn(prompt, rubric, transcript),
+            lambda: self.call_fn(prompt, rubric, transcript, **backup_kwargs),
+            self.is_valid,
+        )
+        self.hedges += outcome != "unhedged"
+        self.backup_wins += outcome == "backup"
+        return output
+
+    @property
+    def backup_model_used(self) -> bool:
+        """Algún tramo lo respondió OTRO modelo (entonces no corresponde a la clave de cache del principal)."""
+        return self.backup_wins > 0 and self.backup_model is not None
+
+    def summary(self) -> Dict[str, Any]:
+        return {"calls": self.calls, "hedges": self.hedges, "backup_wins": self.backup_wins,
+                "backup_model": self.backup_model}
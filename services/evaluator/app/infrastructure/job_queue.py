@@ -0,0 +1,90 @@
+# --*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*
+# services/evaluator/app/infrastructure/job_queue.py
+# Carriles de prioridad de los jobs de evaluación (un stream de Redis por carril):
+#   realtime -> evaluation_jobs:realtime   (entrevista recién terminada, alguien esperando)
+#   normal   -> evaluation_jobs            (default; mismo stream de siempre)
+#   bulk     -> evaluation_jobs:bulk       (re-evaluaciones masivas / backfills)
+# El worker elige de qué carril leer con round-robin ponderado (suave) + protección anti-inanición.
+# Sólo depende de redis: lo usan worker.py, enqueue.py, bulk_reevaluate.py y deadletter.py.
+# --*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*
+from __future__ import annotations
+from typing import Any, Dict, List, Optional
+import json
+import os
+import time
+
+STREAM_NAME = os.getenv("EVALUATOR_STREAM", "evaluation_jobs")  # --> Carril "normal" (compatibilidad)
+PRIORITIES  = ("realtime", "normal", "bulk")                   # --> Orden = desempate del scheduler
+DEFAULT_PRIORITY = "normal"
+
+def _load_weights() -> Dict[str, int]:
+    weights = {"realtime": 8, "normal": 3, "bulk": 1}
+    raw = os.getenv("EVALUATOR_LANE_WEIGHTS")  # --> '{"realtime": 8, "normal": 3, "bulk": 1}'
+    if raw:
+        try:
+            weights.update({k: max(0, int(v)) for k, v in json.loads(raw).items() if k in PRIORITIES})
+        except Exception as e:
+            print(f"[Evaluator] WARNING: EVALUATOR_LANE_WEIGHTS inválido ({e}); uso defaults")
+    return weights
+
+LANE_WEIGHTS = _load_weights()
+LANE_MAX_WAIT_S = float(os.getenv("EVALUATOR_LANE_MAX_WAIT_S", "30"))  # --> Carril sin atender más que esto pasa primero
+
+
+def stream_for(priority: Optional[str]) -> str:
+    """Stream del carril (prioridad desconocida o vacía -> normal)."""
+    priority = priority if priority in PRIORITIES else DEFAULT_PRIORITY
+    return STREAM_NAME if priority == "normal" else f"{STREAM_NAME}:{priority}"
+
+def lane_streams() -> Dict[str, str]:
+    return {p: stream_for(p) for p in PRIORITIES}
+
+def priority_of(stream: Any) -> str:
+    name = stream.decode() if isinstance(stream, bytes) else str(stream)
+    for priority, lane in lane_streams().items():
+        if lane == name:
+            return priority
+    return DEFAULT_PRIORITY
+
+async def enqueue_job(r, interview_id: str, priority: str = DEFAULT_PRIORITY, **extra: Any) -> Any:
+    """XADD del job al carril; el payload lleva prioridad y hora de encolado (para medir espera)."""
+    payload = {"interview_id": interview_id, "priority": priority, "enqueued_at": time.time(), **extra}
+    return await r.xadd(stream_for(priority), {"payload": json.dumps(payload)})
+
+
+class LaneScheduler:
+    """
+    Orden de carriles a probar para el próximo job:
+      - round-robin ponderado suave (estilo nginx): con pesos 8/3/1 y todos con trabajo,
+        de cada 12 jobs 8 son realtime, 3 normal y 1 bulk, intercalados (no en ráfagas)
+      - anti-inanición: un carril que no fue atendido en LANE_MAX_WAIT_S va primero
+    El worker prueba los carriles en ese orden y toma del primero que tenga algo.
+    """
+
+    def __init__(self, weights: Optional[Dict[str, int]] = None, max_wait_s: float = LANE_MAX_WAIT_S) -> None:
+        self.weights = dict(weights or LANE_WEIGHTS)
+        self.max_wait_s = max_wait_s
+        self.current = {p: 0 for p in PRIORITIES}
+        now = time.monotonic()
+        self.last_served = {p: now for p in PRIORITIES}
+
+    def order(self, now: Optional[float] = None) -> List[str]:
+        """Carriles en el orden a probar (no modifica el estado: eso lo hacen served/idle)."""
+        now = time.monotonic() if now is None else now
+        starving = [p for p in PRIORITIES
+                    if self.weights.get(p, 0) and now - self.last_served[p] >= self.max_wait_s]
+        ranked = sorted(PRIORITIES, key=lambda p: (-(self.current[p] + self.weights.get(p, 0)), PRIORITIES.index(p)))
+        return starving + [p for p in ranked if p not in starving]
+
+    def served(self, priority: str, now: Optional[float] = None) -> None:
+        """Paso del round-robin: todos suman su peso, el atendido resta el total (crédito acotado)."""
+        total = sum(self.weights.get(p, 0) for p in PRIORITIES) or 1
+        for p in PRIORITIES:
+            self.current[p] = max(-total, min(total, self.current[p] + self.weights.get(p, 0)))
+        self.current[priority] -= total
+        self.last_served[priority] = time.monotonic() if now is None else now
+
+    def idle(self, priority: str, now: Optional[float] = None) -> None:
+        """Carril vacío: no acumula crédito ni cuenta como inanición (no había nada que atender)."""
+        self.current[priority] = 0
+        self.last_served[priority] = time.monotonic() if now is None else now
@@ -0,0 +1,136 @@
+# --*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*
+# services/evaluator/app/infrastructure/job_status.py
+# Estado de las evaluaciones empujado por Redis pub/sub (en vez de que el front consulte la DB):
+#   - cada transición (queued | running | retrying | done | error) se publica en <prefix>:<interview_id>
+#   - el último estado queda en <prefix>:last:<interview_id> (con TTL) para quien se suscribe tarde
+# Lo publican los repositorios en mark_evaluation_status; lo consumen los endpoints SSE / long-poll.
+# Best-effort: si Redis no está, se loguea y el flujo de evaluación sigue igual.
+# --*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*
+from __future__ import annotations
+from typing import Any, AsyncIterator, Dict, Optional
+import asyncio
+import json
+import os
+import time
+
+STATUS_PUBSUB = os.getenv("EVALUATOR_STATUS_PUBSUB", "1") == "1"                 # --> 0 = no publica (tests / sin Redis)
+STATUS_PREFIX = os.getenv("EVALUATOR_STATUS_PREFIX", "evaluator:status")          # --> Canal = <prefix>:<interview_id>
+STATUS_TTL_S  = int(os.getenv("EVALUATOR_STATUS_TTL_S", str(24 * 3600)))          # --> Cuánto se recuerda el último estado
+REDIS_URI     = os.getenv("REDIS_URI", "redis://redis:6379/0")
+
+TERMINAL_STATUSES = ("done", "error")  # --> "retrying" no es final: el worker vuelve a intentar
+
+_REDIS_RETRY_S = 30.0  # --> Si Redis falla, no lo reintentamos en cada transición
+
+_redis = None
+_redis_loop = None
+_redis_down_until = 0.0
+
+
+def channel_for(interview_id: Any) -> str:
+    return f"{STATUS_PREFIX}:{interview_id}"
+
+def last_key_for(interview_id: Any) -> str:
+    return f"{STATUS_PREFIX}:last:{interview_id}"
+
+def status_event(interview_id: Any, status: str, error: Optional[str] = None, **extra: Any) -> Dict[str, Any]:
+    """Sobre publicado: {"interview_id", "status", "at", "error"?, ...extra}."""
+    event: Dict[str, Any] = {"interview_id": str(interview_id), "status": status, "at": time.time(), **extra}
+    if error:
+        event["error"] = str(error)[:2000]
+    return event
+
+def is_terminal(event: Optional[Dict[str, Any]]) -> bool:
+    return bool(event) and event.get("status") in TERMINAL_STATUSES
+
+def _decode(raw: Any) -> Optional[Dict[str, Any]]:
+    if raw is None:
+        return None
+    try:
+        return json.loads(raw.decode("utf-8") if isinstance(raw, bytes) else raw)
+    except Exception:
+        return None
+
+
+def get_redis():
+    """
+    Cliente redis.asyncio ligado al loop actual (mismo patrón que evaluation_cache).
+    None si la publicación está apagada o Redis está en cooldown por errores.
+    """
+    global _redis, _redis_loop
+    if not STATUS_PUBSUB or time.monotonic() < _redis_down_until:
+        return None
+    loop = asyncio.get_running_loop()
+    if _redis is None or _redis_loop is not loop:
+        from redis.asyncio import Redis
+        _redis = Redis.from_url(REDIS_URI, socket_connect_timeout=2)
+        _redis_loop = loop
+    return _redis
+
+def _redis_failed(e: Exception) -> None:
+    global _redis, _redis_down_until
+    print(f"[Evaluator] WARNING: no pude publicar estado en Redis ({e}); reintento en {_REDIS_RETRY_S:.0f}s")
+    _redis_down_until = time.monotonic() + _REDIS_RETRY_S
+    _redis = None
+
+
+async def publish_status(interview_id: Any, status: str, error: Optional[str] = None, **extra: Any) -> bool:
+    """Guarda el último estado y lo publica a los suscriptores. Devuelve False si no se pudo."""
+    r = get_redis()
+    if r is None:
+        return False
+    event = json.dumps(status_event(interview_id, status, error, **extra), ensure_ascii=False)
+    try:
+        pipe = r.pipeline(transaction=False)
+        pipe.set(last_key_for(interview_id), event, ex=STATUS_TTL_S)
+        pipe.publish(channel_for(interview_id), event)
+        await pipe.execute()
+        return True
+    except Exception as e:
+        _redis_failed(e)
+        return False
+
+async def get_status(interview_id: Any) -> Optional[Dict[str, Any]]:
+    """Último estado publicado (None si no hay o Redis no está)."""
+    r = get_redis()
+    if r is None:
+        return None
+    try:
+        return _decode(await r.get(last_key_for(interview_id)))
+    except Exception as e:
+        _redis_failed(e)
+        return None
+
+
+async def watch_status(interview_id: Any, heartbeat_s: float = 15.0,
+                       timeout_s: Optional[float] = None) -> AsyncIterator[Optional[Dict[str, Any]]]:
+    """
+    Estado actual + cada transición hasta un estado final (done/error) o timeout_s.
+    Cada heartbeat_s sin novedades emite None (para el ping SSE y detectar clientes caídos).
+    Se suscribe ANTES de leer el último estado: así no se pierde una transición entre ambos pasos.
+    """
+    r = get_redis()
+    if r is None:
+        raise RuntimeError("status pub/sub no disponible (EVALUATOR_STATUS_PUBSUB=0 o Redis caído)")
+    deadline = None if timeout_s is None else time.monotonic() + timeout_s
+    pubsub = r.pubsub(ignore_subscribe_messages=True)
+    try:
+        await pubsub.subscribe(channel_for(interview_id))
+        current = _decode(await r.get(last_key_for(interview_id)))
+        if current:
+            yield current
+            if is_terminal(current):
+                return
+        while deadline is None or time.monotonic() < deadline:
+            wait = heartbeat_s if deadline is None else max(0.0, min(heartbeat_s, deadline - time.monotonic()))
+            msg = await pubsub.get_message(timeout=wait)
+            event = _decode(msg.get("data")) if msg else None
+            yield event
+            if is_terminal(event):
+                return
+    finally:
+        try:
+            await pubsub.unsubscribe()
+            await pubsub.aclose()
+        except Exception:
+            pass
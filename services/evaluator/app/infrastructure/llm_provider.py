@@ -2,16 +2,27 @@
 # services/evaluator/app/infrastructure/llm_provider.py
 # --*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*
 from ..domain.entities.interview import Interview # --> Entidad fuerte con from_dict/to_dict
-from .config import Settings # --> Config (pydantic BaseSettings)
-from .persistence.supabase.interview_repository import load_interview_from_supabase # --> función async que trae Interview desde DB
+from .evaluation_cache import get_evaluation_cache, make_cache_key, CACHE_ENABLED # --> Cache content-addressed de outputs
+from .token_budget import plan_evaluation, chunk_transcript, estimate_tokens, estimate_cost, OUTPUT_RESERVE_TOKENS # --> Map-reduce por presupuesto de tokens
+from . import metrics # --> Tokens/costo/latencia por llamada (contadores + usage del job)
+from .rate_limit import run_limited # --> RPM/TPM + AIMD + Retry-After por provider (EVALUATOR_RATE_LIMITS)
+from .fake_llm import FAKE_LLM, FakeOpenAIClient, FakeGenerativeModel # --> EVALUATOR_FAKE_LLM=1: pruebas de carga sin APIs
+from .ensemble import ENSEMBLE_MODE, run_early_exit # --> EVALUATOR_ENSEMBLE=early_exit: desempate sólo si hace falta
+from .hedging import HEDGE_ENABLED, HEDGE_BACKUPS, HedgedCall # --> EVALUATOR_HEDGE=1: respaldo si la llamada pasa el p95
+from .transcript_compaction import compacted_view # --> EVALUATOR_COMPACT: transcript sin timestamps/muletillas/sistema
+from .criterion_evaluation import plan_criteria, evidence_by_criterion, combine_criteria, criteria_cache_params # --> EVALUATOR_EVAL_MODE=per_criterion
 # NICO --> Std libs
 import json
 import os # --> Carga .env de la raíz y configura flags/modelos por defecto.
 import asyncio
+import time
 from pathlib import Path
-# --- Helpers OpenAI/Gemini
-from openai import OpenAI # --> SDK OpenAI (chat.completions)
-import google.generativeai as genai # --> SDK Gemini (generate_content)
+# --- SDKs OpenAI/Gemini, Settings (pydantic) y Supabase: import diferido al primer uso (ver _openai_cls,
+#     _genai, _settings, load_interview_from_source). Cargarlos acá costaba ~1s por proceso (run_one, reinicios
+#     del worker) aunque el job nunca llegue a llamar al provider. Los placeholders permiten patch() en tests.
+OpenAI = None    # --> openai.OpenAI (chat.completions)
+genai = None     # --> google.generativeai (generate_content)
+settings = None  # --> config.Settings
 # --- .env
 try:
     from dotenv import find_dotenv, load_dotenv
@@ -22,8 +33,6 @@ except Exception as e:
 # ================================
 # Settings / Flags / Defaults
 # ================================
-# Initialize settings
-settings = Settings()
 # --> Flags de activación por .env (1=on, 0=off)
 ENABLE_OPENAI     = os.getenv("EVALUATOR_ENABLE_OPENAI", "1") == "1"
 ENABLE_GEMINI     = os.getenv("EVALUATOR_ENABLE_GEMINI", "1") == "1"
@@ -40,10 +49,19 @@ OPENAI_TEMPERATURE    = float(os.getenv("OPENAI_TEMPERATURE", "0.2"))
 OPENROUTER_MAX_TOKENS  = int(os.getenv("OPENROUTER_MAX_TOKENS", "512"))
 OPENROUTER_TEMPERATURE = float(os.getenv("OPENROUTER_TEMPERATURE", "0.2"))
 
+# --> Armado de mensajes: "single" (un mensaje user con todo, histórico) | "cached_prefix" (system estable
+#     = system prompt + rúbrica, igual en miles de entrevistas -> cache de prefijos del provider; user = transcript)
+PROMPT_LAYOUT = os.getenv("EVALUATOR_PROMPT_LAYOUT", "single")
+
 # --> Claves
 OPENAI_API_KEY      = os.getenv("OPENAI_API_KEY")
 GOOGLE_API_KEY      = os.getenv("GOOGLE_API_KEY")
 OPENROUTER_API_KEY  = os.getenv("OPENROUTER_API_KEY")
+if FAKE_LLM:
+    # --> Con el provider falso no hacen falta keys reales (los chequeos de "falta key" siguen igual)
+    OPENAI_API_KEY, GOOGLE_API_KEY, OPENROUTER_API_KEY = (OPENAI_API_KEY or "fake", GOOGLE_API_KEY or "fake",
+                                                          OPENROUTER_API_KEY or "fake")
+    print("[Evaluator] EVALUATOR_FAKE_LLM=1: usando provider LLM falso (sin llamadas reales)")
 
 # ================================
 # Helpers de inicialización
@@ -51,12 +69,34 @@ OPENROUTER_API_KEY  = os.getenv("OPENROUTER_API_KEY")
 _openai_client = None
 _gemini_ready  = False
 
+def _settings():
+    # --> Settings (pydantic_settings) recién cuando se necesita un valor de config
+    global settings
+    if settings is None:
+        from .config import get_settings
+        settings = get_settings()
+    return settings
+
+def _openai_cls():
+    global OpenAI
+    if OpenAI is None:
+        from openai import OpenAI as sdk_client
+        OpenAI = sdk_client
+    return OpenAI
+
+def _genai():
+    global genai
+    if genai is None:
+        import google.generativeai as sdk_module
+        genai = sdk_module
+    return genai
+
 def _get_openai_client():
     # --> Lazy init del cliente OpenAI sólo si hay key.
     global _openai_client
     if OPENAI_API_KEY and _openai_client is None:
         try:
-            _openai_client = OpenAI(api_key=OPENAI_API_KEY)
+            _openai_client = FakeOpenAIClient("openai") if FAKE_LLM else _openai_cls()(api_key=OPENAI_API_KEY)
         except Exception as e:
             print(f"[WARN] OpenAI init error: {e}")
             _openai_client = None
@@ -67,13 +107,30 @@ def _setup_gemini():
     global _gemini_ready
     if GOOGLE_API_KEY and not _gemini_ready:
         try:
-            genai.configure(api_key=GOOGLE_API_KEY)
+            if not FAKE_LLM:
+                _genai().configure(api_key=GOOGLE_API_KEY)
             _gemini_ready = True
         except Exception as e:
             print(f"[WARN] Gemini configure error: {e}")
             _gemini_ready = False
     return _gemini_ready
 
+def _gemini_model(model_name, system_instruction=None):
+    # --> GenerativeModel real o el falso (EVALUATOR_FAKE_LLM); system_instruction = prefijo estable (cached_prefix)
+    if FAKE_LLM:
+        return FakeGenerativeModel(model_name, system_instruction=system_instruction)
+    if system_instruction:
+        return _genai().GenerativeModel(model_name, system_instruction=system_instruction)
+    return _genai().GenerativeModel(model_name)
+
+def _openrouter_client():
+    # --> OpenRouter habla el protocolo de OpenAI: mismo SDK con otra base_url
+    if FAKE_LLM:
+        return FakeOpenAIClient("openrouter")
+    return _openai_cls()(
+        base_url=getattr(_settings(), "OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1"),
+        api_key=OPENROUTER_API_KEY,
+    )
 
 
 # --- Step 1: Data Loading Function ---
@@ -147,6 +204,7 @@ def load_interview_from_source(source_type: str, identifier: str) -> Interview:
             loop = asyncio.new_event_loop() # --> Crea loop si no hay
             asyncio.set_event_loop(loop)
         
+        from .persistence.supabase.interview_repository import load_interview_from_supabase # --> Diferido: carga el SDK Supabase
         interview = loop.run_until_complete(load_interview_from_supabase(identifier)) # --> Await bloqueante
         if interview:
             return interview # --> Ya viene como Interview
@@ -178,58 +236,142 @@ def load_interview_from_source(source_type: str, identifier: str) -> Interview:
 # NOTE: Ensure you have set the following environment variables:
 # OPENAI_API_KEY, GOOGLE_API_KEY, OPENROUTER_API_KEY
 
-async def call_openai_gpt5(prompt, rubric, transcript):
+def build_full_prompt(prompt, rubric, transcript) -> str:
+    """Prompt único que reciben todos los providers (también lo usa el streaming)."""
+    return (
+        f"System Prompt: {prompt}\n\n"
+        f"Evaluation Rubric:\n{rubric}\n\n"
+        f"Interview Transcript:\n{transcript}\n\n"
+        f"---\nPlease provide your evaluation."
+    )
+
+def build_messages(prompt, rubric, transcript, layout=None) -> list:
+    """
+    Mensajes chat según EVALUATOR_PROMPT_LAYOUT:
+      - single:        [user: build_full_prompt(...)]
+      - cached_prefix: [system: prompt + rúbrica (idéntico entre entrevistas), user: transcript]
+        Los providers cachean prefijos exactos: todo lo que varía por entrevista va al final.
+    """
+    if (layout or PROMPT_LAYOUT) != "cached_prefix":
+        return [{"role": "user", "content": build_full_prompt(prompt, rubric, transcript)}]
+    return [
+        {"role": "system", "content": f"{prompt}\n\nEvaluation Rubric:\n{rubric}"},
+        {"role": "user", "content": f"Interview Transcript:\n{transcript}\n\n---\nPlease provide your evaluation."},
+    ]
+
+def messages_text(messages) -> str:
+    """Texto plano de los mensajes (estimar tokens / usage cuando el provider no lo informa)."""
+    return "\n\n".join(m["content"] for m in messages)
+
+def gemini_request(messages):
+    """(system_instruction o None, contenido) para generate_content a partir de build_messages."""
+    system = "\n\n".join(m["content"] for m in messages if m["role"] == "system") or None
+    return system, "\n\n".join(m["content"] for m in messages if m["role"] != "system")
+
+
+def _as_int(value):
+    return int(value) if isinstance(value, (int, float)) else None
+
+def _response_usage(resp):
+    """(prompt_tokens, completion_tokens) reales de la respuesta del SDK, o None si no vinieron."""
+    usage = getattr(resp, "usage", None) # --> OpenAI / OpenRouter
+    prompt_t = _as_int(getattr(usage, "prompt_tokens", None))
+    if prompt_t is not None:
+        return prompt_t, _as_int(getattr(usage, "completion_tokens", None)) or 0
+    meta = getattr(resp, "usage_metadata", None) # --> Gemini
+    prompt_t = _as_int(getattr(meta, "prompt_token_count", None))
+    if prompt_t is not None:
+        return prompt_t, _as_int(getattr(meta, "candidates_token_count", None)) or 0
+    return None
+
+def _cached_tokens(resp) -> int:
+    """Tokens de entrada servidos del cache de prefijos del provider (0 si no lo informa)."""
+    details = getattr(getattr(resp, "usage", None), "prompt_tokens_details", None) # --> OpenAI / OpenRouter
+    if isinstance(details, dict):
+        cached = _as_int(details.get("cached_tokens"))
+    else:
+        cached = _as_int(getattr(details, "cached_tokens", None))
+    if cached is None:
+        cached = _as_int(getattr(getattr(resp, "usage_metadata", None), "cached_content_token_count", None)) # --> Gemini
+    return cached or 0
+
+def record_llm_usage(provider, model, started, full_prompt="", text="", resp=None, outcome="ok"):
+    """
+    Registra una llamada (latencia desde `started`, tokens y costo) en metrics y en el usage del job.
+    Usa el usage real de la respuesta; si el provider no lo trae (streaming) estima con token_budget.
+    Los tokens cacheados por el provider se registran aparte y se cobran a su precio.
+    Las llamadas fallidas cuentan latencia pero no tokens.
+    """
+    usage = _response_usage(resp) if resp is not None else None
+    estimated = usage is None and outcome == "ok"
+    if usage is None:
+        usage = (estimate_tokens(full_prompt), estimate_tokens(text)) if outcome == "ok" else (0, 0)
+    prompt_t, completion_t = usage
+    cached_t = _cached_tokens(resp) if resp is not None else 0
+    metrics.record_llm_call(provider, model, time.perf_counter() - started, prompt_t, completion_t,
+                            estimate_cost(model, prompt_t, completion_t, cached_t), outcome=outcome,
+                            estimated=estimated, cached_tokens=cached_t)
+
+
+async def call_openai_gpt5(prompt, rubric, transcript, model=None):
     """
     Llama a OpenAI con el modelo configurado (por .env o default).
     Usa chat.completions del SDK 2.x; parámetros seguros.
+    `model` pisa el modelo (lo usa el respaldo de hedging).
     """
     if not ENABLE_OPENAI:
         return "[OpenAI disabled by env]"
-    print(f"Calling OpenAI API ({DEFAULT_OPENAI_MODEL})...")
+    model = model or DEFAULT_OPENAI_MODEL
+    print(f"Calling OpenAI API ({model})...")
+    started = time.perf_counter()
     try:
         client = _get_openai_client()
         if not client:
             raise RuntimeError("Cliente OpenAI no inicializado (¿falta OPENAI_API_KEY?).")
 
-        full_prompt = (
-            f"System Prompt: {prompt}\n\n"
-            f"Evaluation Rubric:\n{rubric}\n\n"
-            f"Interview Transcript:\n{transcript}\n\n"
-            f"---\nPlease provide your evaluation."
-        )
-
-        resp = client.chat.completions.create(
-            model=DEFAULT_OPENAI_MODEL,  # --> gpt-4o-mini por .env
-            messages=[{"role": "user", "content": full_prompt}],
-            max_tokens=int(os.getenv("OPENAI_MAX_TOKENS", "512")),    # --> límite seguro
+        messages = build_messages(prompt, rubric, transcript)
+        full_prompt = messages_text(messages)
+        max_tokens = int(os.getenv("OPENAI_MAX_TOKENS", "512"))
+
+        # --> SDK síncrono: en thread para que providers/chunks corran en paralelo (con cupo del provider)
+        resp = await run_limited(
+            "openai", estimate_tokens(full_prompt) + max_tokens,
+            client.chat.completions.create,
+            model=model,  # --> gpt-4o-mini por .env
+            messages=messages,
+            max_tokens=max_tokens,    # --> límite seguro
             temperature=float(os.getenv("OPENAI_TEMPERATURE", "0.2")) # --> determinista-ish
         )
-        return (resp.choices[0].message.content or "").strip()
+        text = (resp.choices[0].message.content or "").strip()
+        record_llm_usage("openai", model, started, full_prompt, text, resp)
+        return text
     except Exception as e:
+        record_llm_usage("openai", model, started, outcome="error")
         msg = f"Error calling OpenAI API: {e}"
         print(msg)
         return msg
 
 
-async def call_google_gemini(prompt, rubric, transcript):
+async def call_google_gemini(prompt, rubric, transcript, model=None):
     """
     Llama a Gemini con el alias que tu cuenta expone (gemini-2.5-flash por defecto).
+    `model` pisa el modelo (lo usa el respaldo de hedging).
     """
     if not ENABLE_GEMINI:
         return "[Gemini disabled by env]"
-    print(f"Calling Google Gemini API ({DEFAULT_GEMINI_MODEL})...")
+    model_name = model or DEFAULT_GEMINI_MODEL
+    print(f"Calling Google Gemini API ({model_name})...")
+    started = time.perf_counter()
     try:
         if not _setup_gemini():
             raise RuntimeError("Gemini no inicializado (¿falta GOOGLE_API_KEY?).")
 
-        model = genai.GenerativeModel(DEFAULT_GEMINI_MODEL)
-        full_prompt = (
-            f"System Prompt: {prompt}\n\n"
-            f"Evaluation Rubric:\n{rubric}\n\n"
-            f"Interview Transcript:\n{transcript}\n\n"
-            f"---\nPlease provide your evaluation."
-        )
-        resp = model.generate_content(full_prompt)
+        messages = build_messages(prompt, rubric, transcript)
+        full_prompt = messages_text(messages)
+        system_instruction, content = gemini_request(messages)
+        model = _gemini_model(model_name, system_instruction)
+        resp = await run_limited("gemini", estimate_tokens(full_prompt) + OUTPUT_RESERVE_TOKENS,
+                                 model.generate_content, content)
 
         # --> extracción defensiva del texto
         txt = getattr(resp, "text", None)
@@ -237,43 +379,48 @@ async def call_google_gemini(prompt, rubric, transcript):
             parts = resp.candidates[0].content.parts
             if parts and hasattr(parts[0], "text"):
                 txt = parts[0].text
-        return (txt or "").strip()
+        text = (txt or "").strip()
+        record_llm_usage("gemini", model_name, started, full_prompt, text, resp)
+        return text
     except Exception as e:
+        record_llm_usage("gemini", model_name, started, outcome="error")
         msg = f"Error calling Google Gemini API: {e}"
         print(msg)
         return msg
 
 
-async def call_openrouter_deepseek(prompt, rubric, transcript):
+async def call_openrouter_deepseek(prompt, rubric, transcript, model=None):
     """
     Llama a DeepSeek vía OpenRouter si está habilitado y hay API key.
+    `model` pisa el modelo (lo usa el respaldo de hedging).
     """
     if not ENABLE_OPENROUTER:
         return "[OpenRouter disabled by env]"
-    print(f"Calling OpenRouter API ({settings.DEEPSEEK_MODEL})...")
+    model = model or _settings().DEEPSEEK_MODEL
+    print(f"Calling OpenRouter API ({model})...")
+    started = time.perf_counter()
     try:
         api_key = OPENROUTER_API_KEY
         if not api_key:
             raise ValueError("OPENROUTER_API_KEY no seteada.")
 
-        client = OpenAI(
-            base_url=getattr(settings, "OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1"),
-            api_key=api_key,
-        )
-        full_prompt = (
-            f"System Prompt: {prompt}\n\n"
-            f"Evaluation Rubric:\n{rubric}\n\n"
-            f"Interview Transcript:\n{transcript}\n\n"
-            f"---\nPlease provide your evaluation."
-        )
-        resp = client.chat.completions.create(
-            model=settings.DEEPSEEK_MODEL,
-            messages=[{"role": "user", "content": full_prompt}],
-            max_tokens=int(os.getenv("OPENROUTER_MAX_TOKENS", "512")),
+        client = _openrouter_client()
+        messages = build_messages(prompt, rubric, transcript)
+        full_prompt = messages_text(messages)
+        max_tokens = int(os.getenv("OPENROUTER_MAX_TOKENS", "512"))
+        resp = await run_limited(
+            "openrouter", estimate_tokens(full_prompt) + max_tokens,
+            client.chat.completions.create,
+            model=model,
+            messages=messages,
+            max_tokens=max_tokens,
             temperature=float(os.getenv("OPENROUTER_TEMPERATURE", "0.2")),
         )
-        return (resp.choices[0].message.content or "").strip()
+        text = (resp.choices[0].message.content or "").strip()
+        record_llm_usage("openrouter", model, started, full_prompt, text, resp)
+        return text
     except Exception as e:
+        record_llm_usage("openrouter", model, started, outcome="error")
         msg = f"Error calling OpenRouter API: {e}"
         print(msg)
         return msg
@@ -283,41 +430,237 @@ async def call_openrouter_deepseek(prompt, rubric, transcript):
 # --------------------------------------------------------------------
 # --> Orquestador de evaluaciones: llena evaluation_1/2/3 en Interview
 # --------------------------------------------------------------------
-async def run_evaluations(interview: Interview) -> Interview:
+# --> Prefijos de salidas que NO son evaluaciones (errores / proveedor apagado): nunca se cachean.
+_NON_EVALUATION_PREFIXES = ("Error calling ", "[OpenAI ", "[Gemini ", "[OpenRouter ")
+
+def _is_cacheable_output(text) -> bool:
+    return isinstance(text, str) and bool(text.strip()) and not text.startswith(_NON_EVALUATION_PREFIXES)
+
+def _evaluation_slots():
     """
-    Llama a los LLMs habilitados y llena evaluation_1/2/3.
-    Si un proveedor está deshabilitado o falla, deja un texto explicativo (no rompe el flujo).
+    Slots de evaluación en orden: (atributo, provider, modelo, parámetros, función, etiqueta de error).
+    Modelo y parámetros se leen igual que en cada call_* para que la clave del cache coincida con lo que se envía
+    (con EVALUATOR_EVAL_MODE=per_criterion se suman los parámetros de la partición por criterio).
     """
-    print(f"\nRunning evaluations for interview ID: {interview.interview_id}")
+    mode = criteria_cache_params()
+    return [
+        ("evaluation_1", "openai", DEFAULT_OPENAI_MODEL,
+         {"max_tokens": int(os.getenv("OPENAI_MAX_TOKENS", "512")),
+          "temperature": float(os.getenv("OPENAI_TEMPERATURE", "0.2")), **mode},
+         call_openai_gpt5, "OpenAI"),
+        ("evaluation_2", "gemini", DEFAULT_GEMINI_MODEL, {**mode},
+         call_google_gemini, "Gemini"),
+        ("evaluation_3", "openrouter", _settings().DEEPSEEK_MODEL,
+         {"max_tokens": int(os.getenv("OPENROUTER_MAX_TOKENS", "512")),
+          "temperature": float(os.getenv("OPENROUTER_TEMPERATURE", "0.2")), **mode},
+         call_openrouter_deepseek, "OpenRouter"),
+    ]
+
+# --> Instrucciones extra para los pasos map/reduce (se agregan al system_prompt original)
+_MAP_INSTRUCTION = (
+    "\n\nYou are reading PART {part} of {total} of a long interview transcript. "
+    "Evaluate only the evidence in this part against the rubric: list strengths, weaknesses and "
+    "provisional scores per criterion, citing short quotes. Do not give a final verdict."
+)
+_REDUCE_INSTRUCTION = (
+    "\n\nThe transcript section below contains partial evaluations of consecutive parts of the SAME "
+    "interview, produced with the rubric. Merge them into ONE final evaluation following the rubric: "
+    "reconcile the scores, weigh the evidence across all parts and write the final summary."
+)
+
+_CRITERION_INSTRUCTION = (
+    "\n\nEvaluate ONLY the criterion \"{name}\" ({index} of {total}; the other criteria are evaluated "
+    "separately). The transcript section below contains only the interview excerpts most relevant to it, in "
+    "order; [...] marks omitted parts. Give the score for this criterion with a brief justification citing "
+    "the excerpts, and your verdict based on it."
+)
+
+def _step(call_fn, interview: Interview, instruction: str, text: str, rubric: str = None):
+    """
+    Llamada de un paso map/reduce (o de un criterio, con su `rubric`). En cached_prefix la instrucción va
+    delante del texto (no en el system): el prefijo system + rúbrica sigue siendo el mismo para todos los
+    chunks y entrevistas.
+    """
+    rubric = interview.rubric if rubric is None else rubric
+    if PROMPT_LAYOUT == "cached_prefix":
+        return call_fn(interview.system_prompt, rubric, instruction.strip() + "\n\n" + text)
+    return call_fn(interview.system_prompt + instruction, rubric, text)
 
-    # OpenAI
-    try:
-        interview.evaluation_1 = await call_openai_gpt5(
-            interview.system_prompt, interview.rubric, interview.full_transcript
-        )
-    except Exception as e:
-        interview.evaluation_1 = f"[OpenAI error] {e}"
+def _join_partials(partials) -> str:
+    total = len(partials)
+    return "\n\n".join(f"### Partial evaluation {i}/{total}\n{p}" for i, p in enumerate(partials, 1))
 
-    # Gemini
+async def _evaluate_with_plan(call_fn, provider: str, model: str, params: dict, interview: Interview):
+    """
+    Evalúa un slot respetando el presupuesto de tokens del modelo.
+      - EVALUATOR_EVAL_MODE=per_criterion y transcript largo: una llamada por criterio de la rúbrica, en
+        paralelo, cada una con sólo los turnos relevantes a ese criterio; las salidas se combinan sin otra llamada.
+      - Si todo entra: una sola llamada (comportamiento original).
+      - Si no: map (chunks por turnos en paralelo) + reduce (une parciales; en rondas si no entran juntas).
+    Devuelve (output, plan).
+    """
+    max_output = int(params.get("max_tokens") or OUTPUT_RESERVE_TOKENS)
+    plan, chunks = plan_evaluation(provider, model, interview.system_prompt, interview.rubric,
+                                   interview.full_transcript, max_output)
+    criteria = plan_criteria(interview.rubric, plan.transcript_tokens)
+    if criteria:
+        evidence = evidence_by_criterion(interview.full_transcript, criteria)
+        plan.mode = "per_criterion"
+        plan.criteria = [c.name for c in criteria]
+        plan.chunk_tokens = [estimate_tokens(e) for e in evidence]
+        print(f"[Evaluator] {provider} ({model}): {len(criteria)} criterios en paralelo, "
+              f"{sum(plan.chunk_tokens)} tokens de evidencia (transcript: {plan.transcript_tokens})")
+        total = len(criteria)
+        outputs = await asyncio.gather(*[
+            _step(call_fn, interview, _CRITERION_INSTRUCTION.format(name=c.name, index=i, total=total), e, c.rubric)
+            for i, (c, e) in enumerate(zip(criteria, evidence), 1)
+        ])
+        failed = next((o for o in outputs if not _is_cacheable_output(o)), None)
+        if failed is not None:
+            return failed, plan # --> Un criterio falló: no se arma una evaluación incompleta
+        return combine_criteria(criteria, outputs), plan
+
+    if plan.mode == "single":
+        return await call_fn(interview.system_prompt, interview.rubric, interview.full_transcript), plan
+
+    total = len(chunks)
+    print(f"[Evaluator] {provider} ({model}): transcript de {plan.transcript_tokens} tokens "
+          f"> presupuesto {plan.budget_tokens}; map-reduce en {total} chunks")
+    partials = await asyncio.gather(*[
+        _step(call_fn, interview, _MAP_INSTRUCTION.format(part=i, total=total), chunk)
+        for i, chunk in enumerate(chunks, 1)
+    ])
+    failed = next((p for p in partials if not _is_cacheable_output(p)), None)
+    if failed is not None:
+        return failed, plan # --> Un chunk falló: no reducimos evaluaciones incompletas
+
+    joined = _join_partials(partials)
+    # --> Reduce jerárquico: si las parciales juntas no entran, se reducen por grupos hasta que entren
+    while estimate_tokens(joined) > plan.budget_tokens and len(partials) > 1:
+        groups = chunk_transcript(joined, plan.budget_tokens)
+        if len(groups) >= len(partials):
+            break # --> Sin progreso posible (parciales enormes): última llamada con lo que hay
+        plan.reduce_rounds += 1
+        partials = await asyncio.gather(*[_step(call_fn, interview, _REDUCE_INSTRUCTION, g) for g in groups])
+        failed = next((p for p in partials if not _is_cacheable_output(p)), None)
+        if failed is not None:
+            return failed, plan
+        joined = _join_partials(partials)
+
+    plan.reduce_rounds += 1
+    return await _step(call_fn, interview, _REDUCE_INSTRUCTION, joined), plan
+
+def _provider_enabled(provider: str) -> bool:
+    return {"openai": ENABLE_OPENAI, "gemini": ENABLE_GEMINI, "openrouter": ENABLE_OPENROUTER}.get(provider, False)
+
+async def pending_slots(interview: Interview, use_cache: bool = True):
+    """
+    Slots habilitados cuya evaluación NO está en el cache (los que costarían una llamada al LLM).
+    Lista vacía = la entrevista ya está evaluada con este prompt/rubric/transcript/modelo.
+    Con use_cache=False (re-evaluación forzada) todos los habilitados cuestan una llamada.
+    """
+    slots = [s for s in _evaluation_slots() if _provider_enabled(s[1])]
+    if not (use_cache and CACHE_ENABLED):
+        return slots
+    interview = await compacted_view(interview) # --> Las claves se arman con el transcript que se envía
+    cache = get_evaluation_cache()
+    pending = []
+    for slot in slots:
+        _, provider, model, params, _, _ = slot
+        key = make_cache_key(provider, model, params, interview.system_prompt,
+                             interview.rubric, interview.full_transcript)
+        if not await cache.contains(key):
+            pending.append(slot)
+    return pending
+
+async def _run_slot(cache, attr, provider, model, params, call_fn, label, interview: Interview):
+    key = None
+    if cache is not None:
+        key = make_cache_key(provider, model, params, interview.system_prompt,
+                             interview.rubric, interview.full_transcript)
+        cached = await cache.get(key, provider=provider)
+        if cached is not None:
+            print(f"[EvalCache] HIT {provider} ({model})")
+            return attr, cached, {"provider": provider, "model": model, "cached": True}
+
+    if HEDGE_ENABLED and _provider_enabled(provider):
+        # --> Cada llamada del slot (también los chunks del map-reduce) con respaldo si pasa el p95
+        call_fn = HedgedCall(provider, call_fn, _is_cacheable_output, HEDGE_BACKUPS.get(provider))
+
+    plan = None
     try:
-        interview.evaluation_2 = await call_google_gemini(
-            interview.system_prompt, interview.rubric, interview.full_transcript
-        )
+        output, plan = await _evaluate_with_plan(call_fn, provider, model, params, interview)
     except Exception as e:
-        interview.evaluation_2 = f"[Gemini error] {e}"
+        output = f"[{label} error] {e}"
+
+    plan = plan.to_dict() if plan else {"provider": provider, "model": model, "mode": "error"}
+    hedge = call_fn.summary() if isinstance(call_fn, HedgedCall) else None
+    if hedge and hedge["hedges"]:
+        plan["hedge"] = hedge
+    # --> Si respondió OTRO modelo (respaldo), no se guarda bajo la clave del modelo principal
+    backup_answered = isinstance(call_fn, HedgedCall) and call_fn.backup_model_used
+    if cache is not None and _is_cacheable_output(output) and not backup_answered:
+        await cache.set(key, output)
+    return attr, output, plan
+
+async def run_evaluations(interview: Interview, use_cache: bool = True) -> Interview:
+    """
+    Llama a los LLMs habilitados (en paralelo) y llena evaluation_1/2/3.
+    Si un proveedor está deshabilitado o falla, deja un texto explicativo (no rompe el flujo).
 
-    # OpenRouter (opcional)
-    try:
-        interview.evaluation_3 = await call_openrouter_deepseek(
-            interview.system_prompt, interview.rubric, interview.full_transcript
+    Con use_cache=True (default) cada slot se busca primero en el cache content-addressed
+    (provider + modelo + parámetros + system_prompt + rubric + full_transcript): replays,
+    reintentos y encolados duplicados no vuelven a llamar al LLM. use_cache=False fuerza re-evaluación.
+
+    Transcripts que no entran en el contexto del modelo se evalúan con map-reduce (ver token_budget);
+    el plan por slot queda en interview.evaluation_plan.
+
+    Antes de evaluar, el transcript se compacta (EVALUATOR_COMPACT, ver transcript_compaction); la
+    Interview original conserva el transcript completo.
+
+    Con EVALUATOR_ENSEMBLE=early_exit el último provider habilitado es desempate: sólo se llama si
+    las primeras evaluaciones no coinciden (ver ensemble.py); si no, su slot queda en None con
+    plan mode="skipped".
+    """
+    print(f"\nRunning evaluations for interview ID: {interview.interview_id}")
+    cache = get_evaluation_cache() if (use_cache and CACHE_ENABLED) else None
+    view = await compacted_view(interview) # --> Lo que ven los providers (y las claves del cache)
+
+    slots = _evaluation_slots()
+    if ENSEMBLE_MODE == "early_exit":
+        # --> Panel primero; el último provider habilitado sólo se llama si el panel no coincide
+        enabled = [s for s in slots if _provider_enabled(s[1])]
+        results = await asyncio.gather(
+            run_early_exit(enabled, lambda slot: _run_slot(cache, *slot, view), _is_cacheable_output),
+            *[_run_slot(cache, *slot, view) for slot in slots if slot not in enabled], # --> "[X disabled by env]"
         )
-    except Exception as e:
-        interview.evaluation_3 = f"[OpenRouter error] {e}"
+        results = [*results[0], *results[1:]]
+    else:
+        results = await asyncio.gather(*[
+            _run_slot(cache, *slot, view) for slot in slots
+        ])
+    plans = {}
+    for attr, output, plan in results:
+        setattr(interview, attr, output)
+        plans[attr] = plan
+    interview.evaluation_plan = plans
 
     print("Evaluations completed.")
     return interview
 
 
+# --------------------------------------------------------------------
+# --> Evaluación estructurada (JSON validado contra templates/rubric_evaluation_schema.json)
+# --------------------------------------------------------------------
+async def get_structured_evaluation(interview: Interview, provider: str = None, use_cache: bool = True, repo=None) -> dict:
+    """
+    Evaluación según el schema de la rúbrica, validada mientras se genera (ver structured_evaluation.py).
+    Si se pasa `repo`, el resultado tipado se persiste con repo.save_structured_evaluation.
+    """
+    from .structured_evaluation import evaluate_structured # --> Import diferido: ese módulo importa a este
+    return await evaluate_structured(interview, provider=provider, use_cache=use_cache, repo=repo)
+
+
 # --> Bloque ejecutable para "python -m ... --ping"
 if __name__ == "__main__":
     import json, os
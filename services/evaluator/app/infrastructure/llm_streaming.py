@@ -0,0 +1,254 @@
+# --*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*
+# services/evaluator/app/infrastructure/llm_streaming.py
+# Streaming de tokens de todos los providers habilitados, en paralelo, multiplexados en un solo
+# flujo de eventos (lo consume el endpoint SSE). Cada provider abre su completion en modo stream
+# y los deltas se reenvían apenas llegan: nada de esperar la respuesta completa para mostrar algo.
+# --*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*
+from __future__ import annotations
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional, Tuple
+import asyncio
+import os
+import threading
+import time
+
+from ..domain.entities.interview import Interview
+from . import llm_provider as llm
+from .evaluation_cache import get_evaluation_cache, make_cache_key, CACHE_ENABLED
+from .token_budget import plan_evaluation, estimate_tokens, OUTPUT_RESERVE_TOKENS
+from .transcript_compaction import compacted_view
+from .rate_limit import get_rate_limiter, is_rate_limit_error, MAX_RETRIES
+
+HEARTBEAT_S = float(os.getenv("EVALUATOR_SSE_HEARTBEAT_S", "15"))  # --> Comentario SSE para que proxies no corten
+
+Event = Tuple[str, Dict[str, Any]]
+_END = object()
+
+
+# ================================
+# Puente SDK síncrono -> async
+# ================================
+async def iterate_in_thread(open_stream: Callable[[], Iterable], extract: Callable[[Any], str]) -> AsyncIterator[str]:
+    """
+    Recorre el iterador de streaming del SDK (bloqueante) en un thread y entrega cada delta al loop.
+    Si el consumidor deja de iterar (cliente desconectado), el thread corta y cierra el stream.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    stop = threading.Event()
+
+    def put(item: Any) -> None:
+        try:
+            loop.call_soon_threadsafe(queue.put_nowait, item)
+        except RuntimeError:
+            pass  # --> Loop cerrado: nadie escucha
+
+    def pump() -> None:
+        stream = None
+        try:
+            stream = open_stream()
+            for chunk in stream:
+                if stop.is_set():
+                    break
+                text = extract(chunk)
+                if text:
+                    put(text)
+        except Exception as e:
+            put(e)
+        finally:
+            close = getattr(stream, "close", None)
+            if callable(close):
+                try:
+                    close()
+                except Exception:
+                    pass
+            put(_END)
+
+    threading.Thread(target=pump, name="llm-stream", daemon=True).start()
+    try:
+        while True:
+            item = await queue.get()
+            if item is _END:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
+
+
+# ================================
+# Aperturas de stream por provider
+# ================================
+def _openai_delta(chunk: Any) -> str:
+    choices = getattr(chunk, "choices", None)
+    return (choices[0].delta.content or "") if choices else ""
+
+def _gemini_delta(chunk: Any) -> str:
+    try:
+        return getattr(chunk, "text", "") or ""
+    except ValueError:
+        return ""  # --> Chunk sin partes de texto (safety / metadata)
+
+# --> Parámetros de los slots que van al request; el resto (p.ej. los de EVALUATOR_EVAL_MODE) sólo arman la clave del cache
+_REQUEST_PARAMS = ("max_tokens", "temperature")
+
+def _request_params(params: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: params[k] for k in _REQUEST_PARAMS if k in params}
+
+def _open_openai(messages: List[Dict[str, str]], params: Dict[str, Any]):
+    client = llm._get_openai_client()
+    if not client:
+        raise RuntimeError("Cliente OpenAI no inicializado (¿falta OPENAI_API_KEY?).")
+    return client.chat.completions.create(
+        model=llm.DEFAULT_OPENAI_MODEL,
+        messages=messages,
+        stream=True,
+        **_request_params(params),
+    )
+
+def _open_gemini(messages: List[Dict[str, str]], params: Dict[str, Any]):
+    if not llm._setup_gemini():
+        raise RuntimeError("Gemini no inicializado (¿falta GOOGLE_API_KEY?).")
+    system_instruction, content = llm.gemini_request(messages)
+    return llm._gemini_model(llm.DEFAULT_GEMINI_MODEL, system_instruction).generate_content(content, stream=True)
+
+def _open_openrouter(messages: List[Dict[str, str]], params: Dict[str, Any]):
+    if not llm.OPENROUTER_API_KEY:
+        raise ValueError("OPENROUTER_API_KEY no seteada.")
+    return llm._openrouter_client().chat.completions.create(
+        model=llm._settings().DEEPSEEK_MODEL,
+        messages=messages,
+        stream=True,
+        **_request_params(params),
+    )
+
+# --> provider -> (flag habilitado, texto si está apagado, abrir stream, extraer delta, prefijo de error)
+def _stream_specs() -> Dict[str, Tuple[bool, str, Callable, Callable, str]]:
+    return {
+        "openai": (llm.ENABLE_OPENAI, "[OpenAI disabled by env]", _open_openai, _openai_delta, "Error calling OpenAI API"),
+        "gemini": (llm.ENABLE_GEMINI, "[Gemini disabled by env]", _open_gemini, _gemini_delta, "Error calling Google Gemini API"),
+        "openrouter": (llm.ENABLE_OPENROUTER, "[OpenRouter disabled by env]", _open_openrouter, _openai_delta, "Error calling OpenRouter API"),
+    }
+
+
+# ================================
+# Multiplexor
+# ================================
+async def stream_evaluations(interview: Interview, use_cache: bool = True) -> AsyncIterator[Event]:
+    """
+    Genera eventos (nombre, data) mientras los providers responden en paralelo:
+      - start          {interview_id, slots}
+      - token          {slot, provider, model, delta}
+      - provider_error {slot, provider, model, error}
+      - provider_done  {slot, provider, model, cached, ttft_ms, elapsed_ms, chars}
+      - ping           {}  (sin tráfico durante HEARTBEAT_S)
+      - done           {interview_id, evaluation_1/2/3}  -> interview ya tiene los textos finales
+    Mismas reglas que run_evaluations: cache content-addressed y map-reduce si el transcript no entra
+    (en ese caso el slot no streamea: se emite el resultado completo al terminar).
+    """
+    cache = get_evaluation_cache() if (use_cache and CACHE_ENABLED) else None
+    view = await compacted_view(interview) # --> Mismo transcript compacto (y claves) que run_evaluations
+    specs = _stream_specs()
+    slots = llm._evaluation_slots()
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def run_slot(attr, provider, model, params, call_fn, label) -> Tuple[str, str]:
+        enabled, disabled_msg, open_fn, extract, error_prefix = specs[provider]
+        base = {"slot": attr, "provider": provider, "model": model}
+        started = time.monotonic()
+        first_token: Optional[float] = None
+        cached = False
+        key = None
+        output = ""
+        try:
+            if cache is not None:
+                key = make_cache_key(provider, model, params, view.system_prompt,
+                                     view.rubric, view.full_transcript)
+                hit = await cache.get(key, provider=provider)
+                if hit is not None:
+                    output, cached = hit, True
+                    first_token = time.monotonic()
+                    await queue.put(("token", {**base, "delta": hit}))
+                    return attr, output
+
+            if not enabled:
+                output = disabled_msg
+                await queue.put(("token", {**base, "delta": output}))
+                return attr, output
+
+            plan, _ = plan_evaluation(provider, model, view.system_prompt, view.rubric,
+                                      view.full_transcript, int(params.get("max_tokens") or OUTPUT_RESERVE_TOKENS))
+            if plan.mode != "single":
+                output, _ = await llm._evaluate_with_plan(call_fn, provider, model, params, view)
+                first_token = time.monotonic()
+                await queue.put(("token", {**base, "delta": output}))
+            else:
+                messages = llm.build_messages(view.system_prompt, view.rubric, view.full_transcript)
+                full_prompt = llm.messages_text(messages)
+                limiter = get_rate_limiter(provider)
+                tokens = estimate_tokens(full_prompt) + plan.max_output_tokens
+                parts = []
+                for attempt in range(MAX_RETRIES + 1):
+                    call_started = time.perf_counter()
+                    try:
+                        async with limiter.slot(tokens):
+                            async for delta in iterate_in_thread(lambda: open_fn(messages, params), extract):
+                                if first_token is None:
+                                    first_token = time.monotonic()
+                                parts.append(delta)
+                                await queue.put(("token", {**base, "delta": delta}))
+                        output = "".join(parts).strip()
+                        llm.record_llm_usage(provider, model, call_started, full_prompt, output) # --> Stream sin usage: estimado
+                        break
+                    except Exception as e:
+                        llm.record_llm_usage(provider, model, call_started, outcome="error")
+                        # --> 429 antes del primer token: el limiter ya fijó la pausa, reintentamos
+                        if not parts and attempt < MAX_RETRIES and is_rate_limit_error(e):
+                            continue
+                        output = f"{error_prefix}: {e}"
+                        await queue.put(("provider_error", {**base, "error": str(e)}))
+                        break
+
+            if cache is not None and llm._is_cacheable_output(output):
+                await cache.set(key, output)
+            return attr, output
+        except Exception as e:
+            output = f"[{label} error] {e}"
+            await queue.put(("provider_error", {**base, "error": str(e)}))
+            return attr, output
+        finally:
+            await queue.put(("provider_done", {
+                **base,
+                "cached": cached,
+                "ttft_ms": round((first_token - started) * 1000) if first_token else None,
+                "elapsed_ms": round((time.monotonic() - started) * 1000),
+                "chars": len(output or ""),
+            }))
+
+    yield "start", {"interview_id": interview.interview_id,
+                    "slots": [{"slot": s[0], "provider": s[1], "model": s[2]} for s in slots]}
+
+    tasks = [asyncio.create_task(run_slot(*slot)) for slot in slots]
+    pending = len(tasks)
+    try:
+        while pending:
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=HEARTBEAT_S)
+            except asyncio.TimeoutError:
+                yield "ping", {}
+                continue
+            if event[0] == "provider_done":
+                pending -= 1
+            yield event
+
+        for attr, output in [t.result() for t in tasks]:
+            setattr(interview, attr, output)
+        yield "done", {"interview_id": interview.interview_id,
+                       "evaluation_1": interview.evaluation_1,
+                       "evaluation_2": interview.evaluation_2,
+                       "evaluation_3": interview.evaluation_3}
+    finally:
+        # --> Cliente desconectado: cancelamos lo que siga corriendo (los threads cortan solos)
+        for t in tasks:
+            if not t.done():
+                t.cancel()
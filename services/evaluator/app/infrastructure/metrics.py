@@ -0,0 +1,267 @@
+# --*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*
+# services/evaluator/app/infrastructure/metrics.py
+# Métricas in-process del Evaluator (contadores e histogramas con labels). Se exponen en GET /metrics
+# (JSON, o texto Prometheus con ?format=prometheus). El worker no tiene HTTP: publica su export en Redis
+# cada EVALUATOR_METRICS_PUSH_S y la API lo suma a /metrics etiquetado por worker.
+# Además, cada job abre un "usage scope" (contextvar): tiempos por etapa y tokens/costo por provider
+# de ESE job, que se guardan junto al resultado (Interview.evaluation_usage).
+# --*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*
+from __future__ import annotations
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+import json
+import os
+import threading
+import time
+
+METRICS_BACKEND = os.getenv("EVALUATOR_METRICS_BACKEND", "redis")        # --> "redis" | "memory" (sin export de workers)
+METRICS_PREFIX  = os.getenv("EVALUATOR_METRICS_PREFIX", "evaluator:metrics:")
+METRICS_TTL_S   = int(os.getenv("EVALUATOR_METRICS_TTL_S", "120"))        # --> Un worker muerto desaparece de /metrics
+REDIS_URI       = os.getenv("REDIS_URI", "redis://redis:6379/0")
+
+# --> Buckets en segundos: desde lecturas de DB (ms) hasta evaluaciones map-reduce (minutos)
+DEFAULT_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+_Key = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+_lock = threading.Lock() # --> Las llamadas a SDKs corren en threads: protegemos los contadores
+_counters: Dict[_Key, float] = defaultdict(float)
+_histograms: Dict[_Key, "_Histogram"] = {}
+
+
+def _key(name: str, labels: Dict[str, Any]) -> _Key:
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+def _render(name: str, labels: Tuple[Tuple[str, str], ...]) -> str:
+    """Nombre estilo Prometheus: metric{label="x"}."""
+    if not labels:
+        return name
+    return name + "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+
+class _Histogram:
+    """Buckets acumulativos a la Prometheus (counts[i] = observaciones <= buckets[i]; el último es +Inf)."""
+
+    def __init__(self, buckets: Tuple[float, ...]) -> None:
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> List[int]:
+        out, acc = [], 0
+        for c in self.counts:
+            acc += c
+            out.append(acc)
+        return out
+
+
+# =============== API ===============
+
+def inc(name: str, value: float = 1.0, **labels: Any) -> None:
+    """Incrementa un contador (crea la serie si no existe)."""
+    with _lock:
+        _counters[_key(name, labels)] += value
+
+def get(name: str, **labels: Any) -> float:
+    """Valor actual de un contador (0 si no existe)."""
+    with _lock:
+        return _counters.get(_key(name, labels), 0.0)
+
+def observe(name: str, value: float, buckets: Tuple[float, ...] = DEFAULT_BUCKETS, **labels: Any) -> None:
+    """Registra una observación en un histograma (latencias en segundos)."""
+    with _lock:
+        hist = _histograms.get(_key(name, labels))
+        if hist is None:
+            hist = _histograms[_key(name, labels)] = _Histogram(buckets)
+        hist.observe(value)
+
+def histogram(name: str, **labels: Any) -> Dict[str, Any]:
+    """count/sum de un histograma (ceros si no existe)."""
+    with _lock:
+        hist = _histograms.get(_key(name, labels))
+        return {"count": hist.count, "sum": hist.sum} if hist else {"count": 0, "sum": 0.0}
+
+def export() -> Dict[str, Any]:
+    """Series en crudo (JSON-serializable): lo que el worker publica en Redis."""
+    with _lock:
+        return {
+            "counters": [[n, dict(l), v] for (n, l), v in sorted(_counters.items())],
+            "histograms": [[n, dict(l), list(h.buckets), h.cumulative(), h.sum, h.count]
+                           for (n, l), h in sorted(_histograms.items())],
+        }
+
+def snapshot(data: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Vista legible (nombres renderizados) de un export; por defecto, el de este proceso."""
+    data = export() if data is None else data
+    hists = {}
+    for name, labels, buckets, cumulative, total, count in data.get("histograms", []):
+        hists[_render(name, tuple(sorted(labels.items())))] = {
+            "count": count,
+            "sum": round(total, 6),
+            "buckets": {**{str(b): c for b, c in zip(buckets, cumulative)}, "+Inf": cumulative[-1]},
+        }
+    return {
+        "counters": {_render(n, tuple(sorted(l.items()))): v for n, l, v in data.get("counters", [])},
+        "histograms": hists,
+    }
+
+def render_prometheus(sources: Dict[str, Dict[str, Any]]) -> str:
+    """
+    Texto de exposición Prometheus de varios exports ({"api": export(), "<worker>": ...}),
+    agregando el label source=<clave> para no mezclar series de procesos distintos.
+    """
+    families: Dict[str, Tuple[str, List[str]]] = {}
+    for source, data in sources.items():
+        for name, labels, value in data.get("counters", []):
+            lines = families.setdefault(name, ("counter", []))[1]
+            lines.append(f"{_render(name, tuple(sorted({**labels, 'source': source}.items())))} {value}")
+        for name, labels, buckets, cumulative, total, count in data.get("histograms", []):
+            lines = families.setdefault(name, ("histogram", []))[1]
+            base = {**labels, "source": source}
+            for le, c in zip([*map(str, buckets), "+Inf"], cumulative):
+                lines.append(f"{_render(name + '_bucket', tuple(sorted({**base, 'le': le}.items())))} {c}")
+            lines.append(f"{_render(name + '_sum', tuple(sorted(base.items())))} {total}")
+            lines.append(f"{_render(name + '_count', tuple(sorted(base.items())))} {count}")
+    out = []
+    for name, (kind, lines) in sorted(families.items()):
+        out.append(f"# TYPE {name} {kind}")
+        out.extend(lines)
+    return "\n".join(out) + "\n"
+
+def reset() -> None:
+    """Limpia todas las series (tests)."""
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+
+
+# =============== Uso por job (contextvar) ===============
+
+@dataclass
+class JobUsage:
+    """Tiempos por etapa y tokens/costo por provider de un job (se guarda con el resultado)."""
+    stages: Dict[str, float] = field(default_factory=dict)
+    providers: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    transcript: Optional[Dict[str, int]] = None  # --> Tokens del transcript antes/después de compactar
+
+    def to_dict(self) -> Dict[str, Any]:
+        totals = {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "cost_usd": 0.0}
+        for p in self.providers.values():
+            for k in totals:
+                totals[k] += p[k]
+        totals["cost_usd"] = round(totals["cost_usd"], 6)
+        out = {
+            "stages_s": {k: round(v, 3) for k, v in self.stages.items()},
+            "providers": {k: {**v, "seconds": round(v["seconds"], 3), "cost_usd": round(v["cost_usd"], 6)}
+                          for k, v in self.providers.items()},
+            "totals": totals,
+        }
+        if self.transcript is not None:
+            out["transcript"] = dict(self.transcript)
+        return out
+
+_usage: ContextVar[Optional[JobUsage]] = ContextVar("evaluator_job_usage", default=None)
+
+@contextmanager
+def usage_scope() -> Iterator[JobUsage]:
+    """Todo lo medido adentro (incluidas tasks y threads lanzados desde acá) se suma a este JobUsage."""
+    usage = JobUsage()
+    token = _usage.set(usage)
+    try:
+        yield usage
+    finally:
+        _usage.reset(token)
+
+def current_usage() -> Optional[JobUsage]:
+    return _usage.get()
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Mide una etapa del job: histograma evaluator_stage_seconds{stage} + tiempo en el usage scope."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        observe("evaluator_stage_seconds", elapsed, stage=name)
+        usage = _usage.get()
+        if usage is not None:
+            with _lock:
+                usage.stages[name] = usage.stages.get(name, 0.0) + elapsed
+
+def record_llm_call(provider: str, model: str, seconds: float, prompt_tokens: int = 0, completion_tokens: int = 0,
+                    cost_usd: float = 0.0, outcome: str = "ok", estimated: bool = False, cached_tokens: int = 0) -> None:
+    """
+    Una llamada a un provider: contadores de tokens/costo, histograma de latencia y usage del job.
+    cached_tokens: tokens de entrada que el provider sirvió de su cache de prefijos (incluidos en prompt_tokens).
+    """
+    inc("llm_calls_total", provider=provider, model=model, outcome=outcome)
+    observe("llm_call_seconds", seconds, provider=provider, outcome=outcome)
+    if prompt_tokens or completion_tokens:
+        inc("llm_prompt_tokens_total", prompt_tokens, provider=provider, model=model)
+        inc("llm_completion_tokens_total", completion_tokens, provider=provider, model=model)
+        inc("llm_cost_usd_total", cost_usd, provider=provider, model=model)
+    if cached_tokens:
+        inc("llm_cached_prompt_tokens_total", cached_tokens, provider=provider, model=model)
+    if estimated:
+        inc("llm_usage_estimated_total", provider=provider)  # --> El provider no devolvió usage (streaming, etc.)
+    usage = _usage.get()
+    if usage is not None:
+        with _lock:
+            p = usage.providers.setdefault(provider, {"model": model, "calls": 0, "errors": 0, "prompt_tokens": 0,
+                                                      "completion_tokens": 0, "cached_prompt_tokens": 0,
+                                                      "cost_usd": 0.0, "seconds": 0.0, "estimated": False})
+            p["calls"] += 1
+            p["errors"] += outcome != "ok"
+            p["prompt_tokens"] += prompt_tokens
+            p["completion_tokens"] += completion_tokens
+            p["cached_prompt_tokens"] += cached_tokens
+            p["cost_usd"] += cost_usd
+            p["seconds"] += seconds
+            p["estimated"] = p["estimated"] or estimated
+
+def record_compaction(raw_tokens: int, compacted_tokens: int) -> None:
+    """Tokens del transcript antes/después de compactar (contadores + usage del job, el último gana)."""
+    inc("transcript_tokens_total", raw_tokens, stage="raw")
+    inc("transcript_tokens_total", compacted_tokens, stage="compacted")
+    usage = _usage.get()
+    if usage is not None:
+        with _lock:
+            usage.transcript = {"raw_tokens": raw_tokens, "compacted_tokens": compacted_tokens}
+
+
+# =============== Export de workers vía Redis ===============
+
+async def push_export(r, source: str) -> None:
+    """El worker deja su export en <prefix><source> con TTL (lo lee la API en /metrics)."""
+    await r.set(METRICS_PREFIX + source, json.dumps(export()), ex=METRICS_TTL_S)
+
+async def collect_exports(redis_uri: str = REDIS_URI) -> Dict[str, Dict[str, Any]]:
+    """Exports vigentes de todos los workers ({} si el backend es memory o Redis no responde)."""
+    if METRICS_BACKEND != "redis":
+        return {}
+    from redis.asyncio import Redis
+
+    r = Redis.from_url(redis_uri, socket_connect_timeout=1, socket_timeout=2)
+    out: Dict[str, Dict[str, Any]] = {}
+    try:
+        async for key in r.scan_iter(match=METRICS_PREFIX + "*", count=100):
+            raw = await r.get(key)
+            if raw:
+                name = key.decode() if isinstance(key, bytes) else key
+                out[name[len(METRICS_PREFIX):]] = json.loads(raw)
+    except Exception as e:
+        print(f"[Evaluator] WARNING: no pude leer métricas de workers ({e})")
+    finally:
+        await r.aclose()
+    return out
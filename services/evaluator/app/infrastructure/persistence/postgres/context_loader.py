@@ -0,0 +1,220 @@
+# --*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*
+# services/evaluator/app/infrastructure/persistence/postgres/context_loader.py
+# Loader del contexto de evaluación en UN round trip sobre un pool asyncpg.
+# interviews + jobs + prompts (system/rubric) + full_conversations + messages -> una sola query.
+# El schema (tablas/columnas disponibles) se sondea una vez al arrancar y la SQL se arma con eso.
+# --*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*
+from __future__ import annotations
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+import asyncio
+import json
+import os
+
+from ...transcript_utils import transcript_from_conversation_row, transcript_from_messages
+
+# --> DSN directo a Postgres (Supabase: "Connection string" del proyecto). Sin DSN no se usa el loader.
+PG_DSN          = os.getenv("EVALUATOR_PG_DSN") or os.getenv("SUPABASE_DB_URL")
+PG_POOL_MIN     = int(os.getenv("EVALUATOR_PG_POOL_MIN", "1"))
+PG_POOL_MAX     = int(os.getenv("EVALUATOR_PG_POOL_MAX", "5"))
+PG_TIMEOUT_S    = float(os.getenv("EVALUATOR_PG_TIMEOUT_S", "10"))
+
+_TABLES = ("interviews", "jobs", "prompts", "interview_full_conversations", "interview_messages")
+_INT_TYPES = {"smallint", "integer", "bigint"}
+
+
+@dataclass
+class SchemaCapabilities:
+    """Columnas (y tipo) por tabla, sondeadas una vez desde information_schema."""
+    columns: Dict[str, Dict[str, str]] = field(default_factory=dict)  # --> tabla -> {columna: data_type}
+
+    def has_table(self, table: str) -> bool:
+        return table in self.columns
+
+    def has(self, table: str, column: str) -> bool:
+        return column in self.columns.get(table, {})
+
+    def is_int(self, table: str, column: str) -> bool:
+        return self.columns.get(table, {}).get(column) in _INT_TYPES
+
+    def present(self, table: str, candidates: List[str]) -> List[str]:
+        return [c for c in candidates if self.has(table, c)]
+
+
+def _order_by(caps: SchemaCapabilities, table: str, alias: str, candidates: List[str], desc: bool = True) -> str:
+    cols = caps.present(table, candidates)
+    if not cols:
+        return ""
+    direction = "DESC NULLS LAST" if desc else "ASC NULLS LAST"
+    return "ORDER BY " + ", ".join(f"{alias}.{c} {direction}" for c in cols)
+
+def _join_on(caps: SchemaCapabilities, table: str, alias: str, column: str) -> str:
+    """Compara contra interviews.id_interview sin castear si los tipos coinciden (usa índices)."""
+    if caps.is_int(table, column) == caps.is_int("interviews", "id_interview"):
+        return f"{alias}.{column} = i.id_interview"
+    return f"{alias}.{column}::text = i.id_interview::text"
+
+def build_context_sql(caps: SchemaCapabilities) -> str:
+    """
+    Arma la query única con subconsultas escalares por campo. Las partes cuya tabla/columna
+    no existe se reemplazan por NULL, así la query nunca falla por schema.
+    """
+    if not caps.has("interviews", "id_interview"):
+        raise RuntimeError("Schema sin interviews.id_interview: no se puede armar el contexto")
+
+    id_filter = "i.id_interview = $1::bigint" if caps.is_int("interviews", "id_interview") else "i.id_interview::text = $1"
+    job_col = "i.id_job" if caps.has("interviews", "id_job") else "NULL"
+
+    # --> JD
+    if caps.has("jobs", "id_job") and caps.has("jobs", "description") and job_col != "NULL":
+        jd_sql = "(SELECT j.description FROM jobs j WHERE j.id_job = i.id_job LIMIT 1)"
+        job_exists_sql = "EXISTS (SELECT 1 FROM jobs j WHERE j.id_job = i.id_job)"
+    else:
+        jd_sql, job_exists_sql = "NULL", "TRUE"
+
+    # --> Prompts (último por tipo)
+    if caps.has("prompts", "prompt_type") and caps.has("prompts", "content"):
+        order = _order_by(caps, "prompts", "p", ["updated_at", "created_at", "id"])
+        def prompt_sql(ptype: str) -> str:
+            return f"(SELECT p.content FROM prompts p WHERE p.prompt_type = '{ptype}' {order} LIMIT 1)"
+        system_sql, rubric_sql = prompt_sql("evaluator_system"), prompt_sql("evaluator_rubric")
+    else:
+        system_sql = rubric_sql = "NULL"
+
+    # --> Conversación completa (fila entera como jsonb: se extrae en Python igual que PostgREST)
+    conv_col = next(iter(caps.present("interview_full_conversations", ["interview_id", "id_interview"])), None)
+    if conv_col:
+        order = _order_by(caps, "interview_full_conversations", "c", ["created_at", "id"])
+        conv_sql = (f"(SELECT to_jsonb(c) FROM interview_full_conversations c "
+                    f"WHERE {_join_on(caps, 'interview_full_conversations', 'c', conv_col)} {order} LIMIT 1)")
+    else:
+        conv_sql = "NULL"
+
+    # --> Mensajes (fallback) agregados en orden
+    if caps.has("interview_messages", "interview_id") and caps.has("interview_messages", "content"):
+        role = "m.role" if caps.has("interview_messages", "role") else "NULL"
+        created = "m.created_at" if caps.has("interview_messages", "created_at") else "NULL"
+        order = "ORDER BY m.created_at ASC" if created != "NULL" else ""
+        msgs_sql = (f"(SELECT jsonb_agg(jsonb_build_object('role', {role}, 'content', m.content, 'created_at', {created}) {order}) "
+                    f"FROM interview_messages m WHERE {_join_on(caps, 'interview_messages', 'm', 'interview_id')})")
+    else:
+        msgs_sql = "NULL"
+
+    return f"""
+        SELECT
+          i.id_interview          AS interview_id,
+          {job_col}               AS job_id,
+          {job_exists_sql}        AS job_exists,
+          {jd_sql}                AS jd,
+          {system_sql}            AS system_prompt,
+          {rubric_sql}            AS rubric,
+          {conv_sql}              AS conversation,
+          {msgs_sql}              AS messages
+        FROM interviews i
+        WHERE {id_filter}
+        LIMIT 1
+    """
+
+
+class PostgresContextLoader:
+    """
+    Loader asíncrono con pool asyncpg.
+
+      - start() -> abre el pool, sondea schema (1 query) y precompila la SQL del contexto
+      - load(interview_id) -> dict {interview_id, jd, system_prompt, rubric, full_transcript} en 1 query
+      - close() -> cierra el pool
+    """
+
+    def __init__(self, dsn: Optional[str] = PG_DSN, min_size: int = PG_POOL_MIN, max_size: int = PG_POOL_MAX) -> None:
+        self.dsn = dsn
+        self.min_size = min_size
+        self.max_size = max_size
+        self.pool = None
+        self.caps: Optional[SchemaCapabilities] = None
+        self.sql: Optional[str] = None
+        self._lock = asyncio.Lock()
+
+    async def start(self) -> None:
+        async with self._lock:
+            if self.pool is not None:
+                return
+            if not self.dsn:
+                raise RuntimeError("Falta EVALUATOR_PG_DSN para el loader Postgres")
+            import asyncpg  # --> Dependencia opcional: sólo si se usa el loader
+
+            # statement_cache_size=0: compatible con el pooler de Supabase (pgbouncer en modo transaction)
+            self.pool = await asyncpg.create_pool(self.dsn, min_size=self.min_size, max_size=self.max_size,
+                                                  command_timeout=PG_TIMEOUT_S, statement_cache_size=0)
+            self.caps = await self._probe_schema()
+            self.sql = build_context_sql(self.caps)
+            print(f"[Evaluator] Loader Postgres listo (tablas: {sorted(self.caps.columns)})")
+
+    async def _probe_schema(self) -> SchemaCapabilities:
+        rows = await self.pool.fetch(
+            """
+            SELECT table_name, column_name, data_type
+            FROM information_schema.columns
+            WHERE table_schema = 'public' AND table_name = ANY($1::text[])
+            """,
+            list(_TABLES),
+        )
+        caps = SchemaCapabilities()
+        for r in rows:
+            caps.columns.setdefault(r["table_name"], {})[r["column_name"]] = r["data_type"]
+        return caps
+
+    async def load(self, interview_id: str) -> Dict[str, Any]:
+        if self.pool is None:
+            await self.start()
+
+        key = str(interview_id).strip()
+        param: Any = key
+        if self.caps.is_int("interviews", "id_interview"):
+            if not key.lstrip("-").isdigit():
+                raise ValueError(f"No existe interviews.id_interview={interview_id}")
+            param = int(key)
+
+        row = await self.pool.fetchrow(self.sql, param)
+        if row is None:
+            raise ValueError(f"No existe interviews.id_interview={interview_id}")
+        if row["job_id"] is not None and not row["job_exists"]:
+            raise ValueError(f"No existe jobs.id_job={row['job_id']}")
+
+        return {
+            "interview_id": key,
+            "jd": row["jd"] or "",
+            "system_prompt": row["system_prompt"],
+            "rubric": row["rubric"],
+            "full_transcript": self._transcript(row["conversation"], row["messages"]),
+        }
+
+    @staticmethod
+    def _transcript(conversation: Any, messages: Any) -> Optional[str]:
+        # --> asyncpg devuelve jsonb como str (sin codec registrado)
+        if isinstance(conversation, str):
+            conversation = json.loads(conversation)
+        if isinstance(messages, str):
+            messages = json.loads(messages)
+        if isinstance(conversation, dict):
+            t = transcript_from_conversation_row(conversation)
+            if t:
+                return t
+        if isinstance(messages, list) and messages:
+            return transcript_from_messages(messages)
+        return None
+
+    async def close(self) -> None:
+        if self.pool is not None:
+            await self.pool.close()
+            self.pool = None
+
+
+# --------------- Singleton ---------------
+_loader: Optional[PostgresContextLoader] = None
+
+def get_context_loader() -> PostgresContextLoader:
+    """Instancia única por proceso (el pool y el schema sondeado se reutilizan entre jobs)."""
+    global _loader
+    if _loader is None:
+        _loader = PostgresContextLoader()
+    return _loader
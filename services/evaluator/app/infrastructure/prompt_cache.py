@@ -0,0 +1,132 @@
+# --*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*
+# services/evaluator/app/infrastructure/prompt_cache.py
+# Cache de prompts in-process con TTL e invalidación explícita.
+# Core publica en Redis (canal PROMPTS_INVALIDATION_CHANNEL) cada vez que crea/edita/borra un prompt;
+# el listener de este proceso vacía el cache al recibir el mensaje.
+# Vencido el TTL se devuelve el valor viejo y se refresca en background (el job no espera la lectura).
+# --*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*
+from __future__ import annotations
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, Union
+import asyncio
+import json
+import os
+import time
+
+from . import metrics
+
+PROMPT_CACHE_TTL_S = float(os.getenv("EVALUATOR_PROMPT_CACHE_TTL_S", "300"))       # --> Prompts cambian pocas veces por semana
+PROMPTS_CHANNEL    = os.getenv("PROMPTS_INVALIDATION_CHANNEL", "prompts:invalidate")  # --> Mismo canal que publica Core
+REDIS_URI          = os.getenv("REDIS_URI", "redis://redis:6379/0")
+
+Loader = Callable[[], Union[Optional[str], Awaitable[Optional[str]]]]
+
+
+class PromptCache:
+    """
+    Cache clave -> contenido de prompt.
+
+      - get_or_load(key, loader) -> valor cacheado; si no hay, llama al loader (sync o async).
+                                    Si el loader lanza excepción no se cachea nada.
+      - invalidate(key=None)     -> borra una clave o todo (mensaje de Core / cambio de versión)
+    """
+
+    def __init__(self, ttl_s: float = PROMPT_CACHE_TTL_S) -> None:
+        self.ttl_s = ttl_s
+        self._items: Dict[str, Tuple[float, Optional[str]]] = {} # --> key -> (cargado_en, valor)
+        self._refreshing: Dict[str, asyncio.Task] = {}
+        self.version = 0 # --> Se incrementa en cada invalidación
+
+    @staticmethod
+    async def _call(loader: Loader) -> Optional[str]:
+        """Loader async -> await; loader sync (SDK bloqueante) -> en thread para no frenar el loop."""
+        if asyncio.iscoroutinefunction(loader):
+            return await loader()
+        result = await asyncio.to_thread(loader)
+        if asyncio.iscoroutine(result):
+            result = await result
+        return result
+
+    async def get_or_load(self, key: str, loader: Loader) -> Optional[str]:
+        item = self._items.get(key)
+        if item is None:
+            metrics.inc("prompt_cache_misses_total", key=key)
+            version = self.version
+            value = await self._call(loader)
+            if version == self.version: # --> Si hubo invalidación mientras cargábamos, no guardamos el valor viejo
+                self._items[key] = (time.monotonic(), value)
+            return value
+
+        loaded_at, value = item
+        metrics.inc("prompt_cache_hits_total", key=key)
+        if time.monotonic() - loaded_at > self.ttl_s and key not in self._refreshing:
+            # --> Stale-while-revalidate: devolvemos ya y refrescamos aparte
+            self._refreshing[key] = asyncio.create_task(self._refresh(key, loader))
+        return value
+
+    async def _refresh(self, key: str, loader: Loader) -> None:
+        try:
+            version = self.version
+            value = await self._call(loader)
+            if version == self.version:
+                self._items[key] = (time.monotonic(), value)
+        except Exception as e:
+            print(f"[PromptCache] WARNING: refresh de '{key}' falló, sigo con el valor anterior: {e}")
+        finally:
+            self._refreshing.pop(key, None)
+
+    def invalidate(self, key: Optional[str] = None) -> None:
+        self.version += 1
+        if key is None:
+            self._items.clear()
+        else:
+            self._items.pop(key, None)
+        metrics.inc("prompt_cache_invalidations_total")
+
+
+# --------------- Singleton ---------------
+_prompt_cache: Optional[PromptCache] = None
+
+def get_prompt_cache() -> PromptCache:
+    global _prompt_cache
+    if _prompt_cache is None:
+        _prompt_cache = PromptCache()
+    return _prompt_cache
+
+
+async def listen_for_invalidations(redis_uri: str = REDIS_URI, channel: str = PROMPTS_CHANNEL) -> None:
+    """
+    Loop de suscripción al canal de invalidación (correr como task de fondo).
+    Mensaje esperado: JSON {"prompt_type": "...", ...}. Ante cualquier mensaje vaciamos el cache
+    completo (son pocos prompts) y ante una desconexión también, por si nos perdimos algún cambio.
+    """
+    from redis.asyncio import Redis
+
+    cache = get_prompt_cache()
+    while True:
+        r = Redis.from_url(redis_uri)
+        try:
+            pubsub = r.pubsub()
+            await pubsub.subscribe(channel)
+            print(f"[PromptCache] Escuchando invalidaciones en '{channel}'")
+            async for msg in pubsub.listen():
+                if msg.get("type") != "message":
+                    continue
+                data: Dict[str, Any] = {}
+                try:
+                    raw = msg.get("data")
+                    data = json.loads(raw.decode("utf-8") if isinstance(raw, bytes) else raw)
+                except Exception:
+                    pass
+                cache.invalidate()
+                print(f"[PromptCache] Invalidado por Core: {data or msg.get('data')}")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            cache.invalidate()
+            print(f"[PromptCache] WARNING: listener caído ({e}); reintento en 5s")
+            await asyncio.sleep(5)
+        finally:
+            try:
+                await r.aclose()
+            except Exception:
+                pass
@@ -0,0 +1,391 @@
+# --*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*
+# services/evaluator/app/infrastructure/rate_limit.py
+# Límite adaptativo por provider: RPM y TPM (tokens estimados) por ventana de 1 minuto + concurrencia
+# ajustada por AIMD (suma +1 por "ronda" de éxitos; divide ante 429 o latencia que se dispara) y
+# pausa compartida según Retry-After. El estado vive en Redis para que todos los workers vean el
+# mismo cupo; si Redis no está, cada proceso sigue con su estado local.
+# Configuración: EVALUATOR_RATE_LIMITS='{"openai": {"rpm": 500, "tpm": 200000, "concurrency": 8}, "gemini": 60}'
+# (un número solo = RPM). Provider sin entrada: sin RPM/TPM, pero con AIMD + Retry-After locales.
+# --*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*
+from __future__ import annotations
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, asdict
+from typing import Any, Awaitable, Callable, Dict, Optional
+import asyncio
+import json
+import math
+import os
+import time
+import uuid
+
+from . import metrics
+
+# --> Config por ENV
+RATE_LIMIT_BACKEND   = os.getenv("EVALUATOR_RATE_LIMIT_BACKEND", "redis")           # --> "redis" | "memory"
+RATE_LIMIT_PREFIX    = os.getenv("EVALUATOR_RATE_LIMIT_PREFIX", "evaluator:ratelimit:")
+REDIS_URI            = os.getenv("REDIS_URI", "redis://redis:6379/0")
+AIMD_INITIAL         = float(os.getenv("EVALUATOR_AIMD_INITIAL_CONCURRENCY", "4"))  # --> Requests en vuelo al arrancar
+AIMD_MIN             = float(os.getenv("EVALUATOR_AIMD_MIN_CONCURRENCY", "1"))
+AIMD_MAX             = float(os.getenv("EVALUATOR_AIMD_MAX_CONCURRENCY", "32"))
+AIMD_DECREASE        = float(os.getenv("EVALUATOR_AIMD_DECREASE", "0.5"))           # --> Factor ante 429
+AIMD_LATENCY_DECREASE = float(os.getenv("EVALUATOR_AIMD_LATENCY_DECREASE", "0.9"))  # --> Factor ante latencia alta
+AIMD_LATENCY_FACTOR  = float(os.getenv("EVALUATOR_AIMD_LATENCY_FACTOR", "2.5"))     # --> "Alta" = factor x línea base
+AIMD_DECREASE_GUARD_S = float(os.getenv("EVALUATOR_AIMD_DECREASE_GUARD_S", "5"))    # --> Un solo recorte por ráfaga de 429
+MAX_RETRIES          = int(os.getenv("EVALUATOR_RATE_LIMIT_MAX_RETRIES", "4"))      # --> Reintentos ante 429
+DEFAULT_RETRY_AFTER_S = float(os.getenv("EVALUATOR_DEFAULT_RETRY_AFTER_S", "5"))    # --> Si el 429 no trae Retry-After
+LEASE_TTL_S          = float(os.getenv("EVALUATOR_RATE_LIMIT_LEASE_TTL_S", "300"))  # --> Lease huérfano (worker caído) se libera solo
+
+_POLL_S = 0.1          # --> Espera entre intentos cuando la concurrencia está llena
+_WINDOW_S = 60         # --> Ventana de RPM/TPM
+_REDIS_RETRY_S = 60.0  # --> Si Redis falla, estado local este tiempo (igual que el cache)
+
+
+@dataclass
+class ProviderLimits:
+    rpm: float = 0           # --> 0 = sin límite
+    tpm: float = 0
+    concurrency: float = AIMD_INITIAL
+    max_concurrency: float = AIMD_MAX
+
+def _parse_limits(value: Any) -> ProviderLimits:
+    if isinstance(value, dict):
+        return ProviderLimits(
+            rpm=float(value.get("rpm") or 0),
+            tpm=float(value.get("tpm") or 0),
+            concurrency=float(value.get("concurrency") or AIMD_INITIAL),
+            max_concurrency=float(value.get("max_concurrency") or AIMD_MAX),
+        )
+    return ProviderLimits(rpm=float(value))
+
+def _load_limits() -> Dict[str, ProviderLimits]:
+    raw = os.getenv("EVALUATOR_RATE_LIMITS")
+    if not raw:
+        return {}
+    try:
+        return {str(k): _parse_limits(v) for k, v in json.loads(raw).items()}
+    except Exception as e:
+        print(f"[Evaluator] WARNING: EVALUATOR_RATE_LIMITS inválido ({e}); sin límites")
+        return {}
+
+RATE_LIMITS = _load_limits()
+
+
+# ================================
+# Detección de 429 / Retry-After
+# ================================
+_RATE_LIMIT_CLASSES = ("RateLimitError", "ResourceExhausted", "TooManyRequests")
+
+def is_rate_limit_error(e: BaseException) -> bool:
+    """429 de cualquier SDK (OpenAI/OpenRouter: RateLimitError; Gemini: ResourceExhausted)."""
+    if getattr(e, "status_code", None) == 429 or getattr(e, "code", None) == 429:
+        return True
+    if type(e).__name__ in _RATE_LIMIT_CLASSES:
+        return True
+    text = str(e).lower()
+    return "429" in text and ("rate" in text or "quota" in text or "too many" in text)
+
+def retry_after_seconds(e: BaseException) -> Optional[float]:
+    """Retry-After (segundos o ms) de la respuesta HTTP si el SDK la expone."""
+    headers = getattr(getattr(e, "response", None), "headers", None)
+    if headers is None:
+        return None
+    for name, scale in (("retry-after-ms", 0.001), ("retry-after", 1.0)):
+        value = headers.get(name)
+        if value is None:
+            continue
+        try:
+            return max(float(value) * scale, 0.0)
+        except (TypeError, ValueError):
+            continue  # --> Formato HTTP-date: usamos el default
+    return None
+
+
+# ================================
+# Estado (local / Redis)
+# ================================
+class _MemoryState:
+    """Estado del limiter en el proceso (mismas reglas que el script de Redis)."""
+
+    def __init__(self, initial: float) -> None:
+        self.limit = initial
+        self.leases: Dict[str, float] = {}
+        self.window = -1
+        self.requests = 0
+        self.tokens = 0
+        self.cooldown_until = 0.0
+        self.guard_until = 0.0
+
+    def try_acquire(self, now: float, lease: str, tokens: int, limits: ProviderLimits) -> float:
+        """0 = adquirido; >0 = segundos a esperar; <0 = concurrencia llena (poll)."""
+        if self.cooldown_until > now:
+            return self.cooldown_until - now
+        self.leases = {k: t for k, t in self.leases.items() if t > now - LEASE_TTL_S}
+        if len(self.leases) >= math.floor(self.limit):
+            return -1
+        window = int(now // _WINDOW_S)
+        if window != self.window:
+            self.window, self.requests, self.tokens = window, 0, 0
+        wait = (window + 1) * _WINDOW_S - now
+        if limits.rpm and self.requests + 1 > limits.rpm:
+            return wait
+        if limits.tpm and self.tokens and self.tokens + tokens > limits.tpm:
+            return wait  # --> Un request más grande que el TPM pasa solo en una ventana vacía
+        self.requests += 1
+        self.tokens += tokens
+        self.leases[lease] = now
+        return 0
+
+    def release(self, lease: str) -> None:
+        self.leases.pop(lease, None)
+
+    def adjust(self, now: float, mul: float, add: float, lo: float, hi: float, guard_s: float) -> float:
+        if guard_s:
+            if self.guard_until > now:
+                return self.limit
+            self.guard_until = now + guard_s
+        self.limit = max(lo, min(hi, self.limit * mul + add))
+        return self.limit
+
+    def set_cooldown(self, until: float) -> None:
+        self.cooldown_until = max(self.cooldown_until, until)
+
+
+# --> KEYS: inflight(zset), limit, cooldown, req:<ventana>, tok:<ventana>
+# --> ARGV: now_ms, lease, lease_ttl_ms, limit_inicial, rpm, tpm, tokens, fin_ventana_ms
+_ACQUIRE_LUA = """
+local now = tonumber(ARGV[1])
+local cd = tonumber(redis.call('GET', KEYS[3]) or '0')
+if cd > now then return cd - now end
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - tonumber(ARGV[3]))
+local limit = tonumber(redis.call('GET', KEYS[2]) or ARGV[4])
+if redis.call('ZCARD', KEYS[1]) >= math.floor(limit) then return -1 end
+local rpm, tpm, tokens = tonumber(ARGV[5]), tonumber(ARGV[6]), tonumber(ARGV[7])
+local wait = tonumber(ARGV[8]) - now
+if rpm > 0 and tonumber(redis.call('GET', KEYS[4]) or '0') + 1 > rpm then return wait end
+if tpm > 0 then
+  local used = tonumber(redis.call('GET', KEYS[5]) or '0')
+  if used > 0 and used + tokens > tpm then return wait end
+end
+redis.call('INCR', KEYS[4])
+redis.call('PEXPIRE', KEYS[4], 120000)
+redis.call('INCRBY', KEYS[5], tokens)
+redis.call('PEXPIRE', KEYS[5], 120000)
+redis.call('ZADD', KEYS[1], now, ARGV[2])
+redis.call('PEXPIRE', KEYS[1], ARGV[3])
+return 0
+"""
+
+# --> KEYS: limit, guard | ARGV: mul, add, lo, hi, limit_inicial, guard_ms
+_ADJUST_LUA = """
+if tonumber(ARGV[6]) > 0 then
+  if not redis.call('SET', KEYS[2], '1', 'NX', 'PX', ARGV[6]) then
+    return redis.call('GET', KEYS[1]) or ARGV[5]
+  end
+end
+local v = tonumber(redis.call('GET', KEYS[1]) or ARGV[5]) * tonumber(ARGV[1]) + tonumber(ARGV[2])
+v = math.max(tonumber(ARGV[3]), math.min(tonumber(ARGV[4]), v))
+redis.call('SET', KEYS[1], tostring(v), 'EX', 86400)
+return tostring(v)
+"""
+
+
+class ProviderLimiter:
+    """
+    Limiter de un provider:
+      - acquire(tokens) / release(lease)  -> cupo RPM/TPM + concurrencia AIMD
+      - slot(tokens)                      -> context manager que además mide latencia y detecta 429
+      - call(fn, *args, tokens=)          -> slot + reintentos ante 429 respetando Retry-After
+    """
+
+    def __init__(self, provider: str, limits: Optional[ProviderLimits] = None,
+                 redis_uri: Optional[str] = None) -> None:
+        self.provider = provider
+        self.limits = limits or ProviderLimits()
+        self.redis_uri = redis_uri
+        self.concurrency = self.limits.concurrency     # --> Última lectura del límite AIMD
+        self.latency_baseline: Optional[float] = None  # --> EWMA lenta de latencia por token (local)
+        self._local = _MemoryState(self.limits.concurrency)
+        self._redis = None
+        self._redis_loop = None
+        self._redis_down_until = 0.0
+        self._acquire_script = None
+        self._adjust_script = None
+        self._successes = 0.0
+
+    # --------------- Redis (lazy, por event loop; mismo patrón que EvaluationCache) ---------------
+    def _get_redis(self):
+        if not self.redis_uri or time.monotonic() < self._redis_down_until:
+            return None
+        loop = asyncio.get_running_loop()
+        if self._redis is None or self._redis_loop is not loop:
+            from redis.asyncio import Redis
+            self._redis = Redis.from_url(self.redis_uri, socket_timeout=2, socket_connect_timeout=2)
+            self._redis_loop = loop
+            self._acquire_script = self._redis.register_script(_ACQUIRE_LUA)
+            self._adjust_script = self._redis.register_script(_ADJUST_LUA)
+        return self._redis
+
+    def _redis_failed(self, e: Exception) -> None:
+        print(f"[RateLimit] WARNING: Redis no disponible ({e}); {self.provider} sigue con estado local por {_REDIS_RETRY_S:.0f}s")
+        self._redis_down_until = time.monotonic() + _REDIS_RETRY_S
+        self._redis = None
+
+    def _key(self, suffix: str) -> str:
+        return f"{RATE_LIMIT_PREFIX}{self.provider}:{suffix}"
+
+    # --------------- Cupo ---------------
+    async def _try_acquire(self, lease: str, tokens: int) -> float:
+        now = time.time()  # --> Reloj de pared: se compara entre procesos
+        r = self._get_redis()
+        if r is not None:
+            window = int(now // _WINDOW_S)
+            try:
+                wait_ms = await self._acquire_script(
+                    keys=[self._key("inflight"), self._key("limit"), self._key("cooldown"),
+                          self._key(f"req:{window}"), self._key(f"tok:{window}")],
+                    args=[int(now * 1000), lease, int(LEASE_TTL_S * 1000), self.limits.concurrency,
+                          self.limits.rpm, self.limits.tpm, tokens, (window + 1) * _WINDOW_S * 1000],
+                )
+                wait_ms = int(wait_ms)
+                return wait_ms / 1000 if wait_ms > 0 else float(wait_ms)
+            except Exception as e:
+                self._redis_failed(e)
+        return self._local.try_acquire(now, lease, tokens, self.limits)
+
+    async def acquire(self, tokens: int = 1) -> str:
+        """Espera cupo (ventana RPM/TPM, concurrencia AIMD y pausa por Retry-After). Devuelve el lease."""
+        lease = uuid.uuid4().hex
+        waited = 0.0
+        while True:
+            wait = await self._try_acquire(lease, max(int(tokens), 1))
+            if wait == 0:
+                break
+            wait = _POLL_S if wait < 0 else wait
+            waited += wait
+            await asyncio.sleep(wait)
+        if waited:
+            metrics.inc("rate_limit_wait_seconds_total", waited, provider=self.provider)
+        return lease
+
+    async def release(self, lease: str) -> None:
+        self._local.release(lease)
+        r = self._get_redis()
+        if r is not None:
+            try:
+                await r.zrem(self._key("inflight"), lease)
+            except Exception as e:
+                self._redis_failed(e)  # --> El lease vence solo a los LEASE_TTL_S
+
+    # --------------- AIMD ---------------
+    async def _adjust(self, mul: float, add: float, guard_s: float = 0.0) -> float:
+        lo, hi = AIMD_MIN, self.limits.max_concurrency
+        r = self._get_redis()
+        if r is not None:
+            try:
+                value = await self._adjust_script(
+                    keys=[self._key("limit"), self._key("guard")],
+                    args=[mul, add, lo, hi, self.limits.concurrency, int(guard_s * 1000)],
+                )
+                self.concurrency = float(value)
+                return self.concurrency
+            except Exception as e:
+                self._redis_failed(e)
+        self.concurrency = self._local.adjust(time.time(), mul, add, lo, hi, guard_s)
+        return self.concurrency
+
+    async def on_success(self, latency_s: float, tokens: int = 1) -> None:
+        """Aumento aditivo (~+1 por cada `concurrency` éxitos) o recorte suave si la latencia se dispara."""
+        per_token = latency_s / max(tokens, 1)
+        base = self.latency_baseline
+        # --> Línea base: EWMA lenta que recibe TODAS las muestras (también las lentas): un pico aislado
+        #     apenas la mueve, pero un cambio sostenido de latencia la alcanza y deja de contar como pico
+        self.latency_baseline = per_token if base is None else base * 0.95 + per_token * 0.05
+        if base is not None and per_token > base * AIMD_LATENCY_FACTOR:
+            metrics.inc("rate_limit_latency_backoff_total", provider=self.provider)
+            await self._adjust(AIMD_LATENCY_DECREASE, 0.0, AIMD_DECREASE_GUARD_S)
+            return
+        self._successes += 1
+        if self._successes >= max(self.concurrency, 1):
+            self._successes = 0
+            await self._adjust(1.0, 1.0)
+
+    async def on_throttle(self, retry_after: Optional[float]) -> float:
+        """429: recorte multiplicativo + pausa compartida. Devuelve los segundos a esperar."""
+        wait = retry_after if retry_after is not None else DEFAULT_RETRY_AFTER_S
+        metrics.inc("rate_limit_throttled_total", provider=self.provider)
+        await self._adjust(AIMD_DECREASE, 0.0, AIMD_DECREASE_GUARD_S)
+        until = time.time() + wait
+        self._local.set_cooldown(until)
+        r = self._get_redis()
+        if r is not None:
+            try:
+                await r.set(self._key("cooldown"), int(until * 1000), px=int(wait * 1000) + 1000)
+            except Exception as e:
+                self._redis_failed(e)
+        print(f"[RateLimit] 429 de {self.provider}: pausa {wait:.1f}s, concurrencia -> {self.concurrency:.1f}")
+        return wait
+
+    # --------------- API de uso ---------------
+    @asynccontextmanager
+    async def slot(self, tokens: int = 1):
+        lease = await self.acquire(tokens)
+        started = time.monotonic()
+        try:
+            yield
+        except Exception as e:
+            if is_rate_limit_error(e):
+                await self.on_throttle(retry_after_seconds(e))
+            raise
+        else:
+            await self.on_success(time.monotonic() - started, tokens)
+        finally:
+            await self.release(lease)
+
+    async def call(self, fn: Callable[..., Awaitable[Any]], *args: Any, tokens: int = 1, **kwargs: Any) -> Any:
+        """await fn(*args, **kwargs) con cupo; ante 429 espera (la pausa ya es compartida) y reintenta."""
+        for attempt in range(MAX_RETRIES + 1):
+            try:
+                async with self.slot(tokens):
+                    return await fn(*args, **kwargs)
+            except Exception as e:
+                if not is_rate_limit_error(e) or attempt >= MAX_RETRIES:
+                    raise
+                metrics.inc("rate_limit_retries_total", provider=self.provider)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"concurrency": round(self.concurrency, 2), **asdict(self.limits),
+                "shared": self.redis_uri is not None and self._redis_down_until <= time.monotonic()}
+
+
+# --------------- Registro por provider ---------------
+_limiters: Dict[str, ProviderLimiter] = {}
+
+def get_rate_limiter(provider: str) -> ProviderLimiter:
+    """
+    Limiter compartido del provider. Con entrada en EVALUATOR_RATE_LIMITS (y backend redis) el estado
+    es compartido entre workers; sin entrada: sin RPM/TPM, AIMD + Retry-After sólo en el proceso.
+    """
+    limiter = _limiters.get(provider)
+    if limiter is None:
+        limits = RATE_LIMITS.get(provider)
+        shared = limits is not None and RATE_LIMIT_BACKEND == "redis"
+        limiter = _limiters[provider] = ProviderLimiter(provider, limits, REDIS_URI if shared else None)
+    return limiter
+
+def set_rate_limit(provider: str, rpm: Optional[float], tpm: Optional[float] = None) -> None:
+    """Pisa los límites de un provider en runtime (CLI bulk: --rpm openai=100)."""
+    _limiters.pop(provider, None)
+    if rpm or tpm:
+        current = RATE_LIMITS.get(provider) or ProviderLimits()
+        RATE_LIMITS[provider] = ProviderLimits(rpm=float(rpm or 0), tpm=float(tpm or current.tpm),
+                                               concurrency=current.concurrency,
+                                               max_concurrency=current.max_concurrency)
+    else:
+        RATE_LIMITS.pop(provider, None)
+
+async def run_limited(provider: str, tokens: int, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """Llamada síncrona del SDK en un thread, bajo el limiter del provider (reintenta 429)."""
+    return await get_rate_limiter(provider).call(asyncio.to_thread, fn, *args, tokens=tokens, **kwargs)
+
+def limiter_stats() -> Dict[str, Any]:
+    return {name: limiter.stats() for name, limiter in sorted(_limiters.items())}
@@ -0,0 +1,310 @@
+# --*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*
+# services/evaluator/app/infrastructure/reporting.py
+# Reportes masivos (cientos de entrevistas por job) en streaming:
+#   - los ids se procesan en lotes de EVALUATOR_REPORT_BATCH; cada lote trae sus evaluaciones con UNA
+#     lectura del repositorio (get_evaluation_records) y, si se pide contexto, las entrevistas en paralelo
+#     con tope EVALUATOR_REPORT_CONCURRENCY
+#   - el lote siguiente se carga mientras se escribe el actual (un lote de adelanto, no más)
+#   - cada lote se serializa (ndjson | csv | json) y se escribe al store local a medida que sale
+# Memoria constante: a lo sumo dos lotes vivos, sin importar cuántas entrevistas tenga el reporte.
+# Store content-addressed: report_id = hash de las entradas (ids, formato, columnas), así que el mismo
+# pedido reusa el archivo ya armado (o el que se está armando) en vez de construirlo otra vez.
+# --*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*
+from __future__ import annotations
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+import asyncio
+import csv
+import hashlib
+import io
+import json
+import os
+import time
+
+from . import metrics
+from .score_stats import free_text_verdict
+
+REPORT_DIR         = Path(os.getenv("EVALUATOR_REPORT_DIR", str(Path(__file__).resolve().parents[2] / "out" / "reports")))
+REPORT_BATCH       = int(os.getenv("EVALUATOR_REPORT_BATCH", "50"))        # --> Entrevistas por lectura al repositorio
+REPORT_CONCURRENCY = int(os.getenv("EVALUATOR_REPORT_CONCURRENCY", "8"))   # --> Contextos en vuelo (include_context)
+REPORT_TTL_S       = int(os.getenv("EVALUATOR_REPORT_TTL_S", "3600"))      # --> Un reporte terminado se reusa hasta esta edad
+REPORT_STALE_S     = int(os.getenv("EVALUATOR_REPORT_STALE_S", "300"))     # --> "building" sin avances por más que esto = caído
+
+REPORT_VERSION = 1  # --> Subirlo si cambian columnas/formato (invalida los reportes guardados)
+
+REPORT_FORMATS: Dict[str, Dict[str, str]] = {
+    "ndjson": {"mime_type": "application/x-ndjson", "extension": ".ndjson"},
+    "csv":    {"mime_type": "text/csv", "extension": ".csv"},
+    "json":   {"mime_type": "application/json", "extension": ".json"},
+}
+
+BASE_COLUMNS       = ["interview_id", "job_id", "status", "updated_at", "score", "recommendation",
+                      "interview_type", "summary", "error"]
+EVALUATION_COLUMNS = ["evaluation_1", "evaluation_2", "evaluation_3"]
+CONTEXT_COLUMNS    = ["jd", "full_transcript"]
+
+
+def report_columns(include_evaluations: bool = True, include_context: bool = False) -> List[str]:
+    return (BASE_COLUMNS + (EVALUATION_COLUMNS if include_evaluations else [])
+            + (CONTEXT_COLUMNS if include_context else []))
+
+def report_key(interview_ids: Sequence[str], fmt: str, include_evaluations: bool = True,
+               include_context: bool = False) -> str:
+    """report_id content-addressed: hash de todo lo que define el archivo (el orden de los ids también)."""
+    material = json.dumps({"v": REPORT_VERSION, "ids": [str(i) for i in interview_ids], "format": fmt,
+                           "evaluations": include_evaluations, "context": include_context},
+                          separators=(",", ":"), ensure_ascii=False)
+    return "rpt_" + hashlib.sha256(material.encode("utf-8")).hexdigest()[:40]
+
+
+# ================================
+# Filas
+# ================================
+def _recommendation(record: Dict[str, Any]) -> Optional[str]:
+    """La del JSON estructurado; si no hay, la más repetida en las evaluaciones de texto libre."""
+    overall = (record.get("structured") or {}).get("overall_assessment") or {}
+    if overall.get("recommendation"):
+        return overall["recommendation"]
+    return free_text_verdict(record.get("results") or {})["recommendation"]
+
+def report_row(record: Dict[str, Any], context: Optional[Dict[str, Any]] = None,
+               include_evaluations: bool = True) -> Dict[str, Any]:
+    """Una fila plana del reporte a partir del record del repositorio (+ contexto si se pidió)."""
+    structured = record.get("structured") or {}
+    overall = structured.get("overall_assessment") or {}
+    results = record.get("results") or {}
+    row = {
+        "interview_id": record.get("interview_id"),
+        "job_id": record.get("job_id"),
+        "status": record.get("status") or ("done" if results else None),
+        "updated_at": record.get("updated_at"),
+        "score": overall.get("quantitative_score", record.get("score")),
+        "recommendation": _recommendation(record),
+        "interview_type": structured.get("interview_type"),
+        "summary": overall.get("summary"),
+        "error": record.get("error"),
+    }
+    if include_evaluations:
+        row.update({c: results.get(c) for c in EVALUATION_COLUMNS})
+    if context is not None:
+        row.update({c: context.get(c) for c in CONTEXT_COLUMNS})
+    return row
+
+
+# ================================
+# Serialización por formato
+# ================================
+class RowEncoder:
+    """Convierte lotes de filas en bytes; header/footer según el formato (csv: encabezado, json: array)."""
+
+    def __init__(self, fmt: str, columns: Sequence[str]) -> None:
+        if fmt not in REPORT_FORMATS:
+            raise ValueError(f"Formato de reporte no soportado: {fmt}")
+        self.fmt = fmt
+        self.columns = list(columns)
+        self.rows = 0
+
+    def header(self) -> bytes:
+        if self.fmt == "csv":
+            return self._csv([self.columns])
+        return b"[" if self.fmt == "json" else b""
+
+    def encode(self, rows: List[Dict[str, Any]]) -> bytes:
+        if not rows:
+            return b""
+        if self.fmt == "csv":
+            data = self._csv([["" if r.get(c) is None else r.get(c) for c in self.columns] for r in rows])
+        else:
+            lines = [json.dumps({c: r.get(c) for c in self.columns}, ensure_ascii=False, default=str) for r in rows]
+            if self.fmt == "ndjson":
+                data = ("\n".join(lines) + "\n").encode("utf-8")
+            else:
+                data = (("," if self.rows else "") + ",".join(lines)).encode("utf-8")
+        self.rows += len(rows)
+        return data
+
+    def footer(self) -> bytes:
+        return b"]" if self.fmt == "json" else b""
+
+    @staticmethod
+    def _csv(rows: List[List[Any]]) -> bytes:
+        buf = io.StringIO()
+        csv.writer(buf).writerows(rows)
+        return buf.getvalue().encode("utf-8")
+
+
+# ================================
+# Store local
+# ================================
+class ReportStore:
+    """
+    Reportes en disco, por hash: <dir>/<id[4:6]>/<report_id><ext> + <report_id>.meta.json al lado.
+    Mientras se arma el archivo es <report_id><ext>.part; se renombra al terminar (nunca se sirve a medias).
+    """
+
+    def __init__(self, root: Optional[Path] = None) -> None:
+        self.root = Path(root or REPORT_DIR)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _dir(self, report_id: str) -> Path:
+        return self.root / report_id[4:6]  # --> Sin el prefijo "rpt_": reparte en 256 carpetas
+
+    def path(self, report_id: str, fmt: str) -> Path:
+        return self._dir(report_id) / f"{report_id}{REPORT_FORMATS[fmt]['extension']}"
+
+    def _meta_path(self, report_id: str) -> Path:
+        return self._dir(report_id) / f"{report_id}.meta.json"
+
+    def meta(self, report_id: str) -> Optional[Dict[str, Any]]:
+        if not report_id.startswith("rpt_") or not report_id[4:].isalnum():
+            return None  # --> report_id viene de la URL: nada de rutas
+        try:
+            with open(self._meta_path(report_id), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def write_meta(self, report_id: str, **fields: Any) -> Dict[str, Any]:
+        meta = {**(self.meta(report_id) or {"report_id": report_id}), **fields}
+        tmp = self._meta_path(report_id).with_suffix(".tmp")
+        tmp.parent.mkdir(exist_ok=True)
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, self._meta_path(report_id))
+        return meta
+
+    def reusable(self, meta: Optional[Dict[str, Any]], now: Optional[float] = None) -> bool:
+        """Terminado, con archivo y dentro del TTL; o armándose y con avances recientes (no se duplica)."""
+        if not meta:
+            return False
+        now = time.time() if now is None else now
+        if meta.get("status") == "completed":
+            return (now - meta.get("finished_ts", 0) < REPORT_TTL_S
+                    and self.path(meta["report_id"], meta["format"]).exists())
+        if meta.get("status") in ("queued", "building"):
+            return now - meta.get("heartbeat_ts", 0) < REPORT_STALE_S
+        return False
+
+    def claim(self, report_id: str, fmt: str, interview_count: int, refresh: bool = False) -> Tuple[Dict[str, Any], bool]:
+        """
+        (meta, hay_que_armarlo). Si ya existe uno reusable se devuelve ese; si no, queda "queued"
+        para que lo arme el job en background.
+        """
+        meta = self.meta(report_id)
+        if not refresh and self.reusable(meta):
+            metrics.inc("reports_reused_total", format=fmt, status=meta["status"])
+            return meta, False
+        return self.write_meta(report_id, format=fmt, status="queued", interview_count=interview_count, rows=0,
+                               error=None, heartbeat_ts=time.time(),
+                               created_at=datetime.now(timezone.utc).isoformat()), True
+
+
+_store: Optional[ReportStore] = None
+
+def get_report_store() -> ReportStore:
+    global _store
+    if _store is None:
+        _store = ReportStore()
+    return _store
+
+
+# ================================
+# Builder
+# ================================
+async def _load_batch(repo, batch: List[str], include_evaluations: bool, include_context: bool,
+                      semaphore: asyncio.Semaphore) -> List[Dict[str, Any]]:
+    """Filas de un lote: evaluaciones en una lectura, contextos en paralelo (acotado)."""
+    async def context(interview_id: str) -> Optional[Dict[str, Any]]:
+        async with semaphore:
+            try:
+                return await repo.get_interview_context(interview_id)
+            except Exception as e:
+                print(f"[Evaluator] WARNING: reporte sin contexto para {interview_id}: {e}")
+                return {}
+
+    records_task = repo.get_evaluation_records(batch)
+    if include_context:
+        records, contexts = await asyncio.gather(records_task, asyncio.gather(*[context(i) for i in batch]))
+    else:
+        records, contexts = await records_task, [None] * len(batch)
+    return [report_row(records.get(i) or {"interview_id": i}, ctx, include_evaluations)
+            for i, ctx in zip(batch, contexts)]
+
+async def stream_report(repo, interview_ids: Sequence[str], fmt: str = "ndjson", include_evaluations: bool = True,
+                        include_context: bool = False, report_id: Optional[str] = None,
+                        store: Optional[ReportStore] = None, batch_size: Optional[int] = None,
+                        concurrency: Optional[int] = None) -> AsyncIterator[bytes]:
+    """
+    Genera el reporte en chunks de bytes (uno por lote) y lo va escribiendo en el store.
+    Si el consumidor corta antes del final el reporte queda con status "incomplete".
+    """
+    store = store or get_report_store()
+    report_id = report_id or report_key(interview_ids, fmt, include_evaluations, include_context)
+    batch_size = max(1, batch_size or REPORT_BATCH)
+    semaphore = asyncio.Semaphore(max(1, concurrency or REPORT_CONCURRENCY))
+    encoder = RowEncoder(fmt, report_columns(include_evaluations, include_context))
+    batches = [list(interview_ids[i:i + batch_size]) for i in range(0, len(interview_ids), batch_size)]
+
+    final_path = store.path(report_id, fmt)
+    part_path = final_path.with_name(final_path.name + ".part")
+    store.write_meta(report_id, format=fmt, status="building", interview_count=len(interview_ids), rows=0,
+                     heartbeat_ts=time.time())
+    status, error, pending = "incomplete", None, None
+    digest = hashlib.sha256()  # --> ETag de la descarga: hash de los bytes, calculado mientras se escriben
+    try:
+        with open(part_path, "wb") as out:
+            chunk = encoder.header()
+            out.write(chunk)
+            digest.update(chunk)
+            yield chunk
+            pending = asyncio.ensure_future(_load_batch(repo, batches[0], include_evaluations, include_context,
+                                                        semaphore)) if batches else None
+            for n in range(len(batches)):
+                rows = await pending
+                # --> Adelanto: el próximo lote se carga mientras este se escribe / envía
+                pending = asyncio.ensure_future(_load_batch(repo, batches[n + 1], include_evaluations,
+                                                            include_context, semaphore)) if n + 1 < len(batches) else None
+                chunk = encoder.encode(rows)
+                out.write(chunk)
+                digest.update(chunk)
+                store.write_meta(report_id, rows=encoder.rows, heartbeat_ts=time.time())
+                yield chunk
+            chunk = encoder.footer()
+            out.write(chunk)
+            digest.update(chunk)
+            yield chunk
+        os.replace(part_path, final_path)
+        status = "completed"
+    except Exception as e:
+        status, error = "error", str(e)
+        raise
+    finally:
+        if pending is not None and not pending.done():
+            pending.cancel()
+        if status != "completed":
+            part_path.unlink(missing_ok=True)
+        metrics.inc("reports_total", format=fmt, status=status)
+        metrics.inc("report_rows_total", encoder.rows, format=fmt)
+        done = status == "completed"
+        store.write_meta(report_id, status=status, rows=encoder.rows, error=error,
+                         bytes=final_path.stat().st_size if done else None,
+                         sha256=digest.hexdigest() if done else None,
+                         finished_at=datetime.now(timezone.utc).isoformat(), finished_ts=time.time())
+
+async def build_report(repo, interview_ids: Sequence[str], fmt: str = "ndjson", include_evaluations: bool = True,
+                       include_context: bool = False, report_id: Optional[str] = None,
+                       store: Optional[ReportStore] = None) -> Dict[str, Any]:
+    """Job en background: arma el reporte completo en el store y devuelve su meta final."""
+    store = store or get_report_store()
+    report_id = report_id or report_key(interview_ids, fmt, include_evaluations, include_context)
+    started = time.perf_counter()
+    try:
+        async for _ in stream_report(repo, interview_ids, fmt, include_evaluations, include_context,
+                                     report_id=report_id, store=store):
+            pass
+        print(f"[Evaluator] Report {report_id} listo: {len(interview_ids)} entrevistas "
+              f"en {time.perf_counter() - started:.1f}s")
+    except Exception as e:
+        print(f"[Evaluator] ERROR armando report {report_id}: {e}")
+    return store.meta(report_id) or {}
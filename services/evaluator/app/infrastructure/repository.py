@@ -5,10 +5,15 @@
 # --*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*
 # --*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*
 from __future__ import annotations
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
+from datetime import datetime, timezone
 from pathlib import Path
+import asyncio
 import json
 
+from .job_status import publish_status
+from .score_stats import GLOBAL_JOB, apply_score_delta, free_text_score_rows, structured_score_rows, summarize_stats
+
 # --> Intentamos importar el loader (si esta disponible), importe relativo ya que esta en el mismo paquete infrastructure.
 try:
     from .llm_provider import load_interview_from_source  # type: ignore
@@ -17,6 +22,16 @@ except Exception:
     _HAS_LOADER = False # --> Flag: no hay loader, usamos lectura manual de JSON
 
 
+def _read_json(path: Path) -> Dict[str, Any]:
+    """JSON de un archivo local ({} si no existe o está corrupto)."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
 class EvaluatorRepository:
     """
     Contrato base del repositorio del Evaluator.
@@ -30,8 +45,39 @@ class EvaluatorRepository:
             Persiste las evaluaciones del LLM (hoy: archivo o DB si existe)
 
       3) mark_evaluation_status(interview_id, status, error?) -> None
-            Marca estado ('queued'|'running'|'done'|'error') para que el front vea progreso
+            Marca estado ('queued'|'running'|'retrying'|'done'|'error') para que el front vea progreso
+            (las implementaciones además lo publican con job_status.publish_status)
+
+      4) save_structured_evaluation(interview_id, evaluation) -> None
+            Persiste la evaluación estructurada (dict validado contra rubric_evaluation_schema.json)
+
+    Opcional:
+      - warmup() -> None
+            Se llama una vez al arrancar el proceso (pools, sondeo de schema). Default: no-op.
+      - list_interview_ids(status?, since?, until?, limit?, job_id?) -> List[str]
+            Selección de entrevistas para re-evaluación masiva (bulk_reevaluate.py) y reportes.
+      - get_evaluation_records(interview_ids) -> Dict[id, record]
+            Lectura en lote de lo ya evaluado (reportes): por id
+            {"interview_id", "job_id", "status", "error", "updated_at", "results", "structured", "score"}.
+            Los ids sin nada guardado vuelven con results/structured en None.
+      - get_score_stats(job_id?) -> Dict
+            Estadísticas pre-agregadas (score_stats.summarize_stats) de un job o globales. Los save_* dejan
+            además los puntajes por criterio en evaluation_scores y los agregados se actualizan al escribir.
+      - close()
+            Se llama al apagar el proceso (vaciar escrituras pendientes, cerrar conexiones). Default: no-op.
     """
+    async def warmup(self) -> None: # --> hook de arranque; las subclases lo pisan si necesitan abrir recursos
+        return None
+    async def close(self) -> None: # --> hook de apagado (simétrico a warmup)
+        return None
+    async def list_interview_ids(self, status: Optional[str] = None, since: Optional[str] = None,
+                                 until: Optional[str] = None, limit: Optional[int] = None,
+                                 job_id: Optional[str] = None) -> List[str]: # --> selección para bulk / reportes
+        raise NotImplementedError
+    async def get_evaluation_records(self, interview_ids: List[str]) -> Dict[str, Dict[str, Any]]: # --> lectura en lote (reportes)
+        raise NotImplementedError
+    async def get_score_stats(self, job_id: Optional[str] = None) -> Dict[str, Any]: # --> estadísticas ya agregadas (/stats)
+        raise NotImplementedError
     async def get_interview_context(self, interview_id: str) -> Dict[str, Any]: # --> devuelve el contexto mínimo para instanciar Interview
         # --> Método abstracto: las subclases deben implementarlo
         raise NotImplementedError
@@ -44,6 +90,10 @@ class EvaluatorRepository:
         # --> Método abstracto: las subclases deben implementarlo
         raise NotImplementedError
 
+    async def save_structured_evaluation(self, interview_id: str, evaluation: Dict[str, Any]) -> None: # --> persiste la evaluación estructurada (tipada)
+        # --> Método abstracto: las subclases deben implementarlo
+        raise NotImplementedError
+
 
 class FileMockRepository(EvaluatorRepository):
     """
@@ -56,6 +106,10 @@ class FileMockRepository(EvaluatorRepository):
       - get_interview_context -> Dict con 5 claves exactas
       - save_evaluation_results -> JSON en out/evaluations/<id>.json
       - mark_evaluation_status -> JSON en out/status_<id>.json
+      - save_structured_evaluation -> JSON en out/structured/<id>.json
+      - list_interview_ids -> ids de examples/*.json
+      - get_evaluation_records -> lee out/status_<id>, out/evaluations/<id> y out/structured/<id>
+      - get_score_stats -> out/score_stats.json (puntajes por criterio en out/scores/<id>.json)
     """
 
     def __init__(self, examples_dir: Optional[Path] = None, out_dir: Optional[Path] = None) -> None:
@@ -87,7 +141,9 @@ class FileMockRepository(EvaluatorRepository):
 
         if _HAS_LOADER:
             # --> Usamos el loader de Marco: ya conoce varias ubicaciones ("examples", "storage", etc.)
-            interview_obj = load_interview_from_source("file", filename) # --> Devuelve Interview
+            # --> Si el archivo está en examples_dir (p. ej. uno propio del benchmark) va por ruta absoluta
+            source = str(json_path) if json_path.exists() else filename
+            interview_obj = load_interview_from_source("file", source) # --> Devuelve Interview
             return interview_obj.to_dict() # --> Normalizamos a dict de 5 claves
 
         # --> Fallback: lectura manual del JSON
@@ -105,6 +161,50 @@ class FileMockRepository(EvaluatorRepository):
 
         return data # --> Dict listo para Interview.from_dict
 
+    async def list_interview_ids(self, status: Optional[str] = None, since: Optional[str] = None,
+                                 until: Optional[str] = None, limit: Optional[int] = None,
+                                 job_id: Optional[str] = None) -> List[str]:
+        """
+        IDs de los ejemplos en examples/ (orden alfabético). status filtra por out/status_<id>.json;
+        since/until no aplican al mock; job_id filtra por la clave "job_id" del ejemplo si la tiene.
+        """
+        ids = sorted(p.stem for p in self.examples_dir.glob("*.json"))
+        if status:
+            def _status(i: str) -> Optional[str]:
+                path = self.out_dir / f"status_{i}.json"
+                if not path.exists():
+                    return None
+                with open(path, "r", encoding="utf-8") as f:
+                    return json.load(f).get("status")
+            ids = [i for i in ids if _status(i) == status]
+        if job_id is not None:
+            ids = [i for i in ids if str(_read_json(self.examples_dir / f"{i}.json").get("job_id")) == str(job_id)]
+        return ids[:limit] if limit else ids
+
+    async def get_evaluation_records(self, interview_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Un record por id armado con los archivos de out/ (en un thread: son cientos de lecturas chicas)."""
+        def _load() -> Dict[str, Dict[str, Any]]:
+            records = {}
+            for i in interview_ids:
+                status = _read_json(self.out_dir / f"status_{i}.json")
+                results_path = self.out_dir / "evaluations" / f"{i}.json"
+                results = _read_json(results_path) or None
+                structured = _read_json(self.out_dir / "structured" / f"{i}.json") or None
+                overall = (structured or {}).get("overall_assessment") or {}
+                records[i] = {
+                    "interview_id": i,
+                    "job_id": _read_json(self.examples_dir / f"{i}.json").get("job_id"),
+                    "status": status.get("status"),
+                    "error": status.get("error"),
+                    "updated_at": (datetime.fromtimestamp(results_path.stat().st_mtime, timezone.utc).isoformat()
+                                   if results else None),
+                    "results": results,
+                    "structured": structured,
+                    "score": overall.get("quantitative_score"),
+                }
+            return records
+        return await asyncio.to_thread(_load)
+
     async def save_evaluation_results(self, interview_id: str, results: Dict[str, Any]) -> None:
         """
         Guarda resultados de evaluación en disco (JSON legible).
@@ -120,14 +220,59 @@ class FileMockRepository(EvaluatorRepository):
             json.dump(results, f, ensure_ascii=False, indent=2)
 
         print(f"[Evaluator] Results saved: {out_path}")  # --> Log simple a consola
+        self._record_scores(interview_id, "free_text", free_text_score_rows(results))
+
+    async def save_structured_evaluation(self, interview_id: str, evaluation: Dict[str, Any]) -> None:
+        """
+        Guarda la evaluación estructurada en out/structured/<interview_id>.json.
+        """
+        out_dir = self.out_dir / "structured"
+        out_dir.mkdir(parents=True, exist_ok=True)
+        out_path = out_dir / f"{interview_id}.json"
+        with open(out_path, "w", encoding="utf-8") as f:
+            json.dump(evaluation, f, ensure_ascii=False, indent=2)
+
+        print(f"[Evaluator] Structured evaluation saved: {out_path}")
+        self._record_scores(interview_id, "structured", structured_score_rows(evaluation))
+
+    def _record_scores(self, interview_id: str, source: str, rows: List[Dict[str, Any]]) -> None:
+        """
+        Reemplazo de los puntajes de `source` en out/scores/<id>.json (upsert + baja de los criterios que ya
+        no vienen) y el mismo delta que aplican los triggers de la migración 015 sobre out/score_stats.json
+        (sin awaits en el medio: atómico dentro del loop).
+        """
+        scores_path = self.out_dir / "scores" / f"{interview_id}.json"
+        current = _read_json(scores_path)
+        criteria = {r["criterion"] for r in rows}
+        stale = [c for c, r in current.items() if r.get("source") == source and c not in criteria]
+        if not rows and not stale:
+            return
+        stats_path = self.out_dir / "score_stats.json"
+        stats = _read_json(stats_path)
+        job_id = _read_json(self.examples_dir / f"{interview_id}.json").get("job_id")
+        old = [current[c] for c in stale] + [current[r["criterion"]] for r in rows if r["criterion"] in current]
+        apply_score_delta(stats, job_id, old, rows)
+        for criterion in stale:
+            del current[criterion]
+        current.update({r["criterion"]: r for r in rows})
+        scores_path.parent.mkdir(parents=True, exist_ok=True)
+        for path, data in ((scores_path, current), (stats_path, stats)):
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+
+    async def get_score_stats(self, job_id: Optional[str] = None) -> Dict[str, Any]:
+        scope = str(GLOBAL_JOB if job_id is None else job_id)
+        stats = _read_json(self.out_dir / "score_stats.json")
+        return summarize_stats([r for r in stats.values() if str(r["id_job"]) == scope], job_id)
 
     async def mark_evaluation_status(self, interview_id: str, status: str, error: Optional[str] = None) -> None:
         """
-        Publica un estado simple de la evaluación para consulta rápida
-        mientras no haya WebSocket/eventos.
+        Publica un estado simple de la evaluación para consulta rápida (archivo) y la transición
+        por Redis pub/sub para los endpoints SSE/long-poll (job_status).
 
-        Estados típicos: "queued", "running", "done", "error".
+        Estados típicos: "queued", "running", "retrying", "done", "error".
         """
+        await publish_status(interview_id, status, error) # --> Best-effort (no-op sin Redis)
         status_payload = {"interview_id": interview_id, "status": status} # --> Arma el sobre con el estado actual. Si hubo error, lo incluye. 
         if error:
             status_payload["error"] = error
@@ -137,3 +282,40 @@ class FileMockRepository(EvaluatorRepository):
             json.dump(status_payload, f, ensure_ascii=False, indent=2) # --> Escribe/actualiza un archivo Json con el estado. Formato legible.
 
         print(f"[Evaluator] Status: {status_payload}")  # --> Log a consola
+
+
+# --------------- Selección por ENV (API) ---------------
+def select_repository(kind: Optional[str] = None) -> EvaluatorRepository:
+    """
+    Mismo switch que el worker (EVALUATOR_REPO): "mock" -> FileMockRepository, "sqlite" -> SqliteRepository,
+    default -> SupabaseRepository. Los backends se importan acá adentro para no cargar lo que no se usa.
+    """
+    import os
+    kind = kind or os.getenv("EVALUATOR_REPO", "supabase")
+    if kind == "mock":
+        return FileMockRepository()
+    if kind == "sqlite":
+        from .repository_sqlite import SqliteRepository
+        return SqliteRepository()
+    from .repository_supabase import SupabaseRepository
+    return SupabaseRepository()
+
+# --------------- Singleton (API) ---------------
+_repo: Optional[EvaluatorRepository] = None
+
+def get_repository() -> EvaluatorRepository:
+    """
+    Instancia única por proceso para la API: un cliente Supabase / un writer SQLite (schema, triggers,
+    executor y conexiones) compartidos por todos los requests. Se cierra con close_repository() al apagar.
+    """
+    global _repo
+    if _repo is None:
+        _repo = select_repository()
+    return _repo
+
+async def close_repository() -> None:
+    """Cierra el repositorio compartido (vacía escrituras pendientes en SQLite)."""
+    global _repo
+    repo, _repo = _repo, None
+    if repo is not None:
+        await repo.close()
@@ -0,0 +1,340 @@
+# --*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*
+# services/evaluator/app/infrastructure/repository_sqlite.py
+# Repositorio SQLite embebido (EVALUATOR_REPO=sqlite) para pruebas de carga locales y deploys de un nodo.
+#   - una tabla interviews (contexto, estado, resultados, estructurada, score) con índices por status y job
+#   - WAL: lecturas concurrentes mientras se escribe; synchronous=NORMAL (un fsync por checkpoint, no por commit)
+#   - escrituras agrupadas: cada save/mark espera a que su lote se confirme (commit de grupo cada
+#     EVALUATOR_SQLITE_FLUSH_MS o EVALUATOR_SQLITE_BATCH escrituras), así cientos de jobs no hacen cientos de commits
+#   - evaluation_scores / evaluation_stats como en la migración 015 (mismos triggers, id_job '0' = global)
+# Los contextos salen de la tabla; si una entrevista no está, se importa desde examples/<id>.json (como el mock).
+# --*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*
+from __future__ import annotations
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+
+from .repository import EvaluatorRepository, _read_json
+from .job_status import publish_status
+from .score_stats import GLOBAL_JOB, RECOMMENDATIONS, free_text_score_rows, structured_score_rows, summarize_stats
+
+SQLITE_PATH     = os.getenv("EVALUATOR_SQLITE_PATH")                         # --> Default: out/evaluator.db
+SQLITE_FLUSH_MS = float(os.getenv("EVALUATOR_SQLITE_FLUSH_MS", "20"))        # --> Ventana para juntar escrituras
+SQLITE_BATCH    = int(os.getenv("EVALUATOR_SQLITE_BATCH", "200"))            # --> Escrituras por transacción (tope)
+
+Statement = Tuple[str, tuple]
+
+_CONTEXT_KEYS = ("interview_id", "system_prompt", "rubric", "jd", "full_transcript")
+_IN_CHUNK = 500  # --> Variables por "IN (...)" (SQLite viejos limitan a 999)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS interviews (
+    interview_id    TEXT PRIMARY KEY,
+    job_id          TEXT,
+    context_json    TEXT,
+    status          TEXT,
+    error           TEXT,
+    results_json    TEXT,
+    structured_json TEXT,
+    score           INTEGER,
+    created_at      TEXT NOT NULL,
+    updated_at      TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_interviews_status ON interviews(status, interview_id);
+CREATE INDEX IF NOT EXISTS idx_interviews_job ON interviews(job_id, interview_id);
+CREATE INDEX IF NOT EXISTS idx_interviews_created ON interviews(created_at);
+CREATE TABLE IF NOT EXISTS evaluation_scores (
+    interview_id    TEXT NOT NULL,
+    job_id          TEXT,
+    criterion       TEXT NOT NULL,
+    score           REAL,
+    recommendation  TEXT,
+    source          TEXT NOT NULL,
+    updated_at      TEXT NOT NULL,
+    PRIMARY KEY (interview_id, criterion)
+);
+CREATE INDEX IF NOT EXISTS idx_evaluation_scores_job ON evaluation_scores(job_id, criterion);
+CREATE TABLE IF NOT EXISTS evaluation_stats (
+    id_job          TEXT NOT NULL,
+    criterion       TEXT NOT NULL,
+    n               INTEGER NOT NULL DEFAULT 0,
+    scored          INTEGER NOT NULL DEFAULT 0,
+    score_sum       REAL NOT NULL DEFAULT 0,
+    score_sq_sum    REAL NOT NULL DEFAULT 0,
+    strong_hire     INTEGER NOT NULL DEFAULT 0,
+    hire            INTEGER NOT NULL DEFAULT 0,
+    no_hire         INTEGER NOT NULL DEFAULT 0,
+    strong_no_hire  INTEGER NOT NULL DEFAULT 0,
+    updated_at      TEXT,
+    PRIMARY KEY (id_job, criterion)
+);
+"""
+
+# --> Triggers de evaluation_stats (los de la migración 015): resta OLD y suma NEW en su job y en el global
+_STATS_DELTA = """
+INSERT INTO evaluation_stats (id_job, criterion, n, scored, score_sum, score_sq_sum, {recs}, updated_at)
+SELECT scope, {row}.criterion, {sign}, CASE WHEN {row}.score IS NULL THEN 0 ELSE {sign} END,
+       {sign} * COALESCE({row}.score, 0), {sign} * COALESCE({row}.score, 0) * COALESCE({row}.score, 0),
+       {rec_values}, {row}.updated_at
+FROM (SELECT '{global_job}' AS scope UNION SELECT {row}.job_id WHERE {row}.job_id IS NOT NULL)
+WHERE true
+ON CONFLICT(id_job, criterion) DO UPDATE SET
+    n = n + excluded.n, scored = scored + excluded.scored, score_sum = score_sum + excluded.score_sum,
+    score_sq_sum = score_sq_sum + excluded.score_sq_sum, {rec_sets}, updated_at = excluded.updated_at;
+"""
+
+def _stats_triggers() -> str:
+    def _delta(row: str, sign: int) -> str:
+        return _STATS_DELTA.format(
+            row=row, sign=sign, global_job=GLOBAL_JOB, recs=", ".join(RECOMMENDATIONS),
+            rec_values=", ".join(f"CASE WHEN {row}.recommendation = '{r}' THEN {sign} ELSE 0 END" for r in RECOMMENDATIONS),
+            rec_sets=", ".join(f"{r} = {r} + excluded.{r}" for r in RECOMMENDATIONS))
+    return "".join(
+        f"CREATE TRIGGER IF NOT EXISTS trg_evaluation_scores_{event.lower()} AFTER {event} ON evaluation_scores "
+        f"BEGIN {''.join(_delta(row, sign) for row, sign in deltas)} END;\n"
+        for event, deltas in (("INSERT", [("NEW", 1)]), ("UPDATE", [("OLD", -1), ("NEW", 1)]),
+                              ("DELETE", [("OLD", -1)])))
+
+_UPSERT_SCORE = """
+INSERT INTO evaluation_scores (interview_id, job_id, criterion, score, recommendation, source, updated_at)
+VALUES (?, (SELECT job_id FROM interviews WHERE interview_id = ?), ?, ?, ?, ?, ?)
+ON CONFLICT(interview_id, criterion) DO UPDATE SET job_id = excluded.job_id, score = excluded.score,
+    recommendation = excluded.recommendation, source = excluded.source, updated_at = excluded.updated_at
+"""
+
+# --> Puntajes de una fuente que no están en la escritura nueva (el trigger de DELETE los resta)
+_DELETE_STALE_SCORES = """
+DELETE FROM evaluation_scores
+WHERE interview_id = ? AND source = ? AND criterion NOT IN (SELECT value FROM json_each(?))
+"""
+
+# --> Upserts: sólo tocan sus columnas (una fila por entrevista, se crea con la primera escritura)
+_UPSERT = """
+INSERT INTO interviews (interview_id, {cols}, created_at, updated_at) VALUES (?, {marks}, ?, ?)
+ON CONFLICT(interview_id) DO UPDATE SET {sets}, updated_at = excluded.updated_at
+"""
+
+def _upsert_sql(cols: Sequence[str]) -> str:
+    return _UPSERT.format(cols=", ".join(cols), marks=", ".join("?" for _ in cols),
+                          sets=", ".join(f"{c} = excluded.{c}" for c in cols))
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+def _loads(raw: Optional[str]) -> Optional[Dict[str, Any]]:
+    return json.loads(raw) if raw else None
+
+
+class SqliteRepository(EvaluatorRepository):
+    """
+    Contrato del Evaluator sobre SQLite (archivo único, sin servidor).
+    Una conexión de escritura en su propio thread (commit de grupo) y una por thread para lecturas.
+    """
+
+    def __init__(self, examples_dir: Optional[Path] = None, out_dir: Optional[Path] = None,
+                 db_path: Optional[Path] = None) -> None:
+        base_dir = Path(__file__).resolve().parents[2]   # --> / "services" / "evaluator"
+        self.examples_dir = examples_dir or (base_dir / "examples")
+        self.out_dir = out_dir or (base_dir / "out")
+        self.db_path = Path(db_path or SQLITE_PATH or (self.out_dir / "evaluator.db"))
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite-writer")
+        self._local = threading.local()  # --> Conexión por thread (sqlite3 no comparte conexiones entre threads)
+        self._pending: List[Tuple[List[Statement], asyncio.Future]] = []
+        self._flush_task: Optional[asyncio.Task] = None
+        conn = self._connect()
+        try:
+            conn.executescript(_SCHEMA + _stats_triggers())
+        finally:
+            conn.close()
+
+    # --------------- Conexiones ---------------
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)  # --> Transacciones explícitas
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=30000")
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    async def _read(self, sql: str, params: Sequence[Any] = ()) -> List[sqlite3.Row]:
+        return await asyncio.to_thread(lambda: self._conn().execute(sql, tuple(params)).fetchall())
+
+    # --------------- Escrituras agrupadas ---------------
+    def _apply(self, batch: List[List[Statement]]) -> List[Optional[Exception]]:
+        """Un lote en UNA transacción; si algo falla, se reintenta cada escritura sola para aislar el error."""
+        conn = self._conn()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for statements in batch:
+                for sql, params in statements:
+                    conn.execute(sql, params)
+            conn.execute("COMMIT")
+            return [None] * len(batch)
+        except Exception:
+            conn.execute("ROLLBACK")
+        errors: List[Optional[Exception]] = []
+        for statements in batch:
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                for sql, params in statements:
+                    conn.execute(sql, params)
+                conn.execute("COMMIT")
+                errors.append(None)
+            except Exception as e:
+                conn.execute("ROLLBACK")
+                errors.append(e)
+        return errors
+
+    async def _write(self, *statements: Statement) -> None:
+        """Encola una escritura (sus sentencias van juntas) y espera a que su lote esté confirmado."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((list(statements), future))
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = loop.create_task(self._flush())
+        await future
+
+    async def _flush(self) -> None:
+        loop = asyncio.get_running_loop()
+        await asyncio.sleep(SQLITE_FLUSH_MS / 1000)  # --> Junta lo que llegue en la ventana
+        while self._pending:
+            batch, self._pending = self._pending[:SQLITE_BATCH], self._pending[SQLITE_BATCH:]
+            try:
+                errors = await loop.run_in_executor(self._writer, self._apply, [st for st, _ in batch])
+            except Exception as e:
+                errors = [e] * len(batch)
+            for (_, future), error in zip(batch, errors):
+                if future.done():
+                    continue  # --> El que esperaba se canceló
+                if error is None:
+                    future.set_result(None)
+                else:
+                    future.set_exception(error)
+
+    async def close(self) -> None:
+        """Confirma lo pendiente y libera el thread de escritura."""
+        if self._flush_task is not None and not self._flush_task.done():
+            await self._flush_task
+        self._writer.shutdown(wait=True)
+
+    # --------------- Contexto ---------------
+    async def _import_context(self, interview_id: str) -> Optional[Dict[str, Any]]:
+        data = await asyncio.to_thread(_read_json, self.examples_dir / f"{interview_id}.json")
+        if not data:
+            return None
+        context = {k: data.get(k) for k in _CONTEXT_KEYS}
+        now = _now_iso()
+        await self._write((_upsert_sql(["job_id", "context_json"]),
+                           (interview_id, data.get("job_id"), json.dumps(context, ensure_ascii=False), now, now)))
+        return context
+
+    async def warmup(self) -> None:
+        """Importa de una vez los ejemplos que todavía no están en la tabla (list_interview_ids los ve)."""
+        known = {r["interview_id"] for r in await self._read("SELECT interview_id FROM interviews "
+                                                             "WHERE context_json IS NOT NULL")}
+        missing = [p.stem for p in sorted(self.examples_dir.glob("*.json")) if p.stem not in known]
+        imported = await asyncio.gather(*[self._import_context(i) for i in missing])
+        count = sum(1 for c in imported if c)
+        if count:
+            print(f"[Evaluator] SQLite: {count} contextos importados de {self.examples_dir} -> {self.db_path}")
+
+    async def get_interview_context(self, interview_id: str) -> Dict[str, Any]:
+        rows = await self._read("SELECT context_json FROM interviews WHERE interview_id = ?", (interview_id,))
+        context = _loads(rows[0]["context_json"]) if rows else None
+        if context is None:
+            context = await self._import_context(interview_id)
+        if context is None:
+            raise FileNotFoundError(f"Interview {interview_id} not in {self.db_path} nor {self.examples_dir}")
+        missing = set(_CONTEXT_KEYS) - {k for k, v in context.items() if v is not None}
+        if missing:
+            raise KeyError(f"Missing keys in SQLite context: {missing}")
+        return context
+
+    # --------------- Selección / lectura en lote ---------------
+    async def list_interview_ids(self, status: Optional[str] = None, since: Optional[str] = None,
+                                 until: Optional[str] = None, limit: Optional[int] = None,
+                                 job_id: Optional[str] = None) -> List[str]:
+        """IDs (orden por id) filtrados por status / created_at / job_id: salen de los índices."""
+        where, params = [], []
+        for clause, value in (("status = ?", status), ("created_at >= ?", since), ("created_at < ?", until),
+                              ("job_id = ?", None if job_id is None else str(job_id))):
+            if value is not None:
+                where.append(clause)
+                params.append(value)
+        sql = "SELECT interview_id FROM interviews" + (" WHERE " + " AND ".join(where) if where else "")
+        sql += " ORDER BY interview_id" + (" LIMIT ?" if limit else "")
+        return [r["interview_id"] for r in await self._read(sql, params + ([limit] if limit else []))]
+
+    async def get_evaluation_records(self, interview_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        rows: Dict[str, sqlite3.Row] = {}
+        for i in range(0, len(interview_ids), _IN_CHUNK):
+            chunk = [str(x) for x in interview_ids[i:i + _IN_CHUNK]]
+            sql = ("SELECT interview_id, job_id, status, error, results_json, structured_json, score, updated_at "
+                   f"FROM interviews WHERE interview_id IN ({', '.join('?' for _ in chunk)})")
+            rows.update({r["interview_id"]: r for r in await self._read(sql, chunk)})
+        records = {}
+        for interview_id in interview_ids:
+            row = rows.get(str(interview_id))
+            results = _loads(row["results_json"]) if row else None
+            records[interview_id] = {
+                "interview_id": interview_id,
+                "job_id": row["job_id"] if row else None,
+                "status": row["status"] if row else None,
+                "error": row["error"] if row else None,
+                "updated_at": row["updated_at"] if row and results else None,
+                "results": results,
+                "structured": _loads(row["structured_json"]) if row else None,
+                "score": row["score"] if row else None,
+            }
+        return records
+
+    # --------------- Puntajes / estadísticas ---------------
+    @staticmethod
+    def _score_statements(interview_id: str, source: str, rows: List[Dict[str, Any]], now: str) -> List[Statement]:
+        """
+        Reemplazo de los puntajes de `source`: borra los criterios que ya no vienen y upsert de los nuevos
+        (los triggers actualizan evaluation_stats en la misma transacción).
+        """
+        criteria = json.dumps([r["criterion"] for r in rows])
+        return [(_DELETE_STALE_SCORES, (interview_id, source, criteria))] + [(_UPSERT_SCORE, (interview_id, interview_id, r["criterion"], r["score"], r["recommendation"],
+                                 r["source"], now)) for r in rows]
+
+    async def get_score_stats(self, job_id: Optional[str] = None) -> Dict[str, Any]:
+        scope = str(GLOBAL_JOB if job_id is None else job_id)
+        rows = await self._read("SELECT * FROM evaluation_stats WHERE id_job = ?", (scope,))
+        return summarize_stats([dict(r) for r in rows], job_id)
+
+    # --------------- Persistencia ---------------
+    async def save_evaluation_results(self, interview_id: str, results: Dict[str, Any]) -> None:
+        now = _now_iso()
+        await self._write((_upsert_sql(["results_json"]), (interview_id, json.dumps(results, ensure_ascii=False), now, now)),
+                          *self._score_statements(interview_id, "free_text", free_text_score_rows(results), now))
+        print(f"[Evaluator] Results saved: {self.db_path.name}#{interview_id}")
+
+    async def save_structured_evaluation(self, interview_id: str, evaluation: Dict[str, Any]) -> None:
+        score = (evaluation.get("overall_assessment") or {}).get("quantitative_score")
+        typed_score = int(round(score)) if isinstance(score, (int, float)) else None
+        now = _now_iso()
+        await self._write((_upsert_sql(["structured_json", "score"]),
+                           (interview_id, json.dumps(evaluation, ensure_ascii=False), typed_score, now, now)),
+                          *self._score_statements(interview_id, "structured", structured_score_rows(evaluation), now))
+        print(f"[Evaluator] Structured evaluation saved: {self.db_path.name}#{interview_id} (score={typed_score})")
+
+    async def mark_evaluation_status(self, interview_id: str, status: str, error: Optional[str] = None) -> None:
+        await publish_status(interview_id, status, error) # --> Best-effort (no-op sin Redis)
+        now = _now_iso()
+        await self._write((_upsert_sql(["status", "error"]), (interview_id, status, error, now, now)))
+        print(f"[Evaluator] Status: {{'interview_id': {interview_id!r}, 'status': {status!r}}}")
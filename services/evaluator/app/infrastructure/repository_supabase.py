@@ -6,30 +6,52 @@
 # --*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*
 
 from __future__ import annotations
-from typing import Dict, Any, Optional, List
+from typing import TYPE_CHECKING, Dict, Any, Optional, List
 from datetime import datetime, timezone
-import os, json
-from postgrest.exceptions import APIError
+import os, json, asyncio
 
-
-# NICO --> SDK Supabase
-from supabase import create_client, Client
+# NICO --> SDK Supabase: se importa al crear el repo (_load_sdk), no al importar el módulo
+#          (supabase + postgrest + httpx suman ~0.3s a cada arranque de worker/run_one, aunque se use mock)
+if TYPE_CHECKING:
+    from supabase import Client
+create_client = None
+APIError: Any = None
 
 # NICO --> Contrato base
 from .repository import EvaluatorRepository
+from .transcript_utils import format_ts, extract_transcript_from_context_data, transcript_from_messages
+from .persistence.postgres.context_loader import get_context_loader, PG_DSN
+from .prompt_cache import get_prompt_cache
+from .job_status import publish_status
+from .score_stats import GLOBAL_JOB, free_text_score_rows, structured_score_rows, summarize_stats
+
+# NICO --> Defaults si no hay prompts cargados en la tabla 'prompts'
+DEFAULT_SYSTEM_PROMPT = "You are an expert technical evaluator. Output concise, rubric-based evaluation."
+DEFAULT_RUBRIC = "Criteria: Problem Solving, Python, APIs/HTTP, Databases/SQL, Communication. Rate 1-5 and justify briefly. End with Overall Verdict: Hire/No Hire."
+
+
+def _load_sdk() -> None:
+    global create_client, APIError
+    if create_client is None:
+        from supabase import create_client as sdk_create_client
+        create_client = sdk_create_client
+    if APIError is None:
+        from postgrest.exceptions import APIError as sdk_api_error
+        APIError = sdk_api_error
 
 
 # --------------- Helpers de tiempo / util ---------------
-def _ts(dt: Optional[str]) -> str:
-    """
-    # NICO --> Normaliza fechas a 'YYYY-MM-DD HH:MM' (para transcript de messages).
-    """
-    if not dt:
-        return ""
+def _read_local(path) -> Optional[Dict[str, Any]]:
+    """Fallback local (mismo formato que el mock); None si no hay archivo."""
     try:
-        return datetime.fromisoformat(dt.replace("Z", "+00:00")).strftime("%Y-%m-%d %H:%M")
-    except Exception:
-        return str(dt)
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+# NICO --> Los helpers de transcript viven en transcript_utils (sin SDKs) y se comparten con el loader Postgres.
+_ts = format_ts
+_extract_transcript_from_context_data = extract_transcript_from_context_data
 
 def _now_iso() -> str:
     """
@@ -37,47 +59,6 @@ def _now_iso() -> str:
     """
     return datetime.now(timezone.utc).isoformat()
 
-# --- Helper: intentar extraer texto de context_data (jsonb) ---
-def _extract_transcript_from_context_data(ctx_obj: Any) -> Optional[str]:
-    # NICO --> Si viene como string JSON, parseamos
-    if isinstance(ctx_obj, str):
-        try:
-            ctx_obj = json.loads(ctx_obj)
-        except Exception:
-            return None
-
-    if not isinstance(ctx_obj, dict):
-        return None
-
-    # 1) Claves directas frecuentes
-    for k in ("full_text", "fullTranscript", "transcript", "content", "text"):
-        v = ctx_obj.get(k)
-        if isinstance(v, str) and v.strip():
-            return v.strip()
-        if isinstance(v, list):
-            joined = "\n".join([str(x) for x in v if isinstance(x, (str, int, float))])
-            if joined.strip():
-                return joined.strip()
-
-    # 2) Conversación como lista de mensajes
-    msgs = ctx_obj.get("messages") or ctx_obj.get("conversation") or ctx_obj.get("turns")
-    if isinstance(msgs, list):
-        lines = []
-        for m in msgs:
-            if isinstance(m, dict):
-                role = (m.get("role") or "").strip()
-                content = (m.get("content") or "").strip()
-                created = _ts(m.get("created_at") or m.get("ts"))
-                prefix = f"[{created}] " if created else ""
-                rolep  = f"{role}: " if role else ""
-                line = f"{prefix}{rolep}{content}".strip()
-                if line:
-                    lines.append(line)
-        if lines:
-            return "\n".join(lines)
-
-    return None
-
 
 # --------------- Clase SupabaseRepository ---------------
 class SupabaseRepository(EvaluatorRepository):
@@ -87,6 +68,7 @@ class SupabaseRepository(EvaluatorRepository):
       - jobs -> jd
       - prompts -> últimos por tipo ('evaluator_system' y 'evaluator_rubric')
       - transcript -> primero en interview_full_conversations; si no, desde interview_messages
+      - evaluation_scores -> puntajes por criterio; evaluation_stats -> agregados (trigger)
     """
 
     # --------------- Client init ---------------
@@ -99,6 +81,7 @@ class SupabaseRepository(EvaluatorRepository):
         key = os.getenv("SUPABASE_SERVICE_ROLE_KEY") or os.getenv("SUPABASE_ANON_KEY")
         if not url or not key:
             raise RuntimeError("Faltan SUPABASE_URL y/o SUPABASE_SERVICE_ROLE_KEY en el entorno (.env).")
+        _load_sdk()  # --> También deja APIError listo para los except de abajo
         self.sb: Client = create_client(url, key)
 
     # --------------- Lecturas base ---------------
@@ -152,24 +135,41 @@ class SupabaseRepository(EvaluatorRepository):
             raise ValueError(f"No existe jobs.id_job={job_id}")
         return rows[0].get("description") or ""
 
+    def _fetch_prompt_latest(self, prompt_type: str) -> Optional[str]:
+        """
+        # NICO --> Último contenido por tipo en 'prompts'. Si no hay, None. Errores de red/DB se propagan.
+        """
+        q = (self.sb.table("prompts")
+                 .select("content,updated_at,created_at,id")
+                 .eq("prompt_type", prompt_type)
+                 .order("updated_at", desc=True)
+                 .order("created_at", desc=True)
+                 .order("id", desc=True)
+                 .limit(1))
+        res = q.execute()
+        rows = res.data or []
+        return rows[0]["content"] if rows else None
+
     def _get_prompt_latest(self, prompt_type: str) -> Optional[str]:
         """
-        # NICO --> Último contenido por tipo en 'prompts'. Si no hay, None.
+        # NICO --> Igual que _fetch_prompt_latest pero sin romper: ante error devuelve None.
         """
         try:
-            q = (self.sb.table("prompts")
-                     .select("content,updated_at,created_at,id")
-                     .eq("prompt_type", prompt_type)
-                     .order("updated_at", desc=True)
-                     .order("created_at", desc=True)
-                     .order("id", desc=True)
-                     .limit(1))
-            res = q.execute()
-            rows = res.data or []
-            return rows[0]["content"] if rows else None
+            return self._fetch_prompt_latest(prompt_type)
         except Exception:
             return None
 
+    async def _get_prompt_cached(self, prompt_type: str) -> Optional[str]:
+        """
+        # NICO --> Prompt desde el cache in-process (TTL + invalidación desde Core).
+        #          Si la lectura falla no se cachea y se usa el default.
+        """
+        try:
+            return await get_prompt_cache().get_or_load(prompt_type, lambda: self._fetch_prompt_latest(prompt_type))
+        except Exception as e:
+            print(f"[Evaluator] WARNING: no pude leer prompt '{prompt_type}': {e}")
+            return None
+
     # --------------- Transcript: full_conversations primero ---------------
     # NICO --> IMPORTANTE: agregá este import arriba del archivo
 # from postgrest.exceptions import APIError
@@ -295,15 +295,21 @@ class SupabaseRepository(EvaluatorRepository):
         if not rows:
             return None
 
-        lines: List[str] = []
-        for r in rows:
-            role = r.get("role", "unknown")
-            content = (r.get("content") or "").strip()
-            created = _ts(r.get("created_at"))
-            lines.append(f"[{created}] {role}: {content}" if created else f"{role}: {content}")
-        print(f"[DEBUG] transcript assembled from messages (count={len(lines)})")
-        return "\n".join(lines)
+        print(f"[DEBUG] transcript assembled from messages (count={len(rows)})")
+        return transcript_from_messages(rows)
+
 
+    # --------------- Ciclo de vida ---------------
+    async def warmup(self) -> None:
+        """
+        Si hay DSN de Postgres, abre el pool y sondea el schema una sola vez al arrancar
+        (columnas/tablas disponibles) para que cada contexto salga en 1 round trip.
+        """
+        if PG_DSN:
+            try:
+                await get_context_loader().start()
+            except Exception as e:
+                print(f"[Evaluator] WARNING: loader Postgres no disponible, sigo con PostgREST: {e}")
 
     # --------------- Implementación: armar contexto ---------------
     async def get_interview_context(self, interview_id: str) -> Dict[str, Any]:
@@ -314,7 +320,20 @@ class SupabaseRepository(EvaluatorRepository):
           3) prompts -> system_prompt & rubric (o defaults)
           4) transcript -> full_conversations o messages
           5) retorna dict con 5 claves para Interview.from_dict
+
+        Con EVALUATOR_PG_DSN los 4 pasos salen de UNA query sobre un pool asyncpg;
+        sin DSN (o si el pool falla) se usa el camino PostgREST de siempre.
         """
+        if PG_DSN:
+            try:
+                ctx = await get_context_loader().load(interview_id)
+                return self._finalize_context(interview_id, ctx["jd"], ctx["system_prompt"],
+                                              ctx["rubric"], ctx["full_transcript"])
+            except (ValueError, KeyError):
+                raise # --> Entrevista/job inexistente: mismo error que el camino PostgREST
+            except Exception as e:
+                print(f"[Evaluator] WARNING: loader Postgres falló ({e}); fallback a PostgREST")
+
         # 1) entrevista
         irow = self._get_interview_row(interview_id)
         job_id = irow.get("id_job")
@@ -322,27 +341,137 @@ class SupabaseRepository(EvaluatorRepository):
         # 2) job description
         jd = self._get_job_description(job_id) if job_id is not None else ""
 
-        # 3) prompts (últimos por tipo) o defaults
-        system_prompt = self._get_prompt_latest("evaluator_system") or \
-                        "You are an expert technical evaluator. Output concise, rubric-based evaluation."
-        rubric = self._get_prompt_latest("evaluator_rubric") or \
-                 "Criteria: Problem Solving, Python, APIs/HTTP, Databases/SQL, Communication. Rate 1-5 and justify briefly. End with Overall Verdict: Hire/No Hire."
+        # 3) prompts (últimos por tipo, desde el cache de prompts)
+        system_prompt = await self._get_prompt_cached("evaluator_system")
+        rubric = await self._get_prompt_cached("evaluator_rubric")
 
         # 4) transcript
         full_transcript = (self._get_transcript_from_full_conversations(interview_id)
                            or self._get_transcript_from_messages(interview_id))
+
+        return self._finalize_context(interview_id, jd, system_prompt, rubric, full_transcript)
+
+    @staticmethod
+    def _finalize_context(interview_id: str, jd: Optional[str], system_prompt: Optional[str],
+                          rubric: Optional[str], full_transcript: Optional[str]) -> Dict[str, Any]:
+        """Aplica defaults de prompts, valida transcript y arma el dict de 5 claves."""
         if not full_transcript:
             raise ValueError(f"No hay transcript para interview_id={interview_id} (ni en full_conversations ni en messages).")
 
         # 5) respuesta final
         return {
             "interview_id": str(interview_id),
-            "system_prompt": system_prompt,
-            "rubric": rubric,
-            "jd": jd,
+            "system_prompt": system_prompt or DEFAULT_SYSTEM_PROMPT,
+            "rubric": rubric or DEFAULT_RUBRIC,
+            "jd": jd or "",
             "full_transcript": full_transcript,
         }
 
+    # --------------- Selección para re-evaluación masiva ---------------
+    async def list_interview_ids(self, status: Optional[str] = None, since: Optional[str] = None,
+                                 until: Optional[str] = None, limit: Optional[int] = None,
+                                 job_id: Optional[str] = None, page_size: int = 1000) -> List[str]:
+        """
+        IDs de interviews (orden por id), paginado por keyset (id > último) para no degradar con OFFSET.
+          - status: evaluation_status exacto ('done', 'error', ...)
+          - since/until: rango sobre timestamp_created (ISO 8601)
+          - job_id: entrevistas de un job (reportes)
+        """
+        ids: List[str] = []
+        last: Optional[int] = None
+        while True:
+            q = self.sb.table("interviews").select("id_interview").order("id_interview")
+            if last is not None:
+                q = q.gt("id_interview", last)
+            if status:
+                q = q.eq("evaluation_status", status)
+            if since:
+                q = q.gte("timestamp_created", since)
+            if until:
+                q = q.lt("timestamp_created", until)
+            if job_id is not None:
+                q = q.eq("id_job", int(job_id) if str(job_id).isdigit() else job_id)
+            size = min(page_size, limit - len(ids)) if limit else page_size
+            rows = (q.limit(size).execute()).data or []
+            ids.extend(str(r["id_interview"]) for r in rows)
+            if len(rows) < size or (limit and len(ids) >= limit):
+                return ids
+            last = rows[-1]["id_interview"]
+
+    # --------------- Lectura en lote (reportes) ---------------
+    def _fetch_evaluation_rows(self, interview_ids: List[str]) -> List[Dict[str, Any]]:
+        """
+        # NICO --> UNA query por lote (in_) en vez de una por entrevista. select("*") porque las columnas
+        #          de evaluación dependen del schema (evaluation_results_json o evaluation_<n>_text).
+        """
+        keys = [int(i) if str(i).strip().isdigit() else str(i).strip() for i in interview_ids]
+        return (self.sb.table("interviews").select("*").in_("id_interview", keys).execute()).data or []
+
+    async def get_evaluation_records(self, interview_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Records de un lote de entrevistas. Lo que no está en DB se busca en los fallbacks locales
+        (out/evaluations, out/structured) que usan save_evaluation_results / save_structured_evaluation.
+        El SDK es síncrono: la query corre en un thread para no frenar el event loop.
+        """
+        from pathlib import Path
+
+        rows = await asyncio.to_thread(self._fetch_evaluation_rows, interview_ids)
+        by_id = {str(r.get("id_interview")): r for r in rows}
+        base_dir = Path(__file__).resolve().parents[2] / "out"  # .../services/evaluator/out
+        records: Dict[str, Dict[str, Any]] = {}
+        for interview_id in interview_ids:
+            row = by_id.get(str(interview_id).strip(), {})
+            results = row.get("evaluation_results_json")
+            if not results and any(row.get(f"evaluation_{n}_text") for n in (1, 2, 3)):
+                results = {f"evaluation_{n}": row.get(f"evaluation_{n}_text") for n in (1, 2, 3)}
+            structured = row.get("evaluation_structured_json")
+            records[interview_id] = {
+                "interview_id": interview_id,
+                "job_id": row.get("id_job"),
+                "status": row.get("evaluation_status"),
+                "error": row.get("evaluation_error"),
+                "updated_at": row.get("evaluation_updated_at"),
+                "results": results or _read_local(base_dir / "evaluations" / f"{interview_id}.json"),
+                "structured": structured or _read_local(base_dir / "structured" / f"{interview_id}.json"),
+                "score": row.get("score"),
+            }
+        return records
+
+    # --------------- Puntajes tipados / estadísticas (migración 015) ---------------
+    def _upsert_scores(self, interview_id: str, source: str, rows: List[Dict[str, Any]]) -> None:
+        irow = self._get_interview_row(interview_id) # --> id_job para el agregado por job
+        # --> Criterios de esta fuente que ya no vienen (otra rúbrica / criterio ausente): se borran y el
+        #     trigger de DELETE los resta de evaluation_stats
+        stale = (self.sb.table("evaluation_scores").delete()
+                 .eq("id_interview", irow["id_interview"]).eq("source", source))
+        if rows:
+            stale = stale.not_.in_("criterion", [row["criterion"] for row in rows])
+        stale.execute()
+        if not rows:
+            return
+        now = _now_iso()
+        payload = [{"id_interview": irow["id_interview"], "id_job": irow.get("id_job"), **row, "updated_at": now}
+                   for row in rows]
+        self.sb.table("evaluation_scores").upsert(payload, on_conflict="id_interview,criterion").execute()
+
+    async def _save_scores(self, interview_id: str, source: str, rows: List[Dict[str, Any]]) -> None:
+        """
+        Reemplaza los puntajes por criterio de `source` (borra los que no vienen + upsert de los nuevos);
+        el trigger de la tabla actualiza evaluation_stats.
+        Best-effort: sin la migración aplicada las evaluaciones se guardan igual.
+        """
+        try:
+            await asyncio.to_thread(self._upsert_scores, interview_id, source, rows)
+        except Exception as e:
+            print(f"[Evaluator] WARNING: evaluation_scores not updated for interview={interview_id}: {e}")
+
+    async def get_score_stats(self, job_id: Optional[str] = None) -> Dict[str, Any]:
+        """Filas ya agregadas de evaluation_stats (id_job = 0 -> global): una lectura chica, sin recorrer JSON."""
+        scope = GLOBAL_JOB if job_id is None else int(job_id) if str(job_id).strip().isdigit() else job_id
+        rows = await asyncio.to_thread(
+            lambda: (self.sb.table("evaluation_stats").select("*").eq("id_job", scope).execute()).data or [])
+        return summarize_stats(rows, job_id)
+
     # --------------- Persistencia: resultados ---------------
     async def save_evaluation_results(self, interview_id: str, results: Dict[str, Any]) -> None:
         """
@@ -351,9 +480,12 @@ class SupabaseRepository(EvaluatorRepository):
           - evaluation_status='done'
           - evaluation_updated_at=now()
         Si falla (columna o permisos), cae a fallback local.
+        Además deja el puntaje/veredicto leído del texto en evaluation_scores (migración 015).
         """
         from pathlib import Path
 
+        await self._save_scores(interview_id, "free_text", free_text_score_rows(results))
+
         # NICO --> Intento A: JSON completo en una sola columna (preferido)
         payloads = [
             {
@@ -405,14 +537,64 @@ class SupabaseRepository(EvaluatorRepository):
         except Exception as e:
             print(f"[Evaluator] ERROR saving results locally: {e} (previous DB error: {last_error})")
 
+    # --------------- Persistencia: evaluación estructurada ---------------
+    async def save_structured_evaluation(self, interview_id: str, evaluation: Dict[str, Any]) -> None:
+        """
+        Guarda la evaluación estructurada una sola vez, ya tipada:
+          - evaluation_structured_json (JSONB) + score (INTEGER 0-100, columna existente de interviews)
+        Si la columna JSONB no existe se guarda sólo el score; si todo falla, fallback local.
+        Los puntajes por criterio van a evaluation_scores (migración 015).
+        """
+        from pathlib import Path
+
+        await self._save_scores(interview_id, "structured", structured_score_rows(evaluation))
+
+        overall = evaluation.get("overall_assessment") or {}
+        score = overall.get("quantitative_score")
+        typed_score = int(round(score)) if isinstance(score, (int, float)) else None
+
+        payloads = [
+            {"evaluation_structured_json": evaluation, "score": typed_score, "evaluation_updated_at": _now_iso()},
+            {"score": typed_score, "evaluation_updated_at": _now_iso()},
+        ]
+        last_error = None
+        for payload in payloads:
+            for key in (int(str(interview_id).strip()) if str(interview_id).strip().isdigit() else None,
+                        str(interview_id).strip()):
+                if key is None:
+                    continue
+                try:
+                    self.sb.table("interviews").update(payload).eq("id_interview", key).execute()
+                    print(f"[Evaluator] Structured evaluation saved in DB for interview={interview_id} (score={typed_score})")
+                    if "evaluation_structured_json" in payload:
+                        return
+                    break # --> Sólo el score: igual dejamos el JSON completo en disco
+                except Exception as e:
+                    last_error = e
+
+        # Fallback local (el JSON completo no entró en DB)
+        try:
+            base_dir = Path(__file__).resolve().parents[2]  # .../services/evaluator
+            out_dir = base_dir / "out" / "structured"
+            out_dir.mkdir(parents=True, exist_ok=True)
+            out_path = out_dir / f"{interview_id}.json"
+            with open(out_path, "w", encoding="utf-8") as f:
+                json.dump(evaluation, f, ensure_ascii=False, indent=2)
+            print(f"[Evaluator] Local structured evaluation saved: {out_path} (DB error: {last_error})")
+        except Exception as e:
+            print(f"[Evaluator] ERROR saving structured evaluation locally: {e} (previous DB error: {last_error})")
+
     # --------------- Persistencia: estado ---------------
     async def mark_evaluation_status(self, interview_id: str, status: str, error: Optional[str] = None) -> None:
         """
-        Estados sugeridos: queued | running | done | error
-        Intenta actualizar columnas; si falla, escribe fallback local.
+        Estados sugeridos: queued | running | retrying | done | error
+        Publica la transición (pub/sub para SSE/long-poll) y después intenta actualizar columnas;
+        si falla, escribe fallback local.
         """
         from pathlib import Path
 
+        await publish_status(interview_id, status, error) # --> Best-effort: no depende de que la DB responda
+
         payload = {
             "evaluation_status": status,
             "evaluation_updated_at": _now_iso(),
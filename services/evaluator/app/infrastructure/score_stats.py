@@ -0,0 +1,121 @@
+# --*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*
+# services/evaluator/app/infrastructure/score_stats.py
+# Puntajes tipados por criterio + estadísticas pre-agregadas (migración 015):
+#   - evaluation_scores: una fila por (entrevista, criterio) con el puntaje normalizado 0..1
+#       "overall" sale de quantitative_score/100 (estructurada) o de los "x/5" del texto libre;
+#       "technical.<criterio>" / "behavioral.<criterio>" salen de la escala very_weak..very_strong
+#   - evaluation_stats: contadores por (job, criterio) y globales (id_job = 0) que mantienen los triggers
+#       al insertar / pisar / borrar puntajes: n, suma, suma de cuadrados y recomendaciones.
+# Los endpoints /stats leen esas filas (O(1) por job) en vez de recorrer los JSON de evaluaciones.
+# --*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*
+from __future__ import annotations
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional
+import math
+
+from .ensemble import extract_verdict
+
+# --> Escala de la rúbrica -> 0..1 (not_applicable no cuenta)
+CRITERION_LEVELS = {"very_weak": 0.0, "weak": 1 / 3, "strong": 2 / 3, "very_strong": 1.0}
+RECOMMENDATIONS = ("strong_hire", "hire", "no_hire", "strong_no_hire")
+SECTIONS = {"technical_evaluation": "technical", "behavioral_evaluation": "behavioral"}
+FREE_TEXT_COLUMNS = ("evaluation_1", "evaluation_2", "evaluation_3")
+
+GLOBAL_JOB = 0  # --> id_job de las filas globales en evaluation_stats
+STAT_COUNTERS = ("n", "scored", "score_sum", "score_sq_sum") + RECOMMENDATIONS
+
+
+def _row(criterion: str, score: Optional[float], recommendation: Optional[str], source: str) -> Dict[str, Any]:
+    return {"criterion": criterion, "score": None if score is None else round(float(score), 4),
+            "recommendation": recommendation if recommendation in RECOMMENDATIONS else None, "source": source}
+
+def free_text_verdict(results: Dict[str, Any]) -> Dict[str, Any]:
+    """Puntaje promedio (0..1) y recomendación más repetida de las evaluaciones de texto libre."""
+    verdicts = [extract_verdict(results.get(c)) for c in FREE_TEXT_COLUMNS]
+    scores = [v.score for v in verdicts if v.score is not None]
+    votes = Counter(v.recommendation for v in verdicts if v.recommendation)
+    return {"score": sum(scores) / len(scores) if scores else None,
+            "recommendation": votes.most_common(1)[0][0] if votes else None}
+
+def free_text_score_rows(results: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """La fila "overall" de una evaluación de texto libre (ninguna si no se pudo leer nada)."""
+    verdict = free_text_verdict(results or {})
+    if verdict["score"] is None and verdict["recommendation"] is None:
+        return []
+    return [_row("overall", verdict["score"], verdict["recommendation"], "free_text")]
+
+def structured_score_rows(evaluation: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Filas "overall" + una por criterio puntuado de la evaluación estructurada."""
+    rows = []
+    overall = evaluation.get("overall_assessment") or {}
+    score = overall.get("quantitative_score")
+    if isinstance(score, (int, float)) or overall.get("recommendation"):
+        normalized = min(max(score / 100, 0.0), 1.0) if isinstance(score, (int, float)) else None
+        rows.append(_row("overall", normalized, overall.get("recommendation"), "structured"))
+    for section, prefix in SECTIONS.items():
+        for name, criterion in (evaluation.get(section) or {}).items():
+            level = (criterion or {}).get("score") if isinstance(criterion, dict) else None
+            if level in CRITERION_LEVELS:
+                rows.append(_row(f"{prefix}.{name}", CRITERION_LEVELS[level], None, "structured"))
+    return rows
+
+
+# ================================
+# Agregados
+# ================================
+def _delta(row: Dict[str, Any], sign: int) -> Dict[str, float]:
+    score = row.get("score")
+    delta = {"n": sign, "scored": sign if score is not None else 0,
+             "score_sum": sign * (score or 0.0), "score_sq_sum": sign * (score or 0.0) ** 2}
+    delta.update({r: sign if row.get("recommendation") == r else 0 for r in RECOMMENDATIONS})
+    return delta
+
+def apply_score_delta(stats: Dict[str, Dict[str, Any]], job_id: Any, old_rows: Iterable[Dict[str, Any]],
+                      new_rows: Iterable[Dict[str, Any]]) -> None:
+    """
+    Lo mismo que hacen los triggers de evaluation_stats, sobre un dict {"<job>|<criterio>": fila}:
+    resta las filas viejas de la entrevista y suma las nuevas, en su job y en el global.
+    """
+    scopes = [GLOBAL_JOB] + ([job_id] if job_id not in (None, "", GLOBAL_JOB) else [])
+    now = datetime.now(timezone.utc).isoformat()
+    for sign, rows in ((-1, old_rows), (1, new_rows)):
+        for row in rows:
+            for scope in scopes:
+                entry = stats.setdefault(f"{scope}|{row['criterion']}", {
+                    "id_job": scope, "criterion": row["criterion"], **{c: 0 for c in STAT_COUNTERS}})
+                for counter, value in _delta(row, sign).items():
+                    entry[counter] += value
+                entry["updated_at"] = now
+
+def summarize_stats(rows: Iterable[Dict[str, Any]], job_id: Any = None) -> Dict[str, Any]:
+    """
+    Respuesta de /stats a partir de las filas de evaluation_stats de UN scope (un job o el global):
+    promedio y desvío de "overall", tasa de hire y promedio por criterio.
+    """
+    by_criterion = {r["criterion"]: r for r in rows if r.get("n")}
+    overall = by_criterion.pop("overall", None) or {c: 0 for c in STAT_COUNTERS}
+
+    def _mean(r: Dict[str, Any]) -> Optional[float]:
+        return round(r["score_sum"] / r["scored"], 4) if r.get("scored") else None
+
+    def _stddev(r: Dict[str, Any]) -> Optional[float]:
+        if not r.get("scored"):
+            return None
+        mean = r["score_sum"] / r["scored"]
+        return round(math.sqrt(max(r["score_sq_sum"] / r["scored"] - mean * mean, 0.0)), 4)
+
+    recommendations = {r: int(overall.get(r) or 0) for r in RECOMMENDATIONS}
+    decided = sum(recommendations.values())
+    updated = [r.get("updated_at") for r in [overall, *by_criterion.values()] if r.get("updated_at")]
+    return {
+        "job_id": None if job_id in (None, GLOBAL_JOB) else str(job_id),
+        "total_interviews": int(overall.get("n") or 0),
+        "avg_score": _mean(overall),
+        "score_stddev": _stddev(overall),
+        "recommendations": recommendations,
+        "success_rate": round((recommendations["hire"] + recommendations["strong_hire"]) / decided, 4) if decided else None,
+        "criteria": [{"name": name, "evaluations": int(r["n"]), "avg_score": _mean(r)}
+                     for name, r in sorted(by_criterion.items())],
+        "updated_at": max(str(u) for u in updated) if updated else None,
+    }
@@ -0,0 +1,530 @@
+# --*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*
+# services/evaluator/app/infrastructure/structured_evaluation.py
+# Evaluación estructurada guiada por templates/rubric_evaluation_schema.json.
+#   - Pide JSON al modelo (JSON mode) y lo valida MIENTRAS llegan los tokens (IncrementalJSONValidator):
+#     un enum inválido, un tipo equivocado o un required faltante cortan el stream en ese momento.
+#   - Ante un corte se reintenta con un prompt de reparación dirigido (el prefijo válido + el error),
+#     no con la evaluación completa desde cero.
+#   - El resultado validado se cachea y se persiste una sola vez en forma tipada.
+# --*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*
+from __future__ import annotations
+from typing import Any, Dict, List, Optional, Tuple
+from datetime import datetime, timezone
+from pathlib import Path
+import asyncio
+import copy
+import hashlib
+import json
+import os
+import time
+
+from ..domain.entities.interview import Interview
+from . import llm_provider as llm
+from . import metrics
+from .evaluation_cache import get_evaluation_cache, make_cache_key, CACHE_ENABLED
+from .rate_limit import get_rate_limiter
+from .token_budget import estimate_tokens
+from .transcript_compaction import compacted_view
+
+_TEMPLATES_DIR = Path(__file__).resolve().parents[2] / "templates"
+SCHEMA_PATH    = Path(os.getenv("EVALUATOR_STRUCTURED_SCHEMA", str(_TEMPLATES_DIR / "rubric_evaluation_schema.json")))
+PROMPT_PATH    = Path(os.getenv("EVALUATOR_STRUCTURED_PROMPT", str(_TEMPLATES_DIR / "evaluation_prompt_template.md")))
+
+STRUCTURED_PROVIDER    = os.getenv("EVALUATOR_STRUCTURED_PROVIDER", "openai")        # --> openai | gemini | openrouter
+STRUCTURED_MAX_TOKENS  = int(os.getenv("EVALUATOR_STRUCTURED_MAX_TOKENS", "2000"))   # --> El JSON con evidencias es largo
+STRUCTURED_TEMPERATURE = float(os.getenv("EVALUATOR_STRUCTURED_TEMPERATURE", "0.2"))
+MAX_REPAIRS            = int(os.getenv("EVALUATOR_STRUCTURED_MAX_REPAIRS", "2"))     # --> Reintentos con prompt de reparación
+RUBRIC_VERSION         = os.getenv("EVALUATOR_RUBRIC_VERSION", "v1")
+
+# --> metadata la completa el servidor (modelo, timestamp, versión); el modelo no la genera
+_SERVER_FIELDS = ("metadata",)
+
+
+class StructuredOutputError(ValueError):
+    """Salida que no cumple el schema. `partial` es el prefijo válido hasta el error (para reparar)."""
+
+    def __init__(self, message: str, path: str = "$", partial: str = "") -> None:
+        super().__init__(f"{path}: {message}")
+        self.path = path
+        self.partial = partial
+
+
+# ================================
+# Schema
+# ================================
+def load_schema(path: Path = SCHEMA_PATH) -> Dict[str, Any]:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def model_schema(schema: Dict[str, Any]) -> Dict[str, Any]:
+    """Schema que se le pide al modelo: el completo sin los campos que completa el servidor."""
+    s = copy.deepcopy(schema)
+    for name in _SERVER_FIELDS:
+        s.get("properties", {}).pop(name, None)
+        if name in s.get("required", []):
+            s["required"] = [r for r in s["required"] if r != name]
+    return s
+
+_JSON_TYPES = {
+    "object": dict, "array": list, "string": str, "boolean": bool,
+    "number": (int, float), "integer": int, "null": type(None),
+}
+
+def _type_matches(value: Any, expected: str) -> bool:
+    if expected in ("number", "integer") and isinstance(value, bool):
+        return False
+    return isinstance(value, _JSON_TYPES.get(expected, object))
+
+def validate_schema(value: Any, schema: Optional[Dict[str, Any]], path: str = "$") -> List[str]:
+    """
+    Validador del subconjunto de JSON Schema que usa la rúbrica:
+    type, enum, const, required, properties, items, minimum, maximum, anyOf.
+    Devuelve la lista de errores ("ruta: problema"); vacía = válido.
+    """
+    if not schema:
+        return []
+    errors: List[str] = []
+    expected = schema.get("type")
+    if expected and not _type_matches(value, expected):
+        return [f"{path}: se esperaba {expected}"]
+    if "enum" in schema and value not in schema["enum"]:
+        errors.append(f"{path}: {value!r} no está en {schema['enum']}")
+    if "const" in schema and value != schema["const"]:
+        errors.append(f"{path}: se esperaba {schema['const']!r}")
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        if "minimum" in schema and value < schema["minimum"]:
+            errors.append(f"{path}: {value} < {schema['minimum']}")
+        if "maximum" in schema and value > schema["maximum"]:
+            errors.append(f"{path}: {value} > {schema['maximum']}")
+    if isinstance(value, dict):
+        for req in schema.get("required", []):
+            if req not in value:
+                errors.append(f"{path}.{req}: requerido")
+        for k, sub in schema.get("properties", {}).items():
+            if k in value:
+                errors.extend(validate_schema(value[k], sub, f"{path}.{k}"))
+    if isinstance(value, list) and "items" in schema:
+        for i, item in enumerate(value):
+            errors.extend(validate_schema(item, schema["items"], f"{path}[{i}]"))
+    if "anyOf" in schema and not any(not validate_schema(value, branch, path) for branch in schema["anyOf"]):
+        errors.append(f"{path}: no cumple ninguna alternativa de anyOf")
+    return errors
+
+
+# ================================
+# Validador incremental (streaming)
+# ================================
+_WS = " \t\r\n"
+_SCALAR_END = _WS + ",]}"
+
+class IncrementalJSONValidator:
+    """
+    Parser JSON por caracteres que valida contra el schema a medida que llega el texto.
+
+      - feed(chunk) -> lanza StructuredOutputError apenas el texto deja de poder ser válido
+                       (sintaxis, tipo del valor, enum, rango numérico, required al cerrar un objeto)
+      - finish()    -> dict parseado y validado completo (incluye anyOf); error si quedó truncado
+
+    Tolera un fence ```json inicial/final (algunos modelos lo agregan aun en JSON mode).
+    """
+
+    def __init__(self, schema: Dict[str, Any]) -> None:
+        self.schema = schema
+        self.text: List[str] = []
+        self.pos = 0
+        self._valid_upto = 0           # --> Largo del prefijo que sabemos válido
+        self._stack: List[Dict[str, Any]] = []
+        self._state = "start"          # --> start | fence | value | string | scalar | done
+        self._expect = "value"
+        self._pending_schema: Optional[Dict[str, Any]] = schema
+        self._pending_path = "$"
+        self._str_raw: List[str] = []
+        self._str_escape = False
+        self._str_is_key = False
+        self._scalar: List[str] = []
+
+    # --------------- API ---------------
+    def feed(self, chunk: str) -> None:
+        for ch in chunk:
+            self.text.append(ch)
+            self._step(ch)
+            self.pos += 1
+
+    @property
+    def partial(self) -> str:
+        return "".join(self.text[: self._valid_upto])
+
+    def finish(self) -> Dict[str, Any]:
+        if self._state == "scalar":
+            self._end_scalar()
+        if self._state != "done":
+            self._fail("respuesta truncada (JSON incompleto)")
+        raw = "".join(self.text).strip().strip("`").strip()
+        if raw.startswith("json"):
+            raw = raw[4:]
+        value = json.loads(raw)
+        errors = validate_schema(value, self.schema)
+        if errors:
+            raise StructuredOutputError("; ".join(errors[:5]), path="$", partial="".join(self.text))
+        return value
+
+    # --------------- Internos ---------------
+    def _fail(self, message: str, path: Optional[str] = None) -> None:
+        if path is None:
+            path = self._stack[-1]["path"] if self._stack else "$"
+        raise StructuredOutputError(message, path=path, partial=self.partial)
+
+    def _step(self, ch: str) -> None:
+        state = self._state
+        if state == "string":
+            return self._string_char(ch)
+        if state == "scalar":
+            if ch not in _SCALAR_END:
+                self._scalar.append(ch)
+                return
+            self._end_scalar()
+            # --> el delimitador se procesa como un caracter normal
+        if self._state == "fence":
+            if ch == "\n":
+                self._state = "start"
+            return
+        if ch in _WS:
+            return
+        if self._state == "start":
+            if ch == "`":
+                self._state = "fence"
+                return
+            self._state = "value"
+        if self._state == "done":
+            if ch != "`":
+                self._fail(f"texto extra después del JSON: {ch!r}")
+            return
+
+        expect = self._expect
+        frame = self._stack[-1] if self._stack else None
+
+        if expect == "value" or (expect == "value_or_end" and ch != "]"):
+            return self._start_value(ch)
+        if expect in ("key_or_end", "key"):
+            if ch == '"':
+                self._state, self._str_is_key, self._str_raw, self._str_escape = "string", True, [], False
+                return
+            if ch == "}" and expect == "key_or_end":
+                return self._close(frame, "}")
+            self._fail(f"se esperaba una clave y llegó {ch!r}")
+        if expect == "colon":
+            if ch != ":":
+                self._fail(f"se esperaba ':' y llegó {ch!r}")
+            props = (frame["schema"] or {}).get("properties", {})
+            self._pending_schema = props.get(frame["key"])
+            self._pending_path = f"{frame['path']}.{frame['key']}"
+            self._expect = "value"
+            return
+        if expect == "value_or_end" and ch == "]":
+            return self._close(frame, "]")
+        if expect == "comma_or_end":
+            closer = "}" if frame["kind"] == "object" else "]"
+            if ch == closer:
+                return self._close(frame, closer)
+            if ch != ",":
+                self._fail(f"se esperaba ',' o '{closer}' y llegó {ch!r}")
+            if frame["kind"] == "object":
+                self._expect = "key"
+            else:
+                frame["index"] += 1
+                self._pending_schema = (frame["schema"] or {}).get("items")
+                self._pending_path = f"{frame['path']}[{frame['index']}]"
+                self._expect = "value"
+            return
+        self._fail(f"caracter inesperado {ch!r}")
+
+    def _check_type(self, kind: str) -> None:
+        expected = (self._pending_schema or {}).get("type")
+        if not expected:
+            return
+        ok = kind == expected or (kind == "number" and expected in ("number", "integer"))
+        if not ok:
+            self._fail(f"se esperaba {expected} y llegó {kind}", path=self._pending_path)
+
+    def _start_value(self, ch: str) -> None:
+        schema, path = self._pending_schema, self._pending_path
+        if ch == "{":
+            self._check_type("object")
+            self._stack.append({"kind": "object", "schema": schema, "path": path, "keys": set(), "key": None})
+            self._expect = "key_or_end"
+        elif ch == "[":
+            self._check_type("array")
+            self._stack.append({"kind": "array", "schema": schema, "path": path, "index": 0})
+            self._pending_schema = (schema or {}).get("items")
+            self._pending_path = f"{path}[0]"
+            self._expect = "value_or_end"
+        elif ch == '"':
+            self._check_type("string")
+            self._state, self._str_is_key, self._str_raw, self._str_escape = "string", False, [], False
+        elif ch == "-" or ch.isdigit() or ch in "tfn":
+            kind = "number" if (ch == "-" or ch.isdigit()) else ("null" if ch == "n" else "boolean")
+            self._check_type(kind)
+            self._state, self._scalar = "scalar", [ch]
+        else:
+            self._fail(f"valor inválido que empieza con {ch!r}", path=path)
+
+    def _string_char(self, ch: str) -> None:
+        if self._str_escape:
+            self._str_raw.append(ch)
+            self._str_escape = False
+            return
+        if ch == "\\":
+            self._str_raw.append(ch)
+            self._str_escape = True
+            return
+        if ch != '"':
+            self._str_raw.append(ch)
+            enum = None if self._str_is_key else (self._pending_schema or {}).get("enum")
+            if enum and "\\" not in self._str_raw:
+                prefix = "".join(self._str_raw)
+                if not any(isinstance(e, str) and e.startswith(prefix) for e in enum):
+                    self._fail(f"'{prefix}...' no puede ser ninguno de {enum}", path=self._pending_path)
+            return
+
+        try:
+            value = json.loads('"' + "".join(self._str_raw) + '"')
+        except ValueError:
+            self._fail("string con escape inválido", path=self._pending_path)
+        self._state = "value"
+        if self._str_is_key:
+            frame = self._stack[-1]
+            frame["key"] = value
+            frame["keys"].add(value)
+            self._expect = "colon"
+            return
+        self._validate_leaf(value)
+        self._value_done()
+
+    def _end_scalar(self) -> None:
+        raw = "".join(self._scalar)
+        try:
+            value = json.loads(raw)
+        except ValueError:
+            self._fail(f"literal inválido {raw!r}", path=self._pending_path)
+        self._state = "value"
+        self._validate_leaf(value)
+        self._value_done()
+
+    def _validate_leaf(self, value: Any) -> None:
+        errors = validate_schema(value, self._pending_schema, self._pending_path)
+        if errors:
+            raise StructuredOutputError(errors[0].split(": ", 1)[-1], path=self._pending_path, partial=self.partial)
+
+    def _close(self, frame: Dict[str, Any], closer: str) -> None:
+        if frame["kind"] == "object":
+            missing = [r for r in (frame["schema"] or {}).get("required", []) if r not in frame["keys"]]
+            if missing:
+                self._fail(f"faltan campos requeridos {missing}", path=frame["path"])
+        self._stack.pop()
+        self._value_done()
+
+    def _value_done(self) -> None:
+        """Un valor terminó: el padre espera ',' o cierre; sin padre el documento está completo."""
+        self._valid_upto = self.pos + 1
+        if not self._stack:
+            self._state, self._expect = "done", "end"
+            return
+        self._expect = "comma_or_end"
+
+
+# ================================
+# Prompts
+# ================================
+_REPAIR_INSTRUCTION = (
+    "Your previous response was cut because it does not follow the JSON schema: {error}\n"
+    "The assistant message above is the valid part you produced before the error. "
+    "Reply with the COMPLETE corrected JSON object only (no markdown), keeping what was already "
+    "correct and fixing the problem at {path}."
+)
+
+_PER_INTERVIEW = ("{job_description}", "{transcript}")
+
+def _split_template(template: str) -> Tuple[str, str]:
+    """
+    (parte fija, parte por entrevista): corta en la etiqueta que precede al primer placeholder
+    por entrevista (JD / transcript), así instrucciones + schema quedan como prefijo estable.
+    """
+    first = min((template.find(p) for p in _PER_INTERVIEW if p in template), default=len(template))
+    cut = template.rfind("\n", 0, template.rfind("\n", 0, first) if "\n" in template[:first] else 0)
+    cut = cut + 1 if cut >= 0 else first
+    return template[:cut], template[cut:]
+
+def build_messages(interview: Interview, schema: Dict[str, Any]) -> List[Dict[str, str]]:
+    """
+    single (default): system = system_prompt, user = template completo.
+    cached_prefix (EVALUATOR_PROMPT_LAYOUT): system = system_prompt + instrucciones + schema + rúbrica
+    (idéntico entre entrevistas: lo cachea el provider), user = JD + transcript.
+    """
+    # --> replace (no format): el schema tiene llaves
+    template = PROMPT_PATH.read_text(encoding="utf-8").replace("[INSERT_SCHEMA_HERE]", json.dumps(schema, ensure_ascii=False))
+    if llm.PROMPT_LAYOUT == "cached_prefix":
+        head, tail = _split_template(template)
+        system = f"{interview.system_prompt or ''}\n\n{head.rstrip()}\n\n**Evaluation Rubric:**\n{interview.rubric or ''}"
+        user = (tail.replace("{job_description}", interview.jd or "")
+                .replace("{rubric}", "(see the Evaluation Rubric above)")
+                .replace("{transcript}", interview.full_transcript or ""))
+        return [{"role": "system", "content": system}, {"role": "user", "content": user}]
+    user = (template
+            .replace("{job_description}", interview.jd or "")
+            .replace("{rubric}", interview.rubric or "")
+            .replace("{transcript}", interview.full_transcript or ""))
+    return [{"role": "system", "content": interview.system_prompt or ""},
+            {"role": "user", "content": user}]
+
+def build_repair_messages(messages: List[Dict[str, str]], error: StructuredOutputError) -> List[Dict[str, str]]:
+    repair = _REPAIR_INSTRUCTION.format(error=str(error), path=error.path)
+    return messages + [{"role": "assistant", "content": error.partial or "{"},
+                       {"role": "user", "content": repair}]
+
+
+# ================================
+# Streaming por provider (síncrono: corre en thread)
+# ================================
+def _stream_openai_compatible(client, model: str, messages, validator: IncrementalJSONValidator) -> None:
+    stream = client.chat.completions.create(
+        model=model,
+        messages=messages,
+        max_tokens=STRUCTURED_MAX_TOKENS,
+        temperature=STRUCTURED_TEMPERATURE,
+        response_format={"type": "json_object"},  # --> JSON mode
+        stream=True,
+    )
+    try:
+        for chunk in stream:
+            if not getattr(chunk, "choices", None):
+                continue
+            delta = chunk.choices[0].delta.content or ""
+            if delta:
+                validator.feed(delta)  # --> Puede lanzar: cortamos el stream (no pagamos el resto)
+    finally:
+        close = getattr(stream, "close", None)
+        if callable(close):
+            close()
+
+def _stream_gemini(model: str, messages, validator: IncrementalJSONValidator) -> None:
+    if not llm._setup_gemini():
+        raise RuntimeError("Gemini no inicializado (¿falta GOOGLE_API_KEY?).")
+    system_instruction = None
+    if llm.PROMPT_LAYOUT == "cached_prefix":
+        # --> Prefijo estable como system_instruction (lo cachea Gemini); el resto como conversación
+        system_instruction = "\n\n".join(m["content"] for m in messages if m["role"] == "system")
+        messages = [m for m in messages if m["role"] != "system"]
+    prompt = "\n\n".join(f"[{m['role']}]\n{m['content']}" for m in messages)
+    gm = llm._gemini_model(model, system_instruction)
+    stream = gm.generate_content(
+        prompt,
+        stream=True,
+        generation_config={"response_mime_type": "application/json",
+                           "max_output_tokens": STRUCTURED_MAX_TOKENS,
+                           "temperature": STRUCTURED_TEMPERATURE},
+    )
+    for chunk in stream:
+        text = getattr(chunk, "text", "") or ""
+        if text:
+            validator.feed(text)
+
+def _provider_model(provider: str) -> str:
+    return {"openai": llm.DEFAULT_OPENAI_MODEL,
+            "gemini": llm.DEFAULT_GEMINI_MODEL,
+            "openrouter": llm._settings().DEEPSEEK_MODEL}[provider]
+
+def _stream_once(provider: str, model: str, messages, validator: IncrementalJSONValidator) -> None:
+    if provider == "openai":
+        client = llm._get_openai_client()
+        if not client:
+            raise RuntimeError("Cliente OpenAI no inicializado (¿falta OPENAI_API_KEY?).")
+        return _stream_openai_compatible(client, model, messages, validator)
+    if provider == "openrouter":
+        if not llm.OPENROUTER_API_KEY:
+            raise RuntimeError("OPENROUTER_API_KEY no seteada.")
+        return _stream_openai_compatible(llm._openrouter_client(), model, messages, validator)
+    if provider == "gemini":
+        return _stream_gemini(model, messages, validator)
+    raise ValueError(f"Provider estructurado no soportado: {provider}")
+
+
+# ================================
+# Orquestador
+# ================================
+def _cache_key(provider: str, model: str, schema: Dict[str, Any], interview: Interview) -> str:
+    params = {
+        "mode": "structured",
+        "schema": hashlib.sha256(json.dumps(schema, sort_keys=True).encode("utf-8")).hexdigest(),
+        "jd": hashlib.sha256((interview.jd or "").encode("utf-8")).hexdigest(),
+        "max_tokens": STRUCTURED_MAX_TOKENS,
+        "temperature": STRUCTURED_TEMPERATURE,
+        "rubric_version": RUBRIC_VERSION,
+    }
+    return make_cache_key(provider, model, params, interview.system_prompt, interview.rubric, interview.full_transcript)
+
+async def _persist(repo, interview: Interview, result: Dict[str, Any]) -> None:
+    if repo is not None and interview.interview_id:
+        await repo.save_structured_evaluation(str(interview.interview_id), result)
+
+async def evaluate_structured(interview: Interview, provider: Optional[str] = None,
+                              use_cache: bool = True, repo=None) -> Dict[str, Any]:
+    """
+    Devuelve la evaluación estructurada (dict válido contra el schema completo).
+    Si `repo` viene, la persiste (una vez) con repo.save_structured_evaluation, también cuando sale del
+    cache: la clave no depende de la entrevista (otra con el mismo contenido) y un reintento tras un save
+    fallido encuentra el cache ya escrito.
+    """
+    provider = provider or STRUCTURED_PROVIDER
+    model = _provider_model(provider)
+    interview = await compacted_view(interview) # --> Mismo transcript compacto que run_evaluations
+    full_schema = load_schema()
+    schema = model_schema(full_schema)
+
+    cache = get_evaluation_cache() if (use_cache and CACHE_ENABLED) else None
+    key = _cache_key(provider, model, full_schema, interview) if cache is not None else None
+    if cache is not None:
+        cached = await cache.get(key, provider=provider)
+        if cached is not None:
+            print(f"[EvalCache] HIT structured {provider} ({model})")
+            result = json.loads(cached)
+            await _persist(repo, interview, result)
+            return result
+
+    messages = build_messages(interview, schema)
+    limiter = get_rate_limiter(provider)
+    last_error: Optional[StructuredOutputError] = None
+    for attempt in range(MAX_REPAIRS + 1):
+        validator = IncrementalJSONValidator(schema)
+        tokens = sum(estimate_tokens(m["content"]) for m in messages) + STRUCTURED_MAX_TOKENS
+        prompt_text = "\n\n".join(m["content"] for m in messages)
+        started = time.perf_counter()
+        try:
+            # --> Cada intento (y reintento por 429) consume cupo del provider
+            await limiter.call(asyncio.to_thread, _stream_once, provider, model, messages, validator, tokens=tokens)
+            result = validator.finish()
+            llm.record_llm_usage(provider, model, started, prompt_text, validator.partial) # --> Una vez por intento
+            break
+        except StructuredOutputError as e:
+            llm.record_llm_usage(provider, model, started, prompt_text, validator.partial) # --> Lo generado hasta cortar también se paga
+            last_error = e
+            metrics.inc("structured_aborts_total", provider=provider)
+            print(f"[Evaluator] Structured {provider}: salida inválida (intento {attempt + 1}) -> {e}")
+            if attempt < MAX_REPAIRS:
+                messages = build_repair_messages(build_messages(interview, schema), e)
+                metrics.inc("structured_repairs_total", provider=provider)
+    else:
+        raise ValueError(f"Evaluación estructurada inválida tras {MAX_REPAIRS} reparaciones: {last_error}")
+
+    result["metadata"] = {
+        "evaluator": model,
+        "evaluation_timestamp": datetime.now(timezone.utc).isoformat(),
+        "rubric_version": RUBRIC_VERSION,
+    }
+    errors = validate_schema(result, full_schema)
+    if errors:
+        raise ValueError(f"Evaluación estructurada inválida: {'; '.join(errors[:5])}")
+
+    if cache is not None:
+        await cache.set(key, json.dumps(result, ensure_ascii=False))
+    await _persist(repo, interview, result)
+    return result
@@ -0,0 +1,238 @@
+# --*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*
+# services/evaluator/app/infrastructure/token_budget.py
+# Planificador de tokens para evaluar transcripts largos.
+# Si prompt + rubric + transcript no entra en el presupuesto del modelo, el transcript se parte
+# en chunks por turnos (sin cortar un turno al medio) para evaluarlos en paralelo (map) y luego
+# unir las evaluaciones parciales en una final (reduce). El plan queda registrado en el output.
+# --*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*
+from __future__ import annotations
+from dataclasses import dataclass, field, asdict
+from typing import Any, Dict, List, Optional, Tuple
+import json
+import math
+import os
+import re
+
+# --> Ventana de contexto (tokens de entrada+salida) por modelo. Se puede pisar/extender por .env:
+#     EVALUATOR_MODEL_LIMITS='{"gpt-4o-mini": 128000, "deepseek/deepseek-chat-v3.1": 64000}'
+_DEFAULT_MODEL_LIMITS: Dict[str, int] = {
+    "gpt-4o-mini": 128_000,
+    "gpt-4o": 128_000,
+    "gpt-4.1": 1_000_000,
+    "gpt-4.1-mini": 1_000_000,
+    "gpt-5": 400_000,
+    "gemini-2.5-flash": 1_000_000,
+    "gemini-2.5-pro": 1_000_000,
+    "deepseek/deepseek-chat-v3.1": 64_000,
+}
+DEFAULT_CONTEXT_TOKENS = int(os.getenv("EVALUATOR_DEFAULT_CONTEXT_TOKENS", "32000"))  # --> Modelos no listados
+# --> Tope opcional de entrada por llamada (aunque el modelo acepte más): latencia y costo acotados
+MAX_INPUT_TOKENS       = int(os.getenv("EVALUATOR_MAX_INPUT_TOKENS", "0")) or None
+SAFETY_MARGIN          = float(os.getenv("EVALUATOR_TOKEN_SAFETY_MARGIN", "0.1"))      # --> El estimador no es exacto
+MAX_CHUNKS             = int(os.getenv("EVALUATOR_MAX_CHUNKS", "16"))                  # --> Sólo avisa: el límite del modelo manda
+OUTPUT_RESERVE_TOKENS  = int(os.getenv("EVALUATOR_OUTPUT_RESERVE_TOKENS", "2048"))     # --> Providers sin max_tokens explícito (Gemini)
+
+# --> Texto fijo que agregan los call_* alrededor de prompt/rubric/transcript (~30 tokens) + instrucciones map/reduce
+PROMPT_OVERHEAD_TOKENS = 128
+
+
+def _load_model_limits() -> Dict[str, int]:
+    limits = dict(_DEFAULT_MODEL_LIMITS)
+    raw = os.getenv("EVALUATOR_MODEL_LIMITS")
+    if raw:
+        try:
+            limits.update({str(k): int(v) for k, v in json.loads(raw).items()})
+        except Exception as e:
+            print(f"[Evaluator] WARNING: EVALUATOR_MODEL_LIMITS inválido ({e}); uso defaults")
+    return limits
+
+MODEL_LIMITS = _load_model_limits()
+
+def context_limit(model: str) -> int:
+    return MODEL_LIMITS.get(model, DEFAULT_CONTEXT_TOKENS)
+
+
+# --> Precio estimado en USD por 1M tokens (entrada, salida[, entrada cacheada por el provider]).
+#     Sin precio cacheado, los tokens cacheados se cobran como entrada normal. Pisar/extender por .env:
+#     EVALUATOR_MODEL_PRICES='{"gpt-4o-mini": [0.15, 0.6, 0.075]}'
+_DEFAULT_MODEL_PRICES: Dict[str, Tuple[float, ...]] = {
+    "gpt-4o-mini": (0.15, 0.60, 0.075),
+    "gpt-4o": (2.50, 10.00, 1.25),
+    "gpt-4.1": (2.00, 8.00, 0.50),
+    "gpt-4.1-mini": (0.40, 1.60, 0.10),
+    "gpt-5": (1.25, 10.00, 0.125),
+    "gemini-2.5-flash": (0.30, 2.50, 0.075),
+    "gemini-2.5-pro": (1.25, 10.00, 0.31),
+    "deepseek/deepseek-chat-v3.1": (0.27, 1.10),
+}
+
+def _load_model_prices() -> Dict[str, Tuple[float, ...]]:
+    prices = dict(_DEFAULT_MODEL_PRICES)
+    raw = os.getenv("EVALUATOR_MODEL_PRICES")
+    if raw:
+        try:
+            prices.update({str(k): tuple(float(x) for x in v[:3]) for k, v in json.loads(raw).items()})
+        except Exception as e:
+            print(f"[Evaluator] WARNING: EVALUATOR_MODEL_PRICES inválido ({e}); uso defaults")
+    return prices
+
+MODEL_PRICES = _load_model_prices()
+
+def estimate_cost(model: str, input_tokens: int, output_tokens: int, cached_tokens: int = 0) -> float:
+    """
+    Costo estimado en USD (0 si el modelo no tiene precio configurado).
+    cached_tokens: parte de input_tokens que el provider sirvió de su cache de prefijos.
+    """
+    prices = MODEL_PRICES.get(model, (0.0, 0.0))
+    price_in, price_out = prices[0], prices[1]
+    price_cached = prices[2] if len(prices) > 2 else price_in
+    cached_tokens = min(max(cached_tokens, 0), input_tokens)
+    return ((input_tokens - cached_tokens) * price_in + cached_tokens * price_cached
+            + output_tokens * price_out) / 1_000_000
+
+
+# ================================
+# Estimación de tokens
+# ================================
+_ENCODING: Any = False  # --> False = todavía no se intentó cargar; None = tiktoken no disponible
+
+def _encoding():
+    """tiktoken (opcional, conteo exacto para modelos OpenAI) al primer uso: cargar el BPE es lento."""
+    global _ENCODING
+    if _ENCODING is False:
+        try:
+            import tiktoken
+            _ENCODING = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            _ENCODING = None
+    return _ENCODING
+
+def estimate_tokens(text: Optional[str]) -> int:
+    """Tokens aproximados: tiktoken si está instalado; si no, ~4 caracteres por token (redondeo arriba)."""
+    if not text:
+        return 0
+    encoding = _encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return math.ceil(len(text) / 4)
+
+
+# ================================
+# Partición por turnos
+# ================================
+# --> Inicio de turno: "[2025-01-01 10:00] user: ...", "assistant: ...", "**Candidate:** ...", "Interviewer: ..."
+_TURN_START = re.compile(r"^\s*(\[[^\]]{1,40}\]\s*)?(\*\*)?[A-Za-zÁÉÍÓÚáéíóúñÑ_][\w .\-]{0,30}(\*\*)?\s*:")
+
+def split_turns(transcript: str) -> List[str]:
+    """
+    Parte el transcript en turnos. Las líneas que no empiezan un turno (continuaciones, líneas vacías)
+    se pegan al turno anterior. Si no se detecta ningún turno, se usa cada párrafo como unidad.
+    """
+    turns: List[str] = []
+    for line in transcript.splitlines():
+        if _TURN_START.match(line) or not turns:
+            turns.append(line)
+        else:
+            turns[-1] += "\n" + line
+    if len(turns) <= 1:
+        turns = [p for p in re.split(r"\n\s*\n", transcript) if p.strip()]
+    return [t.strip("\n") for t in turns if t.strip()]
+
+def _hard_split(text: str, budget: int) -> List[str]:
+    """Último recurso para un turno que solo no entra: corta por líneas/caracteres."""
+    max_chars = max(budget * 4, 1)
+    parts: List[str] = []
+    current = ""
+    for line in text.splitlines(keepends=True):
+        while len(line) > max_chars:
+            if current:
+                parts.append(current)
+                current = ""
+            parts.append(line[:max_chars])
+            line = line[max_chars:]
+        if current and estimate_tokens(current + line) > budget:
+            parts.append(current)
+            current = ""
+        current += line
+    if current:
+        parts.append(current)
+    return [p.strip("\n") for p in parts if p.strip()]
+
+def chunk_transcript(transcript: str, budget: int) -> List[str]:
+    """Agrupa turnos consecutivos mientras la suma no supere `budget` tokens."""
+    chunks: List[str] = []
+    current: List[str] = []
+    current_tokens = 0
+    for turn in split_turns(transcript):
+        t = estimate_tokens(turn) + 1  # --> +1 por el salto de línea al unir
+        if t > budget:
+            if current:
+                chunks.append("\n".join(current))
+                current, current_tokens = [], 0
+            chunks.extend(_hard_split(turn, budget))
+            continue
+        if current and current_tokens + t > budget:
+            chunks.append("\n".join(current))
+            current, current_tokens = [], 0
+        current.append(turn)
+        current_tokens += t
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+# ================================
+# Plan
+# ================================
+@dataclass
+class EvaluationPlan:
+    """Decisión del planificador para un provider/modelo (se guarda en Interview.evaluation_plan)."""
+    provider: str
+    model: str
+    mode: str                          # --> "single" | "map_reduce" | "per_criterion"
+    context_limit: int
+    budget_tokens: int                 # --> Tokens disponibles para el transcript por llamada
+    prompt_tokens: int                 # --> system_prompt + rubric + overhead
+    transcript_tokens: int
+    max_output_tokens: int
+    chunk_tokens: List[int] = field(default_factory=list)  # --> per_criterion: evidencia de cada criterio
+    reduce_rounds: int = 0
+    criteria: List[str] = field(default_factory=list)
+    cached: bool = False
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+def transcript_budget(model: str, prompt_tokens: int, max_output_tokens: int) -> Tuple[int, int]:
+    """(límite del modelo, tokens disponibles para transcript por llamada)."""
+    limit = context_limit(model)
+    usable = int(limit * (1 - SAFETY_MARGIN)) - max_output_tokens
+    if MAX_INPUT_TOKENS:
+        usable = min(usable, MAX_INPUT_TOKENS)
+    return limit, usable - prompt_tokens
+
+def plan_evaluation(provider: str, model: str, system_prompt: str, rubric: str,
+                    transcript: str, max_output_tokens: int) -> Tuple[EvaluationPlan, List[str]]:
+    """
+    Devuelve (plan, chunks). Con mode="single" chunks == [transcript].
+    Si el prompt solo ya no entra se lanza ValueError (no hay forma de partirlo).
+    """
+    prompt_tokens = estimate_tokens(system_prompt) + estimate_tokens(rubric) + PROMPT_OVERHEAD_TOKENS
+    transcript_tokens = estimate_tokens(transcript)
+    limit, budget = transcript_budget(model, prompt_tokens, max_output_tokens)
+    if budget <= 0:
+        raise ValueError(f"El prompt+rubric ({prompt_tokens} tokens) no entra en {model} (límite {limit})")
+
+    plan = EvaluationPlan(provider=provider, model=model, mode="single", context_limit=limit,
+                          budget_tokens=budget, prompt_tokens=prompt_tokens,
+                          transcript_tokens=transcript_tokens, max_output_tokens=max_output_tokens)
+    if transcript_tokens <= budget:
+        plan.chunk_tokens = [transcript_tokens]
+        return plan, [transcript]
+
+    chunks = chunk_transcript(transcript, budget)
+    if len(chunks) > MAX_CHUNKS:
+        print(f"[Evaluator] WARNING: {len(chunks)} chunks para {provider} ({model}) superan EVALUATOR_MAX_CHUNKS={MAX_CHUNKS}")
+    plan.mode = "map_reduce"
+    plan.chunk_tokens = [estimate_tokens(c) for c in chunks]
+    return plan, chunks
@@ -0,0 +1,200 @@
+# --*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*
+# services/evaluator/app/infrastructure/transcript_compaction.py
+# Compactación del transcript antes de evaluar (se manda 3 veces por entrevista: cada token cuenta).
+# Los transcripts de RedisClient.get_stream_content / context_data traen timestamp ISO por línea,
+# roles repetidos, muletillas y texto de sistema inyectado. EVALUATOR_COMPACT:
+#   off        -> transcript tal cual
+#   basic      -> roles normalizados (Interviewer/Candidate), timestamps -> offset relativo [m:ss]
+#                 (o fuera, EVALUATOR_COMPACT_TIMESTAMPS=drop), turnos seguidos del mismo rol unidos,
+#                 sin líneas de sistema, muletillas ni turnos vacíos/duplicados (default)
+#   aggressive -> basic + recorta tangentes: turnos largos sin vocabulario de la rúbrica/JD/pregunta
+#                 quedan en su primera oración
+# El resultado se cachea (cache de evaluaciones, clave = contenido) y los tokens antes/después
+# quedan en metrics y en el usage del job.
+# --*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*
+from __future__ import annotations
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+import hashlib
+import json
+import os
+import re
+
+from ..domain.entities.interview import Interview
+from . import metrics
+from .evaluation_cache import CACHE_ENABLED, get_evaluation_cache
+from .token_budget import estimate_tokens
+
+COMPACT_MODE        = os.getenv("EVALUATOR_COMPACT", "basic")               # --> "off" | "basic" | "aggressive"
+COMPACT_TIMESTAMPS  = os.getenv("EVALUATOR_COMPACT_TIMESTAMPS", "offset")   # --> "offset" | "drop"
+TANGENT_MIN_WORDS   = int(os.getenv("EVALUATOR_COMPACT_TANGENT_MIN_WORDS", "80"))
+TANGENT_MAX_OVERLAP = float(os.getenv("EVALUATOR_COMPACT_TANGENT_OVERLAP", "0.05"))  # --> Fracción de palabras en común
+
+COMPACT_VERSION = 1  # --> Subirlo si cambian las reglas (invalida lo cacheado)
+
+# --> Alias de rol -> rol normalizado (None = se descarta: texto de sistema inyectado)
+_ROLES: Dict[str, Optional[str]] = {
+    "user": "Candidate", "candidate": "Candidate", "human": "Candidate", "interviewee": "Candidate",
+    "assistant": "Interviewer", "interviewer": "Interviewer", "bot": "Interviewer", "ai": "Interviewer",
+    "agent": "Interviewer", "model": "Interviewer",
+    "system": None, "developer": None, "tool": None, "function": None,
+}
+# --> "[2025-01-01T10:00:00.123+00:00] user: ..." / "**Candidate:** '...'" / "assistant: ..."
+_LINE = re.compile(r"^\s*(?:\[(?P<ts>[^\]]{1,40})\]\s*)?(?:\*\*)?(?P<role>[A-Za-z][\w .\-]{0,30}?)(?:\*\*)?\s*:"
+                   r"(?:\*\*)?\s*(?P<text>.*)$")
+_FILLER = re.compile(r"(?<![\w'])(?:u+m+|u+h+|e+r+m+|h+m+|m+-?hm+|uh-huh)(?![\w'])[,.]?\s*", re.I)
+_SPACES = re.compile(r"[ \t]+")
+_WORD = re.compile(r"[A-Za-zÁÉÍÓÚáéíóúñÑ]{4,}")  # --> Palabras "de contenido" (4+ letras)
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+@dataclass
+class Turn:
+    role: str
+    text: str
+    at: Optional[datetime] = None
+
+
+def _parse_ts(raw: Optional[str]) -> Optional[datetime]:
+    if not raw:
+        return None
+    try:
+        return datetime.fromisoformat(raw.strip().replace("Z", "+00:00"))
+    except ValueError:
+        return None
+
+def _role_of(raw: str, has_ts: bool) -> Tuple[bool, Optional[str]]:
+    """(es inicio de turno, rol normalizado). Con timestamp cualquier etiqueta cuenta como rol."""
+    key = raw.strip().lower()
+    if key in _ROLES:
+        return True, _ROLES[key]
+    if has_ts:
+        return True, raw.strip().title()
+    return False, None
+
+def _clean(text: str) -> str:
+    return _SPACES.sub(" ", _FILLER.sub("", text)).strip()
+
+def _unquote(text: str) -> str:
+    """Turnos entre comillas ("**Candidate:** '...'"): las comillas no aportan nada."""
+    return text[1:-1].strip() if len(text) > 1 and text[0] == text[-1] and text[0] in "'\"" else text
+
+def parse_turns(transcript: str) -> Tuple[List[Turn], bool]:
+    """Turnos (roles normalizados, sin sistema) y si se reconoció alguna etiqueta de rol."""
+    turns: List[Turn] = []
+    skipping = False  # --> Continuaciones de una línea de sistema también se descartan
+    recognized = False
+    for line in transcript.splitlines():
+        if not line.strip():
+            continue
+        m = _LINE.match(line)
+        starts, role = _role_of(m.group("role"), bool(m.group("ts"))) if m else (False, None)
+        if starts:
+            recognized = True
+            skipping = role is None
+            if not skipping:
+                turns.append(Turn(role, m.group("text"), _parse_ts(m.group("ts"))))
+        elif turns and not skipping:
+            turns[-1].text += "\n" + line
+    return turns, recognized
+
+def merge_turns(turns: List[Turn]) -> List[Turn]:
+    """Limpia cada turno y une los seguidos del mismo rol (el STT parte frases en varios mensajes)."""
+    merged: List[Turn] = []
+    last = None  # --> Último mensaje (limpio) agregado a merged[-1]
+    for turn in turns:
+        text = _unquote("\n".join(_clean(part) for part in turn.text.splitlines() if _clean(part)))
+        if not text:
+            continue
+        if merged and merged[-1].role == turn.role:
+            if text == last:
+                continue  # --> Duplicado: reenvío del mismo mensaje (no un fragmento que coincide con el final)
+            merged[-1].text += " " + text
+        else:
+            merged.append(Turn(turn.role, text, turn.at))
+        last = text
+    return merged
+
+def _vocabulary(text: str) -> set:
+    return {w.lower() for w in _WORD.findall(text or "")}
+
+def trim_tangents(turns: List[Turn], reference: str) -> int:
+    """
+    Turnos largos que casi no comparten vocabulario con la rúbrica/JD ni con el turno anterior
+    (charla de relleno, anécdotas) quedan en su primera oración + " [...]". Devuelve cuántos recortó.
+    """
+    base = _vocabulary(reference)
+    trimmed = 0
+    for i, turn in enumerate(turns):
+        words = _WORD.findall(turn.text)
+        if len(turn.text.split()) < TANGENT_MIN_WORDS or not words:
+            continue
+        context = base | (_vocabulary(turns[i - 1].text) if i else set())
+        overlap = sum(w.lower() in context for w in words) / len(words)
+        if overlap < TANGENT_MAX_OVERLAP:
+            turn.text = _SENTENCE_END.split(turn.text, maxsplit=1)[0] + " [...]"
+            trimmed += 1
+    return trimmed
+
+def _offset(at: Optional[datetime], start: Optional[datetime]) -> str:
+    if at is None or start is None:
+        return ""
+    try:
+        seconds = max(0, int((at - start).total_seconds()))
+    except TypeError:
+        return ""  # --> Mezcla de timestamps con y sin zona horaria
+    return f"[{seconds // 60}:{seconds % 60:02d}] "
+
+def compact_transcript(transcript: str, mode: Optional[str] = None, reference: str = "",
+                       timestamps: Optional[str] = None) -> Tuple[str, Dict[str, Any]]:
+    """
+    Transcript compacto + stats {turns_in, turns_out, trimmed}. Si no se reconoce ningún rol
+    (texto libre) sólo se normalizan espacios y muletillas.
+    """
+    mode, timestamps = mode or COMPACT_MODE, timestamps or COMPACT_TIMESTAMPS
+    if mode == "off" or not transcript:
+        return transcript, {"turns_in": 0, "turns_out": 0, "trimmed": 0}
+    turns, recognized = parse_turns(transcript)
+    if not recognized:
+        text = "\n".join(c for c in (_clean(line) for line in transcript.splitlines()) if c)
+        return text, {"turns_in": 0, "turns_out": 0, "trimmed": 0}
+
+    merged = merge_turns(turns)
+    trimmed = trim_tangents(merged, reference) if mode == "aggressive" else 0
+    start = next((t.at for t in merged if t.at is not None), None) if timestamps == "offset" else None
+    lines = [f"{_offset(t.at, start)}{t.role}: {t.text}" for t in merged]
+    return "\n".join(lines), {"turns_in": len(turns), "turns_out": len(merged), "trimmed": trimmed}
+
+
+def _cache_key(interview: Interview, mode: str) -> str:
+    material = json.dumps({
+        "v": COMPACT_VERSION, "mode": mode, "timestamps": COMPACT_TIMESTAMPS,
+        "transcript": interview.full_transcript or "",
+        # --> Sólo el modo aggressive depende de rúbrica/JD
+        "reference": (interview.rubric or "") + (interview.jd or "") if mode == "aggressive" else "",
+    }, sort_keys=True, ensure_ascii=False)
+    return "compact:" + hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+async def compacted_view(interview: Interview, mode: Optional[str] = None) -> Interview:
+    """
+    Copia de la Interview con el transcript compacto (la original no se toca: lo que se guarda en
+    DB sigue siendo el transcript completo). Cachea el resultado y registra tokens antes/después.
+    """
+    mode = mode or COMPACT_MODE
+    if mode == "off" or not interview.full_transcript:
+        return interview
+    cache = get_evaluation_cache() if CACHE_ENABLED else None
+    key = _cache_key(interview, mode)
+    compacted = await cache.get(key, provider="compaction") if cache is not None else None
+    if compacted is None:
+        compacted, stats = compact_transcript(interview.full_transcript, mode,
+                                              reference=f"{interview.rubric or ''}\n{interview.jd or ''}")
+        if cache is not None:
+            await cache.set(key, compacted)
+        if stats["trimmed"]:
+            metrics.inc("transcript_tangents_trimmed_total", stats["trimmed"])
+    metrics.record_compaction(estimate_tokens(interview.full_transcript), estimate_tokens(compacted))
+
+    return Interview(interview_id=interview.interview_id, system_prompt=interview.system_prompt,
+                     rubric=interview.rubric, jd=interview.jd, full_transcript=compacted)
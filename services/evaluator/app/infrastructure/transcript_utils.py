@@ -0,0 +1,101 @@
+# --*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*
+# services/evaluator/app/infrastructure/transcript_utils.py
+# Helpers puros para armar el transcript desde filas de DB (sin SDKs):
+# interview_full_conversations (full_text / context_data) o interview_messages.
+# --*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*
+from __future__ import annotations
+from typing import Any, Dict, Iterable, List, Optional
+from datetime import datetime
+import json
+
+
+def format_ts(dt: Optional[Any]) -> str:
+    """
+    # NICO --> Normaliza fechas a 'YYYY-MM-DD HH:MM' (para transcript de messages).
+    """
+    if not dt:
+        return ""
+    if isinstance(dt, datetime):
+        return dt.strftime("%Y-%m-%d %H:%M")
+    try:
+        return datetime.fromisoformat(str(dt).replace("Z", "+00:00")).strftime("%Y-%m-%d %H:%M")
+    except Exception:
+        return str(dt)
+
+
+# --- Helper: intentar extraer texto de context_data (jsonb) ---
+def extract_transcript_from_context_data(ctx_obj: Any) -> Optional[str]:
+    # NICO --> Si viene como string JSON, parseamos
+    if isinstance(ctx_obj, str):
+        try:
+            ctx_obj = json.loads(ctx_obj)
+        except Exception:
+            return None
+
+    if not isinstance(ctx_obj, dict):
+        return None
+
+    # 1) Claves directas frecuentes
+    for k in ("full_text", "fullTranscript", "transcript", "content", "text"):
+        v = ctx_obj.get(k)
+        if isinstance(v, str) and v.strip():
+            return v.strip()
+        if isinstance(v, list):
+            joined = "\n".join([str(x) for x in v if isinstance(x, (str, int, float))])
+            if joined.strip():
+                return joined.strip()
+
+    # 2) Conversación como lista de mensajes
+    msgs = ctx_obj.get("messages") or ctx_obj.get("conversation") or ctx_obj.get("turns")
+    if isinstance(msgs, list):
+        lines = []
+        for m in msgs:
+            if isinstance(m, dict):
+                role = (m.get("role") or "").strip()
+                content = (m.get("content") or "").strip()
+                created = format_ts(m.get("created_at") or m.get("ts"))
+                prefix = f"[{created}] " if created else ""
+                rolep  = f"{role}: " if role else ""
+                line = f"{prefix}{rolep}{content}".strip()
+                if line:
+                    lines.append(line)
+        if lines:
+            return "\n".join(lines)
+
+    return None
+
+
+def transcript_from_conversation_row(row: Dict[str, Any]) -> Optional[str]:
+    """
+    Extrae el transcript de una fila de interview_full_conversations, en este orden:
+    full_text -> context_data (heurística) -> claves alternativas.
+    """
+    # 1) full_text directo
+    ft = row.get("full_text")
+    if isinstance(ft, str) and ft.strip():
+        return ft.strip()
+
+    # 2) context_data -> heurística
+    ctx = row.get("context_data")
+    if ctx is not None:
+        t = extract_transcript_from_context_data(ctx)
+        if t:
+            return t
+
+    # 3) compat: otras claves si existieran en la tabla
+    for k in ("full_transcript", "content", "transcript", "text"):
+        v = row.get(k)
+        if isinstance(v, str) and v.strip():
+            return v.strip()
+    return None
+
+
+def transcript_from_messages(rows: Iterable[Dict[str, Any]]) -> Optional[str]:
+    """Arma '[YYYY-MM-DD HH:MM] role: content' por mensaje (ya ordenados por created_at)."""
+    lines: List[str] = []
+    for r in rows:
+        role = r.get("role", "unknown")
+        content = (r.get("content") or "").strip()
+        created = format_ts(r.get("created_at"))
+        lines.append(f"[{created}] {role}: {content}" if created else f"{role}: {content}")
+    return "\n".join(lines) if lines else None
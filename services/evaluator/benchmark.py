@@ -0,0 +1,270 @@
+# --*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*
+# services/evaluator/benchmark.py
+# Benchmark offline del worker: N jobs sintéticos (examples/ + test_data/*_synth.json) -> Redis ->
+# worker.main embebido con FileMockRepository (o SqliteRepository con --repo sqlite) y el provider LLM falso (sin costo de API).
+# Reporta jobs/s, latencia por job (p50/p99) y lag del event loop, para comparar concurrencias.
+#   python -m services.evaluator.benchmark --jobs 200 --concurrency 1,4,16
+#   python -m services.evaluator.benchmark --jobs 100 --concurrency 8 --latency-ms 1500 --rate-429 0.05
+#   python -m services.evaluator.benchmark --jobs 300 --concurrency 4 --mix bulk=0.95,realtime=0.05   (backfill + tráfico vivo)
+#   python -m services.evaluator.benchmark --jobs 300 --concurrency 8 --sigma 1.0 --hedge           (cola larga + hedging)
+#   python -m services.evaluator.benchmark --jobs 100 --concurrency 4 --layout cached_prefix        (cache de prefijos)
+#   python -m services.evaluator.benchmark --jobs 500 --concurrency 32 --repo sqlite                (escrituras agrupadas en SQLite)
+# Requiere Redis (REDIS_URI); usa un stream propio que se borra al terminar.
+# --*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*
+
+import argparse, json, os, asyncio, time, contextlib, io, itertools, math, random, tempfile, uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+SERVICE_DIR = Path(__file__).resolve().parent
+TEST_DATA   = SERVICE_DIR.parents[1] / "test_data"
+
+
+# =============== Jobs sintéticos ===============
+
+def _synth_transcript(role: Dict[str, Any], candidate: Optional[Dict[str, Any]], qualified: bool) -> str:
+    """Entrevista armada con las preguntas del rol; respuestas ideales (qualified) o el resumen del CV."""
+    lines = []
+    summary = ((candidate or {}).get("cv") or {}).get("summary") or "I have not worked on that yet."
+    for item in role.get("interview") or []:
+        lines.append(f"Interviewer: {item['question']['text']}")
+        answer = item["ideal_answer"]["text"].strip('"') if qualified else summary
+        lines.append(f"Candidate: {answer}")
+    return "\n".join(lines)
+
+def load_base_contexts() -> List[Dict[str, Any]]:
+    """Contextos completos de examples/ + uno por candidato sintético (qualified/unqualified) de test_data/."""
+    contexts: List[Dict[str, Any]] = []
+    for path in sorted((SERVICE_DIR / "examples").glob("*.json")):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if isinstance(data, dict) and data.get("full_transcript"):  # --> Los example_* son salidas, no contextos
+            contexts.append(data)
+    template = contexts[0] if contexts else {"system_prompt": "You are a technical evaluator.",
+                                             "rubric": "Score 1-5 per criterion and give a verdict."}
+
+    jobs_file = TEST_DATA / "Jobs-and-questions_synth.json"
+    if jobs_file.exists():
+        with open(jobs_file, "r", encoding="utf-8") as f:
+            roles = {r["role_title"]: r for r in json.load(f).get("roles", [])}
+        for kind in ("qualified", "unqualified"):
+            path = TEST_DATA / f"{kind}-candidates_synth.json"
+            if not path.exists():
+                continue
+            with open(path, "r", encoding="utf-8") as f:
+                candidates = json.load(f)
+            for cand in candidates:
+                role = roles.get(cand.get("candidateFor"))
+                if not role:
+                    continue
+                contexts.append({
+                    "system_prompt": template["system_prompt"],
+                    "rubric": template["rubric"],
+                    "jd": role["job_description"]["text"],
+                    "full_transcript": _synth_transcript(role, cand, kind == "qualified"),
+                })
+    return contexts
+
+def write_jobs(n: int, run_id: str, examples_dir: Path, seed: int) -> List[str]:
+    """Escribe N contextos (ids únicos, transcript con sufijo propio para no pegarle al cache) y devuelve los ids."""
+    rng = random.Random(seed)
+    base = load_base_contexts()
+    ids = []
+    for i, ctx in zip(range(n), itertools.cycle(base)):
+        interview_id = f"bench-{run_id}-{i:05d}"
+        data = {**ctx, "interview_id": interview_id,
+                "full_transcript": ctx["full_transcript"] + f"\nInterviewer: Thanks. (ref {rng.getrandbits(32):08x})"}
+        with open(examples_dir / f"{interview_id}.json", "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        ids.append(interview_id)
+    return ids
+
+
+def parse_mix(raw: str) -> Dict[str, float]:
+    """'bulk=0.9,realtime=0.1' -> {'bulk': 0.9, 'realtime': 0.1} (pesos relativos)."""
+    mix = {}
+    for part in raw.split(","):
+        if "=" in part:
+            lane, weight = part.split("=", 1)
+            mix[lane.strip()] = float(weight)
+    return mix or {"normal": 1.0}
+
+def assign_priorities(ids: List[str], mix: Dict[str, float], seed: int) -> Dict[str, str]:
+    rng = random.Random(seed)
+    lanes, weights = list(mix), list(mix.values())
+    return {i: rng.choices(lanes, weights)[0] for i in ids}
+
+
+# =============== Medición ===============
+
+def percentile(values: List[float], p: float) -> float:
+    """Percentil por rango más cercano (p en 0..100); 0 si no hay valores."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+async def _loop_lag(samples: List[float], interval: float = 0.05) -> None:
+    """Cuánto tarda el loop en despertarnos después de un sleep: >0 = algo bloquea el event loop."""
+    while True:
+        t0 = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append(max(0.0, time.perf_counter() - t0 - interval))
+
+
+async def run_once(args: argparse.Namespace, concurrency: int) -> Dict[str, Any]:
+    from services.evaluator import worker  # --> Import tardío: el env (stream, fake LLM, cache) ya quedó fijado
+    from redis.asyncio import Redis
+    from services.evaluator.app.infrastructure.repository import FileMockRepository
+    from services.evaluator.app.infrastructure.repository_sqlite import SqliteRepository
+    from services.evaluator.app.infrastructure import metrics, hedging
+    from services.evaluator.app.infrastructure.job_queue import enqueue_job, lane_streams
+
+    run_id = uuid.uuid4().hex[:8]
+    tmp = Path(tempfile.mkdtemp(prefix=f"evaluator-bench-{run_id}-"))
+    examples_dir, out_dir = tmp / "examples", tmp / "out"
+    examples_dir.mkdir()
+    ids = write_jobs(args.jobs, run_id, examples_dir, args.seed)
+    priorities = assign_priorities(ids, parse_mix(args.mix), args.seed)
+
+    enqueued: Dict[str, float] = {}
+    finished: Dict[str, float] = {}
+    failed: Dict[str, float] = {}
+    all_done = asyncio.Event()
+
+    base_repo = SqliteRepository if args.repo == "sqlite" else FileMockRepository
+
+    class TimedRepository(base_repo):
+        """Repositorio que anota cuándo termina cada job (done/error)."""
+        async def mark_evaluation_status(self, interview_id, status, error=None):
+            await super().mark_evaluation_status(interview_id, status, error)
+            if status == "done":
+                finished[interview_id] = time.perf_counter()
+                failed.pop(interview_id, None)  # --> Falló y el reintento salió bien
+            elif status == "error":
+                failed[interview_id] = time.perf_counter()
+            if status in ("done", "error"):
+                if len(finished) + len(failed) >= len(ids):
+                    all_done.set()
+
+    worker.CONCURRENCY = concurrency
+    metrics.reset()
+    hedging.reset()  # --> Cada corrida junta su propio p95
+    r = Redis.from_url(worker.REDIS_URI)
+    await r.delete(*lane_streams().values())
+    await worker._ensure_group(r)  # --> Grupos antes de encolar (se crean en "$")
+    for interview_id in ids:
+        enqueued[interview_id] = time.perf_counter()
+        await enqueue_job(r, interview_id, priorities[interview_id])
+
+    lag: List[float] = []
+    stop = asyncio.Event()
+    lag_task = asyncio.create_task(_loop_lag(lag))
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()) if args.quiet else contextlib.nullcontext():
+        worker_task = asyncio.create_task(worker.main(TimedRepository(examples_dir, out_dir), stop))
+        try:
+            await asyncio.wait_for(all_done.wait(), timeout=args.timeout)
+        except asyncio.TimeoutError:
+            pass
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await worker_task
+    lag_task.cancel()
+    await r.delete(*lane_streams().values())
+    await r.aclose()
+
+    latencies = [finished[i] - enqueued[i] for i in finished]
+    by_lane: Dict[str, List[float]] = {}
+    for i in finished:
+        by_lane.setdefault(priorities[i], []).append(finished[i] - enqueued[i])
+    return {
+        "concurrency": concurrency,
+        "repo": args.repo,
+        "jobs": len(ids),
+        "done": len(finished),
+        "errors": len(failed),
+        "elapsed_s": round(elapsed, 2),
+        "jobs_per_s": round(len(finished) / elapsed, 2) if elapsed else 0.0,
+        "latency_p50_s": round(percentile(latencies, 50), 3),
+        "latency_p99_s": round(percentile(latencies, 99), 3),
+        "loop_lag_p50_ms": round(percentile(lag, 50) * 1000, 1),
+        "loop_lag_p99_ms": round(percentile(lag, 99) * 1000, 1),
+        "loop_lag_max_ms": round(max(lag, default=0.0) * 1000, 1),
+        "fake_429": metrics.get("fake_llm_429_total", provider="openai") + metrics.get("fake_llm_429_total", provider="gemini")
+                    + metrics.get("fake_llm_429_total", provider="openrouter"),
+        "tokens": int(_total(metrics, "llm_prompt_tokens_total") + _total(metrics, "llm_completion_tokens_total")),
+        "cached_tokens": int(_total(metrics, "llm_cached_prompt_tokens_total")),
+        "cost_usd": round(_total(metrics, "llm_cost_usd_total"), 4),
+        "hedges": int(_total(metrics, "hedge_fired_total")),
+        "hedge_backup_wins": int(sum(v for n, l, v in metrics.export()["counters"]
+                                     if n == "hedge_wins_total" and l.get("winner") == "backup")),
+        "stage_mean_s": {labels["stage"]: round(total / count, 3) for name, labels, _, _, total, count
+                         in metrics.export()["histograms"] if name == "evaluator_stage_seconds" and count},
+        "lanes": {lane: {"done": len(v), "latency_p50_s": round(percentile(v, 50), 3),
+                         "latency_p99_s": round(percentile(v, 99), 3)} for lane, v in sorted(by_lane.items())},
+        "tmp_dir": str(tmp),
+    }
+
+def _total(metrics, name: str) -> float:
+    """Suma de un contador sobre todas sus series (labels)."""
+    return sum(v for n, _, v in metrics.export()["counters"] if n == name)
+
+def _print_table(rows: List[Dict[str, Any]]) -> None:
+    cols = ["concurrency", "done", "errors", "elapsed_s", "jobs_per_s", "latency_p50_s", "latency_p99_s",
+            "loop_lag_p50_ms", "loop_lag_p99_ms", "loop_lag_max_ms", "fake_429", "tokens", "cached_tokens", "cost_usd", "hedges"]
+    print(" | ".join(cols))
+    for row in rows:
+        print(" | ".join(str(row[c]).rjust(len(c)) for c in cols))
+
+async def main(args: argparse.Namespace) -> None:
+    rows = []
+    for c in [int(x) for x in args.concurrency.split(",") if x.strip()]:
+        print(f"[Bench] {args.jobs} jobs con EVALUATOR_CONCURRENCY={c} ...")
+        row = await run_once(args, c)
+        rows.append(row)
+        print(f"[Bench] {json.dumps(row)}")
+    _print_table(rows)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description="Benchmark offline del worker con provider LLM falso")
+    p.add_argument("--jobs", type=int, default=100)
+    p.add_argument("--concurrency", default="1,4,16", help="Lista separada por comas (una corrida por valor)")
+    p.add_argument("--latency-ms", type=float, help="Mediana de latencia del provider falso")
+    p.add_argument("--sigma", type=float, help="Dispersión log-normal de la latencia")
+    p.add_argument("--tokens-per-s", type=float, help="Velocidad de generación del provider falso")
+    p.add_argument("--error-rate", type=float, help="Probabilidad de error 500 por llamada")
+    p.add_argument("--rate-429", type=float, help="Probabilidad de 429 por llamada")
+    p.add_argument("--mix", default="normal=1", help="Reparto de jobs por carril, ej. bulk=0.9,realtime=0.1")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--hedge", action="store_true", help="Activa hedged requests (EVALUATOR_HEDGE=1)")
+    p.add_argument("--layout", choices=("single", "cached_prefix"), help="Layout del prompt (EVALUATOR_PROMPT_LAYOUT)")
+    p.add_argument("--repo", choices=("mock", "sqlite"), default="mock", help="Backend de datos del worker")
+    p.add_argument("--cache", action="store_true", help="Deja activo el cache de evaluaciones (default: apagado)")
+    p.add_argument("--timeout", type=float, default=600.0, help="Corte por corrida (s)")
+    p.add_argument("--json", help="Guarda los resultados en este archivo")
+    p.add_argument("--verbose", dest="quiet", action="store_false", help="Muestra los logs del worker")
+    args = p.parse_args()
+
+    # --> Config por ENV antes de importar worker/app (se lee a nivel módulo)
+    os.environ["EVALUATOR_FAKE_LLM"] = "1"
+    os.environ.setdefault("EVALUATOR_STREAM", "evaluation_jobs:bench")
+    os.environ.setdefault("EVALUATOR_GROUP", "evaluator_bench")
+    os.environ.setdefault("EVALUATOR_RECLAIM_EVERY_S", "1")  # --> XREADGROUP con block corto: corte rápido al final
+    os.environ["EVALUATOR_FAKE_SEED"] = str(args.seed)
+    if not args.cache:
+        os.environ["EVALUATOR_CACHE"] = "0"
+    if args.hedge:
+        os.environ["EVALUATOR_HEDGE"] = "1"
+    if args.layout:
+        os.environ["EVALUATOR_PROMPT_LAYOUT"] = args.layout
+    for flag, env in (("latency_ms", "EVALUATOR_FAKE_LATENCY_MS"), ("sigma", "EVALUATOR_FAKE_LATENCY_SIGMA"),
+                      ("tokens_per_s", "EVALUATOR_FAKE_TOKENS_PER_S"), ("error_rate", "EVALUATOR_FAKE_ERROR_RATE"),
+                      ("rate_429", "EVALUATOR_FAKE_429_RATE")):
+        if getattr(args, flag) is not None:
+            os.environ[env] = str(getattr(args, flag))
+    asyncio.run(main(args))
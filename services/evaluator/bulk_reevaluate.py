@@ -0,0 +1,231 @@
+# --*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*
+# services/evaluator/bulk_reevaluate.py
+# Re-evaluación masiva (cambio de rubric/prompt/modelo): selecciona entrevistas, descarta las que ya
+# están en el cache de resultados, y las encola (worker) o las corre acá mismo con concurrencia acotada
+# y límite de RPM por provider. Checkpoint JSONL por corrida: si se cae, se relanza y sigue donde quedó.
+#   python -m services.evaluator.bulk_reevaluate --status done --since 2025-01-01 --dry-run
+#   python -m services.evaluator.bulk_reevaluate --ids-file ids.txt --mode run --concurrency 8 --rpm openai=300
+#   python -m services.evaluator.bulk_reevaluate --run rubric-v3 --mode enqueue     (reanuda si ya existe)
+# --*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*
+
+import argparse, json, os, asyncio, time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, List, Set
+
+from services.evaluator.app.infrastructure.repository import select_repository, EvaluatorRepository
+from services.evaluator.app.domain.entities.interview import Interview
+from services.evaluator.app.infrastructure.llm_provider import (
+    run_evaluations, pending_slots, build_full_prompt,
+)
+from services.evaluator.app.infrastructure.rate_limit import set_rate_limit
+from services.evaluator.app.infrastructure.token_budget import estimate_tokens, estimate_cost, OUTPUT_RESERVE_TOKENS
+from services.evaluator.app.infrastructure.job_queue import enqueue_job, PRIORITIES
+from services.evaluator.app.infrastructure import metrics
+
+REDIS_URI   = os.getenv("REDIS_URI", "redis://redis:6379/0")   # --> Conexión Redis
+BULK_DIR    = Path(os.getenv("EVALUATOR_BULK_DIR", "out/bulk")) # --> Checkpoints <run>.jsonl
+
+
+# =============== Checkpoint ===============
+
+class Checkpoint:
+    """
+    Un JSONL append-only por corrida: una línea por entrevista terminada
+    {"interview_id", "status": done|skipped|enqueued|error, "cost_usd", "error", "at"}.
+    Al reanudar se saltean los ids con estado final (las 'error' se reintentan).
+    """
+    FINAL = {"done", "skipped", "enqueued"}
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.completed: Set[str] = set()
+        if path.exists():
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        rec = json.loads(line)
+                    except ValueError:
+                        continue  # --> Última línea cortada por un crash
+                    if rec.get("status") in self.FINAL:
+                        self.completed.add(str(rec.get("interview_id")))
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._fh = open(path, "a", encoding="utf-8")
+
+    def record(self, interview_id: str, status: str, **extra: Any) -> None:
+        rec = {"interview_id": interview_id, "status": status, **extra,
+               "at": datetime.now(timezone.utc).isoformat()}
+        self._fh.write(json.dumps(rec, ensure_ascii=False) + "\n")
+        self._fh.flush()  # --> Cada línea a disco apenas termina: un crash pierde a lo sumo los jobs en vuelo
+        if status in self.FINAL:
+            self.completed.add(interview_id)
+
+    def close(self) -> None:
+        self._fh.close()
+
+
+# =============== Progreso ===============
+
+class Progress:
+    """Contadores de la corrida + reporte de throughput, ETA y costo (estimado en enqueue/dry-run, real en run)."""
+
+    def __init__(self, total: int) -> None:
+        self.total = total
+        self.started = time.monotonic()
+        self.done = self.skipped = self.errors = 0
+        self.cost_usd = 0.0
+
+    @property
+    def processed(self) -> int:
+        return self.done + self.skipped + self.errors
+
+    def line(self) -> str:
+        elapsed = max(time.monotonic() - self.started, 1e-6)
+        rate = self.processed / elapsed
+        remaining = self.total - self.processed
+        eta = f"{remaining / rate:.0f}s" if rate > 0 else "?"
+        return (f"[Bulk] {self.processed}/{self.total} done={self.done} skipped={self.skipped} "
+                f"errors={self.errors} | {rate * 60:.1f}/min ETA={eta} | cost~${self.cost_usd:.4f}")
+
+
+def estimate_interview_cost(interview: Interview, slots: List[tuple]) -> float:
+    """Costo estimado (USD) de evaluar los slots pendientes: prompt completo de entrada + max_tokens de salida."""
+    input_tokens = estimate_tokens(build_full_prompt(interview.system_prompt, interview.rubric, interview.full_transcript))
+    total = 0.0
+    for _, _, model, params, _, _ in slots:
+        total += estimate_cost(model, input_tokens, int(params.get("max_tokens") or OUTPUT_RESERVE_TOKENS))
+    return total
+
+
+# =============== Selección ===============
+
+async def _select_ids(repo: EvaluatorRepository, args: argparse.Namespace) -> List[str]:
+    ids: List[str] = list(args.ids or [])
+    if args.ids_file:
+        with open(args.ids_file, "r", encoding="utf-8") as f:
+            ids.extend(line.strip() for line in f if line.strip() and not line.startswith("#"))
+    if not ids:
+        ids = await repo.list_interview_ids(status=args.status, since=args.since,
+                                            until=args.until, limit=args.limit)
+    seen: Set[str] = set()
+    unique = [i for i in ids if not (i in seen or seen.add(i))]  # --> Sin duplicados, respetando el orden
+    return unique[:args.limit] if args.limit else unique
+
+
+# =============== Procesamiento ===============
+
+async def _process_one(interview_id: str, repo: EvaluatorRepository, redis: Any,
+                       args: argparse.Namespace, ckpt: Checkpoint, progress: Progress) -> None:
+    """
+    Una entrevista:
+      1) carga contexto y calcula slots pendientes (no cacheados; con --force todos); sin pendientes -> skipped
+      2) enqueue -> XADD al stream del worker | run -> mismo flujo que worker.process_job
+    --force también viaja en el job encolado ("reevaluate": el worker ignora el cache para ese job).
+    """
+    try:
+        interview = Interview.from_dict(await repo.get_interview_context(interview_id))
+        slots = await pending_slots(interview, use_cache=not args.force)
+        if not slots and not args.force:
+            progress.skipped += 1
+            ckpt.record(interview_id, "skipped")
+            return
+        cost = estimate_interview_cost(interview, slots)
+
+        if args.dry_run:
+            progress.done += 1
+            progress.cost_usd += cost
+            return  # --> Sin checkpoint: un dry-run no consume la corrida
+        if args.mode == "enqueue":
+            extra = {"reevaluate": True} if args.force else {}
+            await enqueue_job(redis, interview_id, args.priority, **extra)  # --> Carril bulk: no le roba turno a las entrevistas nuevas
+            progress.done += 1
+            progress.cost_usd += cost
+            ckpt.record(interview_id, "enqueued", cost_usd=round(cost, 6))
+            return
+
+        await repo.mark_evaluation_status(interview_id, "running")
+        with metrics.usage_scope() as usage:  # --> Tokens/costo reales de esta entrevista
+            interview = await run_evaluations(interview, use_cache=not args.force)
+        interview.evaluation_usage = usage.to_dict()
+        await repo.save_evaluation_results(interview_id, interview.to_dict())
+        await repo.mark_evaluation_status(interview_id, "done")
+        cost = interview.evaluation_usage["totals"]["cost_usd"]
+        progress.done += 1
+        progress.cost_usd += cost
+        ckpt.record(interview_id, "done", cost_usd=round(cost, 6))
+    except Exception as e:
+        progress.errors += 1
+        ckpt.record(interview_id, "error", error=str(e)[:500])
+        print(f"[Bulk] ERROR interview_id={interview_id}: {e}")
+        if args.mode == "run" and not args.dry_run:
+            try:
+                await repo.mark_evaluation_status(interview_id, "error", str(e))
+            except Exception:
+                pass
+
+async def _report(progress: Progress, every_s: float) -> None:
+    while True:
+        await asyncio.sleep(every_s)
+        print(progress.line())
+
+async def main(args: argparse.Namespace) -> None:
+    for spec in args.rpm or []:
+        provider, _, rpm = spec.partition("=")
+        set_rate_limit(provider.strip(), float(rpm))  # --> Pisa EVALUATOR_RATE_LIMITS para esta corrida
+
+    repo = select_repository(args.repo)
+    await repo.warmup()
+    ids = await _select_ids(repo, args)
+
+    run_name = args.run or datetime.now(timezone.utc).strftime("bulk-%Y%m%dT%H%M%S")
+    path = BULK_DIR / f"{run_name}.jsonl"
+    if args.restart and path.exists():
+        path.unlink()
+    ckpt = Checkpoint(path)
+    todo = [i for i in ids if i not in ckpt.completed]
+    print(f"[Bulk] run={run_name} mode={args.mode}{' (dry-run)' if args.dry_run else ''} "
+          f"seleccionadas={len(ids)} ya hechas={len(ids) - len(todo)} pendientes={len(todo)} checkpoint={path}")
+
+    redis = None
+    if args.mode == "enqueue" and not args.dry_run:
+        from redis.asyncio import Redis
+        redis = Redis.from_url(REDIS_URI)
+
+    progress = Progress(len(todo))
+    sem = asyncio.Semaphore(args.concurrency)  # --> Tope de entrevistas en vuelo; el RPM lo pone el limiter
+
+    async def worker(interview_id: str) -> None:
+        async with sem:
+            await _process_one(interview_id, repo, redis, args, ckpt, progress)
+
+    reporter = asyncio.create_task(_report(progress, args.report_every))
+    try:
+        await asyncio.gather(*(worker(i) for i in todo))
+    finally:
+        reporter.cancel()
+        ckpt.close()
+        if redis is not None:
+            await redis.aclose()
+    print(progress.line())
+    print(f"[Bulk] Fin run={run_name} (relanzar con --run {run_name} reintenta solo los errores)")
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description="Re-evaluación masiva con checkpoint")
+    p.add_argument("--ids", nargs="*", help="id_interview explícitos")
+    p.add_argument("--ids-file", help="Archivo con un id por línea")
+    p.add_argument("--status", help="Filtra por evaluation_status (ej. done, error)")
+    p.add_argument("--since", help="timestamp_created >= (ISO 8601)")
+    p.add_argument("--until", help="timestamp_created < (ISO 8601)")
+    p.add_argument("--limit", type=int, help="Máximo de entrevistas")
+    p.add_argument("--mode", choices=["enqueue", "run"], default="enqueue")
+    p.add_argument("--priority", choices=PRIORITIES, default="bulk", help="Carril de la cola (modo enqueue)")
+    p.add_argument("--concurrency", type=int, default=4, help="Entrevistas en vuelo (modo run)")
+    p.add_argument("--rpm", action="append", metavar="PROVIDER=N", help="Límite de requests/min por provider")
+    p.add_argument("--run", help="Nombre de la corrida (checkpoint); si existe se reanuda")
+    p.add_argument("--restart", action="store_true", help="Descarta el checkpoint de --run y empieza de cero")
+    p.add_argument("--force", action="store_true", help="Ignora el cache de resultados (también en los jobs encolados)")
+    p.add_argument("--dry-run", action="store_true", help="Solo selecciona y estima costo")
+    p.add_argument("--report-every", type=float, default=10.0, help="Segundos entre reportes de progreso")
+    p.add_argument("--repo", help="mock | supabase (default: EVALUATOR_REPO)")
+    asyncio.run(main(p.parse_args()))
@@ -0,0 +1,123 @@
+# --*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*
+# services/evaluator/deadletter.py
+# Admin CLI del dead-letter: lista jobs fallidos (con motivo) y los reencola en el stream principal.
+#   python -m services.evaluator.deadletter list
+#   python -m services.evaluator.deadletter replay --id <entry_id> [--id ...]
+#   python -m services.evaluator.deadletter replay --all
+#   python -m services.evaluator.deadletter purge
+# --*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*
+
+import argparse, json, os, asyncio, time
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from redis.asyncio import Redis
+
+STREAM_NAME       = os.getenv("EVALUATOR_STREAM", "evaluation_jobs") # --> Stream/cola principal
+DEADLETTER_STREAM = os.getenv("EVALUATOR_DEADLETTER_STREAM", f"{STREAM_NAME}:dead") # --> Mismo default que worker.py
+REDIS_URI         = os.getenv("REDIS_URI", "redis://redis:6379/0") # --> Conexión Redis
+PAGE_SIZE         = 500 # --> replay --all recorre el stream en páginas de este tamaño
+
+
+def _s(v: Any) -> str:
+    """bytes -> str (Redis sin decode_responses)."""
+    return v.decode("utf-8", errors="replace") if isinstance(v, bytes) else str(v)
+
+def _decode(entries: List[Any]) -> List[Tuple[str, Dict[str, str]]]:
+    return [(_s(eid), {_s(k): _s(v) for k, v in fields.items()}) for eid, fields in entries]
+
+async def _read_all(r: Redis, count: int) -> List[Tuple[str, Dict[str, str]]]:
+    """Lee hasta 'count' entries del dead-letter (más viejos primero)."""
+    return _decode(await r.xrange(DEADLETTER_STREAM, count=count))
+
+async def _read_one(r: Redis, eid: str) -> Optional[Dict[str, str]]:
+    """Un entry puntual por id (XRANGE eid eid), esté donde esté en el stream."""
+    entries = _decode(await r.xrange(DEADLETTER_STREAM, min=eid, max=eid))
+    return entries[0][1] if entries else None
+
+async def _iter_all(r: Redis) -> AsyncIterator[Tuple[str, Dict[str, str]]]:
+    """Todo el dead-letter en páginas de PAGE_SIZE (cursor exclusivo: tolera que se borren los ya leídos)."""
+    start = "-"
+    while True:
+        page = _decode(await r.xrange(DEADLETTER_STREAM, min=start, count=PAGE_SIZE))
+        for entry in page:
+            yield entry
+        if len(page) < PAGE_SIZE:
+            return
+        start = f"({page[-1][0]}"
+
+def _refresh_enqueued_at(payload: str) -> str:
+    """Reencolar es encolar de nuevo: la espera en cola se mide desde el replay, no desde el encolado original."""
+    try:
+        data = json.loads(payload)
+    except ValueError:
+        return payload
+    if not isinstance(data, dict):
+        return payload
+    data["enqueued_at"] = time.time()
+    return json.dumps(data)
+
+async def cmd_list(r: Redis, count: int) -> None:
+    entries = await _read_all(r, count)
+    total = await r.xlen(DEADLETTER_STREAM)
+    print(f"[DeadLetter] stream={DEADLETTER_STREAM} total={total}")
+    for eid, f in entries:
+        try:
+            interview_id = json.loads(f.get("payload") or "{}").get("interview_id")
+        except Exception:
+            interview_id = None
+        print(f"  {eid} interview_id={interview_id} attempts={f.get('attempts')} "
+              f"failed_at={f.get('failed_at')} reason={f.get('reason', '')[:160]}")
+
+async def _replay_one(r: Redis, eid: str, f: Dict[str, str], keep: bool) -> None:
+    payload = _refresh_enqueued_at(f.get("payload") or "{}")
+    target = f.get("source_stream") or STREAM_NAME  # --> Vuelve al stream de origen (misma prioridad)
+    new_id = await r.xadd(target, {"payload": payload}) # --> Entry nuevo: contador de entregas en 0
+    if not keep:
+        await r.xdel(DEADLETTER_STREAM, eid)
+    print(f"[DeadLetter] Reencolado {eid} -> {target} {_s(new_id)} payload={payload}")
+
+async def cmd_replay(r: Redis, ids: List[str], replay_all: bool, keep: bool) -> None:
+    if replay_all:
+        async for eid, f in _iter_all(r):
+            await _replay_one(r, eid, f, keep)
+        return
+    for eid in ids:
+        f = await _read_one(r, eid)
+        if f is None:
+            print(f"[DeadLetter] WARNING: entry {eid} no existe en {DEADLETTER_STREAM}")
+            continue
+        await _replay_one(r, eid, f, keep)
+
+async def cmd_purge(r: Redis) -> None:
+    total = await r.xlen(DEADLETTER_STREAM)
+    await r.delete(DEADLETTER_STREAM)
+    print(f"[DeadLetter] Purga: {total} entries eliminados de {DEADLETTER_STREAM}")
+
+async def main(args: argparse.Namespace) -> None:
+    r = Redis.from_url(REDIS_URI) # --> Cliente Redis
+    try:
+        if args.cmd == "list":
+            await cmd_list(r, args.count)
+        elif args.cmd == "replay":
+            if not args.all and not args.id:
+                raise SystemExit("replay requiere --id <entry_id> o --all")
+            await cmd_replay(r, args.id or [], args.all, args.keep)
+        elif args.cmd == "purge":
+            await cmd_purge(r)
+    finally:
+        await r.aclose()
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description="Inspección y replay del dead-letter del Evaluator")
+    sub = p.add_subparsers(dest="cmd", required=True)
+
+    p_list = sub.add_parser("list", help="Lista jobs en dead-letter")
+    p_list.add_argument("--count", type=int, default=100, help="máximo de entries a mostrar")
+
+    p_replay = sub.add_parser("replay", help="Reencola jobs del dead-letter")
+    p_replay.add_argument("--id", action="append", help="entry_id del dead-letter (repetible)")
+    p_replay.add_argument("--all", action="store_true", help="reencola todo el dead-letter")
+    p_replay.add_argument("--keep", action="store_true", help="no borra el entry del dead-letter")
+
+    sub.add_parser("purge", help="Borra el stream de dead-letter")
+
+    asyncio.run(main(p.parse_args()))
@@ -1,22 +1,25 @@
 # --*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*
 # services/evaluator/enqueue.py
-# Productor simple: encola un job con {"interview_id": "<UUID>"} en el stream de Redis.
+# Productor simple: encola un job con {"interview_id": "<UUID>"} en el carril de prioridad elegido.
+#   realtime -> entrevista recién terminada | normal -> default | bulk -> re-evaluaciones masivas
 # --*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*
 
-import argparse, json, os, asyncio
+import argparse, os, asyncio
 from redis.asyncio import Redis
 
-STREAM_NAME = os.getenv("EVALUATOR_STREAM", "evaluation_jobs") # --> Stream/cola
+from services.evaluator.app.infrastructure.job_queue import enqueue_job, stream_for, PRIORITIES, DEFAULT_PRIORITY
+
 REDIS_URI   = os.getenv("REDIS_URI", "redis://redis:6379/0") # --> Conexión Redis
 
-async def main(interview_id: str):
+async def main(interview_id: str, priority: str):
     r = Redis.from_url(REDIS_URI) # --> Cliente Redis
-    payload = {"interview_id": interview_id}  # --> Cuerpo del job
-    await r.xadd(STREAM_NAME, {"payload": json.dumps(payload)}) # --> Encolamos como campo "payload"
-    print(f"[Enqueue] Job encolado: stream={STREAM_NAME} interview_id={interview_id}")
+    await enqueue_job(r, interview_id, priority) # --> Payload JSON en el campo "payload" del stream del carril
+    print(f"[Enqueue] Job encolado: stream={stream_for(priority)} priority={priority} interview_id={interview_id}")
+    await r.aclose()
 
 if __name__ == "__main__":
     p = argparse.ArgumentParser()
     p.add_argument("--id", required=True, help="id_interview real")
+    p.add_argument("--priority", choices=PRIORITIES, default=DEFAULT_PRIORITY, help="Carril de prioridad")
     args = p.parse_args()
-    asyncio.run(main(args.id))
+    asyncio.run(main(args.id, args.priority))
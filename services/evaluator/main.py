@@ -1,18 +1,30 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from app.infrastructure.api.routes import router
 from app.infrastructure.api.evaluation_routes import router as evaluation_router
 from app.infrastructure.api.reporting_routes import router as reporting_router
 from app.infrastructure.config import get_settings
+from app.infrastructure import metrics
+from app.infrastructure.evaluation_cache import get_evaluation_cache
+from app.infrastructure.rate_limit import limiter_stats
+from app.infrastructure.repository import close_repository
 import uvicorn
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    await close_repository()  # --> Repositorio compartido por los requests (get_repository)
+
 def create_app() -> FastAPI:
     settings = get_settings()
     
     app = FastAPI(
         title=settings.PROJECT_NAME,
         description="Service for evaluating technical interviews using multiple LLM providers",
-        version="1.0.0"
+        version="1.0.0",
+        lifespan=lifespan,
     )
     
     # CORS configuration
@@ -45,6 +57,21 @@ async def health_check():
         "features": ["llm-evaluation", "reporting", "statistics"]
     }
 
+# Métricas in-process (contadores, histogramas, cache de evaluaciones y limiters por provider)
+# + las que publican los workers en Redis. ?format=prometheus -> texto de exposición Prometheus.
+@app.get("/metrics")
+async def get_metrics(format: str = "json"):
+    workers = await metrics.collect_exports()
+    if format == "prometheus":
+        return PlainTextResponse(metrics.render_prometheus({"api": metrics.export(), **workers}),
+                                 media_type="text/plain; version=0.0.4")
+    return {
+        **metrics.snapshot(),
+        "evaluation_cache": get_evaluation_cache().stats(),
+        "rate_limits": limiter_stats(),
+        "workers": {name: metrics.snapshot(data) for name, data in workers.items()},
+    }
+
 if __name__ == "__main__":
     uvicorn.run(
         "main:app",
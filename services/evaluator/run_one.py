@@ -16,11 +16,19 @@ from services.evaluator.app.infrastructure.llm_provider import run_evaluations
 from services.evaluator.app.domain.entities.interview import Interview
 
 
-async def run_once(interview_id: str, repo_kind: str):
+async def run_once(interview_id: str, repo_kind: str, use_cache: bool = True):
     # NICO --> Selección explícita del backend de datos
-    #         "supabase" = SupabaseRepository (real), cualquier otro valor = mock
-    use_supabase = (repo_kind or "").lower() == "supabase"
-    repo = SupabaseRepository() if use_supabase else FileMockRepository()
+    #         "supabase" = SupabaseRepository (real), "sqlite" = SqliteRepository (local), cualquier otro valor = mock
+    repo_kind = (repo_kind or "").lower()
+    if repo_kind == "supabase":
+        repo = SupabaseRepository()
+    elif repo_kind == "sqlite":
+        from services.evaluator.app.infrastructure.repository_sqlite import SqliteRepository
+        repo = SqliteRepository()
+    else:
+        repo = FileMockRepository()
+
+    await repo.warmup()
 
     # NICO --> Estado inicial: running (DB o fallback local)
     await repo.mark_evaluation_status(interview_id, "running")
@@ -30,21 +38,23 @@ async def run_once(interview_id: str, repo_kind: str):
 
     # NICO --> Entidad + evaluaciones
     interview = Interview.from_dict(ctx)
-    interview = await run_evaluations(interview)
+    interview = await run_evaluations(interview, use_cache=use_cache)
 
     # NICO --> Persistencia de resultados (DB preferente, fallback local si falta columna)
     await repo.save_evaluation_results(interview_id, interview.to_dict())
 
     # NICO --> Estado final
     await repo.mark_evaluation_status(interview_id, "done")
+    await repo.close()
     print(f"[RunOne] DONE {interview_id}")
 
 
 if __name__ == "__main__":
     p = argparse.ArgumentParser()
     p.add_argument("--id", required=True, help="ID de interview (INT en DB o demo-xxx en mock)")
-    p.add_argument("--repo", default=os.getenv("EVALUATOR_REPO", "supabase"), help="supabase | mock")
+    p.add_argument("--repo", default=os.getenv("EVALUATOR_REPO", "supabase"), help="supabase | sqlite | mock")
+    p.add_argument("--no-cache", action="store_true", help="ignora el cache de evaluaciones (re-evalúa)")
     args = p.parse_args()
 
     # NICO --> Ejecuta el flujo asíncrono
-    asyncio.run(run_once(args.id, args.repo))
+    asyncio.run(run_once(args.id, args.repo, use_cache=not args.no_cache))
@@ -0,0 +1,136 @@
+# --*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*
+# services/evaluator/supervisor.py
+# Supervisor de workers: levanta N procesos worker.py (cada uno con su EVALUATOR_CONSUMER único),
+# mira el lag del consumer group cada EVALUATOR_SCALE_EVERY_S y ajusta el pool entre
+# EVALUATOR_SCALE_MIN y EVALUATOR_SCALE_MAX (ver app/infrastructure/autoscaler.py).
+#   - worker que muere solo -> se repone (y su consumer se retira cuando no le queden pendientes)
+#   - bajar un worker -> SIGTERM (drena hasta EVALUATOR_DRAIN_TIMEOUT_S y libera el resto), SIGKILL si no sale en EVALUATOR_SCALE_STOP_TIMEOUT_S
+#   - consumers retirados / abandonados sin pendientes -> XGROUP DELCONSUMER
+#   python -m services.evaluator.supervisor
+#   python -m services.evaluator.supervisor --min 2 --max 8
+# --*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*
+
+import argparse, asyncio, os, signal, socket, sys, time
+from typing import Dict, Optional, Set
+
+from redis.asyncio import Redis
+
+from services.evaluator.app.infrastructure.autoscaler import ScalePolicy, read_lag, retire_consumers
+
+REDIS_URI       = os.getenv("REDIS_URI", "redis://redis:6379/0")
+CONSUMER_PREFIX = os.getenv("EVALUATOR_CONSUMER_PREFIX", "evaluator")     # --> Consumers: <prefix>-<host>-<pid>-<n>
+SCALE_EVERY_S   = float(os.getenv("EVALUATOR_SCALE_EVERY_S", "15"))       # --> Cada cuánto se mira el lag
+STOP_TIMEOUT_S  = float(os.getenv("EVALUATOR_SCALE_STOP_TIMEOUT_S", "120"))  # --> Espera tras SIGTERM antes de SIGKILL
+
+
+class WorkerPool:
+    """Procesos worker vivos (consumer -> proceso) y consumers a retirar del grupo."""
+
+    def __init__(self, prefix: str = CONSUMER_PREFIX) -> None:
+        self.prefix = f"{prefix}-{socket.gethostname()}-{os.getpid()}"
+        self.procs: Dict[str, asyncio.subprocess.Process] = {}
+        self.retiring: Set[str] = set()
+        self._seq = 0
+
+    def __len__(self) -> int:
+        return len(self.procs)
+
+    async def spawn(self) -> str:
+        self._seq += 1
+        consumer = f"{self.prefix}-{self._seq}"
+        env = {**os.environ, "EVALUATOR_CONSUMER": consumer}
+        self.procs[consumer] = await asyncio.create_subprocess_exec(
+            sys.executable, "-m", "services.evaluator.worker", env=env)
+        print(f"[Supervisor] + {consumer} (pid={self.procs[consumer].pid})")
+        return consumer
+
+    async def stop(self, consumer: str) -> None:
+        proc = self.procs.pop(consumer)
+        self.retiring.add(consumer)
+        if proc.returncode is None:
+            proc.send_signal(signal.SIGTERM)
+            try:
+                await asyncio.wait_for(proc.wait(), timeout=STOP_TIMEOUT_S)
+            except asyncio.TimeoutError:
+                print(f"[Supervisor] {consumer} no terminó en {STOP_TIMEOUT_S}s: SIGKILL")
+                proc.kill()
+                await proc.wait()
+        print(f"[Supervisor] - {consumer} (exit={proc.returncode})")
+
+    async def stop_newest(self) -> None:
+        await self.stop(list(self.procs)[-1])  # --> LIFO: los más viejos siguen con sus conexiones calientes
+
+    def reap(self) -> int:
+        """Saca del pool los procesos que murieron solos (se reponen en el próximo ajuste)."""
+        dead = [c for c, p in self.procs.items() if p.returncode is not None]
+        for consumer in dead:
+            print(f"[Supervisor] {consumer} salió solo (exit={self.procs.pop(consumer).returncode})")
+            self.retiring.add(consumer)
+        return len(dead)
+
+    async def stop_all(self) -> None:
+        await asyncio.gather(*[self.stop(c) for c in list(self.procs)])
+
+
+async def run(policy: ScalePolicy, stop: asyncio.Event, every_s: float = SCALE_EVERY_S) -> None:
+    r = Redis.from_url(REDIS_URI)
+    pool = WorkerPool()
+    idle_since: Optional[float] = None
+    print(f"[Supervisor] online | workers={policy.min_workers}..{policy.max_workers} "
+          f"backlog_per_worker={policy.backlog_per_worker} max_wait={policy.max_wait_s}s idle={policy.idle_s}s")
+    try:
+        while not stop.is_set():
+            pool.reap()
+            try:
+                lag = await read_lag(r)
+            except Exception as e:
+                print(f"[Supervisor] WARNING: no pude leer el lag: {e}")
+                lag = None
+
+            now = time.monotonic()
+            if lag is not None and lag.idle:
+                idle_since = idle_since if idle_since is not None else now
+            else:
+                idle_since = None
+            current = len(pool)
+            target = policy.clamp(current) if lag is None else policy.desired(current, lag, now - (idle_since or now))
+            if target != current:
+                print(f"[Supervisor] {current} -> {target} workers | lag={lag.to_dict() if lag else None}")
+            while len(pool) < target:
+                await pool.spawn()
+            while len(pool) > target:
+                await pool.stop_newest()
+                idle_since = time.monotonic()  # --> Un paso por período ocioso
+
+            try:
+                pool.retiring -= await retire_consumers(r, pool.retiring, live=pool.procs, prefix=f"{CONSUMER_PREFIX}-")
+            except Exception as e:
+                print(f"[Supervisor] WARNING: no pude retirar consumers: {e}")
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=every_s)
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        await pool.stop_all()
+        try:
+            await retire_consumers(r, pool.retiring)
+        except Exception:
+            pass
+        await r.aclose()
+        print("[Supervisor] offline")
+
+
+async def main(args: argparse.Namespace) -> None:
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop.set)  # --> Apaga el pool ordenado (SIGTERM a cada worker)
+    policy = ScalePolicy(**{k: v for k, v in (("min_workers", args.min), ("max_workers", args.max)) if v is not None})
+    await run(policy, stop)
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser()
+    p.add_argument("--min", type=int, help="Workers mínimos (EVALUATOR_SCALE_MIN)")
+    p.add_argument("--max", type=int, help="Workers máximos (EVALUATOR_SCALE_MAX)")
+    asyncio.run(main(p.parse_args()))
@@ -24,6 +24,11 @@ def setup_test_env():
     os.environ.setdefault("STORAGE_PATH", TEST_STORAGE_PATH)
     os.environ.setdefault("DEBUG", "True")
     os.environ.setdefault("DEVELOPMENT_MODE", "True")
+    os.environ.setdefault("EVALUATOR_CACHE_BACKEND", "memory")  # --> Sin Redis en tests
+    os.environ.setdefault("EVALUATOR_RATE_LIMIT_BACKEND", "memory")
+    os.environ.setdefault("EVALUATOR_STATUS_PUBSUB", "0")  # --> Sin publicar estados a Redis
+    os.environ.setdefault("EVALUATOR_METRICS_BACKEND", "memory")
+    os.environ.setdefault("EVALUATOR_COMPACT", "off")  # --> Los tests ven el transcript tal cual (salvo test_transcript_compaction)
 
 # Call setup when imported
 setup_test_env()
\ No newline at end of file
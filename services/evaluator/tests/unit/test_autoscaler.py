@@ -0,0 +1,110 @@
+"""
+Unit tests for the worker autoscaler.
+Tests the scaling policy, consumer-group lag reading and consumer retirement.
+"""
+import pytest
+from unittest.mock import AsyncMock
+from redis.exceptions import ResponseError
+from app.infrastructure.autoscaler import GROUP_NAME, QueueLag, ScalePolicy, read_lag, retire_consumers
+from app.infrastructure.job_queue import stream_for
+
+NOW = 1_700_000_100.0
+
+
+def policy(**kw):
+    return ScalePolicy(**{"min_workers": 1, "max_workers": 6, "backlog_per_worker": 10, "max_wait_s": 60,
+                          "idle_s": 300, **kw})
+
+
+class TestScalePolicy:
+    """Test suite for ScalePolicy.desired"""
+
+    def test_scales_up_on_backlog(self):
+        """Backlog is split across workers, never shrinking the pool while there is work"""
+        assert policy().desired(1, QueueLag(backlog=35)) == 4
+        assert policy().desired(5, QueueLag(backlog=35)) == 5
+
+    def test_old_job_adds_a_worker(self):
+        """A job waiting past max_wait_s adds at least one worker"""
+        assert policy().desired(2, QueueLag(backlog=5, oldest_wait_s=90)) == 3
+        assert policy().desired(2, QueueLag(backlog=5, oldest_wait_s=10)) == 2
+
+    def test_scales_down_only_after_idle_period(self):
+        """An empty queue removes one worker once it has been idle for idle_s; pending work keeps the pool"""
+        assert policy().desired(3, QueueLag(), idle_for_s=100) == 3
+        assert policy().desired(3, QueueLag(), idle_for_s=300) == 2
+        assert policy().desired(3, QueueLag(pending=2), idle_for_s=900) == 3
+
+    def test_bounds(self):
+        """The result always stays within [min_workers, max_workers]"""
+        assert policy().desired(1, QueueLag(backlog=1000)) == 6
+        assert policy(min_workers=2).desired(2, QueueLag(), idle_for_s=900) == 2
+        assert policy(min_workers=2).desired(0, QueueLag()) == 2
+
+
+def redis_with(groups, entries):
+    r = AsyncMock()
+
+    async def xinfo_groups(stream):
+        if stream not in groups:
+            raise ResponseError("no such key")
+        return groups[stream]
+
+    r.xinfo_groups.side_effect = xinfo_groups
+    r.xrange.side_effect = lambda stream, min, count: entries.get(stream, [])[:count]
+    return r
+
+
+class TestReadLag:
+    """Test suite for read_lag"""
+
+    @pytest.mark.asyncio
+    async def test_lag_pending_and_oldest_wait(self):
+        """Backlog and pending add up across lanes; the oldest undelivered entry gives the wait"""
+        normal, bulk = stream_for("normal"), stream_for("bulk")
+        r = redis_with(
+            {normal: [{"name": GROUP_NAME, "lag": 4, "pending": 2, "last-delivered-id": b"1700000000000-0"}],
+             bulk: [{"name": b"other", "lag": 9, "pending": 0}, {"name": GROUP_NAME.encode(), "lag": 0, "pending": 1}]},
+            {normal: [(b"1700000040000-0", {})]})
+        lag = await read_lag(r, now=NOW)
+        assert (lag.backlog, lag.pending, lag.lanes) == (4, 3, {"normal": 4, "bulk": 0})
+        assert lag.oldest_wait_s == pytest.approx(60.0)
+        assert r.xrange.call_args_list[0].kwargs["min"] == "(1700000000000-0"
+
+    @pytest.mark.asyncio
+    async def test_counts_entries_without_lag_field(self):
+        """Without XINFO "lag" (Redis < 7) the undelivered entries are counted with XRANGE"""
+        normal = stream_for("normal")
+        r = redis_with({normal: [{"name": GROUP_NAME, "pending": 0, "last-delivered-id": "0-0"}]},
+                       {normal: [(f"17000000{i}0000-0", {}) for i in range(3)]})
+        lag = await read_lag(r, now=NOW)
+        assert lag.backlog == 3 and not lag.idle
+
+    @pytest.mark.asyncio
+    async def test_connection_errors_propagate(self):
+        """A Redis outage is an error, not an empty queue (the supervisor must not scale down on it)"""
+        r = AsyncMock()
+        r.xinfo_groups.side_effect = ConnectionError("down")
+        with pytest.raises(ConnectionError):
+            await read_lag(r)
+
+
+class TestRetireConsumers:
+    """Test suite for retire_consumers"""
+
+    @pytest.mark.asyncio
+    async def test_deletes_only_without_pending(self):
+        """Retired and stale consumers are deleted once they have nothing pending; live ones are kept"""
+        normal = stream_for("normal")
+        consumers = [{"name": b"evaluator-h-1-1", "pending": 0, "idle": 10},
+                     {"name": "evaluator-h-1-2", "pending": 3, "idle": 10},
+                     {"name": "evaluator-old-9", "pending": 0, "idle": 10_000},
+                     {"name": "evaluator-h-1-3", "pending": 0, "idle": 10_000},
+                     {"name": "other-1", "pending": 0, "idle": 10_000}]
+        r = AsyncMock()
+        r.xinfo_consumers.side_effect = lambda stream, group: consumers if stream == normal else []
+        done = await retire_consumers(r, ["evaluator-h-1-1", "evaluator-h-1-2"], live=["evaluator-h-1-3"],
+                                      prefix="evaluator-", stale_ms=1000)
+        deleted = {c.args[2] for c in r.xgroup_delconsumer.call_args_list}
+        assert deleted == {"evaluator-h-1-1", "evaluator-old-9"}
+        assert done == {"evaluator-h-1-1", "evaluator-old-9"}
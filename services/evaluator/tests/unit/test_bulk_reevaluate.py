@@ -0,0 +1,58 @@
+"""
+Unit tests for the bulk re-evaluation CLI.
+Tests that --force reaches enqueued jobs and is priced over every enabled slot.
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+import pytest
+from unittest.mock import AsyncMock, patch
+
+REPO_ROOT = Path(__file__).resolve().parents[4]  # --> Raíz del repo: bulk_reevaluate.py importa services.evaluator...
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+bulk = pytest.importorskip("services.evaluator.bulk_reevaluate")
+from services.evaluator.app.infrastructure import llm_provider  # --> El mismo módulo que usa el CLI
+
+
+def args(**kw):
+    return argparse.Namespace(**{"force": False, "dry_run": False, "mode": "enqueue", "priority": "bulk", **kw})
+
+
+class TestEnqueue:
+    """Test suite for _process_one in enqueue mode"""
+
+    async def enqueue(self, tmp_path, cached, **kw):
+        repo = AsyncMock()
+        repo.get_interview_context.return_value = {"interview_id": "iv-1", "system_prompt": "p", "rubric": "r",
+                                                   "full_transcript": "t"}
+        redis, progress = AsyncMock(), bulk.Progress(1)
+        ckpt = bulk.Checkpoint(tmp_path / "run.jsonl")
+        cache = AsyncMock()
+        cache.contains.return_value = cached
+        with patch.object(llm_provider, "get_evaluation_cache", return_value=cache), \
+             patch.object(llm_provider, "CACHE_ENABLED", True), \
+             patch.object(llm_provider, "ENABLE_OPENAI", True), \
+             patch.object(llm_provider, "ENABLE_GEMINI", True), \
+             patch.object(llm_provider, "ENABLE_OPENROUTER", True):
+            await bulk._process_one("iv-1", repo, redis, args(**kw), ckpt, progress)
+        ckpt.close()
+        records = [json.loads(line) for line in (tmp_path / "run.jsonl").read_text().splitlines()]
+        return redis, progress, records
+
+    @pytest.mark.asyncio
+    async def test_cached_interview_is_skipped(self, tmp_path):
+        """Without --force an interview whose evaluations are all cached is not enqueued"""
+        redis, progress, records = await self.enqueue(tmp_path, cached=True)
+        redis.xadd.assert_not_awaited()
+        assert progress.skipped == 1 and records[0]["status"] == "skipped"
+
+    @pytest.mark.asyncio
+    async def test_force_reaches_the_worker_and_is_priced(self, tmp_path):
+        """--force marks the job as reevaluate and estimates the cost of every enabled slot, cached or not"""
+        with patch.object(bulk, "estimate_cost", return_value=0.01):
+            redis, progress, records = await self.enqueue(tmp_path, cached=True, force=True)
+        payload = json.loads(redis.xadd.await_args.args[1]["payload"])
+        assert payload["interview_id"] == "iv-1" and payload["reevaluate"] is True
+        assert records[0]["status"] == "enqueued" and records[0]["cost_usd"] == pytest.approx(0.03)
@@ -0,0 +1,122 @@
+"""
+Unit tests for the single-round-trip Postgres context loader.
+Tests SQL generation from probed schema capabilities and row-to-context mapping.
+"""
+import json
+import pytest
+from unittest.mock import AsyncMock, Mock
+from app.infrastructure.persistence.postgres.context_loader import (
+    SchemaCapabilities,
+    PostgresContextLoader,
+    build_context_sql,
+)
+
+
+FULL_SCHEMA = {
+    "interviews": {"id_interview": "integer", "id_job": "integer"},
+    "jobs": {"id_job": "integer", "description": "text"},
+    "prompts": {"prompt_type": "character varying", "content": "text",
+                "updated_at": "timestamp with time zone", "created_at": "timestamp with time zone", "id": "integer"},
+    "interview_full_conversations": {"interview_id": "integer", "full_text": "text",
+                                     "context_data": "jsonb", "created_at": "timestamp with time zone"},
+    "interview_messages": {"interview_id": "text", "role": "text", "content": "text",
+                           "created_at": "timestamp with time zone"},
+}
+
+
+class TestBuildContextSql:
+    """Test suite for build_context_sql"""
+
+    def test_full_schema_single_query(self):
+        """All five fields come from one statement"""
+        sql = build_context_sql(SchemaCapabilities(FULL_SCHEMA))
+        assert sql.count("FROM interviews i") == 1
+        assert "'evaluator_system'" in sql and "'evaluator_rubric'" in sql
+        assert "interview_full_conversations c" in sql
+        assert "interview_messages m" in sql
+        assert "i.id_interview = $1::bigint" in sql
+
+    def test_type_mismatch_uses_text_comparison(self):
+        """A text FK column is compared as text instead of failing"""
+        sql = build_context_sql(SchemaCapabilities(FULL_SCHEMA))
+        assert "m.interview_id::text = i.id_interview::text" in sql
+        assert "c.interview_id = i.id_interview" in sql
+
+    def test_missing_tables_become_null(self):
+        """Missing optional tables/columns are replaced by NULL"""
+        caps = SchemaCapabilities({"interviews": {"id_interview": "integer"}})
+        sql = build_context_sql(caps)
+        assert "interview_messages" not in sql
+        assert "prompts" not in sql
+        assert "NULL              AS messages" in sql
+
+    def test_order_only_uses_existing_columns(self):
+        """Prompt ordering skips sort columns that do not exist"""
+        schema = dict(FULL_SCHEMA)
+        schema["prompts"] = {"prompt_type": "text", "content": "text", "id": "integer"}
+        sql = build_context_sql(SchemaCapabilities(schema))
+        assert "p.updated_at" not in sql
+        assert "ORDER BY p.id DESC" in sql
+
+    def test_without_interviews_table_fails(self):
+        with pytest.raises(RuntimeError):
+            build_context_sql(SchemaCapabilities({}))
+
+
+class TestPostgresContextLoader:
+    """Test suite for PostgresContextLoader.load"""
+
+    @pytest.fixture
+    def loader(self):
+        loader = PostgresContextLoader(dsn="postgresql://test")
+        loader.caps = SchemaCapabilities(FULL_SCHEMA)
+        loader.sql = build_context_sql(loader.caps)
+        loader.pool = Mock()
+        return loader
+
+    @pytest.mark.asyncio
+    async def test_load_from_full_text(self, loader):
+        loader.pool.fetchrow = AsyncMock(return_value={
+            "interview_id": 7, "job_id": 3, "job_exists": True, "jd": "JD",
+            "system_prompt": "SYS", "rubric": "RUB",
+            "conversation": json.dumps({"id": 1, "full_text": "user: hola"}),
+            "messages": None,
+        })
+        ctx = await loader.load("7")
+        loader.pool.fetchrow.assert_awaited_once_with(loader.sql, 7)
+        assert ctx == {"interview_id": "7", "jd": "JD", "system_prompt": "SYS",
+                       "rubric": "RUB", "full_transcript": "user: hola"}
+
+    @pytest.mark.asyncio
+    async def test_load_falls_back_to_messages(self, loader):
+        loader.pool.fetchrow = AsyncMock(return_value={
+            "interview_id": 7, "job_id": None, "job_exists": True, "jd": None,
+            "system_prompt": None, "rubric": None, "conversation": None,
+            "messages": json.dumps([{"role": "assistant", "content": "Hi", "created_at": "2025-01-01T10:00:00+00:00"},
+                                    {"role": "user", "content": "Hello", "created_at": None}]),
+        })
+        ctx = await loader.load("7")
+        assert ctx["full_transcript"] == "[2025-01-01 10:00] assistant: Hi\nuser: Hello"
+        assert ctx["jd"] == ""
+
+    @pytest.mark.asyncio
+    async def test_missing_interview_raises(self, loader):
+        loader.pool.fetchrow = AsyncMock(return_value=None)
+        with pytest.raises(ValueError):
+            await loader.load("99")
+
+    @pytest.mark.asyncio
+    async def test_non_numeric_id_skips_query(self, loader):
+        loader.pool.fetchrow = AsyncMock()
+        with pytest.raises(ValueError):
+            await loader.load("demo-001")
+        loader.pool.fetchrow.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_missing_job_raises(self, loader):
+        loader.pool.fetchrow = AsyncMock(return_value={
+            "interview_id": 7, "job_id": 3, "job_exists": False, "jd": None,
+            "system_prompt": None, "rubric": None, "conversation": None, "messages": None,
+        })
+        with pytest.raises(ValueError, match="jobs.id_job=3"):
+            await loader.load("7")
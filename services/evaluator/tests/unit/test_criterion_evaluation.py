@@ -0,0 +1,134 @@
+"""
+Unit tests for per-criterion evaluation.
+Tests rubric splitting, TF-IDF evidence retrieval, the combined verdict and the per-criterion flow in run_evaluations.
+"""
+import pytest
+from unittest.mock import patch, AsyncMock
+from app.infrastructure import criterion_evaluation
+from app.infrastructure.criterion_evaluation import (
+    TurnIndex,
+    combine_criteria,
+    evidence_by_criterion,
+    plan_criteria,
+    split_criteria,
+)
+from app.infrastructure.ensemble import extract_verdict
+from app.infrastructure.token_budget import estimate_tokens, split_turns
+from app.infrastructure.llm_provider import run_evaluations
+from app.domain.entities.interview import Interview
+
+RUBRIC = ("Score (1-5) on Problem Solving, Python, APIs/HTTP, Databases/SQL, Communication. "
+          "Justify briefly. Finish with Overall Verdict: Hire/No Hire.")
+
+TOPICS = [
+    ("Tell me about a slow query you fixed.", "I added a composite index in postgres and rewrote the join."),
+    ("How do you design a REST API?", "FastAPI endpoints with pagination, JWT auth and proper status codes."),
+    ("Describe a hard bug.", "A race condition; I weighed the trade-offs and chose a simpler approach."),
+    ("What about Python testing?", "I use pytest fixtures and asyncio tests for the async code."),
+    ("Tell me about your weekend.", "I went hiking by the lake with some friends."),
+]
+
+
+def transcript(rounds=6):
+    return "\n".join(f"Interviewer: {q} ({r})\nCandidate: {a} ({r})" for r in range(rounds) for q, a in TOPICS)
+
+
+class TestSplitCriteria:
+    """Test suite for split_criteria"""
+
+    def test_inline_list(self):
+        """An inline list gives one criterion each, keeping the scale and instructions around it"""
+        criteria = split_criteria(RUBRIC)
+        assert [c.name for c in criteria] == ["Problem Solving", "Python", "APIs/HTTP", "Databases/SQL", "Communication"]
+        assert criteria[1].rubric == ("Score (1-5) on Python. Justify briefly. "
+                                      "Finish with Overall Verdict: Hire/No Hire.")
+
+    def test_bulleted_list(self):
+        """List items (with their indented sub-items) become criteria; other lines are shared instructions"""
+        rubric = ("Evaluate the candidate:\n1. Problem solving: breaks problems down\n"
+                  "2. Python - idiomatic code\n   - bonus: async\n3. Communication (clarity)\nEnd with a verdict.")
+        criteria = split_criteria(rubric)
+        assert [c.name for c in criteria] == ["Problem solving", "Python", "Communication"]
+        assert criteria[1].rubric == ("Evaluate the candidate:\nEnd with a verdict.\n\n"
+                                      "2. Python - idiomatic code\n- bonus: async")
+
+    def test_single_criterion_is_not_split(self):
+        """Rubrics without at least two criteria are evaluated whole"""
+        assert split_criteria("Give a score from 1 to 5 and a verdict.") == []
+        assert split_criteria(None) == []
+
+    def test_mode_and_length_gate(self):
+        """Only per_criterion mode on transcripts over EVALUATOR_CRITERIA_MIN_TOKENS is split"""
+        assert plan_criteria(RUBRIC, 10_000, mode="whole") == []
+        with patch.object(criterion_evaluation, "CRITERIA_MIN_TOKENS", 3000):
+            assert plan_criteria(RUBRIC, 2_000, mode="per_criterion") == []
+            assert len(plan_criteria(RUBRIC, 10_000, mode="per_criterion")) == 5
+
+
+class TestEvidence:
+    """Test suite for TF-IDF retrieval"""
+
+    def test_ranks_matching_turns(self):
+        """Turns sharing rare terms with the query rank first; unrelated turns do not match"""
+        index = TurnIndex(split_turns(transcript(1)))
+        top = [i for _, i in index.search("postgres index join")]
+        assert top[0] == 1 and 9 not in top
+
+    def test_evidence_pairs_question_and_answer(self):
+        """Each hit comes with its question or answer, in order, with [...] for omitted parts"""
+        criteria = split_criteria(RUBRIC)
+        evidence = dict(zip([c.name for c in criteria], evidence_by_criterion(transcript(), criteria, 120)))
+        assert "What about Python testing? (0)\nCandidate: I use pytest" in evidence["Python"]
+        assert "postgres" in evidence["Databases/SQL"] and "hiking" not in evidence["Databases/SQL"]
+        assert "JWT" in evidence["APIs/HTTP"] and evidence["APIs/HTTP"].startswith("[...]")
+        assert all(estimate_tokens(e) <= 130 for e in evidence.values())
+
+    def test_no_lexical_match_samples_the_interview(self):
+        """A criterion with no matching terms still gets evidence spread across the interview"""
+        criteria = split_criteria(RUBRIC)
+        evidence = evidence_by_criterion(transcript(), criteria[-1:], 400)[0]
+        assert "(0)" in evidence and "(5)" in evidence
+
+
+class TestCombine:
+    """Test suite for combine_criteria"""
+
+    def test_mean_score_and_majority_verdict(self):
+        """The combined text keeps each section and ends with a readable overall score and verdict"""
+        criteria = split_criteria(RUBRIC)[:3]
+        text = combine_criteria(criteria, ["Score: 4/5. Hire", "3/5. No hire", "5/5, strong hire"])
+        assert text.startswith("### Problem Solving\nScore: 4/5. Hire")
+        verdict = extract_verdict(text)
+        assert verdict.score == pytest.approx(0.8) and verdict.recommendation == "hire"
+
+    def test_tie_uses_mean_score(self):
+        """Without a majority the mean score decides"""
+        criteria = split_criteria(RUBRIC)[:2]
+        assert combine_criteria(criteria, ["2/5. No hire", "4/5. Hire"]).endswith("Overall Verdict: Hire")
+        assert combine_criteria(criteria, ["1/5", "3/5"]).endswith("Overall Verdict: No Hire")
+
+
+class TestRunEvaluationsPerCriterion:
+    """Test suite for per-criterion mode inside run_evaluations"""
+
+    @pytest.mark.asyncio
+    async def test_criteria_evaluated_in_parallel_and_combined(self):
+        """One smaller call per criterion; the outputs are combined and the plan records the evidence"""
+        interview = Interview(interview_id="crit-1", system_prompt="P", rubric=RUBRIC, jd="JD",
+                              full_transcript=transcript(20))
+        call = AsyncMock(side_effect=lambda p, r, t: "Score: 4/5. Hire")
+        with patch.object(criterion_evaluation, "EVAL_MODE", "per_criterion"), \
+             patch.object(criterion_evaluation, "CRITERIA_MIN_TOKENS", 500), \
+             patch.object(criterion_evaluation, "CRITERIA_MAX_TOKENS", 200), \
+             patch("app.infrastructure.llm_provider.call_openai_gpt5", new=call), \
+             patch("app.infrastructure.llm_provider.call_google_gemini", new=AsyncMock(return_value="Error calling Gemini: 500")), \
+             patch("app.infrastructure.llm_provider.call_openrouter_deepseek", new=AsyncMock(return_value="eval C")):
+            result = await run_evaluations(interview, use_cache=False)
+
+        plan = result.evaluation_plan["evaluation_1"]
+        assert plan["mode"] == "per_criterion" and len(plan["criteria"]) == 5 and call.await_count == 5
+        assert max(plan["chunk_tokens"]) < plan["transcript_tokens"] / 4
+        assert 'Evaluate ONLY the criterion "Python" (2 of 5' in call.await_args_list[1].args[0]
+        assert call.await_args_list[1].args[1].startswith("Score (1-5) on Python.")
+        assert result.evaluation_1.endswith("Overall score: 4.0/5\nOverall Verdict: Hire")
+        assert result.evaluation_2.startswith("Error calling Gemini") # --> Un criterio falló: no se combina
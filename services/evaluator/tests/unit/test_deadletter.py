@@ -0,0 +1,83 @@
+"""
+Unit tests for the dead-letter admin CLI.
+Tests replay by id, paginated replay --all and the enqueued_at refresh, against an AsyncMock Redis.
+"""
+import json
+import sys
+from pathlib import Path
+import pytest
+from unittest.mock import AsyncMock, patch
+
+REPO_ROOT = Path(__file__).resolve().parents[4]  # --> Raíz del repo: deadletter.py se corre como services.evaluator...
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+deadletter = pytest.importorskip("services.evaluator.deadletter")
+
+DLQ = deadletter.DEADLETTER_STREAM
+
+
+def dead(i):
+    payload = {"interview_id": f"iv-{i}", "priority": "bulk", "enqueued_at": 1.0}
+    return (f"{i}-0".encode(), {b"payload": json.dumps(payload).encode(), b"source_stream": b"jobs:bulk",
+                                b"reason": b"boom", b"attempts": b"3"})
+
+
+def redis_with(entries):
+    """Redis stub over a dead-letter stream; XRANGE honours min/max ids (inclusive or "(" exclusive) and count."""
+    r = AsyncMock()
+
+    def key(eid):
+        return tuple(int(p) for p in eid.split("-"))
+
+    def xrange(stream, min="-", max="+", count=None):
+        rows = [(eid, f) for eid, f in entries if stream == DLQ]
+        if min != "-":
+            lo = min.lstrip("(")
+            rows = [(eid, f) for eid, f in rows
+                    if key(eid.decode()) > key(lo) or (not min.startswith("(") and key(eid.decode()) == key(lo))]
+        if max != "+":
+            rows = [(eid, f) for eid, f in rows if key(eid.decode()) <= key(max)]
+        return rows[:count] if count else rows
+
+    r.xrange.side_effect = xrange
+    r.xadd.side_effect = lambda stream, fields: b"99-0"
+    return r
+
+
+class TestReplay:
+    """Test suite for cmd_replay"""
+
+    @pytest.mark.asyncio
+    async def test_replay_by_id_looks_up_each_entry(self):
+        """Each id is read with XRANGE id id (even past the first page) and re-enqueued on its source lane"""
+        r = redis_with([dead(i) for i in range(1, 20_002)])
+        with patch.object(deadletter.time, "time", return_value=500.0):
+            await deadletter.cmd_replay(r, ["20001-0"], replay_all=False, keep=False)
+        assert r.xrange.await_args.kwargs == {"min": "20001-0", "max": "20001-0"}
+        stream, fields = r.xadd.await_args.args
+        assert stream == "jobs:bulk"
+        assert json.loads(fields["payload"]) == {"interview_id": "iv-20001", "priority": "bulk", "enqueued_at": 500.0}
+        r.xdel.assert_awaited_once_with(DLQ, "20001-0")
+
+    @pytest.mark.asyncio
+    async def test_missing_id_is_reported(self, capsys):
+        """Unknown ids print a warning and enqueue nothing"""
+        r = redis_with([dead(1)])
+        await deadletter.cmd_replay(r, ["7-0"], replay_all=False, keep=False)
+        r.xadd.assert_not_awaited()
+        assert "7-0 no existe" in capsys.readouterr().out
+
+    @pytest.mark.asyncio
+    async def test_replay_all_pages_through_the_stream(self):
+        """--all walks the whole dead-letter page by page; --keep leaves the entries in place"""
+        r = redis_with([dead(i) for i in range(1, 6)])
+        with patch.object(deadletter, "PAGE_SIZE", 2):
+            await deadletter.cmd_replay(r, [], replay_all=True, keep=True)
+        replayed = [json.loads(c.args[1]["payload"])["interview_id"] for c in r.xadd.await_args_list]
+        assert replayed == [f"iv-{i}" for i in range(1, 6)]
+        r.xdel.assert_not_awaited()
+
+    def test_unparseable_payload_is_replayed_as_is(self):
+        """A payload that is not a JSON object is re-enqueued untouched"""
+        assert deadletter._refresh_enqueued_at("not json") == "not json"
+        assert deadletter._refresh_enqueued_at("[1]") == "[1]"
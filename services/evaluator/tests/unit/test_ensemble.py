@@ -0,0 +1,148 @@
+"""
+Unit tests for the early-exit ensemble.
+Tests verdict extraction from free-text evaluations, agreement and the tie-breaker policy.
+"""
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, patch
+from app.domain.entities.interview import Interview
+from app.infrastructure import metrics
+from app.infrastructure.ensemble import Verdict, agreement, extract_verdict, run_early_exit
+from app.infrastructure.llm_provider import _is_cacheable_output, run_evaluations
+
+
+HIRE = "Technical skills: 4/5. Communication: 5/5. Overall score: 4.5. Recommendation: Hire."
+HIRE_CLOSE = "Problem solving 4/5, communication 4/5. Final score: 4.2 - recommended to move forward."
+NO_HIRE = "Technical skills: 2/5. Communication: 3/5. The candidate is not recommended for this role."
+
+
+def slot(attr, provider):
+    return (attr, provider, f"{provider}-model", {}, None, provider)
+
+
+SLOTS = [slot("evaluation_1", "openai"), slot("evaluation_2", "gemini"), slot("evaluation_3", "openrouter")]
+
+
+def fake_runner(outputs, delays=None):
+    """run_slot double: returns the canned output per attr and records which slots were called"""
+    called = []
+
+    async def run_slot(s):
+        called.append(s[0])
+        await asyncio.sleep((delays or {}).get(s[0], 0))
+        return s[0], outputs[s[0]], {"provider": s[1], "model": s[2], "mode": "single"}
+
+    return run_slot, called
+
+
+class TestVerdictExtraction:
+    """Test suite for extract_verdict / agreement"""
+
+    def test_scores_and_recommendation(self):
+        """The labeled overall score wins over per-criterion scores"""
+        verdict = extract_verdict(HIRE)
+        assert verdict.score == pytest.approx(0.9)
+        assert verdict.recommendation == "hire"
+
+    def test_negated_recommendation(self):
+        """'not recommended' is a no-hire, not a hire"""
+        verdict = extract_verdict(NO_HIRE)
+        assert verdict.recommendation == "no_hire"
+        assert verdict.score == pytest.approx(0.5)
+
+    def test_strong_recommendation(self):
+        """'strong hire' is not downgraded to 'hire'"""
+        assert extract_verdict("Verdict: Strong Hire").recommendation == "strong_hire"
+        assert extract_verdict("Overall: strong no hire").recommendation == "strong_no_hire"
+
+    def test_unreadable(self):
+        """Text without scores or verdict cannot vote"""
+        assert not extract_verdict("The candidate talked about many things.").readable
+        assert not extract_verdict(None).readable
+
+    def test_agreement(self):
+        """Opposite sides never agree; close scores on the same side do"""
+        assert agreement(extract_verdict(HIRE), extract_verdict(NO_HIRE)) == 0.0
+        assert agreement(extract_verdict(HIRE), extract_verdict(HIRE_CLOSE)) >= 0.9
+        assert agreement(Verdict(recommendation="hire"), Verdict(recommendation="strong_hire")) == 0.8
+        assert agreement(Verdict(), Verdict(score=0.5)) == 0.0
+
+
+class TestEarlyExit:
+    """Test suite for run_early_exit"""
+
+    @pytest.fixture(autouse=True)
+    def clean_metrics(self):
+        metrics.reset()
+        yield
+
+    @pytest.mark.asyncio
+    async def test_agreement_skips_tiebreaker(self):
+        """When the panel agrees the last provider is never called"""
+        run_slot, called = fake_runner({"evaluation_1": HIRE, "evaluation_2": HIRE_CLOSE, "evaluation_3": NO_HIRE})
+        results = await run_early_exit(SLOTS, run_slot, _is_cacheable_output, threshold=0.8)
+        assert called == ["evaluation_1", "evaluation_2"]
+        attr, output, plan = results[2]
+        assert output is None
+        assert plan["mode"] == "skipped"
+        assert plan["agreeing"] == ["evaluation_1", "evaluation_2"]
+        assert metrics.get("ensemble_decisions_total", decision="early_exit") == 1
+        assert metrics.get("ensemble_skipped_calls_total", provider="openrouter") == 1
+
+    @pytest.mark.asyncio
+    async def test_disagreement_calls_tiebreaker(self):
+        """When the panel disagrees the tie-breaker runs"""
+        run_slot, called = fake_runner({"evaluation_1": HIRE, "evaluation_2": NO_HIRE, "evaluation_3": HIRE_CLOSE})
+        results = await run_early_exit(SLOTS, run_slot, _is_cacheable_output)
+        assert called == ["evaluation_1", "evaluation_2", "evaluation_3"]
+        assert [r[1] for r in results] == [HIRE, NO_HIRE, HIRE_CLOSE]
+        assert metrics.get("ensemble_decisions_total", decision="tiebreak") == 1
+
+    @pytest.mark.asyncio
+    async def test_failed_panel_member_is_replaced_at_once(self):
+        """A provider error starts the tie-breaker without waiting for the rest of the panel"""
+        run_slot, called = fake_runner(
+            {"evaluation_1": "Error calling OpenAI API: boom", "evaluation_2": HIRE, "evaluation_3": HIRE_CLOSE},
+            delays={"evaluation_2": 0.05},
+        )
+        await run_early_exit(SLOTS, run_slot, _is_cacheable_output)
+        assert called == ["evaluation_1", "evaluation_2", "evaluation_3"]
+        assert metrics.get("ensemble_decisions_total", decision="substitute") == 1
+
+    @pytest.mark.asyncio
+    async def test_larger_panel_cancels_slow_member(self):
+        """With a panel of three, the slow member is cancelled once two agree"""
+        slots = SLOTS + [slot("evaluation_4", "extra")]
+        run_slot, called = fake_runner(
+            {"evaluation_1": HIRE, "evaluation_2": HIRE_CLOSE, "evaluation_3": NO_HIRE, "evaluation_4": HIRE},
+            delays={"evaluation_3": 5},
+        )
+        results = await asyncio.wait_for(run_early_exit(slots, run_slot, _is_cacheable_output), timeout=1)
+        assert "evaluation_4" not in called
+        assert results[2][2]["mode"] == "skipped"
+
+    @pytest.mark.asyncio
+    async def test_two_providers_run_normally(self):
+        """With fewer than three providers there is nothing to skip"""
+        run_slot, called = fake_runner({"evaluation_1": HIRE, "evaluation_2": NO_HIRE})
+        results = await run_early_exit(SLOTS[:2], run_slot, _is_cacheable_output)
+        assert len(results) == 2 and called == ["evaluation_1", "evaluation_2"]
+
+
+class TestRunEvaluationsEarlyExit:
+    """Test suite for EVALUATOR_ENSEMBLE=early_exit inside run_evaluations"""
+
+    @pytest.mark.asyncio
+    async def test_tiebreaker_skipped(self):
+        """The third provider is not called and its slot is recorded as skipped"""
+        interview = Interview(interview_id="ens-1", system_prompt="P", rubric="R", jd="JD", full_transcript="T")
+        with patch("app.infrastructure.llm_provider.ENSEMBLE_MODE", "early_exit"), \
+             patch.multiple("app.infrastructure.llm_provider", ENABLE_OPENAI=True, ENABLE_GEMINI=True, ENABLE_OPENROUTER=True), \
+             patch("app.infrastructure.llm_provider.call_openai_gpt5", new=AsyncMock(return_value=HIRE)), \
+             patch("app.infrastructure.llm_provider.call_google_gemini", new=AsyncMock(return_value=HIRE_CLOSE)), \
+             patch("app.infrastructure.llm_provider.call_openrouter_deepseek", new=AsyncMock(return_value=NO_HIRE)) as m3:
+            result = await run_evaluations(interview, use_cache=False)
+
+        assert m3.await_count == 0
+        assert result.evaluation_3 is None
+        assert result.evaluation_plan["evaluation_3"]["mode"] == "skipped"
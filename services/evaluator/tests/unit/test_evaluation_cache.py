@@ -0,0 +1,118 @@
+"""
+Unit tests for the content-addressed evaluation cache.
+Tests key derivation, the local LRU tier and its use from run_evaluations.
+"""
+import pytest
+from unittest.mock import patch, AsyncMock
+from app.infrastructure.evaluation_cache import EvaluationCache, make_cache_key
+from app.infrastructure.llm_provider import run_evaluations
+from app.domain.entities.interview import Interview
+
+
+class TestCacheKey:
+    """Test suite for make_cache_key"""
+
+    def test_key_is_stable(self):
+        """Same inputs produce the same key"""
+        a = make_cache_key("openai", "gpt-4o-mini", {"temperature": 0.2, "max_tokens": 512}, "p", "r", "t")
+        b = make_cache_key("openai", "gpt-4o-mini", {"max_tokens": 512, "temperature": 0.2}, "p", "r", "t")
+        assert a == b
+
+    @pytest.mark.parametrize("changed", [
+        ("gemini", "gpt-4o-mini", {"temperature": 0.2}, "p", "r", "t"),
+        ("openai", "gpt-4.1", {"temperature": 0.2}, "p", "r", "t"),
+        ("openai", "gpt-4o-mini", {"temperature": 0.3}, "p", "r", "t"),
+        ("openai", "gpt-4o-mini", {"temperature": 0.2}, "p2", "r", "t"),
+        ("openai", "gpt-4o-mini", {"temperature": 0.2}, "p", "r2", "t"),
+        ("openai", "gpt-4o-mini", {"temperature": 0.2}, "p", "r", "t2"),
+    ])
+    def test_key_changes_with_any_input(self, changed):
+        """Any change in provider, model, params, prompt, rubric or transcript changes the key"""
+        base = make_cache_key("openai", "gpt-4o-mini", {"temperature": 0.2}, "p", "r", "t")
+        assert make_cache_key(*changed) != base
+
+
+class TestEvaluationCache:
+    """Test suite for EvaluationCache (memory tier)"""
+
+    @pytest.mark.asyncio
+    async def test_hit_and_miss_counters(self):
+        """Hits and misses are tracked for the hit rate"""
+        cache = EvaluationCache(redis_uri=None)
+        assert await cache.get("k") is None
+        await cache.set("k", "value")
+        assert await cache.get("k") == "value"
+
+        stats = cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["hit_rate"] == 0.5
+
+    @pytest.mark.asyncio
+    async def test_lru_eviction(self):
+        """Least recently used entries are evicted past max_items"""
+        cache = EvaluationCache(max_items=2, redis_uri=None)
+        await cache.set("a", "1")
+        await cache.set("b", "2")
+        await cache.get("a")
+        await cache.set("c", "3")
+
+        assert await cache.get("b") is None
+        assert await cache.get("a") == "1"
+        assert await cache.get("c") == "3"
+
+    @pytest.mark.asyncio
+    async def test_ttl_expiry(self):
+        """Entries past their TTL are not returned"""
+        cache = EvaluationCache(ttl_s=-1, redis_uri=None)
+        await cache.set("k", "value")
+        assert await cache.get("k") is None
+
+
+class TestRunEvaluationsCache:
+    """Test suite for the cache inside run_evaluations"""
+
+    @pytest.fixture
+    def interview(self):
+        return Interview(interview_id="cache-1", system_prompt="P", rubric="R", jd="JD", full_transcript="T")
+
+    @pytest.mark.asyncio
+    async def test_second_run_is_served_from_cache(self, interview):
+        """Re-running the same interview does not call the providers again"""
+        cache = EvaluationCache(redis_uri=None)
+        with patch("app.infrastructure.llm_provider.get_evaluation_cache", return_value=cache), \
+             patch("app.infrastructure.llm_provider.call_openai_gpt5", new=AsyncMock(return_value="eval A")) as m1, \
+             patch("app.infrastructure.llm_provider.call_google_gemini", new=AsyncMock(return_value="eval B")) as m2, \
+             patch("app.infrastructure.llm_provider.call_openrouter_deepseek", new=AsyncMock(return_value="eval C")) as m3:
+            await run_evaluations(interview)
+            again = await run_evaluations(Interview.from_dict(interview.to_dict()))
+
+        assert (m1.await_count, m2.await_count, m3.await_count) == (1, 1, 1)
+        assert (again.evaluation_1, again.evaluation_2, again.evaluation_3) == ("eval A", "eval B", "eval C")
+
+    @pytest.mark.asyncio
+    async def test_errors_are_not_cached(self, interview):
+        """Provider errors and disabled providers are retried on the next run"""
+        cache = EvaluationCache(redis_uri=None)
+        with patch("app.infrastructure.llm_provider.get_evaluation_cache", return_value=cache), \
+             patch("app.infrastructure.llm_provider.call_openai_gpt5", new=AsyncMock(return_value="Error calling OpenAI API: 500")) as m1, \
+             patch("app.infrastructure.llm_provider.call_google_gemini", new=AsyncMock(return_value="eval B")), \
+             patch("app.infrastructure.llm_provider.call_openrouter_deepseek", new=AsyncMock(return_value="[OpenRouter disabled by env]")) as m3:
+            await run_evaluations(interview)
+            await run_evaluations(interview)
+
+        assert m1.await_count == 2
+        assert m3.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_use_cache_false_forces_calls(self, interview):
+        """use_cache=False bypasses the cache (EVALUATOR_REEVALUATE)"""
+        cache = EvaluationCache(redis_uri=None)
+        with patch("app.infrastructure.llm_provider.get_evaluation_cache", return_value=cache), \
+             patch("app.infrastructure.llm_provider.call_openai_gpt5", new=AsyncMock(return_value="eval A")) as m1, \
+             patch("app.infrastructure.llm_provider.call_google_gemini", new=AsyncMock(return_value="eval B")), \
+             patch("app.infrastructure.llm_provider.call_openrouter_deepseek", new=AsyncMock(return_value="eval C")):
+            await run_evaluations(interview)
+            await run_evaluations(interview, use_cache=False)
+
+        assert m1.await_count == 2
@@ -0,0 +1,80 @@
+"""
+Unit tests for the fake LLM provider used by the offline benchmark.
+Tests determinism, error/429 injection and the SDK-shaped adapters.
+"""
+import pytest
+from unittest.mock import patch
+from app.infrastructure import fake_llm
+from app.infrastructure.fake_llm import (
+    FakeLLM,
+    FakeOpenAIClient,
+    FakeGenerativeModel,
+    FakeRateLimitError,
+    FakeLLMError,
+)
+from app.infrastructure.rate_limit import is_rate_limit_error, retry_after_seconds
+
+
+@pytest.fixture(autouse=True)
+def instant():
+    """No real sleeping in unit tests"""
+    with patch("app.infrastructure.fake_llm.time.sleep"):
+        yield
+
+
+class TestFakeLLM:
+    """Test suite for FakeLLM"""
+
+    def test_same_seed_same_output(self):
+        """Two generators with the same seed answer the same prompt identically"""
+        a = FakeLLM("openai", seed="7").complete("prompt", max_tokens=50)
+        b = FakeLLM("openai", seed="7").complete("prompt", max_tokens=50)
+        assert a == b
+        assert a.startswith("[fake openai]")
+        assert len(a.split()) <= 50 + 1
+
+    def test_repeated_prompt_gets_new_draw(self):
+        """Retrying the same prompt rolls again (otherwise a 429 would repeat forever)"""
+        llm = FakeLLM("openai", seed="7")
+        assert llm.complete("prompt", max_tokens=50) != llm.complete("prompt", max_tokens=50)
+
+    def test_injects_429_with_retry_after(self):
+        """With 429 rate 1.0 every call raises a rate-limit error the limiter understands"""
+        with patch.object(fake_llm, "FAKE_429_RATE", 1.0), patch.object(fake_llm, "FAKE_RETRY_AFTER_S", 2.0):
+            with pytest.raises(FakeRateLimitError) as exc:
+                FakeLLM("gemini").complete("p")
+        assert is_rate_limit_error(exc.value)
+        assert retry_after_seconds(exc.value) == 2.0
+
+    def test_injects_errors(self):
+        """With error rate 1.0 every call raises a non-rate-limit error"""
+        with patch.object(fake_llm, "FAKE_ERROR_RATE", 1.0):
+            with pytest.raises(FakeLLMError) as exc:
+                FakeLLM("openai").complete("p")
+        assert not is_rate_limit_error(exc.value)
+
+    def test_stream_matches_complete(self):
+        """Streaming yields the same text as a non-streaming call with the same draw"""
+        text = FakeLLM("openai", seed="1").complete("p", max_tokens=20)
+        streamed = "".join(FakeLLM("openai", seed="1").stream("p", max_tokens=20))
+        assert streamed == text
+
+
+class TestFakeAdapters:
+    """Test suite for the SDK-shaped adapters"""
+
+    def test_openai_client_shape(self):
+        """chat.completions.create returns choices[0].message.content, or deltas when streaming"""
+        client = FakeOpenAIClient("openrouter")
+        resp = client.chat.completions.create(model="m", messages=[{"role": "user", "content": "hi"}], max_tokens=10)
+        assert resp.choices[0].message.content.startswith("[fake openrouter]")
+
+        chunks = client.chat.completions.create(model="m", messages=[{"role": "user", "content": "hi"}],
+                                                max_tokens=10, stream=True)
+        assert "".join(c.choices[0].delta.content for c in chunks)
+
+    def test_gemini_model_shape(self):
+        """generate_content returns an object with .text (also per chunk when streaming)"""
+        model = FakeGenerativeModel("gemini-2.5-flash")
+        assert model.generate_content("hi").text.startswith("[fake gemini]")
+        assert "".join(c.text for c in model.generate_content("hi", stream=True))
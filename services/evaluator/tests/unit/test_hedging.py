@@ -0,0 +1,149 @@
+"""
+Unit tests for hedged LLM requests.
+Tests the latency tracker, the hedge budget and the primary/backup race.
+"""
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, patch
+from app.domain.entities.interview import Interview
+from app.infrastructure import hedging, metrics
+from app.infrastructure.hedging import HedgeBudget, HedgedCall, LatencyTracker, hedged
+from app.infrastructure.llm_provider import _is_cacheable_output, run_evaluations
+
+
+def reply(text, delay=0.0):
+    async def call():
+        await asyncio.sleep(delay)
+        return text
+    return call
+
+
+@pytest.fixture(autouse=True)
+def clean_state():
+    metrics.reset()
+    hedging.reset()
+    yield
+    hedging.reset()
+
+
+class TestLatencyTrackerAndBudget:
+    """Test suite for LatencyTracker / HedgeBudget"""
+
+    def test_no_quantile_until_warm(self):
+        """Without enough samples there is no p95 and nothing is hedged"""
+        tracker = LatencyTracker(window=100, min_samples=5)
+        for v in (1, 2, 3, 4):
+            tracker.observe(v)
+        assert tracker.quantile(0.95) is None
+        tracker.observe(5)
+        assert tracker.quantile(0.95) == 5
+
+    def test_p95_over_window(self):
+        """p95 of 1..100 is 95 and old samples fall out of the window"""
+        tracker = LatencyTracker(window=100, min_samples=1)
+        for v in range(1, 101):
+            tracker.observe(v)
+        assert tracker.quantile(0.95) == 95
+        for _ in range(100):
+            tracker.observe(1)
+        assert tracker.quantile(0.95) == 1
+
+    def test_budget_ratio(self):
+        """With ratio 0.1 and no burst, one hedge is allowed every ten calls"""
+        budget = HedgeBudget(ratio=0.1, burst=1)
+        budget.tokens = 0
+        allowed = 0
+        for _ in range(30):
+            budget.earn()
+            allowed += budget.try_spend()
+        assert allowed == 3
+
+
+class TestHedged:
+    """Test suite for hedged()"""
+
+    @pytest.mark.asyncio
+    async def test_fast_primary_is_not_hedged(self):
+        """A primary that answers before the delay never starts the backup"""
+        backup = AsyncMock(return_value="backup")
+        output, outcome = await hedged("p", reply("primary"), backup, _is_cacheable_output, delay=0.5)
+        assert (output, outcome) == ("primary", "unhedged")
+        backup.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_slow_primary_loses_to_backup(self):
+        """Past the delay the backup runs and the first valid answer wins"""
+        output, outcome = await asyncio.wait_for(
+            hedged("p", reply("primary", 5), reply("backup"), _is_cacheable_output, delay=0.01), timeout=1)
+        assert (output, outcome) == ("backup", "backup")
+        assert metrics.get("hedge_fired_total", provider="p") == 1
+        assert metrics.get("hedge_wins_total", provider="p", winner="backup") == 1
+
+    @pytest.mark.asyncio
+    async def test_failed_backup_waits_for_primary(self):
+        """An error from the backup does not win the race"""
+        output, outcome = await hedged("p", reply("primary", 0.05), reply("Error calling OpenAI API: 500"),
+                                       _is_cacheable_output, delay=0.01)
+        assert (output, outcome) == ("primary", "primary")
+
+    @pytest.mark.asyncio
+    async def test_budget_exhausted(self):
+        """Without budget the primary is awaited alone"""
+        hedging.get_budget("p").tokens = -10
+        backup = AsyncMock(return_value="backup")
+        output, outcome = await hedged("p", reply("primary", 0.03), backup, _is_cacheable_output, delay=0.01)
+        assert (output, outcome) == ("primary", "unhedged")
+        backup.assert_not_awaited()
+        assert metrics.get("hedge_budget_exhausted_total", provider="p") == 1
+
+    @pytest.mark.asyncio
+    async def test_cancelled_primary_still_counts_latency(self):
+        """The losing primary's elapsed time is recorded so the tail stays in the p95"""
+        await hedged("p", reply("primary", 5), reply("backup"), _is_cacheable_output, delay=0.01)
+        assert len(hedging.get_tracker("p").samples) == 1
+
+    @pytest.mark.asyncio
+    async def test_hedged_call_passes_backup_model(self):
+        """The backup is the same call with model=<backup model>"""
+        calls = []
+
+        async def call_fn(prompt, rubric, transcript, model=None):
+            calls.append(model)
+            await asyncio.sleep(5 if model is None else 0)
+            return f"eval by {model or 'primary'}"
+
+        wrapped = HedgedCall("p", call_fn, _is_cacheable_output, backup_model="alt-model")
+        hedging.get_tracker("p").min_samples = 1
+        hedging.get_tracker("p").observe(0.01)
+        assert await asyncio.wait_for(wrapped("P", "R", "T"), timeout=1) == "eval by alt-model"
+        assert calls == [None, "alt-model"]
+        assert wrapped.backup_model_used
+        assert wrapped.summary() == {"calls": 1, "hedges": 1, "backup_wins": 1, "backup_model": "alt-model"}
+
+
+class TestRunEvaluationsHedged:
+    """Test suite for EVALUATOR_HEDGE=1 inside run_evaluations"""
+
+    @pytest.mark.asyncio
+    async def test_plan_records_hedge(self):
+        """A hedged slot records the race in its plan"""
+        interview = Interview(interview_id="hedge-1", system_prompt="P", rubric="R", jd="JD", full_transcript="T")
+
+        async def openai(prompt, rubric, transcript, model=None):
+            if model is None:
+                await asyncio.sleep(5)
+            return "eval A"
+
+        tracker = hedging.get_tracker("openai")
+        tracker.min_samples = 1
+        tracker.observe(0.01)
+        with patch("app.infrastructure.llm_provider.HEDGE_ENABLED", True), \
+             patch.dict("app.infrastructure.llm_provider.HEDGE_BACKUPS", {"openai": "gpt-backup"}), \
+             patch.multiple("app.infrastructure.llm_provider", ENABLE_OPENAI=True, ENABLE_GEMINI=True, ENABLE_OPENROUTER=False), \
+             patch("app.infrastructure.llm_provider.call_openai_gpt5", new=openai), \
+             patch("app.infrastructure.llm_provider.call_google_gemini", new=AsyncMock(return_value="eval B")):
+            result = await asyncio.wait_for(run_evaluations(interview, use_cache=False), timeout=2)
+
+        assert result.evaluation_1 == "eval A"
+        assert result.evaluation_plan["evaluation_1"]["hedge"]["backup_wins"] == 1
+        assert "hedge" not in result.evaluation_plan["evaluation_2"]
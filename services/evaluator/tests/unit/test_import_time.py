@@ -0,0 +1,42 @@
+"""
+Import-time budget for the evaluator entry points.
+Runs `python -X importtime` on worker.py / run_one.py in a fresh interpreter and checks that
+provider SDKs and repository backends are not loaded at import, and that the import stays fast.
+"""
+import os
+import subprocess
+import sys
+from pathlib import Path
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parents[4]  # --> Raíz del repo: los entry points importan services.evaluator...
+IMPORT_BUDGET_S = float(os.getenv("EVALUATOR_IMPORT_BUDGET_S", "0.5"))
+LAZY_MODULES = ("openai", "google.generativeai", "supabase", "postgrest", "pydantic_settings", "tiktoken")
+
+
+def importtime(module):
+    """(segundos acumulados del import de `module`, módulos importados) según -X importtime."""
+    env = {**os.environ, "PYTHONPATH": str(REPO_ROOT), "EVALUATOR_FAKE_LLM": "0"}
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          cwd=REPO_ROOT, env=env, capture_output=True, text=True, timeout=60)
+    if proc.returncode != 0:
+        pytest.skip(f"{module} no importa en este entorno: {proc.stderr.strip().splitlines()[-1]}")
+    rows = [line.split("|") for line in proc.stderr.splitlines() if line.startswith("import time:")]
+    modules = {name.strip() for _, _, name in rows[1:]}
+    total_us = next(int(cumulative) for _, cumulative, name in rows[1:] if name.strip() == module)
+    return total_us / 1_000_000, modules
+
+
+@pytest.mark.parametrize("module", ["services.evaluator.worker", "services.evaluator.run_one"])
+class TestImportTime:
+    """Test suite for the entry-point import budget"""
+
+    def test_sdks_are_not_imported(self, module):
+        """Provider SDKs and the Supabase client load on first use, not at import"""
+        _, modules = importtime(module)
+        assert not [m for m in modules if m.split(".")[0] in LAZY_MODULES or m.startswith(LAZY_MODULES)]
+
+    def test_import_within_budget(self, module):
+        """Importing an entry point stays under the budget (EVALUATOR_IMPORT_BUDGET_S)"""
+        seconds, _ = importtime(module)
+        assert seconds < IMPORT_BUDGET_S, f"{module} tardó {seconds:.3f}s en importar"
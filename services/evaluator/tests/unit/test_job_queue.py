@@ -0,0 +1,97 @@
+"""
+Unit tests for the priority lanes of the evaluation queue.
+Tests lane/stream mapping and the weighted fair scheduler (ratio, starvation guard, idle lanes).
+"""
+import json
+import pytest
+from unittest.mock import AsyncMock
+from app.infrastructure.job_queue import (
+    LaneScheduler,
+    STREAM_NAME,
+    enqueue_job,
+    lane_streams,
+    priority_of,
+    stream_for,
+)
+
+
+class TestLanes:
+    """Test suite for lane naming"""
+
+    def test_normal_keeps_legacy_stream(self):
+        """The normal lane is the original stream so old producers keep working"""
+        assert stream_for("normal") == STREAM_NAME
+        assert stream_for("realtime") == f"{STREAM_NAME}:realtime"
+        assert stream_for("bulk") == f"{STREAM_NAME}:bulk"
+
+    def test_unknown_priority_falls_back_to_normal(self):
+        """Missing or unknown priorities go to the normal lane"""
+        assert stream_for(None) == STREAM_NAME
+        assert stream_for("urgent") == STREAM_NAME
+
+    def test_priority_of_roundtrip(self):
+        """priority_of inverts stream_for (also for bytes from redis)"""
+        for priority, stream in lane_streams().items():
+            assert priority_of(stream) == priority
+            assert priority_of(stream.encode()) == priority
+
+    @pytest.mark.asyncio
+    async def test_enqueue_job_payload(self):
+        """enqueue_job writes to the lane stream with priority and enqueue time"""
+        r = AsyncMock()
+        await enqueue_job(r, "abc", "bulk", attempt=2)
+        stream, fields = r.xadd.call_args.args
+        payload = json.loads(fields["payload"])
+        assert stream == f"{STREAM_NAME}:bulk"
+        assert payload["interview_id"] == "abc"
+        assert payload["priority"] == "bulk"
+        assert payload["attempt"] == 2
+        assert payload["enqueued_at"] > 0
+
+
+class TestLaneScheduler:
+    """Test suite for LaneScheduler"""
+
+    def _serve(self, sched, n, now=0.0):
+        picks = []
+        for _ in range(n):
+            lane = sched.order(now)[0]
+            sched.served(lane, now)
+            picks.append(lane)
+        return picks
+
+    def test_weighted_ratio_when_all_lanes_busy(self):
+        """With weights 8/3/1 and every lane busy, 24 picks split 16/6/2"""
+        sched = LaneScheduler({"realtime": 8, "normal": 3, "bulk": 1}, max_wait_s=1e9)
+        picks = self._serve(sched, 24)
+        assert picks.count("realtime") == 16
+        assert picks.count("normal") == 6
+        assert picks.count("bulk") == 2
+
+    def test_picks_are_interleaved(self):
+        """Smooth round-robin: the lower lanes are not served in one burst at the end"""
+        sched = LaneScheduler({"realtime": 8, "normal": 3, "bulk": 1}, max_wait_s=1e9)
+        picks = self._serve(sched, 12)
+        assert "normal" in picks[:6]
+
+    def test_starving_lane_goes_first(self):
+        """A lane with weight not served for max_wait_s is tried first"""
+        sched = LaneScheduler({"realtime": 8, "normal": 3, "bulk": 1}, max_wait_s=30)
+        sched.last_served = {"realtime": 0.0, "normal": 0.0, "bulk": 0.0}
+        assert sched.order(now=31.0)[0] == "realtime"  # --> All starving: keep priority order
+        sched.last_served = {"realtime": 31.0, "normal": 31.0, "bulk": 0.0}
+        assert sched.order(now=31.0)[0] == "bulk"
+
+    def test_zero_weight_lane_never_starves(self):
+        """A lane with weight 0 is only used when nothing else has work"""
+        sched = LaneScheduler({"realtime": 1, "normal": 1, "bulk": 0}, max_wait_s=1)
+        assert sched.order(now=1e6)[-1] == "bulk"
+
+    def test_idle_lane_does_not_bank_credit(self):
+        """An empty lane resets its credit and starvation clock"""
+        sched = LaneScheduler({"realtime": 8, "normal": 3, "bulk": 1}, max_wait_s=30)
+        sched.current["bulk"] = 12
+        sched.idle("bulk", now=100.0)
+        assert sched.current["bulk"] == 0
+        assert sched.last_served["bulk"] == 100.0
+        assert sched.order(now=100.0)[0] == "realtime"
@@ -0,0 +1,199 @@
+"""
+Unit tests for evaluation status pub/sub and the asynchronous submission endpoints.
+Redis is replaced by small in-memory doubles (no server needed).
+"""
+import json
+import pytest
+from unittest.mock import AsyncMock, patch
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.infrastructure import job_status
+from app.infrastructure.job_status import (
+    channel_for,
+    get_status,
+    is_terminal,
+    last_key_for,
+    publish_status,
+    status_event,
+    watch_status,
+)
+from app.infrastructure.api.routes import router
+
+
+class FakePubSub:
+    """Replays the messages published on the subscribed channel"""
+
+    def __init__(self, redis):
+        self.redis = redis
+        self.channel = None
+
+    async def subscribe(self, channel):
+        self.channel = channel
+
+    async def get_message(self, timeout=None):
+        queue = self.redis.published.get(self.channel) or []
+        return {"type": "message", "data": queue.pop(0)} if queue else None
+
+    async def unsubscribe(self):
+        pass
+
+    async def aclose(self):
+        pass
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.ops = []
+
+    def set(self, key, value, ex=None):
+        self.ops.append(("set", key, value))
+
+    def publish(self, channel, value):
+        self.ops.append(("publish", channel, value))
+
+    async def execute(self):
+        for op, key, value in self.ops:
+            if op == "set":
+                self.redis.values[key] = value
+            else:
+                self.redis.published.setdefault(key, []).append(value)
+
+
+class FakeRedis:
+    def __init__(self):
+        self.values = {}
+        self.published = {}
+        self.xadd = AsyncMock(return_value=b"1700000000000-0")
+
+    def pipeline(self, transaction=False):
+        return FakePipeline(self)
+
+    def pubsub(self, ignore_subscribe_messages=False):
+        return FakePubSub(self)
+
+    async def get(self, key):
+        return self.values.get(key)
+
+
+@pytest.fixture
+def redis():
+    fake = FakeRedis()
+    with patch.object(job_status, "get_redis", return_value=fake):
+        yield fake
+
+
+class TestStatusEvents:
+    """Test suite for publishing and reading status"""
+
+    def test_status_event_shape(self):
+        """Events carry id, status, timestamp and the error only when present"""
+        event = status_event(42, "running", job_id="1-0")
+        assert event["interview_id"] == "42"
+        assert event["status"] == "running"
+        assert event["job_id"] == "1-0"
+        assert "error" not in event
+        assert status_event(42, "error", "boom")["error"] == "boom"
+
+    def test_terminal_statuses(self):
+        """Only done/error close a watch; retrying does not"""
+        assert is_terminal({"status": "done"})
+        assert is_terminal({"status": "error"})
+        assert not is_terminal({"status": "retrying"})
+        assert not is_terminal(None)
+
+    @pytest.mark.asyncio
+    async def test_publish_disabled_is_noop(self):
+        """With EVALUATOR_STATUS_PUBSUB=0 publishing does nothing"""
+        with patch.object(job_status, "STATUS_PUBSUB", False):
+            assert await publish_status("1", "running") is False
+
+    @pytest.mark.asyncio
+    async def test_publish_stores_last_and_notifies(self, redis):
+        """Publishing keeps the last status and sends it on the interview channel"""
+        assert await publish_status("7", "running") is True
+        assert json.loads(redis.values[last_key_for("7")])["status"] == "running"
+        assert len(redis.published[channel_for("7")]) == 1
+        assert (await get_status("7"))["status"] == "running"
+
+    @pytest.mark.asyncio
+    async def test_watch_replays_current_then_transitions(self, redis):
+        """A watcher gets the current status, every later transition, and stops at a final one"""
+        await publish_status("7", "queued")
+        redis.published.clear()
+        await publish_status("7", "running")
+        await publish_status("7", "retrying", "timeout")
+        await publish_status("7", "done")
+        redis.values[last_key_for("7")] = json.dumps(status_event("7", "queued"))
+
+        seen = [e["status"] async for e in watch_status("7", timeout_s=1) if e]
+        assert seen == ["queued", "running", "retrying", "done"]
+
+    @pytest.mark.asyncio
+    async def test_watch_finished_job_returns_immediately(self, redis):
+        """Subscribing after the job ended yields the outcome and closes"""
+        await publish_status("7", "error", "bad transcript")
+        events = [e async for e in watch_status("7", timeout_s=5)]
+        assert [e["status"] for e in events] == ["error"]
+
+
+class TestSubmissionEndpoints:
+    """Test suite for the async submission API"""
+
+    @pytest.fixture
+    def client(self):
+        app = FastAPI()
+        app.include_router(router)
+        return TestClient(app)
+
+    def test_submit_enqueues_and_returns_job_id(self, client, redis):
+        """POST /evaluations answers 202 with the stream entry id and the status URLs"""
+        response = client.post("/api/v1/evaluations", json={"interview_id": "abc"})
+        assert response.status_code == 202
+        body = response.json()
+        assert body["job_id"] == "1700000000000-0"
+        assert body["priority"] == "realtime"
+        assert body["events_url"] == "/api/v1/evaluations/abc/events"
+        stream, fields = redis.xadd.call_args.args
+        assert stream.endswith(":realtime")
+        assert json.loads(fields["payload"])["interview_id"] == "abc"
+        assert json.loads(redis.values[last_key_for("abc")])["status"] == "queued"
+
+    def test_submit_publishes_queued_before_enqueue(self, client, redis):
+        """A worker that picks the job up at once must not be overwritten by a late queued status"""
+        async def xadd(stream, fields):
+            assert json.loads(redis.values[last_key_for("abc")])["status"] == "queued"
+            redis.values[last_key_for("abc")] = json.dumps(status_event("abc", "running"))
+            return b"1700000000000-0"
+        redis.xadd.side_effect = xadd
+        assert client.post("/api/v1/evaluations", json={"interview_id": "abc"}).status_code == 202
+        assert json.loads(redis.values[last_key_for("abc")])["status"] == "running"
+
+    def test_submit_enqueue_failure_publishes_error(self, client, redis):
+        """If the XADD fails subscribers get "error" instead of a job stuck in queued"""
+        redis.xadd.side_effect = ConnectionError("down")
+        assert client.post("/api/v1/evaluations", json={"interview_id": "abc"}).status_code == 503
+        last = json.loads(redis.values[last_key_for("abc")])
+        assert last["status"] == "error" and "down" in last["error"]
+
+    def test_submit_without_redis(self, client):
+        """Without Redis the endpoint refuses instead of evaluating inline"""
+        with patch.object(job_status, "get_redis", return_value=None):
+            assert client.post("/api/v1/evaluations", json={"interview_id": "abc"}).status_code == 503
+
+    def test_status_and_long_poll(self, client, redis):
+        """GET /status returns the last status; with wait it returns the next different one"""
+        assert client.get("/api/v1/evaluations/abc/status").json()["status"] == "unknown"
+        redis.values[last_key_for("abc")] = json.dumps(status_event("abc", "running"))
+        redis.published[channel_for("abc")] = [json.dumps(status_event("abc", "done"))]
+        response = client.get("/api/v1/evaluations/abc/status", params={"wait": 1, "since": "running"})
+        assert response.json()["status"] == "done"
+
+    def test_sse_events_until_done(self, client, redis):
+        """GET /events streams status events and ends after done"""
+        redis.values[last_key_for("abc")] = json.dumps(status_event("abc", "running"))
+        redis.published[channel_for("abc")] = [json.dumps(status_event("abc", "done"))]
+        response = client.get("/api/v1/evaluations/abc/events")
+        assert response.headers["content-type"].startswith("text/event-stream")
+        assert response.text.count("event: status") == 2
+        assert '"status": "done"' in response.text
@@ -0,0 +1,173 @@
+"""
+Unit tests for provider token streaming and the SSE endpoint.
+Tests the thread bridge, the multiplexer events and the /evaluate-interview/stream response.
+"""
+import json
+import time
+from types import SimpleNamespace
+import pytest
+from unittest.mock import patch
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.infrastructure import criterion_evaluation, llm_provider, llm_streaming
+from app.infrastructure.llm_streaming import iterate_in_thread, stream_evaluations
+from app.infrastructure.evaluation_cache import EvaluationCache
+from app.infrastructure.api.routes import router
+from app.domain.entities.interview import Interview
+
+
+def fake_specs(streams, enabled=(True, True, True)):
+    """Replace SDK streams by plain lists of text chunks (or an exception)"""
+    def opener(provider):
+        def open_fn(full_prompt, params):
+            data = streams[provider]
+            if isinstance(data, Exception):
+                raise data
+            return iter(data)
+        return open_fn
+    identity = lambda chunk: chunk
+    return {
+        "openai": (enabled[0], "[OpenAI disabled by env]", opener("openai"), identity, "Error calling OpenAI API"),
+        "gemini": (enabled[1], "[Gemini disabled by env]", opener("gemini"), identity, "Error calling Google Gemini API"),
+        "openrouter": (enabled[2], "[OpenRouter disabled by env]", opener("openrouter"), identity, "Error calling OpenRouter API"),
+    }
+
+
+class StrictCompletions:
+    """chat.completions with the SDK's explicit signature: unknown keyword arguments raise TypeError"""
+
+    def __init__(self, text):
+        self.text, self.calls = text, []
+
+    def create(self, model, messages, stream=False, max_tokens=None, temperature=None):
+        self.calls.append({"max_tokens": max_tokens, "temperature": temperature})
+        return iter([SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=self.text))])])
+
+
+def strict_client(text):
+    return SimpleNamespace(chat=SimpleNamespace(completions=StrictCompletions(text)))
+
+
+async def collect(interview, **kwargs):
+    return [e async for e in stream_evaluations(interview, **kwargs)]
+
+
+class TestIterateInThread:
+    """Test suite for iterate_in_thread"""
+
+    @pytest.mark.asyncio
+    async def test_yields_deltas_in_order(self):
+        out = [d async for d in iterate_in_thread(lambda: iter(["a", "", "b"]), lambda c: c)]
+        assert out == ["a", "b"]
+
+    @pytest.mark.asyncio
+    async def test_propagates_errors(self):
+        def broken():
+            yield "a"
+            raise RuntimeError("boom")
+        with pytest.raises(RuntimeError, match="boom"):
+            [d async for d in iterate_in_thread(broken, lambda c: c)]
+
+    @pytest.mark.asyncio
+    async def test_consumer_stop_stops_thread(self):
+        """Breaking out of the loop stops pulling from the SDK stream"""
+        pulled = []
+        def slow():
+            for i in range(100):
+                pulled.append(i)
+                time.sleep(0.005)
+                yield str(i)
+        gen = iterate_in_thread(slow, lambda c: c)
+        async for _ in gen:
+            break
+        await gen.aclose()
+        time.sleep(0.05)
+        assert len(pulled) < 100
+
+
+class TestStreamEvaluations:
+    """Test suite for the provider multiplexer"""
+
+    @pytest.fixture
+    def interview(self):
+        return Interview(interview_id="sse-1", system_prompt="P", rubric="R", jd="JD", full_transcript="user: hola")
+
+    @pytest.mark.asyncio
+    async def test_tokens_are_tagged_and_joined(self, interview):
+        streams = {"openai": ["Good ", "candidate"], "gemini": ["Strong"], "openrouter": ["OK"]}
+        with patch.object(llm_streaming, "_stream_specs", return_value=fake_specs(streams)):
+            events = await collect(interview, use_cache=False)
+
+        names = [e for e, _ in events]
+        assert names[0] == "start" and names[-1] == "done"
+        openai_tokens = [d["delta"] for e, d in events if e == "token" and d["provider"] == "openai"]
+        assert openai_tokens == ["Good ", "candidate"]
+        assert names.count("provider_done") == 3
+        assert events[-1][1]["evaluation_1"] == "Good candidate"
+        assert interview.evaluation_2 == "Strong"
+
+    @pytest.mark.asyncio
+    async def test_errors_and_disabled_providers(self, interview):
+        streams = {"openai": RuntimeError("429"), "gemini": ["Strong"], "openrouter": ["x"]}
+        with patch.object(llm_streaming, "_stream_specs", return_value=fake_specs(streams, enabled=(True, True, False))):
+            events = await collect(interview, use_cache=False)
+
+        errors = [d for e, d in events if e == "provider_error"]
+        assert errors[0]["provider"] == "openai"
+        assert interview.evaluation_1 == "Error calling OpenAI API: 429"
+        assert interview.evaluation_3 == "[OpenRouter disabled by env]"
+
+    @pytest.mark.asyncio
+    async def test_second_stream_is_served_from_cache(self, interview):
+        cache = EvaluationCache(redis_uri=None)
+        streams = {"openai": ["A"], "gemini": ["B"], "openrouter": ["C"]}
+        with patch.object(llm_streaming, "get_evaluation_cache", return_value=cache), \
+             patch.object(llm_streaming, "_stream_specs", return_value=fake_specs(streams)):
+            await collect(interview)
+            with patch.object(llm_streaming, "_stream_specs", return_value=fake_specs({k: RuntimeError("no") for k in streams})):
+                events = await collect(Interview.from_dict(interview.to_dict()))
+
+        done = [d for e, d in events if e == "provider_done"]
+        assert all(d["cached"] for d in done)
+        assert events[-1][1]["evaluation_1"] == "A"
+
+
+    @pytest.mark.asyncio
+    async def test_per_criterion_cache_params_are_not_sent(self, interview):
+        """EVALUATOR_EVAL_MODE=per_criterion params only key the cache; the SDK request gets max_tokens/temperature"""
+        openai, openrouter = strict_client("Good"), strict_client("OK")
+        with patch.object(criterion_evaluation, "EVAL_MODE", "per_criterion"), \
+             patch.object(llm_provider, "ENABLE_OPENAI", True), \
+             patch.object(llm_provider, "ENABLE_GEMINI", False), \
+             patch.object(llm_provider, "ENABLE_OPENROUTER", True), \
+             patch.object(llm_provider, "OPENROUTER_API_KEY", "test-key"), \
+             patch.object(llm_provider, "_get_openai_client", return_value=openai), \
+             patch.object(llm_provider, "_openrouter_client", return_value=openrouter):
+            assert "eval_mode" in llm_provider._evaluation_slots()[0][3]
+            events = await collect(interview, use_cache=False)
+
+        assert not [d for e, d in events if e == "provider_error"]
+        assert (interview.evaluation_1, interview.evaluation_3) == ("Good", "OK")
+        assert openai.chat.completions.calls[0]["max_tokens"] and openrouter.chat.completions.calls
+
+
+class TestStreamEndpoint:
+    """Test suite for POST /api/v1/evaluate-interview/stream"""
+
+    def test_sse_response(self):
+        app = FastAPI()
+        app.include_router(router)
+        streams = {"openai": ["Hi"], "gemini": ["Yo"], "openrouter": ["Hey"]}
+        with patch.object(llm_streaming, "_stream_specs", return_value=fake_specs(streams)):
+            response = TestClient(app).post(
+                "/api/v1/evaluate-interview/stream?persist=false&use_cache=false",
+                json={"interview_id": "sse-2", "full_transcript": "user: hola"},
+            )
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        blocks = [b for b in response.text.split("\n\n") if b.startswith("event:")]
+        assert blocks[0].startswith("event: start")
+        last = blocks[-1].split("\n")
+        assert last[0] == "event: done"
+        assert json.loads(last[1][len("data: "):])["evaluation_3"] == "Hey"
@@ -0,0 +1,113 @@
+"""
+Unit tests for in-process metrics.
+Tests counters, histograms, Prometheus rendering and the per-job usage scope.
+"""
+import asyncio
+import pytest
+from types import SimpleNamespace
+from app.infrastructure import metrics
+from app.infrastructure.llm_provider import _response_usage, record_llm_usage
+
+
+@pytest.fixture(autouse=True)
+def clean_metrics():
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+class TestHistograms:
+    """Test suite for histograms and exports"""
+
+    def test_observe_fills_cumulative_buckets(self):
+        """Observations land in the first bucket >= value and buckets are cumulative"""
+        for value in (0.02, 0.3, 0.3, 7.0, 900.0):
+            metrics.observe("evaluator_stage_seconds", value, stage="save")
+        snap = metrics.snapshot()["histograms"]['evaluator_stage_seconds{stage="save"}']
+        assert snap["count"] == 5
+        assert snap["buckets"]["0.05"] == 1
+        assert snap["buckets"]["0.5"] == 3
+        assert snap["buckets"]["10.0"] == 4
+        assert snap["buckets"]["+Inf"] == 5
+        assert metrics.histogram("evaluator_stage_seconds", stage="save")["sum"] == pytest.approx(907.62)
+
+    def test_render_prometheus_labels_each_source(self):
+        """Text exposition has one TYPE line per family and a source label per process"""
+        metrics.inc("jobs_started_total", lane="bulk")
+        metrics.observe("llm_call_seconds", 1.2, provider="openai", outcome="ok")
+        data = metrics.export()
+        text = metrics.render_prometheus({"api": data, "worker_1": data})
+        assert text.count("# TYPE jobs_started_total counter") == 1
+        assert text.count("# TYPE llm_call_seconds histogram") == 1
+        assert 'jobs_started_total{lane="bulk",source="worker_1"} 1.0' in text
+        assert 'llm_call_seconds_bucket{le="+Inf",outcome="ok",provider="openai",source="api"} 1' in text
+        assert 'llm_call_seconds_count{outcome="ok",provider="openai",source="api"} 1' in text
+
+    def test_snapshot_of_remote_export(self):
+        """snapshot() renders an export received from a worker"""
+        metrics.inc("llm_calls_total", provider="gemini", model="m", outcome="ok")
+        remote = metrics.export()
+        metrics.reset()
+        assert metrics.snapshot(remote)["counters"]['llm_calls_total{model="m",outcome="ok",provider="gemini"}'] == 1
+
+
+class TestUsageScope:
+    """Test suite for the per-job usage sink"""
+
+    def test_stage_timing_is_recorded(self):
+        """stage() feeds both the histogram and the job usage"""
+        with metrics.usage_scope() as usage:
+            with metrics.stage("context"):
+                pass
+        assert "context" in usage.to_dict()["stages_s"]
+        assert metrics.histogram("evaluator_stage_seconds", stage="context")["count"] == 1
+
+    @pytest.mark.asyncio
+    async def test_calls_from_threads_and_tasks_reach_the_scope(self):
+        """Provider calls made in worker threads and child tasks are added to the job"""
+        def call_in_thread():
+            metrics.record_llm_call("openai", "gpt-4o-mini", 0.5, 100, 20, 0.001)
+
+        async def call_in_task():
+            metrics.record_llm_call("gemini", "gemini-2.5-flash", 0.7, 80, 10, 0.002)
+
+        with metrics.usage_scope() as usage:
+            await asyncio.gather(asyncio.to_thread(call_in_thread), asyncio.create_task(call_in_task()))
+        data = usage.to_dict()
+        assert data["totals"] == {"calls": 2, "prompt_tokens": 180, "completion_tokens": 30, "cost_usd": 0.003}
+        assert data["providers"]["openai"]["model"] == "gpt-4o-mini"
+
+    def test_calls_outside_a_scope_only_update_counters(self):
+        """Without an active scope nothing is attributed to a job"""
+        metrics.record_llm_call("openai", "gpt-4o-mini", 0.1, 10, 5, 0.0)
+        assert metrics.current_usage() is None
+        assert metrics.get("llm_prompt_tokens_total", provider="openai", model="gpt-4o-mini") == 10
+
+
+class TestProviderUsage:
+    """Test suite for reading usage from SDK responses"""
+
+    def test_sdk_usage_shapes(self):
+        """Both SDK usage layouts are understood; mocks without numbers are ignored"""
+        openai_resp = SimpleNamespace(usage=SimpleNamespace(prompt_tokens=11, completion_tokens=7))
+        gemini_resp = SimpleNamespace(usage_metadata=SimpleNamespace(prompt_token_count=13, candidates_token_count=5))
+        assert _response_usage(openai_resp) == (11, 7)
+        assert _response_usage(gemini_resp) == (13, 5)
+        assert _response_usage(SimpleNamespace(text="x")) is None
+
+    def test_missing_usage_is_estimated_and_flagged(self):
+        """Streaming responses have no usage: tokens are estimated and the call is flagged"""
+        with metrics.usage_scope() as usage:
+            record_llm_usage("openrouter", "deepseek/deepseek-chat-v3.1", 0.0, "prompt " * 40, "answer " * 10)
+        provider = usage.to_dict()["providers"]["openrouter"]
+        assert provider["estimated"] is True
+        assert provider["prompt_tokens"] > 0 and provider["completion_tokens"] > 0
+        assert metrics.get("llm_usage_estimated_total", provider="openrouter") == 1
+
+    def test_errors_count_latency_but_no_tokens(self):
+        """A failed call is counted as an error without tokens"""
+        with metrics.usage_scope() as usage:
+            record_llm_usage("openai", "gpt-4o-mini", 0.0, outcome="error")
+        provider = usage.to_dict()["providers"]["openai"]
+        assert provider["errors"] == 1
+        assert provider["prompt_tokens"] == 0
@@ -0,0 +1,48 @@
+"""
+Unit tests for the in-process prompt cache.
+Tests TTL hits, stale-while-revalidate refresh and invalidation.
+"""
+import asyncio
+import pytest
+from unittest.mock import Mock, AsyncMock
+from app.infrastructure.prompt_cache import PromptCache
+
+
+class TestPromptCache:
+    """Test suite for PromptCache"""
+
+    @pytest.mark.asyncio
+    async def test_second_read_is_cached(self):
+        """The loader runs once while the entry is fresh"""
+        cache = PromptCache(ttl_s=60)
+        loader = Mock(return_value="SYS")
+        assert await cache.get_or_load("evaluator_system", loader) == "SYS"
+        assert await cache.get_or_load("evaluator_system", loader) == "SYS"
+        assert loader.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_stale_value_is_served_while_refreshing(self):
+        """Past the TTL the old value is returned and refreshed in background"""
+        cache = PromptCache(ttl_s=-1)
+        await cache.get_or_load("k", AsyncMock(return_value="v1"))
+        assert await cache.get_or_load("k", AsyncMock(return_value="v2")) == "v1"
+        await asyncio.sleep(0)
+        await asyncio.gather(*cache._refreshing.values())
+        assert cache._items["k"][1] == "v2"
+
+    @pytest.mark.asyncio
+    async def test_invalidate_forces_reload(self):
+        """An invalidation message makes the next read hit the loader"""
+        cache = PromptCache(ttl_s=60)
+        loader = AsyncMock(side_effect=["old", "new"])
+        await cache.get_or_load("k", loader)
+        cache.invalidate()
+        assert await cache.get_or_load("k", loader) == "new"
+
+    @pytest.mark.asyncio
+    async def test_loader_errors_are_not_cached(self):
+        """A failing loader propagates and leaves no entry behind"""
+        cache = PromptCache(ttl_s=60)
+        with pytest.raises(RuntimeError):
+            await cache.get_or_load("k", AsyncMock(side_effect=RuntimeError("down")))
+        assert "k" not in cache._items
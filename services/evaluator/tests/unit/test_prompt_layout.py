@@ -0,0 +1,115 @@
+"""
+Unit tests for the cached-prefix prompt layout.
+Tests message building in both layouts, cached-token accounting and the stable prefix across map steps.
+"""
+import json
+import pytest
+from types import SimpleNamespace
+from unittest.mock import patch, AsyncMock
+from app.infrastructure import llm_provider, metrics, structured_evaluation, token_budget
+from app.infrastructure.fake_llm import FakeOpenAIClient
+from app.infrastructure.llm_provider import build_messages, gemini_request, _cached_tokens, record_llm_usage
+from app.domain.entities.interview import Interview
+
+
+@pytest.fixture(autouse=True)
+def clean_metrics():
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+class TestBuildMessages:
+    """Test suite for build_messages / gemini_request"""
+
+    def test_single_layout_is_one_user_message(self):
+        """The default layout keeps the historical single prompt"""
+        messages = build_messages("P", "R", "T", layout="single")
+        assert messages == [{"role": "user", "content": llm_provider.build_full_prompt("P", "R", "T")}]
+
+    def test_cached_prefix_keeps_per_interview_text_last(self):
+        """Prompt and rubric go in the system message; the transcript only in the user message"""
+        a = build_messages("P", "R", "transcript A", layout="cached_prefix")
+        b = build_messages("P", "R", "transcript B", layout="cached_prefix")
+        assert a[0] == b[0] and a[0]["role"] == "system"
+        assert "R" in a[0]["content"] and "transcript A" not in a[0]["content"]
+        assert "transcript A" in a[1]["content"]
+
+    def test_gemini_request_splits_system_instruction(self):
+        """Gemini gets the system message as system_instruction"""
+        system, content = gemini_request(build_messages("P", "R", "T", layout="cached_prefix"))
+        assert system.startswith("P") and "T" in content
+        assert gemini_request(build_messages("P", "R", "T", layout="single"))[0] is None
+
+    def test_structured_prefix_holds_schema_and_rubric(self):
+        """Structured messages put instructions, schema and rubric before the JD and transcript"""
+        interview = Interview(interview_id="i", system_prompt="SYS", rubric="RUB", jd="JD text",
+                              full_transcript="user: hi")
+        with patch.object(llm_provider, "PROMPT_LAYOUT", "cached_prefix"):
+            system, user = structured_evaluation.build_messages(interview, {"type": "object"})
+        assert json.dumps({"type": "object"}) in system["content"] and "RUB" in system["content"]
+        assert "JD text" not in system["content"] and "user: hi" not in system["content"]
+        assert "JD text" in user["content"] and "user: hi" in user["content"]
+
+
+class TestCachedTokens:
+    """Test suite for cached-token extraction and accounting"""
+
+    def test_openai_and_gemini_shapes(self):
+        """Cached tokens are read from both SDK usage shapes"""
+        openai_resp = SimpleNamespace(usage=SimpleNamespace(prompt_tokens_details=SimpleNamespace(cached_tokens=1024)))
+        dict_resp = SimpleNamespace(usage=SimpleNamespace(prompt_tokens_details={"cached_tokens": 256}))
+        gemini_resp = SimpleNamespace(usage_metadata=SimpleNamespace(cached_content_token_count=512))
+        assert _cached_tokens(openai_resp) == 1024
+        assert _cached_tokens(dict_resp) == 256
+        assert _cached_tokens(gemini_resp) == 512
+        assert _cached_tokens(SimpleNamespace()) == 0
+
+    def test_cached_input_is_cheaper(self):
+        """Cached input tokens are billed at the cached price"""
+        full = token_budget.estimate_cost("gpt-4o-mini", 10_000, 0)
+        cached = token_budget.estimate_cost("gpt-4o-mini", 10_000, 0, cached_tokens=8_000)
+        assert cached < full
+        assert token_budget.estimate_cost("deepseek/deepseek-chat-v3.1", 1000, 0, cached_tokens=1000) == \
+            token_budget.estimate_cost("deepseek/deepseek-chat-v3.1", 1000, 0)
+
+    def test_usage_records_cached_tokens(self):
+        """record_llm_usage feeds the cached counter and the job usage"""
+        resp = SimpleNamespace(usage=SimpleNamespace(prompt_tokens=2000, completion_tokens=10,
+                                                     prompt_tokens_details=SimpleNamespace(cached_tokens=1536)))
+        with metrics.usage_scope() as usage:
+            record_llm_usage("openai", "gpt-4o-mini", 0.0, resp=resp)
+        assert metrics.get("llm_cached_prompt_tokens_total", provider="openai", model="gpt-4o-mini") == 1536
+        assert usage.providers["openai"]["cached_prompt_tokens"] == 1536
+
+    def test_fake_reports_prefix_hits(self):
+        """The fake provider reports cached tokens once a long system prefix repeats"""
+        messages = build_messages("P" * 8000, "R", "T", layout="cached_prefix")
+        client = FakeOpenAIClient()
+        first = client.chat.completions.create(model="gpt-4o-mini", messages=messages)
+        second = client.chat.completions.create(model="gpt-4o-mini", messages=messages)
+        assert second.usage.prompt_tokens_details.cached_tokens > 0
+        assert second.usage.prompt_tokens_details.cached_tokens % 128 == 0
+        assert first.usage.prompt_tokens_details.cached_tokens <= second.usage.prompt_tokens_details.cached_tokens
+
+
+class TestMapStepsLayout:
+    """Test suite for map/reduce steps under the cached-prefix layout"""
+
+    @pytest.mark.asyncio
+    async def test_map_steps_share_system_prompt(self):
+        """In cached_prefix the map/reduce instructions travel with the text, not in the prompt"""
+        lines = [f"[2025-01-01 10:{i:02d}] {'assistant' if i % 2 == 0 else 'user'}: " + f"answer {i} " * 5
+                 for i in range(40)]
+        interview = Interview(interview_id="layout-1", system_prompt="P", rubric="R", jd="JD",
+                              full_transcript="\n".join(lines))
+        with patch.object(llm_provider, "PROMPT_LAYOUT", "cached_prefix"), \
+             patch.dict(token_budget.MODEL_LIMITS, {"gpt-4o-mini": 1500}), \
+             patch("app.infrastructure.llm_provider.call_openai_gpt5", new=AsyncMock(return_value="partial")) as m1, \
+             patch("app.infrastructure.llm_provider.call_google_gemini", new=AsyncMock(return_value="eval B")), \
+             patch("app.infrastructure.llm_provider.call_openrouter_deepseek", new=AsyncMock(return_value="eval C")):
+            result = await llm_provider.run_evaluations(interview, use_cache=False)
+
+        assert result.evaluation_plan["evaluation_1"]["mode"] == "map_reduce"
+        assert {call.args[0] for call in m1.await_args_list} == {"P"}
+        assert "Merge" in m1.await_args.args[2]
@@ -0,0 +1,190 @@
+"""
+Unit tests for per-provider rate limiting and bulk re-evaluation helpers.
+Tests RPM/TPM windows, AIMD concurrency, 429 retries, runtime overrides, cost estimation
+and the pending-slot cache check.
+"""
+import pytest
+from types import SimpleNamespace
+from unittest.mock import patch, AsyncMock
+from app.infrastructure import rate_limit
+from app.infrastructure.rate_limit import (
+    ProviderLimiter,
+    ProviderLimits,
+    _parse_limits,
+    get_rate_limiter,
+    set_rate_limit,
+    is_rate_limit_error,
+    retry_after_seconds,
+)
+from app.infrastructure.token_budget import estimate_cost
+from app.infrastructure.evaluation_cache import EvaluationCache, make_cache_key
+from app.infrastructure import llm_provider
+from app.domain.entities.interview import Interview
+
+
+@pytest.fixture(autouse=True)
+def clean_limits():
+    saved = dict(rate_limit.RATE_LIMITS)
+    rate_limit._limiters.clear()
+    yield
+    rate_limit.RATE_LIMITS.clear()
+    rate_limit.RATE_LIMITS.update(saved)
+    rate_limit._limiters.clear()
+
+
+class _RateLimited(Exception):
+    status_code = 429
+
+    def __init__(self, retry_after=None):
+        super().__init__("Error code: 429 - rate limit exceeded")
+        headers = {"retry-after": str(retry_after)} if retry_after is not None else {}
+        self.response = SimpleNamespace(headers=headers)
+
+
+class TestProviderLimiter:
+    """Test suite for ProviderLimiter (memory backend) and the provider registry"""
+
+    @pytest.mark.asyncio
+    async def test_rpm_window_blocks_until_next_minute(self):
+        """Once the RPM of the current window is used, acquire waits for the next window"""
+        limiter = ProviderLimiter("openai", ProviderLimits(rpm=2, concurrency=10))
+        waits = []
+
+        async def fake_sleep(s):
+            waits.append(s)
+            limiter._local.window = -1  # --> simulate the window rolling over
+
+        with patch("app.infrastructure.rate_limit.asyncio.sleep", side_effect=fake_sleep):
+            for _ in range(3):
+                await limiter.release(await limiter.acquire())
+        assert len(waits) == 1 and 0 < waits[0] <= 60
+
+    @pytest.mark.asyncio
+    async def test_tpm_counts_estimated_tokens(self):
+        """A request that would exceed the TPM of a non-empty window must wait"""
+        limiter = ProviderLimiter("openai", ProviderLimits(tpm=1000, concurrency=10))
+        assert await limiter._try_acquire("a", 800) == 0
+        assert await limiter._try_acquire("b", 300) > 0
+        assert await limiter._try_acquire("c", 200) == 0
+
+    @pytest.mark.asyncio
+    async def test_concurrency_limit(self):
+        """In-flight leases are capped by the AIMD concurrency"""
+        limiter = ProviderLimiter("openai", ProviderLimits(concurrency=1))
+        assert await limiter._try_acquire("a", 1) == 0
+        assert await limiter._try_acquire("b", 1) < 0
+        await limiter.release("a")
+        assert await limiter._try_acquire("b", 1) == 0
+
+    @pytest.mark.asyncio
+    async def test_throttle_halves_and_success_increases(self):
+        """429 halves concurrency (once per burst); successes add ~1 per round"""
+        limiter = ProviderLimiter("openai", ProviderLimits(concurrency=8))
+        await limiter.on_throttle(0)
+        await limiter.on_throttle(0)
+        assert limiter.concurrency == pytest.approx(4)
+        for _ in range(4):
+            await limiter.on_success(0.1)
+        assert limiter.concurrency == pytest.approx(5)
+
+    @pytest.mark.asyncio
+    async def test_latency_spike_backs_off(self):
+        """Latency far above the baseline reduces concurrency"""
+        limiter = ProviderLimiter("gemini", ProviderLimits(concurrency=10))
+        limiter.latency_baseline = 0.001
+        await limiter.on_success(1.0, tokens=100)
+        assert limiter.concurrency == pytest.approx(9)
+
+    @pytest.mark.asyncio
+    async def test_baseline_follows_sustained_latency_shift(self):
+        """A sustained slowdown moves the baseline, so it stops counting as a spike and concurrency recovers"""
+        limiter = ProviderLimiter("gemini", ProviderLimits(concurrency=4))
+        with patch.object(rate_limit, "AIMD_DECREASE_GUARD_S", 0.0):
+            for _ in range(20):
+                await limiter.on_success(0.1, tokens=100)
+            before = limiter.concurrency
+            for _ in range(200):
+                await limiter.on_success(0.3, tokens=100)
+        assert limiter.latency_baseline == pytest.approx(0.003, rel=0.01)
+        assert limiter.concurrency > before
+
+    @pytest.mark.asyncio
+    async def test_call_retries_after_429_respecting_retry_after(self):
+        """call() waits Retry-After and retries instead of failing"""
+        limiter = ProviderLimiter("openrouter", ProviderLimits(concurrency=4))
+        fn = AsyncMock(side_effect=[_RateLimited(retry_after=2), "ok"])
+        waits = []
+
+        async def fake_sleep(s):
+            waits.append(s)
+            limiter._local.cooldown_until = 0
+
+        with patch("app.infrastructure.rate_limit.asyncio.sleep", side_effect=fake_sleep):
+            assert await limiter.call(fn, tokens=10) == "ok"
+        assert fn.await_count == 2
+        assert waits and waits[0] == pytest.approx(2, abs=0.1)
+        assert limiter.concurrency == pytest.approx(2)
+
+    @pytest.mark.asyncio
+    async def test_call_does_not_retry_other_errors(self):
+        """Non-429 errors propagate on the first attempt"""
+        limiter = ProviderLimiter("openai")
+        fn = AsyncMock(side_effect=RuntimeError("boom"))
+        with pytest.raises(RuntimeError):
+            await limiter.call(fn)
+        assert fn.await_count == 1
+
+    def test_rate_limit_detection(self):
+        """429s are recognised by status code, SDK class name or message"""
+        assert is_rate_limit_error(_RateLimited())
+        assert is_rate_limit_error(type("ResourceExhausted", (Exception,), {})("quota"))
+        assert not is_rate_limit_error(ValueError("bad request"))
+        assert retry_after_seconds(_RateLimited(retry_after=3)) == 3.0
+        assert retry_after_seconds(ValueError("x")) is None
+
+    def test_registry_and_overrides(self):
+        """Unconfigured providers get a local limiter; set_rate_limit replaces it"""
+        rate_limit.RATE_LIMITS.pop("gemini", None)
+        limiter = get_rate_limiter("gemini")
+        assert limiter.limits.rpm == 0 and limiter.redis_uri is None
+        assert get_rate_limiter("gemini") is limiter
+
+        set_rate_limit("gemini", 30)
+        assert get_rate_limiter("gemini").limits.rpm == 30
+        set_rate_limit("gemini", None)
+        assert get_rate_limiter("gemini").limits.rpm == 0
+
+    def test_parse_limits(self):
+        """A bare number means RPM; dicts carry rpm/tpm/concurrency"""
+        assert _parse_limits(60).rpm == 60
+        limits = _parse_limits({"rpm": 500, "tpm": 200000, "concurrency": 8})
+        assert (limits.rpm, limits.tpm, limits.concurrency) == (500, 200000, 8)
+
+
+class TestBulkHelpers:
+    """Test suite for cost estimation and pending_slots"""
+
+    def test_estimate_cost(self):
+        """Cost uses the per-1M input/output prices; unknown models cost 0"""
+        assert estimate_cost("gpt-4o-mini", 1_000_000, 1_000_000) == pytest.approx(0.75)
+        assert estimate_cost("unknown-model", 10_000, 10_000) == 0.0
+
+    @pytest.mark.asyncio
+    async def test_pending_slots_skips_cached(self):
+        """Slots whose result is already cached are not pending"""
+        interview = Interview(interview_id="i-1", system_prompt="p", rubric="r", full_transcript="t")
+        cache = EvaluationCache(redis_uri=None)
+        slot = llm_provider._evaluation_slots()[0]
+        _, provider, model, params, _, _ = slot
+        await cache.set(make_cache_key(provider, model, params, "p", "r", "t"), "cached eval")
+
+        with patch.object(llm_provider, "get_evaluation_cache", return_value=cache), \
+             patch.object(llm_provider, "CACHE_ENABLED", True), \
+             patch.object(llm_provider, "ENABLE_OPENAI", True), \
+             patch.object(llm_provider, "ENABLE_GEMINI", True), \
+             patch.object(llm_provider, "ENABLE_OPENROUTER", True):
+            pending = await llm_provider.pending_slots(interview)
+            forced = await llm_provider.pending_slots(interview, use_cache=False)
+
+        assert slot not in pending and slot in forced
+        assert len(pending) == len(llm_provider._evaluation_slots()) - 1
@@ -0,0 +1,207 @@
+"""
+Unit tests for bulk reports.
+Tests row building, the NDJSON/CSV/JSON encoders, batched loading, the content-addressed store and the routes.
+"""
+import asyncio
+import csv
+import io
+import json
+import pytest
+from unittest.mock import patch
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.infrastructure import reporting
+from app.infrastructure.reporting import ReportStore, RowEncoder, report_row, stream_report
+from app.infrastructure.repository import FileMockRepository, EvaluatorRepository
+from app.infrastructure.api.reporting_routes import router
+
+
+class FakeRepo(EvaluatorRepository):
+    """Repository that records how reports read it"""
+
+    def __init__(self, job_ids=None):
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.job_ids = job_ids or []
+
+    async def list_interview_ids(self, status=None, since=None, until=None, limit=None, job_id=None):
+        return list(self.job_ids)
+
+    async def get_evaluation_records(self, interview_ids):
+        self.calls.append(list(interview_ids))
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.001)
+        self.in_flight -= 1
+        return {i: {"interview_id": i, "status": "done", "results": {"evaluation_1": f"Score: 4/5. Hire {i}"}}
+                for i in interview_ids}
+
+    async def get_interview_context(self, interview_id):
+        return {"interview_id": interview_id, "jd": "JD", "full_transcript": "user: hi"}
+
+
+async def collect(stream):
+    return b"".join([chunk async for chunk in stream])
+
+
+class TestReportRows:
+    """Test suite for report_row and RowEncoder"""
+
+    def test_structured_fields_win(self):
+        """Score and recommendation come from the structured evaluation when present"""
+        record = {"interview_id": "1", "structured": {"interview_type": "technical", "overall_assessment": {
+            "quantitative_score": 82, "recommendation": "hire", "summary": "Solid"}}, "score": 10}
+        row = report_row(record)
+        assert (row["score"], row["recommendation"], row["summary"]) == (82, "hire", "Solid")
+
+    def test_free_text_verdict_fallback(self):
+        """Without structured output the most common free-text verdict is used"""
+        record = {"interview_id": "1", "results": {"evaluation_1": "No hire.", "evaluation_2": "Do not hire",
+                                                   "evaluation_3": "Hire"}}
+        assert report_row(record)["recommendation"] == "no_hire"
+
+    def test_encoders(self):
+        """CSV has a header, JSON is one valid array across batches, NDJSON is one object per line"""
+        rows = [{"interview_id": "1", "score": 3}, {"interview_id": "2", "score": None}]
+        enc = RowEncoder("csv", ["interview_id", "score"])
+        parsed = list(csv.reader(io.StringIO((enc.header() + enc.encode(rows)).decode())))
+        assert parsed == [["interview_id", "score"], ["1", "3"], ["2", ""]]
+        enc = RowEncoder("json", ["interview_id"])
+        data = enc.header() + enc.encode(rows[:1]) + enc.encode(rows[1:]) + enc.footer()
+        assert json.loads(data) == [{"interview_id": "1"}, {"interview_id": "2"}]
+        enc = RowEncoder("ndjson", ["interview_id"])
+        assert enc.encode(rows).decode().splitlines() == ['{"interview_id": "1"}', '{"interview_id": "2"}']
+
+
+class TestStreamReport:
+    """Test suite for stream_report"""
+
+    @pytest.mark.asyncio
+    async def test_batches_and_store(self, tmp_path):
+        """Ids are read in bounded batches, at most one batch ahead; the store holds the same bytes"""
+        repo, store = FakeRepo(), ReportStore(tmp_path)
+        ids = [str(i) for i in range(23)]
+        data = await collect(stream_report(repo, ids, "ndjson", report_id="rpt_r1", store=store, batch_size=5))
+        assert [len(c) for c in repo.calls] == [5, 5, 5, 5, 3]
+        assert repo.max_in_flight <= 2
+        assert len(data.decode().splitlines()) == 23
+        assert store.path("rpt_r1", "ndjson").read_bytes() == data
+        assert store.meta("rpt_r1")["status"] == "completed" and store.meta("rpt_r1")["rows"] == 23
+
+    @pytest.mark.asyncio
+    async def test_context_columns(self, tmp_path):
+        """include_context adds jd and transcript columns"""
+        data = await collect(stream_report(FakeRepo(), ["1"], "csv", include_context=True,
+                                           report_id="rpt_r2", store=ReportStore(tmp_path)))
+        header, row = list(csv.reader(io.StringIO(data.decode())))
+        assert row[header.index("jd")] == "JD" and row[header.index("full_transcript")] == "user: hi"
+
+    @pytest.mark.asyncio
+    async def test_abandoned_stream_is_incomplete(self, tmp_path):
+        """A consumer that stops early leaves no final file and an incomplete status"""
+        store = ReportStore(tmp_path)
+        stream = stream_report(FakeRepo(), [str(i) for i in range(10)], "ndjson", report_id="rpt_r3",
+                               store=store, batch_size=2)
+        await stream.__anext__()
+        await stream.__anext__()
+        await stream.aclose()
+        assert store.meta("rpt_r3")["status"] == "incomplete"
+        assert not store.path("rpt_r3", "ndjson").exists()
+        assert not list(tmp_path.rglob("*.part"))
+
+    @pytest.mark.asyncio
+    async def test_mock_repository_records(self, tmp_path):
+        """FileMockRepository builds records from its out/ files"""
+        repo = FileMockRepository(examples_dir=tmp_path / "examples", out_dir=tmp_path / "out")
+        await repo.save_evaluation_results("a", {"evaluation_1": "Hire"})
+        (tmp_path / "out" / "status_a.json").write_text(json.dumps({"status": "done"}))
+        records = await repo.get_evaluation_records(["a", "b"])
+        assert records["a"]["status"] == "done" and records["a"]["results"] == {"evaluation_1": "Hire"}
+        assert records["b"]["results"] is None
+
+
+class TestReportStore:
+    """Test suite for the content-addressed store"""
+
+    def test_key_depends_on_inputs(self):
+        """Same inputs give the same id; order, format and columns change it"""
+        assert reporting.report_key(["1", "2"], "csv") == reporting.report_key(["1", "2"], "csv")
+        assert len({reporting.report_key(["1", "2"], "csv"), reporting.report_key(["2", "1"], "csv"),
+                    reporting.report_key(["1", "2"], "ndjson"),
+                    reporting.report_key(["1", "2"], "csv", include_context=True)}) == 4
+
+    def test_claim_reuses_fresh_reports(self, tmp_path):
+        """A queued or completed report is reused; stale or refreshed ones are rebuilt"""
+        store = ReportStore(tmp_path)
+        meta, build = store.claim("rpt_a1", "csv", 3)
+        assert build and meta["status"] == "queued"
+        assert store.claim("rpt_a1", "csv", 3) == (store.meta("rpt_a1"), False)
+        assert store.claim("rpt_a1", "csv", 3, refresh=True)[1]
+        store.write_meta("rpt_a1", heartbeat_ts=0)
+        assert store.claim("rpt_a1", "csv", 3)[1]  # --> Quedó colgado en "queued": se vuelve a armar
+
+    @pytest.mark.asyncio
+    async def test_completed_report_records_hash(self, tmp_path):
+        """The final meta carries the sha256 of the file (used as ETag)"""
+        import hashlib
+        store = ReportStore(tmp_path)
+        meta = await reporting.build_report(FakeRepo(), ["1", "2"], "json", report_id="rpt_b1", store=store)
+        assert meta["status"] == "completed"
+        assert meta["sha256"] == hashlib.sha256(store.path("rpt_b1", "json").read_bytes()).hexdigest()
+        assert store.reusable(meta)
+
+
+class TestReportingRoutes:
+    """Test suite for the reporting endpoints"""
+
+    @pytest.fixture
+    def client(self, tmp_path):
+        app = FastAPI()
+        app.include_router(router)
+        with patch.object(reporting, "_store", ReportStore(tmp_path)):
+            yield TestClient(app)
+
+    def generate(self, client, repo, **body):
+        with patch("app.infrastructure.repository.get_repository", return_value=repo):
+            return client.post("/api/v1/reporting/generate", json=body)
+
+    def test_generate_runs_in_background_and_reuses(self, client):
+        """The first request queues a job; an identical one reuses the stored report"""
+        repo = FakeRepo(job_ids=["7", "8"])
+        first = self.generate(client, repo, interview_ids=["1"], job_id="42", format="csv")
+        assert first.status_code == 202
+        body = first.json()
+        assert body["status"] == "queued" and not body["reused"] and body["interview_count"] == 3
+        status = client.get(body["status_url"]).json()
+        assert status["status"] == "completed" and status["rows"] == 3
+        second = self.generate(client, repo, interview_ids=["1"], job_id="42", format="csv").json()
+        assert second["report_id"] == body["report_id"] and second["reused"] and second["status"] == "completed"
+        assert len(repo.calls) == 1
+
+    def test_download_etag_and_range(self, client):
+        """Downloads carry an ETag, answer 304 to If-None-Match and 206 to Range"""
+        body = self.generate(client, FakeRepo(), interview_ids=["1", "2", "3"], format="ndjson").json()
+        url = f"/api/v1/reporting/download/{body['report_id']}"
+        full = client.get(url)
+        assert full.status_code == 200 and len(full.text.splitlines()) == 3
+        etag = full.headers["etag"]
+        assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+        part = client.get(url, headers={"Range": "bytes=0-9"})
+        assert part.status_code == 206 and part.content == full.content[:10]
+        resumed = client.get(url, headers={"Range": "bytes=10-", "If-Range": etag})
+        assert resumed.status_code == 206 and part.content + resumed.content == full.content
+
+    def test_default_format_is_json(self, client):
+        """Clients that omit format keep getting the JSON report"""
+        body = self.generate(client, FakeRepo(), interview_ids=["1"]).json()
+        assert body["format"] == "json"
+
+    def test_generate_without_interviews(self, client):
+        """An empty selection is rejected"""
+        assert self.generate(client, FakeRepo(), job_id="42").status_code == 400
+
+    def test_unknown_report(self, client):
+        """Unknown or path-like report ids are not found"""
+        assert client.get("/api/v1/reporting/download/rpt_nope").status_code == 404
+        assert client.get("/api/v1/reporting/status/..%2Fx").status_code == 404
@@ -0,0 +1,114 @@
+"""
+Unit tests for SqliteRepository.
+Tests WAL setup, grouped writes, context import from examples/, selection queries and batch reads.
+"""
+import asyncio
+import json
+import sqlite3
+import pytest
+from unittest.mock import patch
+from app.infrastructure import repository_sqlite
+from app.infrastructure import repository
+from app.infrastructure.repository import close_repository, get_repository, select_repository
+from app.infrastructure.repository_sqlite import SqliteRepository
+
+CONTEXT = {"system_prompt": "Be fair", "rubric": "1-5", "jd": "Python dev", "full_transcript": "user: hi"}
+
+
+@pytest.fixture
+def repo(tmp_path):
+    examples = tmp_path / "examples"
+    examples.mkdir()
+    for interview_id, job_id in (("a", 1), ("b", 1), ("c", 2)):
+        (examples / f"{interview_id}.json").write_text(json.dumps({"interview_id": interview_id, "job_id": job_id,
+                                                                   **CONTEXT}))
+    return SqliteRepository(examples_dir=examples, out_dir=tmp_path / "out")
+
+
+class TestSqliteRepository:
+    """Test suite for SqliteRepository"""
+
+    def test_wal_and_indexes(self, repo):
+        """The database is in WAL mode with indexes on status and job"""
+        conn = sqlite3.connect(repo.db_path)
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        indexes = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        assert {"idx_interviews_status", "idx_interviews_job"} <= indexes
+
+    @pytest.mark.asyncio
+    async def test_context_imported_on_demand(self, repo):
+        """A context missing from the table is imported from examples/ and then served from SQLite"""
+        context = await repo.get_interview_context("a")
+        assert context["jd"] == "Python dev" and context["interview_id"] == "a"
+        (repo.examples_dir / "a.json").unlink()
+        assert (await repo.get_interview_context("a"))["rubric"] == "1-5"
+        with pytest.raises(FileNotFoundError):
+            await repo.get_interview_context("missing")
+
+    @pytest.mark.asyncio
+    async def test_concurrent_writes_share_commits(self, repo):
+        """Writes issued together are confirmed in one transaction, and are visible once awaited"""
+        with patch.object(repo, "_apply", wraps=repo._apply) as apply:
+            await asyncio.gather(*[repo.mark_evaluation_status(f"id{i}", "running") for i in range(50)])
+        assert apply.call_count == 1 and len(apply.call_args[0][0]) == 50
+        assert await repo.list_interview_ids(status="running") == sorted(f"id{i}" for i in range(50))
+
+    @pytest.mark.asyncio
+    async def test_batch_size_caps_transactions(self, repo):
+        """EVALUATOR_SQLITE_BATCH bounds the writes per transaction"""
+        with patch.object(repository_sqlite, "SQLITE_BATCH", 8), \
+             patch.object(repo, "_apply", wraps=repo._apply) as apply:
+            await asyncio.gather(*[repo.save_evaluation_results(f"id{i}", {"evaluation_1": "Hire"}) for i in range(20)])
+        assert [len(c[0][0]) for c in apply.call_args_list] == [8, 8, 4]
+
+    @pytest.mark.asyncio
+    async def test_failing_write_does_not_sink_its_batch(self, repo):
+        """A bad statement fails only its own caller; the rest of the batch is committed"""
+        good = repo.mark_evaluation_status("ok", "done")
+        bad = repo._write(("INSERT INTO nope VALUES (?)", (1,)))
+        results = await asyncio.gather(good, bad, return_exceptions=True)
+        assert results[0] is None and isinstance(results[1], sqlite3.OperationalError)
+        assert await repo.list_interview_ids(status="done") == ["ok"]
+
+    @pytest.mark.asyncio
+    async def test_records_and_filters(self, repo):
+        """Batch reads merge status, results and structured output; job filters see imported examples"""
+        await repo.warmup()
+        await repo.mark_evaluation_status("a", "done")
+        await repo.save_evaluation_results("a", {"evaluation_1": "Hire"})
+        await repo.save_structured_evaluation("a", {"overall_assessment": {"quantitative_score": 81.6}})
+        records = await repo.get_evaluation_records(["a", "b", "zz"])
+        assert records["a"]["status"] == "done" and records["a"]["results"] == {"evaluation_1": "Hire"}
+        assert records["a"]["score"] == 82 and records["a"]["job_id"] == "1"
+        assert records["b"]["results"] is None and records["zz"]["status"] is None
+        assert await repo.list_interview_ids(job_id=1) == ["a", "b"]
+        assert await repo.list_interview_ids(limit=2) == ["a", "b"]
+
+    @pytest.mark.asyncio
+    async def test_close_flushes_pending(self, repo):
+        """close() waits for queued writes before shutting the writer down"""
+        task = asyncio.ensure_future(repo.mark_evaluation_status("x", "done"))
+        await asyncio.sleep(0)
+        await repo.close()
+        await task
+        conn = sqlite3.connect(repo.db_path)
+        assert conn.execute("SELECT status FROM interviews WHERE interview_id = 'x'").fetchone() == ("done",)
+
+    def test_selected_by_env(self, tmp_path, monkeypatch):
+        """EVALUATOR_REPO=sqlite selects this backend"""
+        monkeypatch.setenv("EVALUATOR_REPO", "sqlite")
+        monkeypatch.setattr(repository_sqlite, "SQLITE_PATH", str(tmp_path / "db.sqlite"))
+        assert isinstance(select_repository(), SqliteRepository)
+
+    @pytest.mark.asyncio
+    async def test_one_repository_per_process(self, tmp_path, monkeypatch):
+        """get_repository reuses a single instance until close_repository closes it on shutdown"""
+        monkeypatch.setenv("EVALUATOR_REPO", "sqlite")
+        monkeypatch.setattr(repository_sqlite, "SQLITE_PATH", str(tmp_path / "db.sqlite"))
+        monkeypatch.setattr(repository, "_repo", None)
+        shared = get_repository()
+        assert get_repository() is shared
+        with patch.object(shared, "close", wraps=shared.close) as close:
+            await close_repository()
+        close.assert_awaited_once()
+        assert repository._repo is None
@@ -0,0 +1,155 @@
+"""
+Unit tests for typed scores and pre-aggregated evaluation statistics.
+Tests score normalisation, the incremental delta (mock and SQLite triggers) and the /stats endpoints.
+"""
+import asyncio
+import json
+import pytest
+from unittest.mock import MagicMock, patch
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.infrastructure.score_stats import (apply_score_delta, free_text_score_rows, structured_score_rows,
+                                            summarize_stats)
+from app.infrastructure.repository import FileMockRepository
+from app.infrastructure.repository_sqlite import SqliteRepository
+from app.infrastructure.repository_supabase import SupabaseRepository
+from app.infrastructure.api.evaluation_routes import router
+
+STRUCTURED = {
+    "interview_type": "technical",
+    "technical_evaluation": {"problem_understanding": {"score": "strong"}, "technical_skills": {"score": "very_strong"},
+                             "rationale": {"score": "not_applicable"}},
+    "overall_assessment": {"quantitative_score": 80, "recommendation": "hire"},
+}
+
+
+def structured(score, recommendation, level="strong"):
+    return {"technical_evaluation": {"technical_skills": {"score": level}},
+            "overall_assessment": {"quantitative_score": score, "recommendation": recommendation}}
+
+
+class TestScoreRows:
+    """Test suite for score normalisation"""
+
+    def test_structured_rows(self):
+        """Overall is normalised to 0-1 and each scored criterion gets its own row; n/a is skipped"""
+        rows = {r["criterion"]: r for r in structured_score_rows(STRUCTURED)}
+        assert set(rows) == {"overall", "technical.problem_understanding", "technical.technical_skills"}
+        assert rows["overall"]["score"] == 0.8 and rows["overall"]["recommendation"] == "hire"
+        assert rows["technical.technical_skills"]["score"] == 1.0
+        assert rows["technical.problem_understanding"]["score"] == round(2 / 3, 4)
+
+    def test_free_text_rows(self):
+        """Free-text evaluations give one overall row with the mean score and the majority verdict"""
+        rows = free_text_score_rows({"evaluation_1": "Score: 4/5. Hire", "evaluation_2": "3/5, no hire",
+                                     "evaluation_3": "Overall 4/5, recommended"})
+        assert rows == [{"criterion": "overall", "score": round(11 / 15, 4), "recommendation": "hire",
+                         "source": "free_text"}]
+        assert free_text_score_rows({"evaluation_1": "n/a"}) == []
+
+
+class TestIncrementalStats:
+    """Test suite for apply_score_delta / summarize_stats"""
+
+    def test_overwrite_replaces_previous_contribution(self):
+        """Re-scoring an interview subtracts its old row before adding the new one, in its job and globally"""
+        stats = {}
+        first = structured_score_rows(structured(60, "no_hire"))
+        apply_score_delta(stats, 7, [], first)
+        apply_score_delta(stats, 8, [], structured_score_rows(structured(90, "hire")))
+        apply_score_delta(stats, 7, first, structured_score_rows(structured(80, "hire")))
+        job = summarize_stats([r for r in stats.values() if r["id_job"] == 7], 7)
+        assert job["total_interviews"] == 1 and job["avg_score"] == 0.8 and job["recommendations"]["no_hire"] == 0
+        overall = summarize_stats([r for r in stats.values() if r["id_job"] == 0])
+        assert overall["total_interviews"] == 2 and overall["avg_score"] == 0.85
+        assert overall["score_stddev"] == 0.05 and overall["success_rate"] == 1.0
+        assert overall["criteria"] == [{"name": "technical.technical_skills", "evaluations": 2,
+                                        "avg_score": round(2 / 3, 4)}]
+
+    def test_empty(self):
+        """No rows means zero interviews and no averages"""
+        stats = summarize_stats([])
+        assert stats["total_interviews"] == 0 and stats["avg_score"] is None and stats["success_rate"] is None
+
+
+@pytest.fixture(params=["mock", "sqlite"])
+def repo(request, tmp_path):
+    examples = tmp_path / "examples"
+    examples.mkdir()
+    for interview_id, job_id in (("a", 1), ("b", 1), ("c", 2)):
+        (examples / f"{interview_id}.json").write_text(json.dumps({
+            "interview_id": interview_id, "job_id": job_id, "system_prompt": "s", "rubric": "r", "jd": "j",
+            "full_transcript": "t"}))
+    cls = SqliteRepository if request.param == "sqlite" else FileMockRepository
+    return cls(examples_dir=examples, out_dir=tmp_path / "out")
+
+
+class TestRepositoryStats:
+    """Both local backends keep the same running totals as the migration 015 trigger"""
+
+    @pytest.mark.asyncio
+    async def test_saves_update_stats(self, repo):
+        """Free-text results and structured evaluations feed the job and global stats; later writes replace earlier ones"""
+        await repo.warmup()
+        await repo.save_evaluation_results("a", {"evaluation_1": "Score: 2/5. No hire"})
+        await repo.save_structured_evaluation("a", structured(70, "hire"))
+        await repo.save_structured_evaluation("b", structured(90, "strong_hire", "very_strong"))
+        await repo.save_structured_evaluation("c", structured(30, "strong_no_hire", "very_weak"))
+        job = await repo.get_score_stats("1")
+        assert job["job_id"] == "1" and job["total_interviews"] == 2 and job["avg_score"] == 0.8
+        assert job["recommendations"] == {"strong_hire": 1, "hire": 1, "no_hire": 0, "strong_no_hire": 0}
+        assert job["criteria"][0]["avg_score"] == pytest.approx((2 / 3 + 1) / 2, abs=1e-3)
+        total = await repo.get_score_stats()
+        assert total["job_id"] is None and total["total_interviews"] == 3
+        assert total["avg_score"] == round(1.9 / 3, 4) and total["success_rate"] == round(2 / 3, 4)
+
+
+    @pytest.mark.asyncio
+    async def test_missing_criteria_are_removed(self, repo):
+        """Re-evaluating with fewer criteria deletes the stale rows of that source, so the aggregates drop them"""
+        await repo.warmup()
+        await repo.save_structured_evaluation("a", STRUCTURED)
+        await repo.save_evaluation_results("a", {"evaluation_1": "Score: 2/5. No hire"})
+        assert len((await repo.get_score_stats("1"))["criteria"]) == 2
+        await repo.save_structured_evaluation("a", structured(70, "hire"))
+        job = await repo.get_score_stats("1")
+        assert [c["name"] for c in job["criteria"]] == ["technical.technical_skills"]
+        assert job["total_interviews"] == 1 and job["avg_score"] == 0.7  # --> "overall" se reemplaza, no se duplica
+        await repo.save_evaluation_results("a", {"evaluation_1": "n/a"})
+        assert (await repo.get_score_stats("1"))["total_interviews"] == 1  # --> El overall es de la estructurada
+
+
+class TestSupabaseScores:
+    """Score writes of the Supabase backend (SDK mocked)"""
+
+    def test_deletes_stale_criteria_before_upsert(self):
+        """The source's rows not in the new set are deleted (the DELETE trigger subtracts them) before the upsert"""
+        repo = SupabaseRepository.__new__(SupabaseRepository)
+        repo.sb = MagicMock()
+        repo._get_interview_row = lambda interview_id: {"id_interview": 5, "id_job": 1}
+        repo._upsert_scores("5", "structured", structured_score_rows(structured(70, "hire")))
+        delete = repo.sb.table.return_value.delete.return_value
+        delete.eq.assert_called_once_with("id_interview", 5)
+        delete.eq.return_value.eq.assert_called_once_with("source", "structured")
+        delete.eq.return_value.eq.return_value.not_.in_.assert_called_once_with(
+            "criterion", ["overall", "technical.technical_skills"])
+        repo.sb.table.return_value.upsert.assert_called_once()
+
+
+class TestStatsRoutes:
+    """Test suite for the /stats endpoints"""
+
+    def test_global_and_position(self, tmp_path):
+        """The endpoints return the repository's pre-aggregated stats"""
+        repo = FileMockRepository(examples_dir=tmp_path / "examples", out_dir=tmp_path / "out")
+        (tmp_path / "examples" / "a.json").write_text(json.dumps({"job_id": 5}))
+        app = FastAPI()
+        app.include_router(router)
+        client = TestClient(app)
+        with patch("app.infrastructure.repository.get_repository", return_value=repo):
+            asyncio.run(repo.save_structured_evaluation("a", structured(50, "no_hire")))
+            body = client.get("/api/v1/evaluation/stats/global").json()
+            assert body["total_interviews"] == 1 and body["avg_score"] == 0.5 and body["success_rate"] == 0.0
+            body = client.get("/api/v1/evaluation/stats/position/5").json()
+            assert body["job_id"] == "5" and body["criteria"][0]["name"] == "technical.technical_skills"
+            assert client.get("/api/v1/evaluation/stats/position/9").json()["total_interviews"] == 0
@@ -0,0 +1,190 @@
+"""
+Unit tests for the schema-constrained structured evaluation.
+Tests the incremental streaming validator, the schema subset validator and the repair loop.
+"""
+import json
+import pytest
+from unittest.mock import patch, AsyncMock
+from app.infrastructure.evaluation_cache import EvaluationCache
+from app.infrastructure import structured_evaluation as se
+from app.infrastructure.structured_evaluation import (
+    IncrementalJSONValidator,
+    StructuredOutputError,
+    load_schema,
+    model_schema,
+    validate_schema,
+)
+from app.domain.entities.interview import Interview
+
+
+def criterion(score="strong"):
+    return {"score": score, "rationale": "r", "evidence": ["quote"]}
+
+def valid_evaluation():
+    return {
+        "interview_type": "behavioral",
+        "behavioral_evaluation": {
+            "question_understanding": criterion(),
+            "experience_competence": criterion("very_strong"),
+            "self_awareness": criterion("weak"),
+            "communication": criterion(),
+        },
+        "overall_assessment": {
+            "quantitative_score": 75,
+            "score_calculation": "avg",
+            "technical_weight": 0,
+            "behavioral_weight": 1,
+            "recommendation": "hire",
+            "key_strengths": ["a"],
+            "areas_for_improvement": ["b"],
+            "summary": "ok",
+        },
+    }
+
+
+@pytest.fixture
+def schema():
+    return model_schema(load_schema())
+
+
+class TestIncrementalValidator:
+    """Test suite for IncrementalJSONValidator"""
+
+    def test_valid_document_in_small_chunks(self, schema):
+        """A valid response streamed in tiny chunks parses to the same dict"""
+        text = json.dumps(valid_evaluation(), indent=1)
+        v = IncrementalJSONValidator(schema)
+        for i in range(0, len(text), 3):
+            v.feed(text[i:i + 3])
+        assert v.finish() == valid_evaluation()
+
+    def test_code_fence_is_tolerated(self, schema):
+        v = IncrementalJSONValidator(schema)
+        v.feed("```json\n" + json.dumps(valid_evaluation()) + "\n```")
+        assert v.finish()["interview_type"] == "behavioral"
+
+    def test_enum_violation_aborts_before_the_end(self, schema):
+        """A bad enum value is detected on its first impossible character"""
+        text = json.dumps(valid_evaluation()).replace('"very_strong"', '"excellent"')
+        v = IncrementalJSONValidator(schema)
+        with pytest.raises(StructuredOutputError) as exc:
+            v.feed(text)
+        assert exc.value.path == "$.behavioral_evaluation.experience_competence.score"
+        assert v.pos < len(text) // 2
+        assert exc.value.partial.endswith('"evidence": ["quote"]}')
+
+    def test_wrong_type_aborts(self, schema):
+        v = IncrementalJSONValidator(schema)
+        with pytest.raises(StructuredOutputError, match="se esperaba number"):
+            v.feed('{"interview_type": "technical", "overall_assessment": {"quantitative_score": "high"')
+
+    def test_missing_required_detected_on_close(self, schema):
+        """Required fields are checked when their object closes"""
+        v = IncrementalJSONValidator(schema)
+        with pytest.raises(StructuredOutputError, match="requeridos"):
+            v.feed('{"interview_type": "technical", "overall_assessment": {"summary": "x"}')
+
+    def test_prose_aborts_on_first_character(self, schema):
+        v = IncrementalJSONValidator(schema)
+        with pytest.raises(StructuredOutputError):
+            v.feed("Sure! Here is")
+        assert v.pos == 0
+
+    def test_truncated_output_fails_on_finish(self, schema):
+        v = IncrementalJSONValidator(schema)
+        v.feed(json.dumps(valid_evaluation())[:-10])
+        with pytest.raises(StructuredOutputError, match="truncada"):
+            v.finish()
+
+    def test_any_of_checked_on_finish(self, schema):
+        """interview_type=technical without technical_evaluation is rejected"""
+        data = valid_evaluation()
+        data["interview_type"] = "technical"
+        v = IncrementalJSONValidator(schema)
+        v.feed(json.dumps(data))
+        with pytest.raises(StructuredOutputError, match="anyOf"):
+            v.finish()
+
+
+class TestValidateSchema:
+    """Test suite for validate_schema"""
+
+    def test_range(self):
+        errors = validate_schema({"quantitative_score": 120}, {"type": "object", "properties": {
+            "quantitative_score": {"type": "number", "maximum": 100}}})
+        assert errors == ["$.quantitative_score: 120 > 100"]
+
+    def test_bool_is_not_a_number(self):
+        assert validate_schema(True, {"type": "number"})
+
+
+class TestEvaluateStructured:
+    """Test suite for the repair loop in evaluate_structured"""
+
+    @pytest.fixture
+    def interview(self):
+        return Interview(interview_id="s-1", system_prompt="P", rubric="R", jd="JD", full_transcript="T")
+
+    @pytest.mark.asyncio
+    async def test_repair_after_early_abort(self, interview):
+        """An aborted attempt is retried with the valid prefix and the error, then persisted once"""
+        bad = json.dumps(valid_evaluation()).replace('"hire"', '"maybe"')
+        good = json.dumps(valid_evaluation())
+        calls = []
+
+        def fake_stream(provider, model, messages, validator):
+            calls.append(messages)
+            validator.feed(bad if len(calls) == 1 else good)
+
+        repo = AsyncMock()
+        with patch.object(se, "_stream_once", side_effect=fake_stream):
+            result = await se.evaluate_structured(interview, provider="openai", use_cache=False, repo=repo)
+
+        assert len(calls) == 2
+        assert calls[1][-2]["role"] == "assistant"
+        assert "maybe" not in calls[1][-2]["content"]
+        assert "recommendation" in calls[1][-1]["content"]
+        assert result["metadata"]["rubric_version"] == se.RUBRIC_VERSION
+        repo.save_structured_evaluation.assert_awaited_once_with("s-1", result)
+
+    @pytest.mark.asyncio
+    async def test_gives_up_after_max_repairs(self, interview):
+        def always_bad(provider, model, messages, validator):
+            validator.feed("not json")
+
+        with patch.object(se, "_stream_once", side_effect=always_bad) as stream, \
+             patch.object(se, "MAX_REPAIRS", 1):
+            with pytest.raises(ValueError, match="reparaciones"):
+                await se.evaluate_structured(interview, provider="openai", use_cache=False)
+        assert stream.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_usage_recorded_once_per_attempt(self, interview):
+        """An attempt that fails only on finish() (truncated JSON) is recorded once, not twice"""
+        doc = json.dumps(valid_evaluation())
+        calls = []
+
+        def fake_stream(provider, model, messages, validator):
+            calls.append(messages)
+            validator.feed(doc[:-1] if len(calls) == 1 else doc)
+
+        with patch.object(se, "_stream_once", side_effect=fake_stream), \
+             patch.object(se.llm, "record_llm_usage") as record:
+            await se.evaluate_structured(interview, provider="openai", use_cache=False)
+        assert len(calls) == 2 and record.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_retry_after_failed_save_persists_cache_hit(self, interview):
+        """If the save fails after the cache was written, the retry (served from cache) still persists"""
+        cache = EvaluationCache(redis_uri=None)
+        stream = patch.object(se, "_stream_once", side_effect=lambda p, m, msgs, v: v.feed(json.dumps(valid_evaluation())))
+        failing = AsyncMock()
+        failing.save_structured_evaluation.side_effect = RuntimeError("db down")
+        repo = AsyncMock()
+        with patch.object(se, "get_evaluation_cache", return_value=cache), patch.object(se, "CACHE_ENABLED", True), \
+             stream as stream_once:
+            with pytest.raises(RuntimeError):
+                await se.evaluate_structured(interview, provider="openai", repo=failing)
+            result = await se.evaluate_structured(interview, provider="openai", repo=repo)
+        assert stream_once.call_count == 1
+        repo.save_structured_evaluation.assert_awaited_once_with("s-1", result)
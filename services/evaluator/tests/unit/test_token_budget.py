@@ -0,0 +1,112 @@
+"""
+Unit tests for the token-budget planner and map-reduce evaluation.
+Tests turn splitting, chunk packing, plan selection and the map/reduce flow in run_evaluations.
+"""
+import pytest
+from unittest.mock import patch, AsyncMock
+from app.infrastructure import token_budget
+from app.infrastructure.token_budget import (
+    split_turns,
+    chunk_transcript,
+    estimate_tokens,
+    plan_evaluation,
+)
+from app.infrastructure.llm_provider import run_evaluations
+from app.domain.entities.interview import Interview
+
+
+def long_transcript(turns=40):
+    lines = []
+    for i in range(turns):
+        role = "assistant" if i % 2 == 0 else "user"
+        lines.append(f"[2025-01-01 10:{i % 60:02d}] {role}: " + f"answer number {i} " * 5)
+    return "\n".join(lines)
+
+
+class TestSplitTurns:
+    """Test suite for split_turns and chunk_transcript"""
+
+    def test_continuation_lines_stay_in_turn(self):
+        """Lines that do not start a turn are glued to the previous one"""
+        turns = split_turns("user: hola\nsigo hablando\nassistant: ok")
+        assert turns == ["user: hola\nsigo hablando", "assistant: ok"]
+
+    def test_markdown_speakers(self):
+        """**Speaker:** style transcripts are split on speakers"""
+        turns = split_turns("**Interviewer:** 'Hi'\n\n**Candidate:** 'Hello'")
+        assert len(turns) == 2
+        assert turns[1].startswith("**Candidate:**")
+
+    def test_chunks_respect_budget_and_turns(self):
+        """Every chunk fits the budget and no turn is cut"""
+        transcript = long_transcript()
+        chunks = chunk_transcript(transcript, budget=200)
+        assert len(chunks) > 1
+        assert all(estimate_tokens(c) <= 200 for c in chunks)
+        assert "\n".join(chunks) == transcript
+
+    def test_oversized_turn_is_hard_split(self):
+        """A single turn larger than the budget is still split"""
+        chunks = chunk_transcript("user: " + "x" * 4000, budget=100)
+        assert len(chunks) > 1
+        assert all(estimate_tokens(c) <= 100 for c in chunks)
+
+
+class TestPlanEvaluation:
+    """Test suite for plan_evaluation"""
+
+    def test_short_transcript_is_single_call(self):
+        plan, chunks = plan_evaluation("openai", "gpt-4o-mini", "P", "R", "user: hola", 512)
+        assert plan.mode == "single"
+        assert chunks == ["user: hola"]
+
+    def test_long_transcript_is_map_reduce(self):
+        """Per-model limits drive the split"""
+        with patch.dict(token_budget.MODEL_LIMITS, {"tiny-model": 1500}):
+            plan, chunks = plan_evaluation("openai", "tiny-model", "P", "R", long_transcript(), 512)
+        assert plan.mode == "map_reduce"
+        assert plan.context_limit == 1500
+        assert len(chunks) == len(plan.chunk_tokens) > 1
+        assert max(plan.chunk_tokens) <= plan.budget_tokens
+
+    def test_prompt_larger_than_model_fails(self):
+        with patch.dict(token_budget.MODEL_LIMITS, {"tiny-model": 600}):
+            with pytest.raises(ValueError):
+                plan_evaluation("openai", "tiny-model", "P" * 4000, "R", "user: hola", 512)
+
+
+class TestRunEvaluationsMapReduce:
+    """Test suite for map-reduce inside run_evaluations"""
+
+    @pytest.mark.asyncio
+    async def test_map_then_reduce(self):
+        """Chunks are evaluated, then merged; the plan is recorded on the interview"""
+        interview = Interview(interview_id="long-1", system_prompt="P", rubric="R", jd="JD",
+                              full_transcript=long_transcript())
+        with patch.dict(token_budget.MODEL_LIMITS, {"gpt-4o-mini": 1500}), \
+             patch("app.infrastructure.llm_provider.call_openai_gpt5", new=AsyncMock(side_effect=lambda p, r, t: "final" if "Merge" in p else "partial")) as m1, \
+             patch("app.infrastructure.llm_provider.call_google_gemini", new=AsyncMock(return_value="eval B")) as m2, \
+             patch("app.infrastructure.llm_provider.call_openrouter_deepseek", new=AsyncMock(return_value="eval C")):
+            result = await run_evaluations(interview, use_cache=False)
+
+        plan = result.evaluation_plan["evaluation_1"]
+        assert plan["mode"] == "map_reduce"
+        assert m1.await_count == len(plan["chunk_tokens"]) + plan["reduce_rounds"]
+        assert result.evaluation_1 == "final"
+        assert "Partial evaluation 1/" in m1.await_args.args[2]
+        assert result.evaluation_plan["evaluation_2"]["mode"] == "single"
+        m2.assert_awaited_once_with("P", "R", interview.full_transcript)
+
+    @pytest.mark.asyncio
+    async def test_failed_chunk_skips_reduce(self):
+        """If a map call fails its error is returned instead of a partial merge"""
+        interview = Interview(interview_id="long-2", system_prompt="P", rubric="R", jd="JD",
+                              full_transcript=long_transcript())
+        with patch.dict(token_budget.MODEL_LIMITS, {"gpt-4o-mini": 1500}), \
+             patch("app.infrastructure.llm_provider.call_openai_gpt5", new=AsyncMock(return_value="Error calling OpenAI API: 429")) as m1, \
+             patch("app.infrastructure.llm_provider.call_google_gemini", new=AsyncMock(return_value="eval B")), \
+             patch("app.infrastructure.llm_provider.call_openrouter_deepseek", new=AsyncMock(return_value="eval C")):
+            result = await run_evaluations(interview, use_cache=False)
+
+        assert result.evaluation_1.startswith("Error calling OpenAI API")
+        assert m1.await_count == len(result.evaluation_plan["evaluation_1"]["chunk_tokens"])
@@ -257,4 +257,16 @@ class TestGenerateTextUseCase:
         
         # Simple word-based token estimation
         expected_tokens = len("This is a test response with multiple words".split())
-        assert result.tokens_used == expected_tokens
\ No newline at end of file
+        assert result.tokens_used == expected_tokens
+
+    @pytest.mark.asyncio
+    async def test_reported_token_usage(self, use_case, mock_provider, basic_request):
+        """Real usage reported by the provider wins over the word estimate"""
+        mock_provider.generate_text_mock.return_value = "Short answer"
+        mock_provider.get_model_info_mock.return_value = {"name": "Test"}
+        mock_provider.last_usage = {"calls": 1, "prompt_tokens": 120, "completion_tokens": 30, "cost_usd": 0.0001}
+
+        result = await use_case.execute(basic_request)
+
+        assert result.tokens_used == 150
+        assert result.metadata["usage"]["cost_usd"] == 0.0001
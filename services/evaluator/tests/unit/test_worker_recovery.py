@@ -0,0 +1,256 @@
+"""
+Unit tests for the worker's recovery path.
+Tests delivery counting, retries with backoff (XCLAIM IDLE), dead-lettering, pending reclaim and the SIGTERM drain,
+against an AsyncMock Redis.
+"""
+import asyncio
+import json
+import sys
+from pathlib import Path
+import pytest
+from unittest.mock import AsyncMock, patch
+
+REPO_ROOT = Path(__file__).resolve().parents[4]  # --> Raíz del repo: worker.py importa services.evaluator...
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+worker = pytest.importorskip("services.evaluator.worker")
+
+NORMAL = worker.lane_streams()["normal"]
+PAYLOAD = {"interview_id": "iv-1", "priority": "normal"}
+
+
+def entry(payload=PAYLOAD):
+    return {b"payload": json.dumps(payload).encode()}
+
+
+def redis_at(delivery):
+    """Redis stub whose PEL reports `delivery` deliveries for any entry."""
+    r = AsyncMock()
+    r.xpending_range.return_value = [{"message_id": b"1-0", "times_delivered": delivery}]
+    return r
+
+
+@pytest.fixture(autouse=True)
+def policy():
+    with patch.object(worker, "MAX_ATTEMPTS", 3), \
+         patch.object(worker, "CLAIM_IDLE_MS", 60_000), \
+         patch.object(worker, "RETRY_BACKOFF_MS", 1_000):
+        yield
+
+
+class TestDeliveryCount:
+    """Test suite for _delivery_count"""
+
+    @pytest.mark.asyncio
+    async def test_reads_times_delivered(self):
+        """The attempt number is the PEL delivery counter for that entry"""
+        r = redis_at(2)
+        assert await worker._delivery_count(r, b"1-0", NORMAL) == 2
+        assert r.xpending_range.await_args.kwargs == {"min": b"1-0", "max": b"1-0", "count": 1}
+
+    @pytest.mark.asyncio
+    async def test_defaults_to_first_attempt(self):
+        """Without PEL info (or if XPENDING fails) it counts as the first delivery"""
+        r = AsyncMock()
+        r.xpending_range.return_value = []
+        assert await worker._delivery_count(r, b"1-0", NORMAL) == 1
+        r.xpending_range.side_effect = ConnectionError("down")
+        assert await worker._delivery_count(r, b"1-0", NORMAL) == 1
+
+
+class TestHandleEntry:
+    """Test suite for _handle_entry retry / dead-letter policy"""
+
+    async def handle(self, r, result):
+        repo = AsyncMock()
+        with patch.object(worker, "process_job", new=AsyncMock(return_value=result)) as process:
+            await worker._handle_entry(r, repo, b"1-0", entry(), NORMAL)
+        return process, repo
+
+    @pytest.mark.asyncio
+    async def test_success_acks(self):
+        """A processed job is acked and nothing goes to the dead-letter"""
+        r = redis_at(1)
+        process, _ = await self.handle(r, None)
+        assert process.await_args.kwargs == {"final": False}
+        r.xack.assert_awaited_once_with(NORMAL, worker.GROUP_NAME, b"1-0")
+        r.xadd.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_failure_schedules_retry_with_backoff(self):
+        """A failure with attempts left stays pending; XCLAIM IDLE makes the reclaim pick it up after the backoff"""
+        r = redis_at(2)
+        await self.handle(r, "boom")
+        r.xack.assert_not_awaited()
+        kwargs = r.xclaim.await_args.kwargs
+        assert r.xclaim.await_args.args == (NORMAL, worker.GROUP_NAME, worker.CONSUMER_ID)
+        assert kwargs["idle"] == 60_000 - 2_000 and kwargs["justid"] is True and kwargs["message_ids"] == [b"1-0"]
+
+    @pytest.mark.asyncio
+    async def test_last_attempt_goes_to_dead_letter_then_acks(self):
+        """The final attempt runs with final=True; its failure is written to the dead-letter and then acked"""
+        r = redis_at(3)
+        calls = []
+        r.xadd.side_effect = lambda *a, **k: calls.append("xadd")
+        r.xack.side_effect = lambda *a, **k: calls.append("xack")
+        process, _ = await self.handle(r, "boom")
+        assert process.await_args.kwargs == {"final": True}
+        assert calls == ["xadd", "xack"]
+        stream, fields = r.xadd.await_args.args
+        assert stream == worker.DEADLETTER_STREAM
+        assert fields["attempts"] == "3" and fields["reason"] == "boom" and fields["source_stream"] == NORMAL
+        assert json.loads(fields["payload"]) == PAYLOAD
+
+    @pytest.mark.asyncio
+    async def test_over_delivered_entry_is_dead_lettered_without_running(self):
+        """An entry delivered past MAX_ATTEMPTS (it keeps killing workers) is not run again"""
+        r = redis_at(4)
+        process, repo = await self.handle(r, None)
+        process.assert_not_awaited()
+        repo.mark_evaluation_status.assert_awaited_once_with("iv-1", "error", "max deliveries exceeded (3)")
+        assert r.xadd.await_args.args[1]["attempts"] == "3"
+        r.xack.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_starts_always_counted_queue_wait_only_on_first_delivery(self):
+        """Every delivery counts as a start; queue wait is observed once, on the first delivery"""
+        for delivery, waits in ((1, 1), (2, 0)):
+            r = redis_at(delivery)
+            with patch.object(worker.metrics, "inc") as inc, \
+                 patch.object(worker, "process_job", new=AsyncMock(return_value=None)):
+                await worker._handle_entry(r, AsyncMock(), b"1-0", entry({**PAYLOAD, "enqueued_at": 1.0}), NORMAL)
+            names = [c.args[0] for c in inc.call_args_list]
+            assert names.count("jobs_started_total") == 1
+            assert names.count("job_queue_wait_seconds_total") == names.count("job_queue_wait_observed_total") == waits
+
+    @pytest.mark.asyncio
+    async def test_start_counted_without_enqueued_at(self):
+        """Payloads without enqueued_at (older producers) still count as started"""
+        with patch.object(worker.metrics, "inc") as inc:
+            await self.handle(redis_at(1), None)
+        assert [c.args[0] for c in inc.call_args_list] == ["jobs_started_total"]
+
+    @pytest.mark.asyncio
+    async def test_no_ack_when_dead_letter_write_fails(self):
+        """If the dead-letter XADD fails the entry stays pending instead of being lost"""
+        r = redis_at(3)
+        r.xadd.side_effect = ConnectionError("down")
+        await self.handle(r, "boom")
+        r.xack.assert_not_awaited()
+
+
+class TestProcessJob:
+    """Test suite for process_job cache use"""
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("payload, use_cache", [(PAYLOAD, True), ({**PAYLOAD, "reevaluate": True}, False)])
+    async def test_reevaluate_payload_skips_the_cache(self, payload, use_cache):
+        """A job enqueued with "reevaluate" (bulk_reevaluate --force) ignores the evaluation cache"""
+        repo = AsyncMock()
+        repo.get_interview_context.return_value = {"interview_id": "iv-1", "full_transcript": "t"}
+        run = AsyncMock(side_effect=lambda interview, use_cache: interview)
+        with patch.object(worker, "run_evaluations", new=run), patch.object(worker, "REEVALUATE", False):
+            assert await worker.process_job(repo, payload) is None
+        assert run.await_args.kwargs == {"use_cache": use_cache}
+
+
+class TestReclaimPending:
+    """Test suite for _reclaim_pending"""
+
+    @pytest.mark.asyncio
+    async def test_claims_only_free_slots(self):
+        """One XAUTOCLAIM per lane (realtime first) for the remaining slots; the rest stays in the PEL"""
+        streams = worker.lane_streams()
+        pel = {streams["realtime"]: [(b"1-0", {b"payload": b"{}"}), (b"2-0", None)],
+               streams["normal"]: [(b"3-0", {b"payload": b"{}"})]}
+        r = AsyncMock()
+        r.xautoclaim.side_effect = lambda stream, group, consumer, min_idle_time, start_id, count: \
+            [b"0-0", pel.get(stream, [])[:count], []]
+        claimed = await worker._reclaim_pending(r, 3)
+        assert [(s, eid) for s, eid, _ in claimed] == [(streams["realtime"], b"1-0"), (streams["normal"], b"3-0")]
+        assert [c.kwargs["count"] for c in r.xautoclaim.await_args_list] == [3, 2, 1]
+        assert all(c.kwargs["min_idle_time"] == 60_000 for c in r.xautoclaim.await_args_list)
+
+    @pytest.mark.asyncio
+    async def test_stops_when_slots_are_filled(self):
+        """Once the free slots are claimed the remaining lanes are not touched"""
+        r = AsyncMock()
+        r.xautoclaim.return_value = [b"5-0", [(b"1-0", {b"payload": b"{}"})], []]
+        assert len(await worker._reclaim_pending(r, 1)) == 1
+        assert r.xautoclaim.await_count == 1
+
+
+class TestGracefulShutdown:
+    """Test suite for the SIGTERM drain in main() and _release"""
+
+    def worker_redis(self, after_stop):
+        """
+        Redis stub for main(): the first read delivers iv-1; the next one waits until that job is running,
+        sets `stop` (the SIGTERM) and returns `after_stop`. Every entry is on its second delivery.
+        """
+        r = redis_at(2)
+        r.xautoclaim.return_value = [b"0-0", [], []]
+        r.xclaim.side_effect = lambda stream, group, consumer, min_idle_time, message_ids, **kw: message_ids
+        self.stop, self.running = asyncio.Event(), asyncio.Event()
+
+        async def xreadgroup(group, consumer, streams, count, block=None):
+            stream = next(iter(streams))
+            if r.xreadgroup.await_count == 1:
+                return [[stream, [(b"1-0", entry({"interview_id": "iv-1"}))]]]
+            await self.running.wait()
+            self.stop.set()
+            return [[stream, [(eid, entry({"interview_id": iid})) for eid, iid in after_stop]]]
+
+        r.xreadgroup.side_effect = xreadgroup
+        return r
+
+    async def run(self, r, job, drain_timeout_s):
+        repo = AsyncMock()
+
+        async def process_job(repo, payload, final):
+            self.running.set()
+            return await job()
+
+        with patch.object(worker.Redis, "from_url", return_value=r), \
+             patch.object(worker, "listen_for_invalidations", new=AsyncMock()), \
+             patch.object(worker, "process_job", new=process_job), \
+             patch.object(worker, "METRICS_PUSH_S", 0), \
+             patch.object(worker, "CONCURRENCY", 2), \
+             patch.object(worker, "DRAIN_TIMEOUT_S", drain_timeout_s):
+            await asyncio.wait_for(worker.main(repo=repo, stop=self.stop), timeout=5)
+        return repo
+
+    @pytest.mark.asyncio
+    async def test_unfinished_and_late_entries_are_released(self):
+        """A job still running after DRAIN_TIMEOUT_S and an entry read after the SIGTERM go back to the group"""
+        r = self.worker_redis(after_stop=[(b"2-0", "iv-2")])
+        repo = await self.run(r, job=asyncio.Event().wait, drain_timeout_s=0.05)
+
+        released = {c.kwargs["message_ids"][0]: c.kwargs for c in r.xclaim.await_args_list}
+        assert set(released) == {b"1-0", b"2-0"}
+        for kwargs in released.values():
+            assert kwargs["idle"] == 60_000 and kwargs["retrycount"] == 1 and kwargs["justid"] is True
+        queued = {c.args for c in repo.mark_evaluation_status.await_args_list}
+        assert queued == {("iv-1", "queued"), ("iv-2", "queued")}
+        r.xack.assert_not_awaited()
+        repo.close.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_job_finishing_within_timeout_is_acked(self):
+        """A job that ends during the drain is acked normally and nothing is released"""
+        r = self.worker_redis(after_stop=[])
+        repo = await self.run(r, job=AsyncMock(return_value=None), drain_timeout_s=5)
+        r.xack.assert_awaited_once()
+        assert r.xack.await_args.args[2] == b"1-0"
+        r.xclaim.assert_not_awaited()
+        repo.mark_evaluation_status.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_release_skips_entries_no_longer_pending(self):
+        """If the entry was acked just before the cut, XCLAIM returns nothing and the status is left alone"""
+        r = redis_at(1)
+        r.xclaim.return_value = []
+        repo = AsyncMock()
+        await worker._release(r, repo, NORMAL, b"1-0", entry())
+        assert r.xclaim.await_args.kwargs["retrycount"] == 0
+        repo.mark_evaluation_status.assert_not_awaited()
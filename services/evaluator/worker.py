@@ -4,8 +4,9 @@
 # Worker del Evaluator: consume jobs de Redis -> arma contexto -> llama LLMs -> persiste resultados -> marca estado.
 # --*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*
 # --*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*--*
-import os, json, asyncio
-from typing import Dict, Any, Optional
+import os, json, asyncio, signal, time
+from datetime import datetime, timezone
+from typing import Dict, Any, Optional, List, Tuple
 
 # Redis asíncrono
 from redis.asyncio import Redis
@@ -14,15 +15,31 @@ from redis.asyncio import Redis
 from services.evaluator.app.infrastructure.repository import FileMockRepository, EvaluatorRepository
 from services.evaluator.app.infrastructure.repository_supabase import SupabaseRepository
 from services.evaluator.app.domain.entities.interview import Interview
-from services.evaluator.app.infrastructure.llm_provider import run_evaluations
+from services.evaluator.app.infrastructure.llm_provider import run_evaluations, get_structured_evaluation
+from services.evaluator.app.infrastructure.prompt_cache import listen_for_invalidations
+from services.evaluator.app.infrastructure.job_queue import LaneScheduler, lane_streams, priority_of
+from services.evaluator.app.infrastructure import metrics
 
 # --------------- Config por ENV ---------------
-STREAM_NAME = os.getenv("EVALUATOR_STREAM", "evaluation_jobs")   # --> Nombre del stream/cola
+STREAM_NAME = os.getenv("EVALUATOR_STREAM", "evaluation_jobs")   # --> Carril normal; realtime/bulk = "<stream>:<prioridad>"
 GROUP_NAME  = os.getenv("EVALUATOR_GROUP", "evaluator_group")    # --> Consumer group
 CONSUMER_ID = os.getenv("EVALUATOR_CONSUMER", "evaluator_worker_1")
 REDIS_URI   = os.getenv("REDIS_URI", "redis://redis:6379/0")     # --> Ya en .env.example
-REPO_KIND   = os.getenv("EVALUATOR_REPO", "supabase")            # --> "supabase" | "mock"
-REEVALUATE  = os.getenv("EVALUATOR_REEVALUATE", "false").lower() == "true"  # --> Idempotencia simple (hoy informativa)
+REPO_KIND   = os.getenv("EVALUATOR_REPO", "supabase")            # --> "supabase" | "mock" | "sqlite"
+REEVALUATE  = os.getenv("EVALUATOR_REEVALUATE", "false").lower() == "true"  # --> true = ignora el cache de evaluaciones
+STRUCTURED  = os.getenv("EVALUATOR_STRUCTURED", "false").lower() == "true"  # --> true = además guarda la evaluación estructurada (schema)
+
+# --> Recuperación ante caídas: reclamo de pendientes, reintentos y dead-letter
+DEADLETTER_STREAM = os.getenv("EVALUATOR_DEADLETTER_STREAM", f"{STREAM_NAME}:dead")  # --> Jobs que agotaron reintentos
+MAX_ATTEMPTS      = int(os.getenv("EVALUATOR_MAX_ATTEMPTS", "3"))               # --> Entregas máximas antes de dead-letter
+CLAIM_IDLE_MS     = int(os.getenv("EVALUATOR_CLAIM_IDLE_MS", "300000"))         # --> Idle mínimo para reclamar (5 min)
+RECLAIM_EVERY_S   = float(os.getenv("EVALUATOR_RECLAIM_EVERY_S", "30"))        # --> Cada cuánto barremos el PEL
+RETRY_BACKOFF_MS  = int(os.getenv("EVALUATOR_RETRY_BACKOFF_MS", "5000"))        # --> Backoff base (se duplica por intento)
+CONCURRENCY       = max(1, int(os.getenv("EVALUATOR_CONCURRENCY", "1")))        # --> Jobs en vuelo por worker (1 = secuencial)
+# --> Slots que sólo puede usar el carril realtime (una entrevista recién terminada no espera a que termine un bulk)
+REALTIME_RESERVED = int(os.getenv("EVALUATOR_REALTIME_RESERVED", "1"))
+METRICS_PUSH_S    = float(os.getenv("EVALUATOR_METRICS_PUSH_S", "15"))         # --> Export de métricas a Redis (0 = apagado)
+DRAIN_TIMEOUT_S   = float(os.getenv("EVALUATOR_DRAIN_TIMEOUT_S", "60"))        # --> SIGTERM: plazo para terminar los jobs en vuelo
 
 # =============== Helpers ===============
 
@@ -33,33 +50,224 @@ def _select_repo() -> EvaluatorRepository:
     """
     Selección de backend de datos por ENV:
       - "mock"     -> FileMockRepository
+      - "sqlite"   -> SqliteRepository (archivo local en WAL, escrituras agrupadas)
       - default    -> SupabaseRepository
     """
     if REPO_KIND == "mock":
         return FileMockRepository()
+    if REPO_KIND == "sqlite":
+        from services.evaluator.app.infrastructure.repository_sqlite import SqliteRepository
+        return SqliteRepository()
     return SupabaseRepository()
 
 async def _ensure_group(r: Redis) -> None:
     """
-    Crea el consumer group si no existe (mkstream=True crea el stream si hace falta).
+    Crea el consumer group en cada carril si no existe (mkstream=True crea el stream si hace falta).
     Ignora error si el grupo ya existe.
     """
+    for stream in lane_streams().values():
+        try:
+            await r.xgroup_create(stream, GROUP_NAME, id="$", mkstream=True)
+        except Exception:
+            pass  # --> No nos importa si ya estaba creado
+
+async def _ack(r: Redis, entry_id: str, stream: str = STREAM_NAME):
+    """Ack del mensaje procesado al consumer group (no interrumpe si falla)."""
     try:
-        await r.xgroup_create(STREAM_NAME, GROUP_NAME, id="$", mkstream=True)
+        await r.xack(stream, GROUP_NAME, entry_id)
     except Exception:
-        pass  # --> No nos importa si ya estaba creado
+        pass
 
-async def _ack(r: Redis, entry_id: str):
-    """Ack del mensaje procesado al consumer group (no interrumpe si falla)."""
+def _parse_payload(fields: Dict[Any, Any]) -> Dict[str, Any]:
+    """Decodifica el campo 'payload' del entry (bytes/str). Si no parsea, devuelve {}."""
+    try:
+        payload_raw = fields.get(b"payload") or fields.get("payload")  # --> Soporta bytes/str
+        return json.loads(payload_raw if isinstance(payload_raw, str)
+                          else payload_raw.decode("utf-8"))
+    except Exception:
+        return {}
+
+def _retry_backoff_ms(attempt: int) -> int:
+    """
+    Backoff exponencial por número de entrega: base * 2^(attempt-1), topeado en CLAIM_IDLE_MS
+    (más allá de eso el reclamo periódico ya lo vuelve a tomar).
+    """
+    return min(RETRY_BACKOFF_MS * (2 ** max(attempt - 1, 0)), CLAIM_IDLE_MS)
+
+async def _delivery_count(r: Redis, entry_id: Any, stream: str = STREAM_NAME) -> int:
+    """Veces que el entry fue entregado según el PEL (1 si no se puede consultar)."""
     try:
-        await r.xack(STREAM_NAME, GROUP_NAME, entry_id)
+        info = await r.xpending_range(stream, GROUP_NAME, min=entry_id, max=entry_id, count=1)
+        if info:
+            return int(info[0].get("times_delivered") or 1)
     except Exception:
         pass
+    return 1
+
+async def _dead_letter(r: Redis, entry_id: Any, payload: Dict[str, Any], reason: str, attempts: int,
+                       stream: str = STREAM_NAME) -> None:
+    """
+    Mueve el job al stream de dead-letter (con motivo y cantidad de intentos) y lo ackea del stream principal.
+    Se puede inspeccionar/reencolar con deadletter.py.
+    """
+    eid = entry_id.decode() if isinstance(entry_id, bytes) else str(entry_id)
+    try:
+        await r.xadd(DEADLETTER_STREAM, {
+            "payload": json.dumps(payload),
+            "source_stream": stream, # --> deadletter.py replay vuelve a este carril
+            "source_id": eid,
+            "reason": reason[:2000],
+            "attempts": str(attempts),
+            "failed_at": datetime.now(timezone.utc).isoformat(),
+            "consumer": CONSUMER_ID,
+        })
+        print(f"[Evaluator] DEAD-LETTER entry={eid} attempts={attempts} reason={reason[:200]}")
+    except Exception as e:
+        # --> Si no pudimos escribir al DLQ NO ackeamos: el entry queda pendiente y se reintenta el movimiento
+        print(f"[Evaluator] ERROR escribiendo dead-letter entry={eid}: {e}")
+        return
+    await _ack(r, entry_id, stream)
+
+async def _schedule_retry(r: Redis, entry_id: Any, attempt: int, stream: str = STREAM_NAME) -> None:
+    """
+    Deja el entry pendiente (sin ack) y ajusta su idle con XCLAIM IDLE para que el reclamo
+    periódico lo vuelva a tomar en ~backoff ms. JUSTID no incrementa el contador de entregas.
+    """
+    backoff = _retry_backoff_ms(attempt)
+    try:
+        await r.xclaim(stream, GROUP_NAME, CONSUMER_ID, min_idle_time=0,
+                       message_ids=[entry_id], idle=max(CLAIM_IDLE_MS - backoff, 0), justid=True)
+    except Exception as e:
+        print(f"[Evaluator] WARNING: no pude programar reintento de {entry_id}: {e}")
+    print(f"[Evaluator] RETRY entry={entry_id} intento={attempt}/{MAX_ATTEMPTS} en ~{backoff} ms")
+
+async def _release(r: Redis, repo: EvaluatorRepository, stream: str, entry_id: Any, fields: Dict[Any, Any]) -> None:
+    """
+    Devuelve al grupo un entry que el apagado no dejó terminar (o que llegó después del SIGTERM):
+    XCLAIM con IDLE = CLAIM_IDLE_MS (el próximo reclamo de cualquier worker lo toma) y RETRYCOUNT sin
+    esta entrega (no gasta un intento). La entrevista vuelve a 'queued' en vez de quedar en 'running'.
+    """
+    attempt = await _delivery_count(r, entry_id, stream)
+    try:
+        claimed = await r.xclaim(stream, GROUP_NAME, CONSUMER_ID, min_idle_time=0, message_ids=[entry_id],
+                                 idle=CLAIM_IDLE_MS, retrycount=max(attempt - 1, 0), justid=True)
+    except Exception as e:
+        print(f"[Evaluator] WARNING: no pude liberar {entry_id}: {e}")
+        return
+    if not claimed:
+        return  # --> Ya no está pendiente: se ackeó justo antes de cancelarlo
+    interview_id = _parse_payload(fields).get("interview_id")
+    if interview_id:
+        try:
+            await repo.mark_evaluation_status(interview_id, "queued")
+        except Exception as e:
+            print(f"[Evaluator] WARNING: no pude marcar queued: {e}")
+    print(f"[Evaluator] RELEASE entry={entry_id} interview_id={interview_id} (se reentrega en el próximo reclamo)")
+
+async def _reclaim_pending(r: Redis, limit: int) -> List[Tuple[str, Any, Dict[Any, Any]]]:
+    """
+    XAUTOCLAIM de entries con idle >= CLAIM_IDLE_MS (worker caído a mitad de job o reintento vencido),
+    carril por carril (realtime primero) y sólo hasta `limit` (los slots libres): el resto queda en el PEL
+    para otro worker o el próximo barrido. Devuelve (stream, entry_id, fields) ya asignados a este consumer.
+    """
+    claimed: List[Tuple[str, Any, Dict[Any, Any]]] = []
+    for stream in lane_streams().values():
+        if len(claimed) >= limit:
+            break
+        try:
+            resp = await r.xautoclaim(stream, GROUP_NAME, CONSUMER_ID, min_idle_time=CLAIM_IDLE_MS,
+                                      start_id="0-0", count=limit - len(claimed))
+            claimed.extend((stream, eid, fields) for eid, fields in resp[1] if fields)  # --> fields=None: entry borrado
+        except Exception as e:
+            print(f"[Evaluator] WARNING: XAUTOCLAIM falló en {stream}: {e}")
+    if claimed:
+        print(f"[Evaluator] Reclamados {len(claimed)} entries pendientes")
+    return claimed
+
+async def _handle_entry(r: Redis, repo: EvaluatorRepository, entry_id: Any, fields: Dict[Any, Any],
+                        stream: str = STREAM_NAME) -> None:
+    """
+    Procesa un entry con la política de reintentos:
+      - OK                       -> ack
+      - error y quedan intentos  -> sin ack, reintento con backoff
+      - error sin intentos       -> dead-letter + ack
+    """
+    payload = _parse_payload(fields)
+    lane = priority_of(stream)
+    attempt = await _delivery_count(r, entry_id, stream)
+    metrics.inc("jobs_started_total", lane=lane)
+    if attempt == 1 and payload.get("enqueued_at"):
+        # --> Espera en cola por carril, sólo en la primera entrega (promedio = seconds_total / observed_total)
+        metrics.inc("job_queue_wait_seconds_total", max(0.0, time.time() - float(payload["enqueued_at"])), lane=lane)
+        metrics.inc("job_queue_wait_observed_total", lane=lane)
+    if attempt > MAX_ATTEMPTS:
+        # --> Entregado de más sin llegar a ack: el job tumba al worker (o nunca termina)
+        reason = f"max deliveries exceeded ({attempt - 1})"
+        if payload.get("interview_id"):
+            try:
+                await repo.mark_evaluation_status(payload["interview_id"], "error", reason) # --> Quedó en 'running'
+            except Exception as e:
+                print(f"[Evaluator] WARNING: no pude marcar error: {e}")
+        await _dead_letter(r, entry_id, payload, reason, attempt - 1, stream)
+        return
+
+    error = await process_job(repo, payload, final=attempt >= MAX_ATTEMPTS) # --> Procesa el job
+    if error is None:
+        await _ack(r, entry_id, stream) # --> Ack al grupo
+    elif attempt >= MAX_ATTEMPTS:
+        await _dead_letter(r, entry_id, payload, error, attempt, stream)
+    else:
+        await _schedule_retry(r, entry_id, attempt, stream)
+
+
+async def _read_next(r: Redis, scheduler: LaneScheduler, lanes: List[str],
+                     block_ms: Optional[int]) -> List[Tuple[str, Any, Dict[Any, Any]]]:
+    """
+    Un job del primer carril con trabajo, en el orden del scheduler (lecturas sin bloqueo).
+    Si todos están vacíos y block_ms no es None, espera en todos a la vez (lo primero que llegue).
+    """
+    streams = lane_streams()
+    for lane in [p for p in scheduler.order() if p in lanes]:
+        resp = await r.xreadgroup(GROUP_NAME, CONSUMER_ID, streams={streams[lane]: ">"}, count=1)
+        if resp and resp[0][1]:
+            scheduler.served(lane)
+            return [(streams[lane], eid, fields) for eid, fields in resp[0][1]]
+        scheduler.idle(lane)
+    if block_ms is None:
+        return []
+    resp = await r.xreadgroup(GROUP_NAME, CONSUMER_ID, streams={streams[p]: ">" for p in lanes},
+                              count=1, block=block_ms)
+    entries = []
+    for stream, items in resp or []:
+        stream = stream.decode() if isinstance(stream, bytes) else stream
+        scheduler.served(priority_of(stream))
+        entries.extend((stream, eid, fields) for eid, fields in items)
+    return entries
+
+
+def _usage_summary(usage: "metrics.JobUsage", started: float) -> str:
+    """Una línea con total, etapas y tokens/costo del job (para el log)."""
+    data = usage.to_dict()
+    stages = " ".join(f"{k}={v}s" for k, v in data["stages_s"].items())
+    totals = data["totals"]
+    return (f"total={time.perf_counter() - started:.2f}s {stages} calls={totals['calls']} "
+            f"tokens={totals['prompt_tokens']}+{totals['completion_tokens']} cost=${totals['cost_usd']:.4f}")
+
+async def _push_metrics(r: Redis, every_s: float) -> None:
+    """Publica el export de métricas de este worker en Redis (la API lo muestra en /metrics)."""
+    while True:
+        try:
+            await metrics.push_export(r, CONSUMER_ID)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"[Evaluator] WARNING: no pude publicar métricas: {e}")
+        await asyncio.sleep(every_s)
 
 
 # =============== Núcleo del procesamiento ===============
 
-async def process_job(repo: EvaluatorRepository, payload: Dict[str, Any]):
+async def process_job(repo: EvaluatorRepository, payload: Dict[str, Any], final: bool = True) -> Optional[str]:
     """
     Flujo por job:
       1) valida que venga 'interview_id'
@@ -67,76 +275,177 @@ async def process_job(repo: EvaluatorRepository, payload: Dict[str, Any]):
       3) carga contexto -> Interview.from_dict
       4) run_evaluations (3 modelos, async)
       5) save_evaluation_results (DB si hay columnas; sino local)
-      6) marca 'done' o 'error'
+         (+ evaluación estructurada si EVALUATOR_STRUCTURED=true)
+      6) marca 'done' o 'error' ('retrying' si final=False: el loop lo va a reintentar)
+
+    Devuelve None si terminó OK (o si el payload se ignora) y el mensaje de error si falló,
+    para que el loop decida reintento o dead-letter.
     """
     interview_id = payload.get("interview_id")                 # --> Extraemos ID
     if not interview_id:
         print("[Evaluator] WARNING: payload sin 'interview_id'. Se ignora.")
-        return
+        return None
 
-    # Idempotencia simple: si no queremos re-evaluar, dejamos que el repo/DB lo defina con su status.
-    # Para no depender de schema, acá sólo respetamos REEVALUATE=false => seguimos igual (el repo anotará "running").
-    try:
-        await repo.mark_evaluation_status(interview_id, "running")
-    except Exception as e:
-        print(f"[Evaluator] WARNING: no pude marcar running: {e}")
+    # Idempotencia: con REEVALUATE=false las evaluaciones ya hechas (mismo modelo/prompt/rubric/transcript)
+    # salen del cache de resultados sin llamar al LLM; REEVALUATE=true (o "reevaluate": true en el payload,
+    # ej. bulk_reevaluate --force) fuerza llamadas nuevas.
+    use_cache = not (REEVALUATE or payload.get("reevaluate"))
 
-    # --> Estado 'running' al iniciar (si falla no cortamos)
-    try:
-        await repo.mark_evaluation_status(interview_id, "running")
-    except Exception as e:
-        print(f"[Evaluator] WARNING: no pude marcar running: {e}")
+    # --> Cada etapa se mide (histograma evaluator_stage_seconds) y, con los tokens/costo por provider,
+    #     queda en interview.evaluation_usage junto al resultado
+    started = time.perf_counter()
+    with metrics.usage_scope() as usage:
+        # --> Estado 'running' al iniciar (si falla no cortamos)
+        try:
+            with metrics.stage("status"):
+                await repo.mark_evaluation_status(interview_id, "running")
+        except Exception as e:
+            print(f"[Evaluator] WARNING: no pude marcar running: {e}")
 
-    try:
-        ctx = await repo.get_interview_context(interview_id) # --> Dict con 5 claves
-        interview = Interview.from_dict(ctx) # --> Entidad Interview completa
+        try:
+            with metrics.stage("context"):
+                ctx = await repo.get_interview_context(interview_id) # --> Dict con 5 claves
+            interview = Interview.from_dict(ctx) # --> Entidad Interview completa
 
-        interview = await run_evaluations(interview) # --> Llama a OpenAI/Gemini/OpenRouter
+            with metrics.stage("evaluate"):
+                interview = await run_evaluations(interview, use_cache=use_cache) # --> Llama a OpenAI/Gemini/OpenRouter (o cache)
+            interview.evaluation_usage = usage.to_dict() # --> Hasta acá: lo que costó producir estas evaluaciones
 
-        await repo.save_evaluation_results(interview_id, interview.to_dict()) # --> Persistencia DB/archivo
-        await repo.mark_evaluation_status(interview_id, "done") # --> Estado final OK
+            with metrics.stage("save"):
+                await repo.save_evaluation_results(interview_id, interview.to_dict()) # --> Persistencia DB/archivo
+            if STRUCTURED:
+                # --> JSON validado contra el schema de la rúbrica, persistido tipado (score) una sola vez
+                with metrics.stage("structured"):
+                    await get_structured_evaluation(interview, use_cache=use_cache, repo=repo)
+            with metrics.stage("status"):
+                await repo.mark_evaluation_status(interview_id, "done") # --> Estado final OK
 
-        print(f"[Evaluator] DONE interview_id={interview_id}")
-    except Exception as e:
-        await repo.mark_evaluation_status(interview_id, "error", str(e)) # --> Estado final con error
-        print(f"[Evaluator] ERROR interview_id={interview_id}: {e}")
+            metrics.observe("evaluator_job_seconds", time.perf_counter() - started, outcome="done")
+            print(f"[Evaluator] DONE interview_id={interview_id} {_usage_summary(usage, started)}")
+            return None
+        except Exception as e:
+            try:
+                # --> 'error' sólo si no quedan intentos; si no 'retrying' (los suscriptores SSE no cierran todavía)
+                with metrics.stage("status"):
+                    await repo.mark_evaluation_status(interview_id, "error" if final else "retrying", str(e))
+            except Exception as status_err:
+                print(f"[Evaluator] WARNING: no pude marcar error: {status_err}")
+            metrics.observe("evaluator_job_seconds", time.perf_counter() - started, outcome="error")
+            print(f"[Evaluator] ERROR interview_id={interview_id}: {e} {_usage_summary(usage, started)}")
+            return str(e) or e.__class__.__name__
 
-async def main():
+async def main(repo: Optional[EvaluatorRepository] = None, stop: Optional[asyncio.Event] = None):
     """
     Loop principal del worker:
       - Conecta a Redis
-      - Asegura consumer group
-      - Hace XREADGROUP bloqueante y procesa de a 1 mensaje
+      - Asegura consumer group en cada carril (realtime / normal / bulk)
+      - Cada RECLAIM_EVERY_S reclama pendientes viejos (XAUTOCLAIM) y los reprocesa
+      - Elige carril con LaneScheduler (ponderado + anti-inanición) y procesa hasta CONCURRENCY
+        jobs a la vez; REALTIME_RESERVED slots quedan sólo para realtime
+      - Con `stop` seteado (SIGTERM) deja de leer, da DRAIN_TIMEOUT_S a los jobs en vuelo y libera
+        los que no terminaron (y lo leído después del corte) para reentrega inmediata
+    `repo` y `stop` permiten correrlo embebido (benchmark.py): repo propio y corte ordenado.
     """
-    repo = _select_repo() # --> Elige backend (supabase/mock)
+    repo = repo or _select_repo() # --> Elige backend (supabase/mock)
+    await repo.warmup() # --> Pools / sondeo de schema una sola vez
     r = Redis.from_url(REDIS_URI) # --> Cliente Redis
     await _ensure_group(r) # --> Crea grupo si falta
-    print(f"[Evaluator] Worker online | stream={STREAM_NAME} group={GROUP_NAME} consumer={CONSUMER_ID} repo={REPO_KIND}")
+    prompts_listener = asyncio.create_task(listen_for_invalidations(REDIS_URI)) # --> Core avisa cambios de prompts
+    metrics_pusher = (asyncio.create_task(_push_metrics(r, METRICS_PUSH_S))
+                      if METRICS_PUSH_S > 0 and metrics.METRICS_BACKEND == "redis" else None)
+    reserved = min(max(REALTIME_RESERVED, 0), CONCURRENCY - 1) # --> Con CONCURRENCY=1 no se reserva nada
+    print(f"[Evaluator] Worker online | lanes={list(lane_streams().values())} group={GROUP_NAME} "
+          f"consumer={CONSUMER_ID} repo={REPO_KIND} concurrency={CONCURRENCY} realtime_reserved={reserved}")
 
-    while True:
-        try:
-            resp = await r.xreadgroup(
-                GROUP_NAME, CONSUMER_ID, # --> Grupo + consumer
-                streams={STREAM_NAME: ">"}, # --> '>' = mensajes nuevos
-                count=1, block=10_000 # --> 1 por vez, 10s de espera
-            )
-            if not resp:
-                continue # --> Timeout: sigue loop
-
-            _, entries = resp[0] # --> Tomamos primera lista de entries
-            for entry_id, fields in entries:
-                try:
-                    payload_raw = fields.get(b"payload") or fields.get("payload")  # --> Soporta bytes/str
-                    payload = json.loads(payload_raw if isinstance(payload_raw, str)
-                                           else payload_raw.decode("utf-8"))
-                except Exception:
-                    payload = {} # --> Si no parsea, payload vacío
-
-                await process_job(repo, payload) # --> Procesa el job
-                await _ack(r, entry_id) # --> Ack al grupo
-        except Exception as loop_err:
-            print(f"[Evaluator] Worker loop error: {loop_err}")
-            await asyncio.sleep(1) # --> Backoff básico y seguimos
+    scheduler = LaneScheduler()
+    inflight: Dict[asyncio.Task, str] = {} # --> Task de _handle_entry en curso -> carril (el ack lo hace la task)
+    held: Dict[asyncio.Task, Tuple[str, Any, Dict[Any, Any]]] = {} # --> Task -> entry (para liberarlo si se corta)
+    stopping = asyncio.create_task(stop.wait()) if stop is not None else None
+
+    def _spawn(stream, entry_id, fields) -> None:
+        task = asyncio.create_task(_handle_entry(r, repo, entry_id, fields, stream))
+        inflight[task] = priority_of(stream)
+        held[task] = (stream, entry_id, fields)
+        task.add_done_callback(lambda t: (inflight.pop(t, None), held.pop(t, None)))
+
+    def _stopped() -> bool:
+        return stop is not None and stop.is_set()
+
+    async def _wait_slot() -> None:
+        """Hasta que termine algún job en vuelo (o llegue el corte)."""
+        await asyncio.wait([*inflight, *([stopping] if stopping else [])], return_when=asyncio.FIRST_COMPLETED)
+
+    def _open_lanes() -> List[str]:
+        """Carriles que pueden empezar un job ahora (los no-realtime no tocan los slots reservados)."""
+        if len(inflight) >= CONCURRENCY:
+            return []
+        others = sum(1 for lane in inflight.values() if lane != "realtime")
+        if others >= CONCURRENCY - reserved:
+            return ["realtime"]
+        return ["realtime", "normal", "bulk"]
+
+    base_block_ms = min(10_000, int(RECLAIM_EVERY_S * 1000)) # --> Espera acotada por el reclamo
+    last_reclaim = 0.0
+    try:
+        while not _stopped():
+            try:
+                # --> Con todos los slots ocupados esperamos a que termine alguno antes de leer más
+                if len(inflight) >= CONCURRENCY:
+                    await _wait_slot()
+                    continue
+
+                # --> Pendientes de workers caídos o reintentos con backoff vencido
+                if time.monotonic() - last_reclaim >= RECLAIM_EVERY_S:
+                    last_reclaim = time.monotonic()
+                    for stream, entry_id, fields in await _reclaim_pending(r, CONCURRENCY - len(inflight)):
+                        if _stopped():
+                            await _release(r, repo, stream, entry_id, fields) # --> Reclamado pero ya no lo vamos a correr
+                        else:
+                            _spawn(stream, entry_id, fields)
+
+                # --> Con jobs en vuelo bloqueamos poco: al liberarse un slot no-realtime hay que volver a elegir carril.
+                #     La lectura no se cancela en el corte (un XREADGROUP cortado puede entregar sin que nos enteremos):
+                #     lo que devuelva después del SIGTERM se libera sin procesar
+                block_ms = min(base_block_ms, 1000) if inflight else base_block_ms
+                for stream, entry_id, fields in await _read_next(r, scheduler, _open_lanes(), block_ms):
+                    if _stopped():
+                        await _release(r, repo, stream, entry_id, fields)
+                    else:
+                        _spawn(stream, entry_id, fields) # --> Procesa + ack / reintento / dead-letter
+            except Exception as loop_err:
+                print(f"[Evaluator] Worker loop error: {loop_err}")
+                await asyncio.sleep(1) # --> Backoff básico y seguimos
+    finally:
+        if inflight:
+            # --> Drenado: lo que ya empezó tiene DRAIN_TIMEOUT_S; lo que no llega se cancela y se libera
+            print(f"[Evaluator] Apagando: esperando {len(inflight)} jobs en vuelo (hasta {DRAIN_TIMEOUT_S}s)")
+            _, unfinished = await asyncio.wait(list(inflight), timeout=DRAIN_TIMEOUT_S)
+            interrupted = [held[t] for t in unfinished]
+            for task in unfinished:
+                task.cancel()
+            await asyncio.gather(*unfinished, return_exceptions=True)
+            for stream, entry_id, fields in interrupted:
+                await _release(r, repo, stream, entry_id, fields)
+        if stopping is not None:
+            stopping.cancel()
+        prompts_listener.cancel()
+        if metrics_pusher is not None:
+            metrics_pusher.cancel()
+            try:
+                await metrics.push_export(r, CONSUMER_ID) # --> Último export con los jobs recién terminados
+            except Exception:
+                pass
+        await repo.close() # --> Vacía escrituras pendientes (sqlite) antes de salir
+        await r.aclose()
+        print(f"[Evaluator] Worker offline | consumer={CONSUMER_ID}")
+
+async def serve() -> None:
+    """main() con SIGTERM / SIGINT -> corte ordenado (deploys, supervisor.py, Ctrl+C)."""
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop.set)
+    await main(stop=stop)
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    asyncio.run(serve())
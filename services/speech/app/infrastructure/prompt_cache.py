@@ -0,0 +1,92 @@
+"""
+Cache de prompts in-process con TTL e invalidación por Redis pub/sub.
+
+Core publica en PROMPTS_INVALIDATION_CHANNEL cada vez que crea/edita/borra un prompt;
+un thread daemon escucha ese canal y vacía el cache. Así el inicio de cada entrevista
+no vuelve a leer de Supabase un prompt que cambia pocas veces por semana.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from ..config.redis_config import redis_client
+
+logger = logging.getLogger(__name__)
+
+PROMPT_CACHE_TTL_S = float(os.getenv("SPEECH_PROMPT_CACHE_TTL_S", "300"))
+PROMPTS_CHANNEL = os.getenv("PROMPTS_INVALIDATION_CHANNEL", "prompts:invalidate")
+
+
+class PromptCache:
+    """Cache clave -> dict del prompt (o None si no existe), thread-safe."""
+
+    def __init__(self, ttl_s: float = PROMPT_CACHE_TTL_S):
+        self.ttl_s = ttl_s
+        self._items: Dict[str, Tuple[float, Optional[Dict[str, Any]]]] = {}
+        self._lock = threading.Lock()
+        self.version = 0  # Se incrementa en cada invalidación
+
+    def get_or_load(self, key: str, loader: Callable[[], Optional[Dict[str, Any]]]) -> Optional[Dict[str, Any]]:
+        """Devuelve el valor cacheado si no venció el TTL; si no, llama al loader y lo guarda.
+
+        Si el loader lanza excepción no se cachea nada (se propaga al llamador).
+        """
+        with self._lock:
+            item = self._items.get(key)
+            version = self.version
+        if item is not None and time.monotonic() - item[0] <= self.ttl_s:
+            return item[1]
+
+        value = loader()
+        with self._lock:
+            # Si hubo invalidación mientras cargábamos, no guardamos un valor posiblemente viejo
+            if version == self.version:
+                self._items[key] = (time.monotonic(), value)
+        return value
+
+    def invalidate(self, key: Optional[str] = None) -> None:
+        with self._lock:
+            self.version += 1
+            if key is None:
+                self._items.clear()
+            else:
+                self._items.pop(key, None)
+
+
+prompt_cache = PromptCache()
+
+_listener: Optional[threading.Thread] = None
+
+
+def _listen(channel: str) -> None:
+    while True:
+        try:
+            pubsub = redis_client.client.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(channel)
+            logger.info(f"Escuchando invalidaciones de prompts en '{channel}'")
+            for msg in pubsub.listen():
+                try:
+                    data = json.loads(msg.get("data") or "{}")
+                except (TypeError, ValueError):
+                    data = {}
+                # Son pocos prompts: ante cualquier cambio vaciamos todo
+                prompt_cache.invalidate()
+                logger.info(f"Cache de prompts invalidado: {data or msg.get('data')}")
+        except Exception as e:
+            # Tras una desconexión pudimos perder mensajes: vaciamos y reintentamos
+            prompt_cache.invalidate()
+            logger.warning(f"Listener de prompts caído ({e}); reintento en 5s")
+            time.sleep(5)
+
+
+def start_invalidation_listener(channel: str = PROMPTS_CHANNEL) -> None:
+    """Arranca (una sola vez) el thread daemon que escucha el canal de invalidación."""
+    global _listener
+    if _listener is not None and _listener.is_alive():
+        return
+    _listener = threading.Thread(target=_listen, args=(channel,), name="prompt-cache-listener", daemon=True)
+    _listener.start()
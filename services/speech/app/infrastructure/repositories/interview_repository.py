@@ -3,6 +3,8 @@ from supabase import create_client, Client
 import os
 import logging
 
+from ..prompt_cache import prompt_cache
+
 
 class SupabaseInterviewRepository:
     """Implementación del repositorio de entrevistas usando Supabase."""
@@ -41,9 +43,9 @@ class SupabaseInterviewRepository:
             Exception: Si hay un error en la consulta a la base de datos
         """
         try:
-            # Consulta con joins incluyendo prompts usando PostgREST
+            # Consulta con joins usando PostgREST; el prompt se resuelve aparte por prompt_id (cacheado)
             result = self.client.table("interviews").select(
-                "id_interview, is_active, is_complete, candidates(name), jobs(job_role, description), prompts(prompt_type, content)"
+                "id_interview, is_active, is_complete, prompt_id, candidates(name), jobs(job_role, description)"
             ).eq("id_interview", interview_id).execute()
             
             if result.data and len(result.data) > 0:
@@ -62,7 +64,7 @@ class SupabaseInterviewRepository:
                 job_data = interview_data['jobs']
                 
                 # Obtener información del prompt si existe
-                prompt_data = interview_data.get('prompts')
+                prompt_data = self._get_prompt(interview_data.get('prompt_id'))
                 custom_prompt = None
                 if prompt_data and prompt_data.get('content'):
                     custom_prompt = prompt_data['content']
@@ -82,4 +84,17 @@ class SupabaseInterviewRepository:
             
         except Exception as e:
             logging.error(f"Error al consultar información de entrevista {interview_id}: {str(e)}")
-            raise Exception(f"Error fetching interview context: {e}")
\ No newline at end of file
+            raise Exception(f"Error fetching interview context: {e}")
+
+    def _get_prompt(self, prompt_id: Optional[Any]) -> Optional[Dict[str, Any]]:
+        """Obtiene {prompt_type, content} de un prompt, pasando por el cache con TTL.
+
+        El cache se invalida cuando Core publica un cambio de prompts en Redis.
+        """
+        if not prompt_id:
+            return None
+        return prompt_cache.get_or_load(str(prompt_id), lambda: self._fetch_prompt(prompt_id))
+
+    def _fetch_prompt(self, prompt_id: Any) -> Optional[Dict[str, Any]]:
+        result = self.client.table("prompts").select("prompt_type, content").eq("id", prompt_id).limit(1).execute()
+        return result.data[0] if result.data else None
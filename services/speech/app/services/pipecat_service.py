@@ -4,6 +4,8 @@
 # SPDX-License-Identifier: BSD 2-Clause License
 #
 import sys
+import json
+import time
 import asyncio
 from pathlib import Path  
 import os
@@ -55,6 +57,9 @@ _interview_repository = None
 _context_service = None
 _qa_service = None
 TRANSCRIPT_BASE_DIR = Path("storage")
+# subprocess -> corre run_one al cortar (default) | queue -> encola en el carril realtime del worker
+EVALUATOR_MODE = os.getenv("SPEECH_EVALUATOR_MODE", "subprocess")
+EVALUATOR_STREAM = os.getenv("EVALUATOR_STREAM", "evaluation_jobs")
 _shutdown_services_callback = None
 # We store functions so objects (e.g. SileroVADAnalyzer) don't get
 # instantiated. The function will be called when the desired transport gets
@@ -123,6 +128,19 @@ transport_params = {
     ),
 }
 
+def _enqueue_evaluation(interview_id: str | int) -> bool:
+    """
+    Encola la evaluación en el carril realtime (mismo formato que services.evaluator.app.infrastructure.job_queue):
+    el worker la atiende antes que los jobs normal/bulk aunque haya un backfill en curso.
+    """
+    payload = {"interview_id": str(interview_id), "priority": "realtime", "enqueued_at": time.time()}
+    entry_id = redis_client.add_to_stream(f"{EVALUATOR_STREAM}:realtime", {"payload": json.dumps(payload)})
+    if entry_id:
+        logger.info(f"📬 Evaluación encolada (realtime) para interview_id: {interview_id} ({entry_id})")
+        return True
+    logger.error(f"❌ No se pudo encolar la evaluación para interview_id: {interview_id}")
+    return False
+
 async def _run_evaluator_for_interview(interview_id: str | int):
     """
     Ejecuta el evaluador:
@@ -311,8 +329,9 @@ async def run_bot(webrtc_connection, runner_args: RunnerArguments, interview_id:
                     logger.info(f"✅ Conversación guardada en Supabase para interview_id: {interview_id}")
                     # Limpiar stream de Redis después de guardar
                     redis_client.delete_stream(stream_key)
-                    # 🔽🔽 Lanzar el evaluador para este interview_id
-                    await _run_evaluator_for_interview(interview_id)
+                    # 🔽🔽 Lanzar el evaluador para este interview_id (si no se pudo encolar, corre acá)
+                    if EVALUATOR_MODE != "queue" or not _enqueue_evaluation(interview_id):
+                        await _run_evaluator_for_interview(interview_id)
                 else:
                     logger.error(f"❌ Error al guardar conversación en Supabase para interview_id: {interview_id}")
             else:
@@ -16,6 +16,7 @@ from dotenv import load_dotenv
 
 from app.routes.speech_routes import router as speech_router
 from app.api.context_management import router as context_router
+from app.infrastructure.prompt_cache import start_invalidation_listener
 
 # Cargar variables de entorno desde el .env principal y local
 load_dotenv(dotenv_path="../../.env")  # .env principal del proyecto
@@ -30,6 +31,7 @@ async def lifespan(app: FastAPI):
     """Gestión del ciclo de vida de la aplicación"""
     try:
         logger.info("Iniciando Speech Service...")
+        start_invalidation_listener()  # Cache de prompts: invalidación cuando Core los edita
         logger.info("Speech Service iniciado correctamente")
         yield
     except Exception as e: